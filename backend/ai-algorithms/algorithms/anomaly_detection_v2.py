@@ -18,20 +18,91 @@ It decides:
 
 from typing import Dict, List, Optional   # For type hints (helps readability)
 from datetime import datetime, timedelta  # For working with dates and time
+from datetime import timezone             # For normalising aware timestamps
 from dataclasses import dataclass         # For creating simple data containers
 import random                             # For random number generation
+import warnings                           # For strict NumPy date parsing
+import zlib                               # For stable per-shop seeds
+
+import numpy as np                        # For the batch / fast paths
+
+
+# -----------------------------------------------------------
+# TIMESTAMP HELPERS — parse once into int64 epoch microseconds
+# -----------------------------------------------------------
+
+def _naive_utc(value: datetime) -> datetime:
+    """Aware datetimes become naive UTC; naive ones are left alone."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def datetime_to_epoch_us(value: datetime) -> int:
+    """One datetime → microseconds since 1970-01-01 (naive wall time)."""
+    return (_naive_utc(value) - _EPOCH) // _MICROSECOND
+
+
+def to_epoch_us(timestamps) -> np.ndarray:
+    """
+    Convert timestamps to an int64 array of epoch microseconds.
+
+    Accepts:
+    • an integer array (taken to already be epoch microseconds)
+    • a datetime64 array
+    • a sequence of ISO-8601 strings, datetimes, or sale dicts
+      with a 'timestamp' key (the sales_log shape)
+    """
+
+    if isinstance(timestamps, np.ndarray):
+        if timestamps.dtype.kind in 'iu':
+            return timestamps.astype(np.int64, copy=False)
+        if timestamps.dtype.kind == 'M':
+            return timestamps.astype('datetime64[us]').astype(np.int64)
+
+    values = [
+        t['timestamp'] if isinstance(t, dict) else t
+        for t in timestamps
+    ]
+
+    if not values:
+        return np.empty(0, dtype=np.int64)
+
+    if isinstance(values[0], str):
+        # NumPy parses plain ISO strings in C; anything it would have to
+        # guess about (e.g. UTC offsets) goes through fromisoformat
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                parsed = np.array(values, dtype='datetime64[us]')
+            return parsed.astype(np.int64)
+        except (ValueError, Warning):
+            values = [datetime.fromisoformat(v) for v in values]
+
+    # Plain datetime arithmetic is several times faster than letting
+    # NumPy convert datetime objects one by one
+    return np.fromiter(
+        (datetime_to_epoch_us(v) for v in values),
+        dtype=np.int64, count=len(values)
+    )
 
 
 # -----------------------------------------------------------
 # DATA CLASS — holds sales behavior information
 # -----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class SalesVelocityData:
     """
     Stores historical sales data for ONE product (SKU)
 
     Think of this as a report card of recent sales activity.
+    (Slotted to keep it small; columnar_store.SalesVelocityTable
+    holds millions of these as typed arrays.)
     """
 
     sku_id: str                     # Product ID
@@ -40,6 +111,11 @@ class SalesVelocityData:
     last_count_timestamp: datetime  # When the last physical count happened
     total_sales_since_count: int    # How many units sold since last count
 
+    @property
+    def current_hour_sales(self) -> float:
+        """Sales in the most recent hour (0 when there is no history)."""
+        return self.hourly_sales[-1] if self.hourly_sales else 0
+
 
 # -----------------------------------------------------------
 # MAIN AI / LOGIC ENGINE
@@ -57,6 +133,12 @@ class AnomalyDetectionEngine:
     # DEFAULT SETTINGS (all thresholds in one place)
     # -------------------------------------------------------
 
+    # Trigger type codes used by the batch API (index = code)
+    TRIGGER_TYPES = ('NONE', 'RANDOM', 'VOLUME', 'TIME', 'COUNTER')
+
+    # Severity codes used by the batch API (index = code)
+    SEVERITIES = ('GREEN', 'YELLOW', 'RED')
+
     DEFAULT_CONFIG = {
 
         # 20% chance of random security check
@@ -65,6 +147,12 @@ class AnomalyDetectionEngine:
         # Trigger if current sales are 2× normal sales
         'volume_multiplier': 2.0,
 
+        # 'multiplier' (above) or 'zscore' against the hour-of-day
+        # baseline, when the velocity data carries one
+        'volume_test': 'multiplier',
+        'volume_z_threshold': 3.0,
+        'volume_min_std': 1.0,    # Floor for near-constant hours
+
         # Trigger if this many hours passed since last count
         'time_threshold_hours': 4,
 
@@ -85,11 +173,16 @@ class AnomalyDetectionEngine:
     # INITIALIZATION
     # -------------------------------------------------------
 
-    def __init__(self, config: Dict = None):
+    def __init__(self, config: Dict = None, seed: Optional[int] = None):
         """
         Allows custom settings, but uses defaults if none provided.
+
+        A seed makes the RANDOM trigger reproducible (tests, audits).
+        Without one, draws come from Python's global random module.
         """
         self.config = {**self.DEFAULT_CONFIG, **(config or {})}
+        self.seed = seed
+        self._random = random.Random(seed) if seed is not None else random
 
 
     # -------------------------------------------------------
@@ -98,20 +191,37 @@ class AnomalyDetectionEngine:
 
     def should_trigger_count(self, velocity: SalesVelocityData,
                              current_time: datetime,
-                             sales_since_trigger: int = 0) -> Dict:
+                             sales_since_trigger: int = 0,
+                             random_draw: Optional[float] = None) -> Dict:
         """
         Checks ALL possible trigger conditions.
 
         Returns the MOST IMPORTANT one if multiple conditions are met.
+
+        `random_draw` replaces the engine's own draw for the RANDOM
+        check (decision_cache.py uses one draw per SKU and time slot).
+
+        A `velocity` with an advance() method (SalesVelocityTracker) is
+        rolled forward to `current_time` first, so this call modifies
+        the caller's tracker: hours older than the window are dropped,
+        as the next record_sale would do anyway.
         """
 
         triggers = []  # List of possible reasons to trigger a count
 
+        # Ring-buffer trackers roll their hourly window up to "now"
+        advance = getattr(velocity, 'advance', None)
+        if advance is not None:
+            advance(current_time)
+
         # ---------------------------------------------------
         # 1. RANDOM SECURITY CHECK
         # ---------------------------------------------------
 
-        if random.random() < self.config['random_probability']:
+        if random_draw is None:
+            random_draw = self._random.random()
+
+        if random_draw < self.config['random_probability']:
             triggers.append(('RANDOM', 2, 'Random security check'))
 
         # ---------------------------------------------------
@@ -119,11 +229,12 @@ class AnomalyDetectionEngine:
         # ---------------------------------------------------
 
         if self._is_volume_spike(velocity):
-            rate = sum(velocity.hourly_sales[-1:]) if velocity.hourly_sales else 0
+            rate = velocity.current_hour_sales
+            normal, _ = self._volume_baseline(velocity)
             triggers.append((
                 'VOLUME',
                 3,
-                f'Sales spike: {rate:.1f} vs {velocity.seven_day_average:.1f} avg'
+                f'Sales spike: {rate:.1f} vs {normal:.1f} avg'
             ))
 
         # ---------------------------------------------------
@@ -160,6 +271,145 @@ class AnomalyDetectionEngine:
         return {'should_trigger': False}
 
 
+    # -------------------------------------------------------
+    # BATCH DECISION: MANY SKUs (AND SHOPS) IN ONE CALL
+    # -------------------------------------------------------
+
+    def should_trigger_counts(self, current_hour_sales, seven_day_average,
+                              last_count_timestamps, current_time,
+                              sales_since_trigger=None, shop_ids=None,
+                              seed: Optional[int] = None,
+                              baseline_mean=None,
+                              baseline_std=None) -> Dict[str, np.ndarray]:
+        """
+        should_trigger_count for a whole shop (or many shops) at once.
+
+        Every argument except `current_time` and `seed` is an array
+        with one entry per SKU. `last_count_timestamps` (and an array
+        `current_time`) take anything to_epoch_us accepts.
+
+        The same four checks and the same priority rule are applied:
+        VOLUME (3) beats RANDOM / TIME (2, RANDOM first) beats
+        COUNTER (1).
+
+        RANDOM draws come from one stream per shop keyed on
+        (seed, shop id), consumed in row order, so the same seed and
+        inputs always give the same decisions, and a shop's decisions
+        do not depend on which other shops share the call. `seed`
+        defaults to the
+        engine's seed; with neither, draws are unseeded.
+
+        `baseline_mean` / `baseline_std` (e.g. from
+        SeasonalBaseline.trigger_inputs) replace seven_day_average for
+        the volume check, row by row; NaN rows keep the flat average.
+
+        Returns:
+            Dictionary of arrays:
+            - should_trigger (bool)
+            - type (int8 code; TRIGGER_TYPES[code] is the label)
+            - priority (int8; 0 when nothing triggers)
+            - hours_since_count (float64)
+            - random_draw (float64, the draw used for RANDOM)
+        """
+
+        recent = np.asarray(current_hour_sales, dtype=np.float64)
+        average = np.asarray(seven_day_average, dtype=np.float64)
+        n = recent.size
+
+        last_us = to_epoch_us(last_count_timestamps)
+        if isinstance(current_time, datetime):
+            now_us = datetime_to_epoch_us(current_time)
+        else:
+            now_us = to_epoch_us(current_time)
+
+        if sales_since_trigger is None:
+            sales_since_trigger = np.zeros(n, dtype=np.int64)
+        sales = np.asarray(sales_since_trigger)
+
+        draws = self._random_draws(n, shop_ids, self.seed if seed is None else seed)
+
+        # Same four conditions as the scalar path
+        is_random = draws < self.config['random_probability']
+        if baseline_mean is None:
+            is_volume = self._spike_rule(recent, average, None)
+        else:
+            mean = np.asarray(baseline_mean, dtype=np.float64)
+            std = (np.full(n, np.nan) if baseline_std is None
+                   else np.asarray(baseline_std, dtype=np.float64))
+            seasonal = ~np.isnan(mean)
+            is_volume = np.where(
+                seasonal,
+                self._spike_rule(recent, np.where(seasonal, mean, 0.0), std),
+                self._spike_rule(recent, average, None)
+            )
+        hours = (now_us - last_us) / 1e6 / 3600
+        is_time = hours >= self.config['time_threshold_hours']
+        is_counter = sales >= self.config['sales_counter_max']
+
+        # Highest priority wins; ties go to the earlier trigger
+        ttype = np.select(
+            [is_volume, is_random, is_time, is_counter],
+            [2, 1, 3, 4],
+            default=0
+        ).astype(np.int8)
+        priority = np.select(
+            [is_volume, is_random | is_time, is_counter],
+            [3, 2, 1],
+            default=0
+        ).astype(np.int8)
+
+        return {
+            'should_trigger': ttype > 0,
+            'type': ttype,
+            'priority': priority,
+            'hours_since_count': hours,
+            'random_draw': draws
+        }
+
+    @staticmethod
+    def _random_draws(n: int, shop_ids, seed: Optional[int]) -> np.ndarray:
+        """
+        One uniform [0, 1) draw per row.
+
+        Row k of a shop gets splitmix64(seed, shop key, k): a counter-
+        based generator, so every shop has its own reproducible stream
+        without building thousands of generator objects per call.
+        """
+
+        if seed is None:
+            return np.random.default_rng().random(n)
+
+        if shop_ids is None:
+            keys = np.zeros(n, dtype=np.uint64)
+            ranks = np.arange(n, dtype=np.uint64)
+        else:
+            shops, inverse = np.unique(np.asarray(shop_ids), return_inverse=True)
+            inverse = inverse.ravel()
+            shop_keys = np.array(
+                [zlib.crc32(str(shop).encode()) for shop in shops.tolist()],
+                dtype=np.uint64
+            )
+            keys = shop_keys[inverse]
+
+            # Position of each row among its own shop's rows
+            order = np.argsort(inverse, kind='stable')
+            counts = np.bincount(inverse, minlength=shops.size)
+            starts = np.cumsum(counts) - counts
+            ranks = np.empty(n, dtype=np.uint64)
+            ranks[order] = np.arange(n) - np.repeat(starts, counts)
+
+        # splitmix64 finaliser (uint64 array arithmetic wraps by design)
+        seed_mix = np.uint64((seed * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF)
+        x = (keys << np.uint64(32)) ^ ranks ^ seed_mix
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+
+        # Top 53 bits → double in [0, 1)
+        return (x >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
     # -------------------------------------------------------
     # CLASSIFY HOW SERIOUS A STOCK DIFFERENCE IS
     # -------------------------------------------------------
@@ -181,6 +431,25 @@ class AnomalyDetectionEngine:
             return {'severity': 'RED', 'send_alert': True}
 
 
+    def classify_variances(self, variance_pct) -> Dict[str, np.ndarray]:
+        """
+        classify_variance for a whole array of percentages.
+
+        Returns:
+            Dictionary of arrays:
+            - severity (int8 code; SEVERITIES[code] is the label)
+            - send_alert (bool; only RED alerts)
+        """
+
+        abs_var = np.abs(np.asarray(variance_pct, dtype=np.float64))
+
+        severity = np.full(abs_var.shape, 2, dtype=np.int8)
+        severity[abs_var <= self.config['yellow_max']] = 1
+        severity[abs_var <= self.config['green_max']] = 0
+
+        return {'severity': severity, 'send_alert': severity == 2}
+
+
     # -------------------------------------------------------
     # DETECT SUSPICIOUS SALES PATTERNS
     # -------------------------------------------------------
@@ -238,6 +507,77 @@ class AnomalyDetectionEngine:
         # FINAL RESULT
         # ---------------------------------------------------
 
+        return self.pattern_result(patterns)
+
+
+    # -------------------------------------------------------
+    # FAST PATH FOR LARGE SALES LOGS
+    # -------------------------------------------------------
+
+    def detect_theft_patterns_fast(self, sales_log, shift_end: datetime,
+                                   assume_sorted: bool = False) -> Dict:
+        """
+        Same checks and same result as detect_theft_patterns, built
+        for week-long logs.
+
+        Timestamps are parsed ONCE into an int64 epoch-microsecond
+        array (or `sales_log` can already be such an array, e.g. from
+        to_epoch_us). The end-of-shift window is found by binary search
+        and the largest gap with one vectorised diff.
+
+        The log is sorted first unless it is already in time order
+        (checked in O(n), or skipped with assume_sorted=True). The
+        original method measures gaps in log order, so the two agree
+        for chronologically ordered logs.
+        """
+
+        patterns = []
+
+        times = to_epoch_us(sales_log)
+        if not assume_sorted and times.size > 1 and np.any(times[1:] < times[:-1]):
+            times = np.sort(times, kind='stable')
+
+        # ---------------------------------------------------
+        # PATTERN 1: MANY SALES RIGHT BEFORE SHIFT ENDS
+        # ---------------------------------------------------
+
+        end_us = datetime_to_epoch_us(shift_end)
+        start_us = end_us - self.config['shift_window_min'] * 60 * 1_000_000
+
+        spike_count = int(
+            np.searchsorted(times, end_us, side='right')
+            - np.searchsorted(times, start_us, side='left')
+        )
+
+        if spike_count >= self.config['suspicious_sales']:
+            patterns.append({
+                'pattern': 'end_of_shift_spike',
+                'severity': 'high',
+                'description': f'{spike_count} sales in final {self.config["shift_window_min"]} min'
+            })
+
+        # ---------------------------------------------------
+        # PATTERN 2: LONG PERIOD WITH NO SALES
+        # ---------------------------------------------------
+
+        if times.size > 1:
+
+            max_gap = float(np.diff(times).max()) / 1e6 / 60
+
+            if max_gap > self.config['gap_threshold_min']:
+                patterns.append({
+                    'pattern': 'extended_gap',
+                    'severity': 'medium',
+                    'description': f'{max_gap:.0f} min gap between sales'
+                })
+
+        return self.pattern_result(patterns)
+
+
+    @staticmethod
+    def pattern_result(patterns: List[Dict]) -> Dict:
+        """Wraps detected patterns into the final risk summary."""
+
         return {
             'has_suspicious_activity': len(patterns) > 0,
             'patterns': patterns,
@@ -257,13 +597,33 @@ class AnomalyDetectionEngine:
         Determines if recent sales are unusually high.
         """
 
-        if not velocity.hourly_sales:
-            return False
+        mean, std = self._volume_baseline(velocity)
+        return bool(self._spike_rule(velocity.current_hour_sales, mean, std))
 
-        recent = sum(velocity.hourly_sales[-1:]) / 1
-        threshold = velocity.seven_day_average * self.config['volume_multiplier']
+    def _volume_baseline(self, velocity: SalesVelocityData):
+        """
+        (mean, std) "normal" sales for this hour. Velocity objects that
+        keep per-hour-of-day history (seasonal_baseline.BaselineVelocity)
+        expose `hour_baseline`; otherwise the flat 7-day average is used.
+        """
+        seasonal = getattr(velocity, 'hour_baseline', None)
+        if seasonal is not None:
+            return seasonal
+        return velocity.seven_day_average, None
 
-        return recent > threshold
+    def _spike_rule(self, recent, mean, std):
+        """
+        Multiplier test (recent > mean × volume_multiplier), or z-score
+        test when configured and a spread is known. Works on scalars and
+        arrays (NaN std falls back to the multiplier test).
+        """
+        multiplier = recent > mean * self.config['volume_multiplier']
+        if self.config['volume_test'] != 'zscore' or std is None:
+            return multiplier
+
+        spread = np.maximum(std, self.config['volume_min_std'])
+        zscore = (recent - mean) > self.config['volume_z_threshold'] * spread
+        return np.where(np.isnan(std), multiplier, zscore)
 
 
 # -----------------------------------------------------------
@@ -290,15 +650,23 @@ class QuickCountManager:
             'background_color': '#D4AF37'   # Golden color for alert
         }
 
+    # Field order of a count record for process_counts
+    COUNT_FIELDS = ('expected', 'actual', 'unit_price', 'staff_id', 'counted_at')
+
     @staticmethod
     def process_count(expected: float, actual: float,
-                      unit_price: float, staff_id: str) -> Dict:
+                      unit_price: float, staff_id: str,
+                      counted_at: Optional[datetime] = None,
+                      engine: Optional[AnomalyDetectionEngine] = None) -> Dict:
         """
         Processes the count submitted by staff.
         Calculates difference and financial loss.
+
+        `counted_at` is when the count was taken (defaults to now);
+        pass `engine` to reuse an already configured one.
         """
 
-        engine = AnomalyDetectionEngine()
+        engine = engine or AnomalyDetectionEngine()
 
         variance_pct = ((actual - expected) / expected * 100) if expected > 0 else 0
         classification = engine.classify_variance(variance_pct)
@@ -312,9 +680,134 @@ class QuickCountManager:
             'send_alert': classification['send_alert'],
             'financial_loss': abs(actual - expected) * unit_price,
             'staff_id': staff_id,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': (counted_at or datetime.now()).isoformat()
+        }
+
+    @classmethod
+    def process_counts(cls, records,
+                       engine: Optional[AnomalyDetectionEngine] = None) -> Dict:
+        """
+        Processes many counts at once (e.g. an offline device syncing
+        its queue). One engine is used for the whole batch and
+        severity is classified in a single vectorised pass.
+
+        Parameters:
+            records — a sequence of (expected, actual, unit_price,
+                staff_id, counted_at) tuples or dicts with those keys,
+                or a NumPy structured array with those fields.
+                counted_at may be None (meaning now).
+            engine — optional configured AnomalyDetectionEngine
+
+        Returns:
+            Columnar dictionary with the same keys as process_count
+            (arrays; severity as SEVERITIES codes, counted_at as
+            datetime64[us]) plus 'alerts': the per-record
+            process_count-shaped dicts for counts that need an alert.
+        """
+
+        engine = engine or AnomalyDetectionEngine()
+        columns = cls._count_columns(records)
+
+        expected = np.asarray(columns['expected'], dtype=np.float64)
+        actual = np.asarray(columns['actual'], dtype=np.float64)
+        unit_price = np.asarray(columns['unit_price'], dtype=np.float64)
+
+        variance = actual - expected
+        variance_pct = np.zeros_like(variance)
+        np.divide(variance, expected, out=variance_pct, where=expected > 0)
+        variance_pct *= 100
+
+        classification = engine.classify_variances(variance_pct)
+
+        # Missing count times fall back to one shared "now"
+        now = datetime.now()
+        counted_at = to_epoch_us(
+            [now if t is None else t for t in columns['counted_at']]
+        ).view('datetime64[us]')
+
+        result = {
+            'expected': expected,
+            'actual': actual,
+            'variance': variance,
+            'variance_pct': variance_pct,
+            'severity': classification['severity'],
+            'send_alert': classification['send_alert'],
+            'financial_loss': np.abs(variance) * unit_price,
+            'staff_id': np.asarray(columns['staff_id'], dtype=object),
+            'counted_at': counted_at
+        }
+
+        result['alerts'] = cls.count_records(
+            result, np.flatnonzero(result['send_alert'])
+        )
+
+        return result
+
+    @staticmethod
+    def count_records(result: Dict, rows) -> List[Dict]:
+        """Several rows of a process_counts result, shaped like process_count."""
+
+        rows = np.asarray(rows, dtype=np.intp)
+        names = ('expected', 'actual', 'variance', 'variance_pct',
+                 'financial_loss', 'staff_id')
+        values = {name: result[name][rows].tolist() for name in names}
+        severity = [AnomalyDetectionEngine.SEVERITIES[c]
+                    for c in result['severity'][rows].tolist()]
+        send_alert = result['send_alert'][rows].tolist()
+        stamps = result['counted_at'][rows].astype(datetime).tolist()
+
+        return [
+            {
+                'expected': values['expected'][k],
+                'actual': values['actual'][k],
+                'variance': values['variance'][k],
+                'variance_pct': values['variance_pct'][k],
+                'severity': severity[k],
+                'send_alert': send_alert[k],
+                'financial_loss': values['financial_loss'][k],
+                'staff_id': values['staff_id'][k],
+                'timestamp': stamps[k].isoformat()
+            }
+            for k in range(rows.size)
+        ]
+
+    @staticmethod
+    def count_record(result: Dict, i: int) -> Dict:
+        """Row `i` of a process_counts result, shaped like process_count."""
+
+        return {
+            'expected': result['expected'][i].item(),
+            'actual': result['actual'][i].item(),
+            'variance': result['variance'][i].item(),
+            'variance_pct': result['variance_pct'][i].item(),
+            'severity': AnomalyDetectionEngine.SEVERITIES[result['severity'][i]],
+            'send_alert': bool(result['send_alert'][i]),
+            'financial_loss': result['financial_loss'][i].item(),
+            'staff_id': result['staff_id'][i],
+            'timestamp': result['counted_at'][i].item().isoformat()
         }
 
+    @classmethod
+    def _count_columns(cls, records) -> Dict:
+        """Normalise the accepted record shapes into columns."""
+
+        if isinstance(records, np.ndarray) and records.dtype.names:
+            columns = {name: records[name] for name in cls.COUNT_FIELDS}
+            if columns['counted_at'].dtype.kind == 'M':
+                columns['counted_at'] = columns['counted_at'].astype(
+                    'datetime64[us]').astype(datetime)
+            return columns
+
+        records = list(records)
+        if records and isinstance(records[0], dict):
+            return {
+                name: [r.get(name) for r in records]
+                for name in cls.COUNT_FIELDS
+            }
+
+        rows = list(zip(*records)) or [()] * len(cls.COUNT_FIELDS)
+        return dict(zip(cls.COUNT_FIELDS, rows))
+
 
 # -----------------------------------------------------------
 # QUICK TEST — runs only if file executed directly
@@ -345,4 +838,18 @@ if __name__ == "__main__":
     print(f"  Trigger: {decision['should_trigger']}")
 
     if decision['should_trigger']:
-        print(f"  Type: {decision['type']}, Reason: {decision['reason']}")
\ No newline at end of file
+        print(f"  Type: {decision['type']}, Reason: {decision['reason']}")
+    print("\nOffline Sync (batch of counts):")
+
+    synced = QuickCountManager.process_counts([
+        (107, 106, 14.0, "Blessing", datetime(2026, 2, 16, 15, 0)),
+        (167, 167, 6.67, "Blessing", datetime(2026, 2, 16, 12, 0)),
+        (87, 70, 9.33, "Chinedu", datetime(2026, 2, 16, 18, 0)),
+    ], engine=engine)
+
+    for code, loss in zip(synced['severity'], synced['financial_loss']):
+        print(f"  {engine.SEVERITIES[code]}: ${loss:,.2f}")
+
+    for alert in synced['alerts']:
+        print(f"  ALERT {alert['staff_id']} at {alert['timestamp']}: "
+              f"{alert['variance_pct']:.1f}%")
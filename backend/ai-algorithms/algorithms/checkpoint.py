@@ -0,0 +1,520 @@
+"""
+Smart Loss Control - Engine State Checkpoints
+==============================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Saves the state a long-running engine process builds up (running
+expected stock, velocity windows, sales-since-count counters, the
+seasonal baselines and the trigger engine's random stream) to one
+binary file, so a restart loads it in well under a second instead of
+replaying the whole transaction history.
+
+• EngineState bundles the stateful pieces and applies events to all
+  of them. `position` counts the events consumed from the transaction
+  log in arrival order: it is the checkpoint's watermark.
+• Checkpointer saves every N events (and/or seconds), keeps the last
+  few files, and on restart loads the newest readable one and replays
+  only the log after its watermark.
+
+The watermark is a log position, not an event time: offline events
+arrive late with old timestamps, and a time watermark would skip them.
+
+FILE LAYOUT (little-endian, same framing as transaction_archive.py):
+• 8-byte magic  b'SLCCKP\\x00\\x01'
+• uint32 format version, uint32 header length
+• JSON header: position, engine config + random state, SKU id lists,
+  scalar settings and the array table (name, dtype, shape, offset)
+• the replay's remembered transaction ids as one JSON array per
+  generation (so 5 and '5' stay distinct and ids may hold any
+  character); the replay forgets ids past its dedup window, so this
+  part stays bounded
+• arrays, each starting on a 64-byte boundary
+
+Files are written to a temporary name, fsynced and renamed into
+place, so a crash mid-save leaves the previous checkpoint intact.
+"""
+
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+import gc
+import json
+import os
+import random
+import struct
+import time
+
+import numpy as np
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, to_epoch_us
+from event_replay import InventoryReplayEngine, SkuRunningState
+from seasonal_baseline import SeasonalBaseline
+from velocity_tracker import SalesVelocityTracker
+
+
+MAGIC = b'SLCCKP\x00\x01'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+# "No value" marker for int64 columns (NaT when viewed as datetime64)
+_NONE = np.iinfo(np.int64).min
+
+
+# -------------------------------------------------------------------
+# STATE BUNDLE: EngineState
+# -------------------------------------------------------------------
+
+class EngineState:
+    """Everything a warm engine process keeps between events"""
+
+    def __init__(self, engine: Optional[AnomalyDetectionEngine] = None,
+                 replay: Optional[InventoryReplayEngine] = None,
+                 velocity: Optional[Dict[str, SalesVelocityTracker]] = None,
+                 baseline: Optional[SeasonalBaseline] = None,
+                 baseline_rows: Optional[Dict[str, int]] = None,
+                 position: int = 0):
+        self.engine = engine or AnomalyDetectionEngine()
+        self.replay = replay or InventoryReplayEngine()
+        self.velocity = velocity if velocity is not None else {}
+
+        # Optional fleet baseline; baseline_rows maps sku_id → row
+        self.baseline = baseline
+        self.baseline_rows = baseline_rows or {}
+
+        # Events consumed from the log so far (the watermark)
+        self.position = position
+
+
+    # ---------------------------------------------------------------
+    # EVENTS
+    # ---------------------------------------------------------------
+
+    def apply(self, event: Dict) -> bool:
+        """
+        Apply one log event to every piece of state. Duplicates
+        (already-seen transaction ids) only move the position.
+        """
+        self.position += 1
+        if not self.replay.apply(event):
+            return False
+
+        sku_id = event['sku_id']
+        timestamp = datetime.fromisoformat(event['timestamp'])
+        tracker = self.velocity.get(sku_id)
+
+        if event['type'] == 'sale':
+            if tracker is None:
+                # Never counted: the TIME trigger will ask for a count
+                tracker = self.velocity[sku_id] = SalesVelocityTracker(sku_id, datetime.min)
+            tracker.record_sale(timestamp, event['quantity'])
+
+            row = self.baseline_rows.get(sku_id)
+            if row is not None:
+                self.baseline.record_sale(row, timestamp, event['quantity'])
+
+        elif event['type'] == 'quick_count':
+            if tracker is None:
+                self.velocity[sku_id] = SalesVelocityTracker(sku_id, timestamp)
+            else:
+                tracker.record_count(timestamp)
+
+        return True
+
+    def apply_batch(self, events: Iterable[Dict]) -> int:
+        """Apply events in arrival order. Returns how many were used."""
+        return sum(1 for event in events if self.apply(event))
+
+    def catch_up(self, log) -> int:
+        """
+        Apply the part of `log` (the whole arrival-ordered log, as a
+        sequence or iterable) that comes after `position`.
+        """
+        if hasattr(log, '__getitem__'):
+            tail = log[self.position:]
+        else:
+            tail = islice(log, self.position, None)
+        return self.apply_batch(tail)
+
+
+    # ---------------------------------------------------------------
+    # SAVE
+    # ---------------------------------------------------------------
+
+    def save(self, path, metadata: Optional[Dict] = None) -> Path:
+        """Write the state to `path` atomically."""
+
+        path = Path(path)
+        header = {
+            'position': self.position,
+            'created_at': datetime.now().isoformat(),
+            'engine': _engine_header(self.engine),
+            'metadata': metadata or {},
+        }
+        arrays: Dict[str, np.ndarray] = {}
+
+        # Running expected stock
+        replay = self.replay
+        states = list(replay.skus.values())
+        header['replay'] = {
+            'sku_ids': [s.sku_id for s in states],
+            'watermark': replay.watermark.isoformat() if replay.watermark else None,
+            'events_applied': replay.events_applied,
+            'dedup_window_s': (replay.dedup_window.total_seconds()
+                               if replay.dedup_window is not None else None),
+        }
+        arrays['replay.starting'] = np.array([s.starting_quantity for s in states], dtype='<f8')
+        arrays['replay.sell_price'] = np.array([s.sell_price for s in states], dtype='<f8')
+        arrays['replay.expected'] = np.array([s.expected for s in states], dtype='<f8')
+        arrays['replay.last_count_at'] = _epochs([s.last_count_at for s in states])
+        arrays['replay.last_count_actual'] = np.array(
+            [np.nan if s.last_count_actual is None else s.last_count_actual for s in states],
+            dtype='<f8'
+        )
+        arrays['replay.last_count_variance'] = np.array(
+            [s.last_count_variance for s in states], dtype='<f8'
+        )
+        # Transaction ids, [[generation, [ids]], ...] as JSON (types kept)
+        seen = [[generation, list(ids)] for generation, ids in replay._seen.items()]
+        arrays['replay.seen'] = np.frombuffer(json.dumps(seen).encode(), dtype='|u1')
+
+        # Velocity windows and since-count counters
+        trackers = list(self.velocity.values())
+        window = trackers[0].window_hours if trackers else SalesVelocityTracker.WINDOW_HOURS
+        if any(t.window_hours != window for t in trackers):
+            raise ValueError('All velocity trackers must share one window size')
+        header['velocity'] = {'sku_ids': [t.sku_id for t in trackers], 'window_hours': window}
+        arrays['velocity.buckets'] = (
+            np.stack([t._buckets for t in trackers]) if trackers
+            else np.zeros((0, window))
+        ).astype('<f8', copy=False)
+        arrays['velocity.head_hour'] = np.array(
+            [_NONE if t._head_hour is None else t._head_hour for t in trackers], dtype='<i8'
+        )
+        arrays['velocity.window_sum'] = np.array([t._window_sum for t in trackers], dtype='<f8')
+        arrays['velocity.last_count'] = _epochs([t.last_count_timestamp for t in trackers])
+        arrays['velocity.since_count'] = np.array(
+            [t.total_sales_since_count for t in trackers], dtype='<f8'
+        )
+
+        # Seasonal baselines (already columnar)
+        if self.baseline is not None:
+            b = self.baseline
+            header['baseline'] = {
+                'alpha': b.alpha, 'min_observations': b.min_observations,
+                'sku_ids': sorted(self.baseline_rows, key=self.baseline_rows.get),
+            }
+            for name in ('mean', 'var', 'n_obs', 'open_hour', 'open_sales'):
+                arrays[f'baseline.{name}'] = getattr(b, name)
+
+        return _write(path, header, arrays)
+
+
+    # ---------------------------------------------------------------
+    # LOAD
+    # ---------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path) -> 'EngineState':
+        """Rebuild the state saved by `save`."""
+
+        # Hundreds of thousands of new objects would otherwise set off
+        # repeated full garbage collections over the whole heap
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return cls._load(Path(path))
+        finally:
+            if was_enabled:
+                gc.enable()
+
+    @classmethod
+    def _load(cls, path: Path) -> 'EngineState':
+        header, arrays = _read(path)
+
+        # Running expected stock
+        info = header['replay']
+        replay = InventoryReplayEngine(
+            None if info['dedup_window_s'] is None else timedelta(seconds=info['dedup_window_s'])
+        )
+        counted_at = _datetimes(arrays['replay.last_count_at'])
+        actual = arrays['replay.last_count_actual']
+        replay.skus = {
+            sku_id: SkuRunningState(sku_id, start, price, expected, at,
+                                    None if a != a else a, variance)
+            for sku_id, start, price, expected, at, a, variance in zip(
+                info['sku_ids'],
+                arrays['replay.starting'].tolist(),
+                arrays['replay.sell_price'].tolist(),
+                arrays['replay.expected'].tolist(),
+                counted_at,
+                actual.tolist(),
+                arrays['replay.last_count_variance'].tolist(),
+            )
+        }
+        replay._seen = {generation: set(ids) for generation, ids
+                        in json.loads(arrays['replay.seen'].tobytes())}
+        replay.watermark = (datetime.fromisoformat(info['watermark'])
+                            if info['watermark'] else None)
+        replay.events_applied = info['events_applied']
+
+        # Velocity windows (each tracker's buckets are a row view)
+        buckets = arrays['velocity.buckets']
+        velocity = {
+            sku_id: SalesVelocityTracker.from_window(
+                sku_id, last_count, buckets[i],
+                None if head == _NONE else head, window_sum, since
+            )
+            for i, (sku_id, head, window_sum, last_count, since) in enumerate(zip(
+                header['velocity']['sku_ids'],
+                arrays['velocity.head_hour'].tolist(),
+                arrays['velocity.window_sum'].tolist(),
+                _datetimes(arrays['velocity.last_count']),
+                arrays['velocity.since_count'].tolist(),
+            ))
+        }
+
+        # Seasonal baselines
+        baseline, baseline_rows = None, {}
+        if 'baseline' in header:
+            info = header['baseline']
+            baseline = SeasonalBaseline.__new__(SeasonalBaseline)
+            baseline.alpha = info['alpha']
+            baseline.min_observations = info['min_observations']
+            for name in ('mean', 'var', 'n_obs', 'open_hour', 'open_sales'):
+                setattr(baseline, name, arrays[f'baseline.{name}'])
+            baseline_rows = {sku_id: row for row, sku_id in enumerate(info['sku_ids'])}
+
+        return cls(engine=_engine_from_header(header['engine']), replay=replay,
+                   velocity=velocity, baseline=baseline,
+                   baseline_rows=baseline_rows, position=header['position'])
+
+
+# -------------------------------------------------------------------
+# PERIODIC SNAPSHOTS: Checkpointer
+# -------------------------------------------------------------------
+
+class Checkpointer:
+    """Saves EngineState now and then; restores the newest snapshot"""
+
+    def __init__(self, directory, every_events: int = 100_000,
+                 every_seconds: Optional[float] = None, keep: int = 2):
+        if keep < 1:
+            # The snapshot just written is always kept
+            raise ValueError(f'keep must be at least 1, got {keep}')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.every_events = every_events
+        self.every_seconds = every_seconds
+        self.keep = keep
+
+        self._saved_position = 0
+        self._saved_at = time.monotonic()
+
+    def path_for(self, position: int) -> Path:
+        # Zero-padded so name order is position order
+        return self.directory / f'state-{position:012d}.ckpt'
+
+    def checkpoints(self) -> List[Path]:
+        """Snapshot files, oldest first."""
+        return sorted(self.directory.glob('state-*.ckpt'))
+
+    def maybe_save(self, state: EngineState) -> Optional[Path]:
+        """Save if enough events (or time) passed since the last save."""
+        due = state.position - self._saved_position >= self.every_events
+        if self.every_seconds is not None:
+            due = due or time.monotonic() - self._saved_at >= self.every_seconds
+        if due and state.position > self._saved_position:
+            return self.save(state)
+        return None
+
+    def save(self, state: EngineState, metadata: Optional[Dict] = None) -> Path:
+        path = state.save(self.path_for(state.position), metadata)
+        self._saved_position = state.position
+        self._saved_at = time.monotonic()
+
+        saved = self.checkpoints()
+        for old in saved[:len(saved) - self.keep]:
+            old.unlink()
+        return path
+
+    def restore(self, log=None,
+                default: Optional[EngineState] = None) -> EngineState:
+        """
+        Load the newest readable snapshot (falling back to older ones
+        if it is damaged), then replay `log` after its watermark.
+        With no snapshot, starts from `default` (or empty state).
+        """
+        state = None
+        for path in reversed(self.checkpoints()):
+            try:
+                state = EngineState.load(path)
+                break
+            except (ValueError, KeyError, OSError):
+                continue
+
+        if state is None:
+            state = default if default is not None else EngineState()
+        self._saved_position = state.position
+
+        if log is not None:
+            state.catch_up(log)
+        return state
+
+
+# -------------------------------------------------------------------
+# FILE FORMAT HELPERS
+# -------------------------------------------------------------------
+
+def _write(path: Path, header: Dict, arrays: Dict[str, np.ndarray]) -> Path:
+    header['arrays'] = []
+    offset = 0
+    for name, array in arrays.items():
+        array = arrays[name] = np.ascontiguousarray(array)
+        header['arrays'].append({
+            'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape),
+            'offset': offset, 'nbytes': array.nbytes
+        })
+        offset += _aligned(array.nbytes)
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - f.tell()))
+
+        for array in arrays.values():
+            f.write(memoryview(array).cast('B'))
+            f.write(b'\0' * (_aligned(array.nbytes) - array.nbytes))
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+
+    # Make the rename itself durable
+    directory = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    return path
+
+
+def _read(path: Path):
+    """Header plus writable arrays over one in-memory copy of the file."""
+
+    with open(path, 'rb') as f:
+        buffer = bytearray(os.fstat(f.fileno()).st_size)
+        f.readinto(buffer)
+
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError(f'{path} is truncated')
+    magic, version, header_len = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not an engine checkpoint')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported checkpoint version {version}')
+
+    header = json.loads(buffer[_PREAMBLE.size:_PREAMBLE.size + header_len])
+    data_start = _aligned(_PREAMBLE.size + header_len)
+
+    arrays = {}
+    for entry in header['arrays']:
+        start = data_start + entry['offset']
+        if start + entry['nbytes'] > len(buffer):
+            raise ValueError(f'{path} is truncated')
+        dtype = np.dtype(entry['dtype'])
+        arrays[entry['name']] = np.frombuffer(
+            buffer, dtype=dtype, count=entry['nbytes'] // dtype.itemsize, offset=start
+        ).reshape(entry['shape'])
+    return header, arrays
+
+
+def _engine_header(engine: AnomalyDetectionEngine) -> Dict:
+    # An unseeded engine draws from the global random module, which
+    # is not ours to save
+    state = None
+    if isinstance(engine._random, random.Random):
+        version, internal, gauss = engine._random.getstate()
+        state = [version, list(internal), gauss]
+    return {'config': engine.config, 'seed': engine.seed, 'random_state': state}
+
+
+def _engine_from_header(info: Dict) -> AnomalyDetectionEngine:
+    engine = AnomalyDetectionEngine(info['config'], seed=info['seed'])
+    if info['random_state'] is not None:
+        version, internal, gauss = info['random_state']
+        engine._random.setstate((version, tuple(internal), gauss))
+    return engine
+
+
+def _epochs(values: List[Optional[datetime]]) -> np.ndarray:
+    """Datetimes (or None) → int64 epoch µs with _NONE for None."""
+    out = np.full(len(values), _NONE, dtype='<i8')
+    present = [i for i, v in enumerate(values) if v is not None]
+    if present:
+        out[present] = to_epoch_us([values[i] for i in present])
+    return out
+
+
+def _datetimes(epochs: np.ndarray) -> List[Optional[datetime]]:
+    """Inverse of _epochs (naive datetimes; _NONE → None)."""
+    return epochs.astype('datetime64[us]').astype(object).tolist()
+
+
+def _aligned(n: int) -> int:
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+# Replays the simulation with a snapshot half way, restarts from it
+# and checks the result matches an uninterrupted replay.
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    dataset_path = (
+        Path(__file__).resolve().parent.parent
+        / 'test-data' / 'simulation_dataset.json'
+    )
+    with open(dataset_path, 'r') as f:
+        data = json.load(f)
+    log = data['transactions']
+
+    def fresh():
+        return EngineState(
+            engine=AnomalyDetectionEngine(seed=7),
+            replay=InventoryReplayEngine.from_initial_inventory(data['initial_inventory'])
+        )
+
+    reference = fresh()
+    reference.apply_batch(log)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpointer = Checkpointer(tmp, every_events=len(log) // 2)
+        live = fresh()
+        for event in log[:len(log) * 3 // 4]:
+            live.apply(event)
+            checkpointer.maybe_save(live)
+
+        # "Restart": only the events after the snapshot are replayed
+        restored = Checkpointer(tmp).restore(log, default=fresh())
+        snapshot = checkpointer.checkpoints()[-1]
+        print(f"Snapshot {snapshot.name} ({snapshot.stat().st_size:,} bytes), "
+              f"replayed {len(log) - int(snapshot.stem.split('-')[1])} of {len(log)} events")
+
+    same = restored.replay.inventory_snapshots() == reference.replay.inventory_snapshots()
+    print(f"Inventory snapshots match uninterrupted replay: {same}")
@@ -0,0 +1,471 @@
+"""
+Smart Loss Control - Columnar Store for Engine Inputs
+======================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Holds millions of InventoryState / SalesVelocityData records as typed
+NumPy columns instead of millions of Python objects.
+
+• Numbers live in fixed-width columns (float64, int32, ...)
+• sku_id / brand / size strings are interned: each distinct string is
+  stored once and rows keep a small integer code
+• hourly_sales (a ragged list per SKU) is one flat float64 array plus
+  an offsets array
+
+Indexing a table gives a lightweight VIEW (two slots: table + row)
+with the same attribute names as the dataclass, so existing callers
+such as InventoryEngine.calculate_expected and
+AnomalyDetectionEngine.should_trigger_count keep working unchanged.
+Whole-table work should use the columns directly (see reconcile and
+trigger_inputs).
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from inventory_engine_v2 import InventoryEngine, InventoryState
+from anomaly_detection_v2 import SalesVelocityData, datetime_to_epoch_us
+
+
+# Reference point for decoding epoch-microsecond columns
+_EPOCH = datetime(1970, 1, 1)
+
+
+# -------------------------------------------------------------------
+# STRING INTERNING
+# -------------------------------------------------------------------
+
+class StringPool:
+    """Stores each distinct string once and hands out int codes."""
+
+    __slots__ = ('_codes', 'values')
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def intern_many(self, values) -> np.ndarray:
+        """Intern a whole column; distinct values are looked up once."""
+        uniques, inverse = np.unique(np.asarray(values, dtype=object),
+                                     return_inverse=True)
+        codes = np.array([self.intern(v) for v in uniques.tolist()],
+                         dtype=np.int32)
+        return codes[inverse.ravel()]
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+# -------------------------------------------------------------------
+# BASE TABLE: growable typed columns
+# -------------------------------------------------------------------
+
+class _ColumnTable:
+    """Shared storage logic. Subclasses declare COLUMNS and STRINGS."""
+
+    # column name → dtype (string columns hold int32 codes)
+    COLUMNS: Dict[str, type] = {}
+
+    # columns whose values are interned strings
+    STRINGS: tuple = ()
+
+    # view class handed out by __getitem__
+    VIEW = None
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._data = {
+            name: np.zeros(capacity, dtype=dtype)
+            for name, dtype in self.COLUMNS.items()
+        }
+        self._pools = {name: StringPool() for name in self.STRINGS}
+
+    def _reserve(self, extra: int) -> None:
+        """Make room for `extra` more rows (capacity doubles)."""
+        needed = self._size + extra
+        capacity = len(next(iter(self._data.values())))
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, column in self._data.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+
+    def _append_row(self, values: Dict) -> int:
+        self._reserve(1)
+        row = self._size
+        for name, value in values.items():
+            if name in self._pools:
+                value = self._pools[name].intern(value)
+            self._data[name][row] = value
+        self._size += 1
+        return row
+
+    def _append_columns(self, columns: Dict) -> None:
+        n = len(next(iter(columns.values())))
+        self._reserve(n)
+        start, end = self._size, self._size + n
+        for name, values in columns.items():
+            if name in self._pools:
+                values = self._pools[name].intern_many(values)
+            self._data[name][start:end] = values
+        self._size = end
+
+    # ---------------------------------------------------------------
+    # ACCESS
+    # ---------------------------------------------------------------
+
+    def column(self, name: str) -> np.ndarray:
+        """Live view of one column (codes for string columns)."""
+        return self._data[name][:self._size]
+
+    def strings(self, name: str) -> np.ndarray:
+        """Decoded string column (allocates; use for reporting)."""
+        pool = np.asarray(self._pools[name].values, dtype=object)
+        return pool[self.column(name)]
+
+    def nbytes(self) -> int:
+        """Bytes used by stored rows (excluding string pools)."""
+        return sum(column[:self._size].nbytes for column in self._data.values())
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, row: int):
+        if row < 0:
+            row += self._size
+        if not 0 <= row < self._size:
+            raise IndexError(row)
+        return self.VIEW(self, row)
+
+    def __iter__(self) -> Iterator:
+        for row in range(self._size):
+            yield self.VIEW(self, row)
+
+
+# -------------------------------------------------------------------
+# ROW VIEWS
+# -------------------------------------------------------------------
+
+def _number_field(name: str) -> property:
+    def get(self):
+        return self._table._data[name][self._row].item()
+
+    def set(self, value):
+        self._table._data[name][self._row] = value
+
+    return property(get, set)
+
+
+def _string_field(name: str) -> property:
+    def get(self):
+        return self._table._pools[name][int(self._table._data[name][self._row])]
+
+    def set(self, value):
+        self._table._data[name][self._row] = self._table._pools[name].intern(value)
+
+    return property(get, set)
+
+
+class _RowView:
+    """A (table, row) pair; attribute access reads the columns."""
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: _ColumnTable, row: int):
+        self._table = table
+        self._row = row
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dataclass()!r})"
+
+
+class InventoryStateView(_RowView):
+    """Behaves like InventoryState, backed by an InventoryStateTable row."""
+
+    __slots__ = ()
+
+    sku_id = _string_field('sku_id')
+    brand = _string_field('brand')
+    size = _string_field('size')
+    initial_stock = _number_field('initial_stock')
+    cartons_received = _number_field('cartons_received')
+    units_sold = _number_field('units_sold')
+    litres_per_carton = _number_field('litres_per_carton')
+
+    def to_dataclass(self) -> InventoryState:
+        return InventoryState(
+            sku_id=self.sku_id, brand=self.brand, size=self.size,
+            initial_stock=self.initial_stock,
+            cartons_received=self.cartons_received,
+            units_sold=self.units_sold,
+            litres_per_carton=self.litres_per_carton
+        )
+
+
+class SalesVelocityView(_RowView):
+    """Behaves like SalesVelocityData, backed by a SalesVelocityTable row."""
+
+    __slots__ = ()
+
+    sku_id = _string_field('sku_id')
+    seven_day_average = _number_field('seven_day_average')
+    total_sales_since_count = _number_field('total_sales_since_count')
+
+    @property
+    def hourly_sales(self) -> np.ndarray:
+        """This SKU's hourly history (a view, not a copy)."""
+        start, end = self._table._bounds(self._row)
+        return self._table._values[start:end]
+
+    @property
+    def current_hour_sales(self) -> float:
+        start, end = self._table._bounds(self._row)
+        return self._table._values[end - 1].item() if end > start else 0
+
+    @property
+    def last_count_timestamp(self) -> datetime:
+        micros = int(self._table._data['last_count_timestamp'][self._row])
+        return _EPOCH + timedelta(microseconds=micros)
+
+    @last_count_timestamp.setter
+    def last_count_timestamp(self, value: datetime) -> None:
+        self._table._data['last_count_timestamp'][self._row] = datetime_to_epoch_us(value)
+
+    def to_dataclass(self) -> SalesVelocityData:
+        return SalesVelocityData(
+            sku_id=self.sku_id,
+            hourly_sales=self.hourly_sales.tolist(),
+            seven_day_average=self.seven_day_average,
+            last_count_timestamp=self.last_count_timestamp,
+            total_sales_since_count=self.total_sales_since_count
+        )
+
+
+# -------------------------------------------------------------------
+# TABLE: InventoryStateTable
+# -------------------------------------------------------------------
+
+class InventoryStateTable(_ColumnTable):
+    """Array-backed store of InventoryState rows (34 bytes per row)."""
+
+    COLUMNS = {
+        'sku_id': np.int32,
+        'brand': np.int32,
+        'size': np.int32,
+        'initial_stock': np.float64,
+        'cartons_received': np.int32,
+        'units_sold': np.float64,
+        'litres_per_carton': np.int16,
+    }
+    STRINGS = ('sku_id', 'brand', 'size')
+    VIEW = InventoryStateView
+
+    def append(self, state: InventoryState) -> int:
+        """Copy one InventoryState (or view) in; returns its row."""
+        return self._append_row({
+            name: getattr(state, name) for name in self.COLUMNS
+        })
+
+    def extend(self, states: Iterable[InventoryState]) -> None:
+        for state in states:
+            self.append(state)
+
+    @classmethod
+    def from_columns(cls, sku_id, brand, size, initial_stock,
+                     cartons_received, units_sold,
+                     litres_per_carton=None) -> 'InventoryStateTable':
+        """Bulk-load whole columns without creating per-row objects."""
+        n = len(sku_id)
+        table = cls(capacity=max(n, 1))
+        if litres_per_carton is None:
+            litres_per_carton = np.full(n, InventoryEngine.CARTON_CONVERSION)
+        table._append_columns({
+            'sku_id': sku_id, 'brand': brand, 'size': size,
+            'initial_stock': initial_stock,
+            'cartons_received': cartons_received,
+            'units_sold': units_sold,
+            'litres_per_carton': litres_per_carton,
+        })
+        return table
+
+    def reconcile(self, actual, unit_price) -> Dict[str, np.ndarray]:
+        """
+        InventoryEngine.reconcile_batch over every row. Uses
+        CARTON_CONVERSION like calculate_expected does.
+        """
+        return InventoryEngine.reconcile_batch(
+            initial_stock=self.column('initial_stock'),
+            cartons_received=self.column('cartons_received'),
+            units_sold=self.column('units_sold'),
+            actual=actual,
+            unit_price=unit_price
+        )
+
+
+# -------------------------------------------------------------------
+# TABLE: SalesVelocityTable
+# -------------------------------------------------------------------
+
+class SalesVelocityTable(_ColumnTable):
+    """Array-backed store of SalesVelocityData rows."""
+
+    COLUMNS = {
+        'sku_id': np.int32,
+        'seven_day_average': np.float64,
+        'last_count_timestamp': np.int64,   # epoch microseconds
+        'total_sales_since_count': np.int64,
+    }
+    STRINGS = ('sku_id',)
+    VIEW = SalesVelocityView
+
+    def __init__(self, capacity: int = 1024, hours_per_row: int = 24):
+        super().__init__(capacity)
+
+        # Ragged hourly_sales: row i owns _values[_offsets[i]:_offsets[i+1]]
+        self._offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._values = np.zeros(capacity * hours_per_row, dtype=np.float64)
+
+    def _bounds(self, row: int):
+        return int(self._offsets[row]), int(self._offsets[row + 1])
+
+    def _reserve_values(self, extra_rows: int, extra_values: int) -> None:
+        if self._size + extra_rows + 1 > len(self._offsets):
+            grown = np.zeros(max(self._size + extra_rows + 1,
+                                 2 * len(self._offsets)), dtype=np.int64)
+            grown[:self._size + 1] = self._offsets[:self._size + 1]
+            self._offsets = grown
+
+        used = int(self._offsets[self._size])
+        if used + extra_values > len(self._values):
+            grown = np.zeros(max(used + extra_values, 2 * len(self._values)),
+                             dtype=np.float64)
+            grown[:used] = self._values[:used]
+            self._values = grown
+
+    def append(self, velocity: SalesVelocityData) -> int:
+        """Copy one SalesVelocityData (or view) in; returns its row."""
+        hourly = np.asarray(velocity.hourly_sales, dtype=np.float64)
+        self._reserve_values(1, hourly.size)
+
+        start = int(self._offsets[self._size])
+        self._values[start:start + hourly.size] = hourly
+        self._offsets[self._size + 1] = start + hourly.size
+
+        return self._append_row({
+            'sku_id': velocity.sku_id,
+            'seven_day_average': velocity.seven_day_average,
+            'last_count_timestamp': datetime_to_epoch_us(velocity.last_count_timestamp),
+            'total_sales_since_count': velocity.total_sales_since_count,
+        })
+
+    def extend(self, velocities: Iterable[SalesVelocityData]) -> None:
+        for velocity in velocities:
+            self.append(velocity)
+
+    @classmethod
+    def from_columns(cls, sku_id, hourly_sales: np.ndarray, seven_day_average,
+                     last_count_timestamp, total_sales_since_count,
+                     hourly_offsets: Optional[np.ndarray] = None) -> 'SalesVelocityTable':
+        """
+        Bulk-load columns. `hourly_sales` is either a 2-D array (same
+        history length for every row) or a flat array with
+        `hourly_offsets` (length rows + 1) marking each row's slice.
+        `last_count_timestamp` is epoch microseconds or datetime64.
+        """
+        n = len(sku_id)
+        hourly_sales = np.asarray(hourly_sales, dtype=np.float64)
+
+        if hourly_offsets is None:
+            width = hourly_sales.shape[1] if hourly_sales.ndim == 2 else 0
+            hourly_offsets = np.arange(n + 1, dtype=np.int64) * width
+            hourly_sales = hourly_sales.reshape(-1)
+
+        table = cls(capacity=max(n, 1), hours_per_row=0)
+        table._offsets = np.asarray(hourly_offsets, dtype=np.int64).copy()
+        table._values = hourly_sales.copy()
+
+        stamps = np.asarray(last_count_timestamp)
+        if stamps.dtype.kind == 'M':
+            stamps = stamps.astype('datetime64[us]').astype(np.int64)
+
+        table._append_columns({
+            'sku_id': sku_id,
+            'seven_day_average': seven_day_average,
+            'last_count_timestamp': stamps,
+            'total_sales_since_count': total_sales_since_count,
+        })
+        return table
+
+    def nbytes(self) -> int:
+        used = int(self._offsets[self._size])
+        return (super().nbytes() + self._offsets[:self._size + 1].nbytes
+                + self._values[:used].nbytes)
+
+    def current_hour_sales(self) -> np.ndarray:
+        """Latest hourly value per row (0 for empty histories)."""
+        offsets = self._offsets[:self._size + 1]
+        ends = offsets[1:]
+        has_history = ends > offsets[:-1]
+        latest = np.zeros(self._size, dtype=np.float64)
+        latest[has_history] = self._values[ends[has_history] - 1]
+        return latest
+
+    def trigger_inputs(self) -> Dict[str, np.ndarray]:
+        """Keyword arguments for AnomalyDetectionEngine.should_trigger_counts."""
+        return {
+            'current_hour_sales': self.current_hour_sales(),
+            'seven_day_average': self.column('seven_day_average'),
+            'last_count_timestamps': self.column('last_count_timestamp'),
+        }
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from anomaly_detection_v2 import AnomalyDetectionEngine
+
+    engine = InventoryEngine()
+
+    table = InventoryStateTable()
+    table.append(InventoryState("KINGS_5L", "King's Oil", "5L", 100, 10, 85))
+    table.append(InventoryState("MAMADOR_2L", "Mamador", "2L", 180, 0, 29))
+
+    # Views work with the existing scalar engine...
+    for state in table:
+        print(f"{state.sku_id}: expected {engine.calculate_expected(state)}")
+
+    # ...and the columns feed the batch engine directly
+    batch = table.reconcile(actual=[132, 151], unit_price=[25, 6.67])
+    print(f"Batch variance: {batch['variance'].tolist()}")
+    print(f"Column bytes: {table.nbytes()} for {len(table)} rows")
+
+    now = datetime(2026, 2, 16, 15, 0)
+    velocities = SalesVelocityTable()
+    velocities.append(SalesVelocityData(
+        "KINGS_5L", [5, 4, 15], 5.0, now - timedelta(hours=5), 12
+    ))
+
+    view = velocities[0]
+    decision = AnomalyDetectionEngine().should_trigger_count(view, now, 12)
+    print(f"View trigger: {decision['type']} - {decision['reason']}")
@@ -0,0 +1,469 @@
+"""
+Smart Loss Control - Config Sweep Backtester
+=============================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Replays a labelled transaction history (workload_generator's injected
+THEFT_EVENTs are the labels) through the AnomalyDetectionEngine rules
+under a whole grid of configs, and scores each config the way the
+hand-filled performance_metrics block of simulation_dataset.json
+describes a run: detection accuracy, false positive / negative rates,
+time to detection and how many spot checks it costs.
+
+THE REPLAY (per SKU, at the end of every opening hour):
+  • should_trigger_count's four checks — VOLUME (this hour's units >
+    seven_day_average × volume_multiplier), RANDOM, TIME, COUNTER
+    (sale events since the last count) — with the same priorities
+  • a triggered check is a count: actual = book stock − units stolen
+    since the last count, plus an honest miscount (±1 unit) on
+    `miscount_rate` of counts; the variance is classified with
+    green_max / yellow_max. A count above green_max (YELLOW or RED)
+    is "flagged"; RED also sends an alert.
+  • a count resets the book to the true shelf quantity
+  • shift patterns (end-of-shift spike, extended gap) are scored per
+    staff shift; a shift is a theft shift when a theft happened while
+    that staff member was the one selling
+
+A flagged count with theft since the previous count is a true
+positive, a flagged count without one a false positive. Every theft is
+detected (at that count) or missed; thefts after a SKU's last count
+are missed. The RANDOM draw and the miscount of each SKU-hour are the
+same for every config (common random numbers), so configs differ only
+by their settings.
+
+HOW THE SWEEP IS SPLIT:
+  • trigger settings (volume_multiplier, time_threshold_hours,
+    sales_counter_max, random_probability) decide WHEN counts happen:
+    each distinct combination is one row of a (configs × SKUs) state
+    array stepped hour by hour — all of them side by side
+  • green_max / yellow_max only classify counts: every count's
+    |variance %| goes into a histogram over the grid's thresholds, so
+    all classification settings come out of one replay
+  • pattern settings use ShiftIndex.shift_patterns once per
+    shift_window_min; thresholds are compared on the arrays
+Blocks of trigger combinations can go to a process pool (workers > 1).
+"""
+
+from typing import Dict, Iterable, List, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+
+import numpy as np
+
+from anomaly_detection_v2 import AnomalyDetectionEngine
+from shift_analytics import ShiftIndex
+from workload_generator import CLOSE_HOUR, OPEN_HOUR, TYPE_CODE
+
+
+TRIGGER_PARAMS = ('volume_multiplier', 'time_threshold_hours', 'sales_counter_max',
+                  'random_probability')
+CLASSIFY_PARAMS = ('green_max', 'yellow_max')
+PATTERN_PARAMS = ('shift_window_min', 'suspicious_sales', 'gap_threshold_min')
+SWEEP_PARAMS = TRIGGER_PARAMS + CLASSIFY_PARAMS + PATTERN_PARAMS
+
+_HOUR_US = 3_600_000_000
+_WEEK_HOURS = 168
+
+# Trigger codes as in AnomalyDetectionEngine.TRIGGER_TYPES
+_RANDOM, _VOLUME, _TIME, _COUNTER = 1, 2, 3, 4
+
+
+def config_grid(**values: Sequence) -> List[Dict]:
+    """
+    Every combination of the given settings, on top of DEFAULT_CONFIG:
+    config_grid(volume_multiplier=[1.5, 2, 3], green_max=[1, 2]) → 6.
+    """
+    unknown = set(values) - set(SWEEP_PARAMS)
+    if unknown:
+        raise KeyError(f'not a sweep parameter: {sorted(unknown)}')
+    names = list(values)
+    return [{**AnomalyDetectionEngine.DEFAULT_CONFIG, **dict(zip(names, combo))}
+            for combo in itertools.product(*(values[n] for n in names))]
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: ConfigBacktester
+# -------------------------------------------------------------------
+
+class ConfigBacktester:
+    """Scores a grid of engine configs on one labelled history"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], initial_stock, sku_shop,
+                 staff_ids: List[str], sku_ids: List[str], start_us: int, days: int,
+                 check_hours: Iterable[int] = range(OPEN_HOUR, CLOSE_HOUR),
+                 miscount_rate: float = 0.05, seed: int = 2026):
+        self.days = days
+        self.sku_shop = np.asarray(sku_shop)
+        self.n_shops = int(self.sku_shop.max()) + 1 if self.sku_shop.size else 0
+        n = len(self.sku_shop)
+        hours = days * 24
+
+        etype = np.asarray(columns['type'])
+        sku = np.asarray(columns['sku']).astype(np.int64)
+        quantity = np.asarray(columns['quantity'], dtype=np.float64)
+        offset = np.asarray(columns['timestamp']) - start_us
+        keep = (sku >= 0) & (offset >= 0) & (offset < hours * _HOUR_US)
+        cell = sku * hours + offset // _HOUR_US
+
+        def per_hour(kind, weights=None):
+            rows = keep & (etype == TYPE_CODE[kind])
+            w = None if weights is None else weights[rows]
+            return np.bincount(cell[rows], weights=w, minlength=n * hours).reshape(n, hours)
+
+        units = per_hour('sale', quantity)
+        book = -units + per_hour('restock', quantity) + per_hour('decant', quantity)
+        stolen = per_hour('THEFT_EVENT', quantity)
+        thefts = per_hour('THEFT_EVENT')
+        theft_hours = per_hour('THEFT_EVENT', offset / _HOUR_US)
+
+        # Check ticks: the end of each opening hour
+        tick_hour = np.array([d * 24 + h for d in range(days) for h in check_hours])
+        self.tick_time = tick_hour + 1                 # hours since start
+        self.current_hour_sales = units[:, tick_hour]
+
+        # seven_day_average: the 168 hours up to and including this one
+        total = np.cumsum(units, axis=1)
+        before = np.zeros_like(total)
+        before[:, _WEEK_HOURS:] = total[:, :-_WEEK_HOURS]
+        self.seven_day_average = (total - before)[:, tick_hour] / _WEEK_HOURS
+
+        # Running totals at each tick; column 0 is the start of the run
+        def at_ticks(matrix, initial=0.0):
+            cum = np.cumsum(matrix, axis=1)[:, tick_hour]
+            return np.hstack([np.zeros((n, 1)), cum]) + np.reshape(initial, (-1, 1))
+
+        self.sale_events = at_ticks(per_hour('sale'))
+        self.book_stock = at_ticks(book, np.asarray(initial_stock, dtype=np.float64))
+        self.stolen = at_ticks(stolen)
+        self.thefts = at_ticks(thefts)
+        self.theft_hours = at_ticks(theft_hours)
+        self.total_thefts = int(thefts.sum())
+
+        rng = np.random.default_rng(seed)
+        self.random_draws = rng.random((n, tick_hour.size))
+        self.miscount = np.where(rng.random((n, tick_hour.size)) < miscount_rate,
+                                 rng.choice([-1.0, 1.0], (n, tick_hour.size)), 0.0)
+
+        # Staff shifts and which of them had a theft
+        self.shifts = ShiftIndex(columns, staff_ids, sku_ids)
+        self.theft_shift = _theft_shifts(self.shifts, columns, self.sku_shop)
+
+    @classmethod
+    def from_workload(cls, workload, **kwargs) -> 'ConfigBacktester':
+        start_us = int(np.datetime64(workload.start_date, 'us').astype(np.int64))
+        return cls(workload.columns, workload.initial_litres, workload.sku_shop,
+                   workload.staff_ids, workload.sku_ids, start_us, workload.days, **kwargs)
+
+    @property
+    def _inputs(self) -> Dict[str, np.ndarray]:
+        """
+        What a replay block needs (sent once to each pool worker), as
+        ticks × SKUs so each tick is one contiguous row.
+        """
+        inputs = {name: np.ascontiguousarray(getattr(self, name).T) for name in (
+            'current_hour_sales', 'seven_day_average', 'sale_events', 'book_stock',
+            'stolen', 'thefts', 'theft_hours', 'random_draws', 'miscount')}
+        inputs['tick_time'] = self.tick_time
+        return inputs
+
+
+    # ---------------------------------------------------------------
+    # THE SWEEP
+    # ---------------------------------------------------------------
+
+    def run(self, configs: Sequence[Dict], workers: int = 1,
+            block_size: int = 64) -> Dict[str, np.ndarray]:
+        """
+        Score every config. Missing keys take DEFAULT_CONFIG values.
+
+        Returns a dictionary of arrays, one entry per config (input
+        order): the SWEEP_PARAMS, then
+        - checks, checks_per_shop_day, and random / volume / time /
+          counter_checks (the trigger type of each count)
+        - true_positives, false_positives, false_negatives,
+          true_negatives (counts), accuracy, false_positive_rate,
+          false_negative_rate
+        - thefts, detected, detection_rate, mean_hours_to_detect
+        - red_alerts, false_red_alerts
+        - shifts_flagged, theft_shifts_flagged, pattern_recall,
+          pattern_false_positive_rate
+        """
+        full = [{**AnomalyDetectionEngine.DEFAULT_CONFIG, **c} for c in configs]
+        table = {name: np.array([c[name] for c in full], dtype=np.float64)
+                 for name in SWEEP_PARAMS}
+
+        # Distinct trigger settings are replayed once each
+        trigger = np.stack([table[name] for name in TRIGGER_PARAMS], axis=1)
+        combos, combo_of = np.unique(trigger, axis=0, return_inverse=True)
+        combo_of = combo_of.ravel()
+        greens = np.unique(table['green_max'])
+        yellows = np.unique(table['yellow_max'])
+
+        blocks = [(combos[i:i + block_size], greens, yellows)
+                  for i in range(0, len(combos), block_size)]
+        if workers <= 1:
+            _init_worker(self._inputs)
+            parts = [_replay_block(b) for b in blocks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self._inputs,)) as pool:
+                parts = list(pool.map(_replay_block, blocks))
+        acc = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+
+        # Suffix sums: column j = counts whose |variance %| is above threshold j
+        def above(hist, thresholds, values):
+            suffix = np.cumsum(hist[:, ::-1], axis=1)[:, ::-1]
+            return suffix[combo_of, np.searchsorted(thresholds, values) + 1]
+
+        g, y = table['green_max'], table['yellow_max']
+        tp = above(acc['theft_counts'], greens, g)
+        fp = above(acc['clean_counts'], greens, g)
+        positives = acc['theft_counts'].sum(axis=1)[combo_of]
+        negatives = acc['clean_counts'].sum(axis=1)[combo_of]
+        detected = above(acc['theft_events'], greens, g)
+        hours_to_detect = above(acc['detect_hours'], greens, g)
+        red = above(acc['red_theft'], yellows, y) + above(acc['red_clean'], yellows, y)
+
+        by_type = acc['by_type'][combo_of]
+        checks = by_type.sum(axis=1)
+        shop_days = max(self.n_shops * self.days, 1)
+
+        result = dict(table)
+        result.update({
+            'checks': checks,
+            'checks_per_shop_day': checks / shop_days,
+            'random_checks': by_type[:, _RANDOM],
+            'volume_checks': by_type[:, _VOLUME],
+            'time_checks': by_type[:, _TIME],
+            'counter_checks': by_type[:, _COUNTER],
+            'true_positives': tp,
+            'false_positives': fp,
+            'false_negatives': positives - tp,
+            'true_negatives': negatives - fp,
+            'accuracy': _ratio(tp + negatives - fp, checks),
+            'false_positive_rate': _ratio(fp, negatives),
+            'false_negative_rate': _ratio(positives - tp, positives),
+            'thefts': np.full(len(full), self.total_thefts),
+            'detected': detected,
+            'detection_rate': _ratio(detected, self.total_thefts),
+            'mean_hours_to_detect': _ratio(hours_to_detect, detected, np.nan),
+            'red_alerts': red,
+            'false_red_alerts': above(acc['red_clean'], yellows, y),
+        })
+        result.update(self._pattern_scores(table))
+        return result
+
+    def _pattern_scores(self, table: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Pattern flags vs theft shifts; one shift_patterns per window."""
+        labels = self.theft_shift
+        flagged = np.zeros(len(table['shift_window_min']), dtype=np.int64)
+        hits = np.zeros_like(flagged)
+        for window in np.unique(table['shift_window_min']).tolist():
+            engine = AnomalyDetectionEngine({'shift_window_min': window})
+            p = self.shifts.shift_patterns(engine)
+            rows = np.flatnonzero(table['shift_window_min'] == window)
+            spike = p['spike_count'][None, :] >= table['suspicious_sales'][rows, None]
+            gap = (p['sales'] > 1) & (p['max_gap_min'][None, :] > table['gap_threshold_min'][rows, None])
+            flags = spike | gap
+            flagged[rows] = flags.sum(axis=1)
+            hits[rows] = (flags & labels).sum(axis=1)
+        theft_shifts = int(labels.sum())
+        return {
+            'shifts_flagged': flagged,
+            'theft_shifts_flagged': hits,
+            'pattern_recall': _ratio(hits, theft_shifts),
+            'pattern_false_positive_rate': _ratio(flagged - hits, labels.size - theft_shifts),
+        }
+
+
+# -------------------------------------------------------------------
+# REPLAY (runs in pool workers)
+# -------------------------------------------------------------------
+
+_INPUTS: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(inputs: Dict[str, np.ndarray]) -> None:
+    global _INPUTS
+    _INPUTS = inputs
+
+
+def _replay_block(block) -> Dict[str, np.ndarray]:
+    """
+    Step a block of trigger settings (rows) × all SKUs through every
+    check tick. Returns per-setting histograms over the classification
+    thresholds (bin j = |variance %| above j thresholds).
+    """
+    combos, greens, yellows = block
+    d = _INPUTS
+    vm, tth, scm, rp = (combos[:, k:k + 1] for k in range(4))
+    c_n, n = len(combos), d['book_stock'].shape[1]
+    ng, ny = greens.size + 1, yellows.size + 1
+    row_of = np.broadcast_to(np.arange(c_n)[:, None], (c_n, n))
+    sku_of = np.broadcast_to(np.arange(n)[None, :], (c_n, n))
+
+    # State per (setting, SKU), as of its last count
+    last_time = np.zeros((c_n, n))
+    sales_at = np.zeros((c_n, n))
+    stolen_at = np.zeros((c_n, n))
+    thefts_at = np.zeros((c_n, n))
+    hours_at = np.zeros((c_n, n))
+
+    by_type = np.zeros(c_n * 5, dtype=np.int64)
+    out = {name: np.zeros(c_n * ng) for name in
+           ('theft_counts', 'clean_counts', 'theft_events', 'detect_hours')}
+    red_theft = np.zeros(c_n * ny)
+    red_clean = np.zeros(c_n * ny)
+
+    for k, now in enumerate(d['tick_time'].tolist()):
+        sales_now = d['sale_events'][k + 1]
+        is_volume = d['current_hour_sales'][k] > d['seven_day_average'][k] * vm
+        is_random = d['random_draws'][k] < rp
+        is_time = (now - last_time) >= tth
+        is_counter = (sales_now - sales_at) >= scm
+        counted = is_volume | is_random | is_time | is_counter
+        if not counted.any():
+            continue
+        c, s = row_of[counted], sku_of[counted]
+
+        # Highest priority wins: VOLUME, RANDOM, TIME, COUNTER
+        ttype = np.select([is_volume[counted], is_random[counted], is_time[counted]],
+                          [_VOLUME, _RANDOM, _TIME], _COUNTER)
+        by_type += np.bincount(c * 5 + ttype, minlength=c_n * 5)
+
+        # The count: same arithmetic as QuickCountManager.process_count
+        stolen_before = stolen_at[counted]
+        expected = d['book_stock'][k + 1][s] - stolen_before
+        actual = expected - (d['stolen'][k + 1][s] - stolen_before) + d['miscount'][k][s]
+        pct = np.zeros(c.size)
+        np.divide(actual - expected, expected, out=pct, where=expected > 0)
+        pct = np.abs(pct * 100)
+
+        events = d['thefts'][k + 1][s] - thefts_at[counted]
+        waited = events * now - (d['theft_hours'][k + 1][s] - hours_at[counted])
+        theft = events > 0
+
+        gbin = c * ng + np.searchsorted(greens, pct)
+        ybin = c * ny + np.searchsorted(yellows, pct)
+        size = c_n * ng
+        out['theft_counts'] += np.bincount(gbin[theft], minlength=size)
+        out['clean_counts'] += np.bincount(gbin[~theft], minlength=size)
+        out['theft_events'] += np.bincount(gbin, weights=events, minlength=size)
+        out['detect_hours'] += np.bincount(gbin, weights=waited, minlength=size)
+        red_theft += np.bincount(ybin[theft], minlength=c_n * ny)
+        red_clean += np.bincount(ybin[~theft], minlength=c_n * ny)
+
+        np.copyto(last_time, now, where=counted)
+        np.copyto(sales_at, sales_now, where=counted)
+        np.copyto(stolen_at, d['stolen'][k + 1], where=counted)
+        np.copyto(thefts_at, d['thefts'][k + 1], where=counted)
+        np.copyto(hours_at, d['theft_hours'][k + 1], where=counted)
+
+    result = {name: v.reshape(c_n, ng) for name, v in out.items()}
+    result['red_theft'] = red_theft.reshape(c_n, ny)
+    result['red_clean'] = red_clean.reshape(c_n, ny)
+    result['by_type'] = by_type.reshape(c_n, 5)
+    return result
+
+
+# -------------------------------------------------------------------
+# HELPERS
+# -------------------------------------------------------------------
+
+def _theft_shifts(shifts: ShiftIndex, columns: Dict[str, np.ndarray],
+                  sku_shop: np.ndarray) -> np.ndarray:
+    """
+    Shift mask: a theft belongs to the shift of whoever made the shop's
+    sale closest before it (or the first one after, at opening).
+    """
+    labels = np.zeros(len(shifts), dtype=bool)
+    thefts = np.flatnonzero(np.asarray(columns['type']) == TYPE_CODE['THEFT_EVENT'])
+    if not thefts.size or not len(shifts):
+        return labels
+
+    # Every sale's shift number, then the shop's sales in time order
+    shift_of = np.repeat(np.arange(len(shifts)), shifts.shift_sizes)
+    sale_shop = sku_shop[np.asarray(columns['sku'])[shifts.rows]]
+    order = np.lexsort((shifts.times, sale_shop))
+    span = int(np.ptp(shifts.times)) + 1 if shifts.times.size else 1
+    key = sale_shop[order].astype(np.int64) * span + (shifts.times[order] - shifts.times.min())
+
+    theft_shop = sku_shop[np.asarray(columns['sku'])[thefts]].astype(np.int64)
+    theft_at = np.clip(np.asarray(columns['timestamp'])[thefts] - shifts.times.min(), 0, span - 1)
+    pos = np.searchsorted(key, theft_shop * span + theft_at, side='right') - 1
+    # No earlier sale in that shop: take its first sale instead
+    before = (pos < 0) | (pos >= 0) & (key[np.maximum(pos, 0)] // span != theft_shop)
+    pos = np.where(before, pos + 1, pos)
+    valid = (pos < key.size) & (key[np.minimum(pos, key.size - 1)] // span == theft_shop)
+    labels[shift_of[order[pos[valid]]]] = True
+    return labels
+
+
+def _ratio(num, den, empty=0.0):
+    num = np.asarray(num, dtype=np.float64)
+    den = np.broadcast_to(np.asarray(den, dtype=np.float64), num.shape)
+    out = np.full(num.shape, empty)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def performance_metrics(result: Dict[str, np.ndarray], i: int) -> Dict:
+    """Config i's scores shaped like simulation_dataset.json's block."""
+    return {
+        'detection_accuracy': round(float(result['accuracy'][i]), 4),
+        'false_positive_rate': round(float(result['false_positive_rate'][i]), 4),
+        'false_negative_rate': round(float(result['false_negative_rate'][i]), 4),
+        'average_time_to_detection_minutes': round(float(result['mean_hours_to_detect'][i]) * 60),
+        'trigger_frequency': {
+            'random': int(result['random_checks'][i]),
+            'time_based': int(result['time_checks'][i]),
+            'volume_based': int(result['volume_checks'][i]),
+            'counter_based': int(result['counter_checks'][i]),
+        },
+        'detection_rate': round(float(result['detection_rate'][i]), 4),
+        'checks_per_shop_day': round(float(result['checks_per_shop_day'][i]), 2),
+    }
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    import time
+
+    from workload_generator import generate_workload
+
+    workload = generate_workload(shops=20, skus_per_shop=10, days=14)
+    start = time.perf_counter()
+    backtester = ConfigBacktester.from_workload(workload)
+    prepared = time.perf_counter() - start
+
+    configs = config_grid(time_threshold_hours=[2, 4, 8], sales_counter_max=[10, 20],
+                          green_max=[0.5, 1.0, 2.0])
+    start = time.perf_counter()
+    result = backtester.run(configs)
+    swept = time.perf_counter() - start
+    print(f"{workload.size:,} events, {backtester.total_thefts} thefts; "
+          f"prepared in {prepared:.2f}s, {len(configs)} configs in {swept:.2f}s\n")
+
+    print(f"  {'time h':>6} {'counter':>7} {'green':>5} {'checks/shop-day':>15} "
+          f"{'detected':>9} {'FP rate':>8} {'hours':>6}")
+    for i in range(len(configs)):
+        print(f"  {result['time_threshold_hours'][i]:>6.0f} {result['sales_counter_max'][i]:>7.0f} "
+              f"{result['green_max'][i]:>5.1f} {result['checks_per_shop_day'][i]:>15.1f} "
+              f"{result['detection_rate'][i]:>9.1%} {result['false_positive_rate'][i]:>8.1%} "
+              f"{result['mean_hours_to_detect'][i]:>6.1f}")
+
+    default = next(i for i, c in enumerate(configs)
+                   if c['time_threshold_hours'] == 4 and c['sales_counter_max'] == 10
+                   and c['green_max'] == 1.0)
+    print(f"\nDEFAULT_CONFIG: {performance_metrics(result, default)}")
+
+    # A process pool gives the same numbers
+    pooled = backtester.run(configs, workers=2, block_size=2)
+    print(f"2 workers agree: {all(np.array_equal(result[k], pooled[k], equal_nan=True) for k in result)}")
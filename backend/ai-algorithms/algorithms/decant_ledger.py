@@ -0,0 +1,343 @@
+"""
+Smart Loss Control - Two-Bucket Decant Ledger
+==============================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+InventoryEngine.log_decant says "total inventory unchanged", but
+nothing checked it. DecantLedger keeps, for every SKU, two balances as
+NumPy columns:
+
+    bulk   — unopened cartons in the store room
+    shelf  — units (litres) out for sale
+
+and applies events in batches:
+
+    restock  → bulk  += quantity_received / litres_per_carton
+    decant   → bulk  -= cartons_broken,  shelf += litres_added
+    sale     → shelf -= quantity
+
+Every batch is checked as a whole (no Python loop per event):
+  • DECANT_NOT_CONSERVED — a decant whose litres_added is not
+    cartons_broken × litres_per_carton, i.e. total stock changed
+  • SHELF_NEGATIVE — a sale or decant leaves the shelf below zero
+    (sold stock that was never put out)
+  • BULK_NEGATIVE — more cartons broken than the store room holds
+  • DECANT_INCOMPLETE — a decant with neither cartons_broken nor
+    litres_added; it is reported and not applied
+
+Per-SKU batch totals (one bincount) screen out every SKU that cannot
+go negative whatever the event order; for the rest, the balance after
+each event comes from a grouped cumulative sum over the batch (the
+same trick as ingest.py), so the offending events can be reported.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from inventory_engine_v2 import InventoryEngine
+from event_replay import EVENT_TYPES
+
+
+TYPE_CODE = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+# check codes: LEDGER_CHECKS[code] is the label
+LEDGER_CHECKS = ('DECANT_NOT_CONSERVED', 'SHELF_NEGATIVE', 'BULK_NEGATIVE',
+                 'DECANT_INCOMPLETE')
+
+# Quantities are whole units; this only absorbs float round-off
+TOLERANCE = 1e-6
+
+_SALE = TYPE_CODE['sale']
+_DECANT = TYPE_CODE['decant']
+_RESTOCK = TYPE_CODE['restock']
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: DecantLedger
+# -------------------------------------------------------------------
+
+class DecantLedger:
+    """Per-SKU bulk-carton and shelf-unit balances, checked per batch"""
+
+    def __init__(self, bulk_cartons, shelf_units, litres_per_carton=None,
+                 sku_ids: Optional[List[str]] = None):
+        self.bulk = np.array(bulk_cartons, dtype=np.float64)
+        self.shelf = np.array(shelf_units, dtype=np.float64)
+        if litres_per_carton is None:
+            litres_per_carton = InventoryEngine.CARTON_CONVERSION
+        self.litres_per_carton = np.broadcast_to(
+            np.asarray(litres_per_carton, dtype=np.float64), self.bulk.shape).copy()
+
+        self.sku_ids: List[str] = list(sku_ids or [])
+        self._codes = {sku_id: i for i, sku_id in enumerate(self.sku_ids)}
+        self.events = 0
+        self.violations = 0
+
+    @classmethod
+    def from_initial_inventory(cls, records: Iterable[Dict],
+                               litres_per_carton=None) -> 'DecantLedger':
+        """
+        From simulation_dataset-style initial_inventory records.
+
+        quantity_litres is the SKU's total stock (cartons included), as
+        InventoryReplayEngine reads it, so the shelf holds whatever the
+        cartons do not. Raises ValueError for records whose total is
+        smaller than their cartons.
+        """
+        records = list(records)
+        return cls.from_totals([r['quantity_cartons'] for r in records],
+                               [r['quantity_litres'] for r in records],
+                               litres_per_carton, sku_ids=[r['sku_id'] for r in records])
+
+    @classmethod
+    def from_totals(cls, cartons, total_units, litres_per_carton=None,
+                    sku_ids: Optional[List[str]] = None) -> 'DecantLedger':
+        """
+        From per-SKU carton counts and total stock (cartons included):
+        the shelf holds what the cartons do not. Raises ValueError
+        where the total is smaller than the cartons.
+        """
+        if litres_per_carton is None:
+            litres_per_carton = InventoryEngine.CARTON_CONVERSION
+        cartons = np.asarray(cartons, dtype=np.float64)
+        shelf = np.asarray(total_units, dtype=np.float64) \
+            - cartons * np.asarray(litres_per_carton, dtype=np.float64)
+        short = np.flatnonzero(shelf < -TOLERANCE)
+        if short.size:
+            where = [sku_ids[i] for i in short[:10].tolist()] if sku_ids else short[:10].tolist()
+            raise ValueError(f"quantity_litres below quantity_cartons × litres_per_carton "
+                             f"for {short.size} SKU(s): {where}")
+        return cls(cartons, shelf, litres_per_carton, sku_ids=sku_ids)
+
+    @classmethod
+    def from_workload(cls, workload) -> 'DecantLedger':
+        return cls.from_totals(workload.initial_cartons, workload.initial_litres,
+                               sku_ids=workload.sku_ids)
+
+    def total_units(self) -> np.ndarray:
+        """Bulk + shelf per SKU, in units."""
+        return self.bulk * self.litres_per_carton + self.shelf
+
+    def _code(self, sku_id: str) -> int:
+        """SKU code, registering new SKUs (empty balances)."""
+        code = self._codes.get(sku_id)
+        if code is None:
+            code = self._codes[sku_id] = len(self.sku_ids)
+            self.sku_ids.append(sku_id)
+            if code >= len(self.bulk):
+                grow = max(len(self.bulk), 1024)
+                self.bulk = np.concatenate([self.bulk, np.zeros(grow)])
+                self.shelf = np.concatenate([self.shelf, np.zeros(grow)])
+                self.litres_per_carton = np.concatenate(
+                    [self.litres_per_carton,
+                     np.full(grow, float(InventoryEngine.CARTON_CONVERSION))])
+        return code
+
+
+    # ---------------------------------------------------------------
+    # METHOD: apply_columns
+    # ---------------------------------------------------------------
+
+    def apply_columns(self, sku, etype, quantity, cartons=None) -> Dict[str, np.ndarray]:
+        """
+        Apply a batch of events, in order, and check it.
+
+        Args:
+            sku: SKU code per event (-1 = none; the event is skipped)
+            etype: EVENT_TYPES code per event
+            quantity: units sold / received / litres added to the shelf
+            cartons: cartons broken per decant (default: quantity /
+                     litres_per_carton, i.e. taken as conserved); a
+                     decant with NaN litres or cartons is reported as
+                     DECANT_INCOMPLETE and not applied
+
+        Returns:
+            Dictionary of NumPy arrays, one entry per violation:
+            - position (int64 index into the batch), check (int8 code
+              into LEDGER_CHECKS)
+            - bulk_after, shelf_after (float64 balances after the event)
+        """
+        sku = np.asarray(sku, dtype=np.int64)
+        etype = np.asarray(etype)
+        quantity = np.asarray(quantity, dtype=np.float64)
+        n = sku.size
+        self.events += n
+
+        has_sku = sku >= 0
+        code = np.where(has_sku, sku, 0)
+        lpc = self.litres_per_carton[code]
+        is_sale = (etype == _SALE) & has_sku
+        is_decant = (etype == _DECANT) & has_sku
+        is_restock = (etype == _RESTOCK) & has_sku
+
+        if cartons is None:
+            cartons = quantity / lpc
+        cartons = np.asarray(cartons, dtype=np.float64)
+
+        # A NaN would stick to the SKU's balances for good
+        incomplete = is_decant & (np.isnan(quantity) | np.isnan(cartons))
+        is_decant &= ~incomplete
+
+        # -----------------------------------------------------------
+        # Signed change of each bucket per event
+        # -----------------------------------------------------------
+
+        d_bulk = np.zeros(n)
+        d_bulk[is_restock] = quantity[is_restock] / lpc[is_restock]
+        d_bulk[is_decant] = -cartons[is_decant]
+
+        d_shelf = np.zeros(n)
+        d_shelf[is_sale] = -quantity[is_sale]
+        d_shelf[is_decant] = quantity[is_decant]
+
+        # -----------------------------------------------------------
+        # A bucket can only go negative if its balance minus all the
+        # batch's outflows is below zero. Only those SKUs need the
+        # balance after every event (grouped cumulative sums), along
+        # with SKUs that have a non-conserving decant to report.
+        # -----------------------------------------------------------
+
+        not_conserved = is_decant & (np.abs(quantity - cartons * lpc) > TOLERANCE)
+
+        size = len(self.bulk)
+        suspect = np.zeros(size, dtype=bool)
+        suspect[code[not_conserved | incomplete]] = True
+        for delta, balance in ((d_bulk, self.bulk), (d_shelf, self.shelf)):
+            outflow = np.bincount(code, weights=np.minimum(delta, 0), minlength=size)
+            suspect |= balance + outflow < -TOLERANCE
+
+        # Zero for the other events, which never fails a check
+        rows = np.flatnonzero(suspect[code] & has_sku)
+        bulk_after = np.zeros(n)
+        shelf_after = np.zeros(n)
+        if rows.size:
+            order = rows[np.argsort(code[rows], kind='stable')]
+            grouped = code[order]
+            starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+            sizes = np.diff(np.r_[starts, order.size])
+            for after, delta, balance in ((bulk_after, d_bulk, self.bulk),
+                                          (shelf_after, d_shelf, self.shelf)):
+                step = delta[order]
+                total = np.cumsum(step)
+                within = total - np.repeat(total[starts] - step[starts], sizes)
+                after[order] = balance[grouped] + within
+
+        # Commit the batch's end state
+        self.bulk += np.bincount(code, weights=d_bulk, minlength=size)
+        self.shelf += np.bincount(code, weights=d_shelf, minlength=size)
+
+        # -----------------------------------------------------------
+        # Checks, whole batch at once
+        # -----------------------------------------------------------
+
+        checks = np.stack([
+            not_conserved,
+            (d_shelf < 0) & (shelf_after < -TOLERANCE),
+            (d_bulk < 0) & (bulk_after < -TOLERANCE),
+            incomplete,
+        ])
+        check, position = np.nonzero(checks)
+        order = np.lexsort((check, position))
+        position, check = position[order], check[order].astype(np.int8)
+        self.violations += position.size
+
+        return {
+            'position': position,
+            'check': check,
+            'bulk_after': bulk_after[position],
+            'shelf_after': shelf_after[position],
+        }
+
+
+    # ---------------------------------------------------------------
+    # METHOD: apply (transaction dicts)
+    # ---------------------------------------------------------------
+
+    def apply(self, records: List[Dict]) -> List[Dict]:
+        """
+        Apply a batch of transaction dicts in order; returns one dict
+        per violation (position counts events since the ledger began).
+        """
+        first = self.events
+        if not records:
+            return []
+
+        kinds, sku_ids, quantity = zip(*[
+            (r.get('type'), r.get('sku_id'), r.get('quantity', 0)) for r in records
+        ])
+        etype = np.array([TYPE_CODE.get(k, -1) for k in kinds], dtype=np.int8)
+        quantity = np.array(quantity, dtype=np.float64)
+        cartons = np.full(len(records), np.nan)
+
+        # Restocks and decants keep their quantities in other fields
+        for i in np.flatnonzero(etype == _RESTOCK).tolist():
+            r = records[i]
+            quantity[i] = r.get('quantity_received', r.get('quantity', 0))
+        for i in np.flatnonzero(etype == _DECANT).tolist():
+            r = records[i]
+            quantity[i] = r.get('litres_added', np.nan)
+            cartons[i] = r.get('cartons_broken', np.nan)
+
+        codes = self._codes
+        sku = np.array([codes.get(s, -2) for s in sku_ids], dtype=np.int64)
+        for i in np.flatnonzero(sku == -2).tolist():
+            # New SKU (or none at all: sync events, labels)
+            sku[i] = -1 if sku_ids[i] is None else self._code(sku_ids[i])
+
+        # Decants recorded with only one of cartons / litres are
+        # completed from the other, so they are conserved by definition;
+        # with neither, both stay NaN (DECANT_INCOMPLETE)
+        lpc = self.litres_per_carton[np.maximum(sku, 0)]
+        no_cartons = np.isnan(cartons)
+        cartons[no_cartons] = quantity[no_cartons] / lpc[no_cartons]
+        no_litres = np.isnan(quantity)
+        quantity[no_litres] = cartons[no_litres] * lpc[no_litres]
+
+        found = self.apply_columns(sku, etype, quantity, cartons)
+        return [
+            {
+                'position': first + i,
+                'transaction_id': records[i].get('transaction_id'),
+                'sku_id': records[i].get('sku_id'),
+                'type': records[i].get('type'),
+                'check': LEDGER_CHECKS[c],
+                'bulk_after': round(float(b), 6),
+                'shelf_after': round(float(s), 6),
+            }
+            for i, c, b, s in zip(found['position'].tolist(), found['check'].tolist(),
+                                  found['bulk_after'].tolist(), found['shelf_after'].tolist())
+        ]
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    ledger = DecantLedger.from_initial_inventory([
+        {'sku_id': 'OIL_5L', 'quantity_cartons': 2, 'quantity_litres': 34},
+        {'sku_id': 'OIL_1L', 'quantity_cartons': 0, 'quantity_litres': 3},
+    ])
+    print(f"Start: bulk {ledger.bulk[:2].tolist()} cartons, shelf {ledger.shelf[:2].tolist()}, "
+          f"total {ledger.total_units()[:2].tolist()} units")
+
+    events = [
+        {'transaction_id': 'T1', 'type': 'sale', 'sku_id': 'OIL_5L', 'quantity': 8},
+        {'transaction_id': 'T2', 'type': 'decant', 'sku_id': 'OIL_5L',
+         'cartons_broken': 1, 'litres_added': 12},
+        {'transaction_id': 'T3', 'type': 'decant', 'sku_id': 'OIL_5L',
+         'cartons_broken': 1, 'litres_added': 10},                  # 2 litres missing
+        {'transaction_id': 'T4', 'type': 'sale', 'sku_id': 'OIL_1L', 'quantity': 5},  # only 3
+        {'transaction_id': 'T5', 'type': 'decant', 'sku_id': 'OIL_1L', 'cartons_broken': 1},
+        {'transaction_id': 'T6', 'type': 'restock', 'sku_id': 'OIL_1L', 'quantity_received': 24},
+        {'transaction_id': 'T7', 'type': 'decant', 'sku_id': 'OIL_1L'},   # no quantities
+    ]
+    for violation in ledger.apply(events):
+        print(f"  {violation['transaction_id']} {violation['type']:<8} {violation['check']:<22}"
+              f"bulk {violation['bulk_after']:g}, shelf {violation['shelf_after']:g}")
+    print(f"End:   bulk {ledger.bulk[:2].tolist()} cartons, shelf {ledger.shelf[:2].tolist()}")
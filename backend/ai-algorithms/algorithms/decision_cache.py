@@ -0,0 +1,229 @@
+"""
+Smart Loss Control - Trigger Decision Cache
+============================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Staff devices poll "should I show a Quick Check?" every few seconds,
+while a SKU's inputs only change when it sells or is counted.
+DecisionCache sits in front of AnomalyDetectionEngine.should_trigger_count
+and answers repeat polls from memory.
+
+WHEN IS A CACHED ANSWER STILL RIGHT?
+An entry is keyed on the SKU plus the tracker's `version` (bumped by
+SalesVelocityTracker on every sale and count) and sales_since_trigger,
+so a new sale or count invalidates it automatically. It also carries a
+"valid until" time — the earliest of:
+  • the end of the current hour (the hourly window rolls over, so the
+    VOLUME check sees a new hour)
+  • the moment the TIME trigger becomes due (last count + threshold),
+    or once due, the next change of its "x.x hours" reason
+  • the end of the RANDOM time slot
+  • now + ttl_seconds (a safety net, e.g. for config changes)
+Inside that window a fresh computation would give the same answer.
+
+RANDOM TRIGGER:
+Asking the engine on every poll would re-roll the 20% random check
+each time, so a SKU polled 100 times an hour would almost always fire.
+The cache makes ONE draw per SKU and time slot (random_slot_minutes),
+from a counter-based hash of (seed, SKU, slot) — the same draw however
+often the device polls, even after eviction. A RANDOM check already
+answered by a count in this slot does not fire again.
+
+SIZE:
+At most max_entries SKUs are kept, least recently polled evicted first
+(OrderedDict). hits / misses / invalidations / expirations / evictions
+are counted; stats() returns them.
+
+Velocity objects without a `version` (plain SalesVelocityData) are
+cached too, but then the caller must call invalidate(sku_id) when the
+inputs change. Not thread-safe: one cache per event loop / thread.
+"""
+
+from typing import Dict, Optional
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import random
+import zlib
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, datetime_to_epoch_us
+
+
+_HOUR_US = 3_600_000_000
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: DecisionCache
+# -------------------------------------------------------------------
+
+class DecisionCache:
+    """LRU + TTL cache of should_trigger_count decisions per SKU"""
+
+    def __init__(self, engine: Optional[AnomalyDetectionEngine] = None,
+                 max_entries: int = 100_000, ttl_seconds: float = 900,
+                 random_slot_minutes: int = 60, seed: Optional[int] = None):
+        self.engine = engine or AnomalyDetectionEngine()
+        self.max_entries = max_entries
+        self.ttl_us = int(ttl_seconds * 1_000_000)
+        self.slot_us = random_slot_minutes * 60_000_000
+
+        # The engine's seed keeps draws reproducible; otherwise pick one
+        if seed is None:
+            seed = self.engine.seed if self.engine.seed is not None else random.getrandbits(63)
+        self.seed = seed
+        self._seed_mix = (seed * 0x9E3779B97F4A7C15) & _MASK64
+
+        # sku_id → (version, sales_since_trigger, computed_at, valid_until, decision)
+        # (times as the caller's datetimes, so a hit needs no conversion)
+        self._entries: OrderedDict = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    # ---------------------------------------------------------------
+    # METHOD: should_trigger_count
+    # ---------------------------------------------------------------
+
+    def should_trigger_count(self, velocity, current_time: datetime,
+                             sales_since_trigger: int = 0) -> Dict:
+        """
+        Same arguments and result as the engine's should_trigger_count,
+        answered from the cache when the inputs have not changed.
+        """
+        sku_id = velocity.sku_id
+        version = getattr(velocity, 'version', None)
+
+        entry = self._entries.get(sku_id)
+        if entry is not None:
+            if entry[0] != version or entry[1] != sales_since_trigger:
+                self.invalidations += 1
+            elif not entry[2] <= current_time < entry[3]:
+                self.expirations += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(sku_id)
+                return dict(entry[4])
+
+        self.misses += 1
+        now_us = datetime_to_epoch_us(current_time)
+        decision, valid_until = self._decide(velocity, current_time, now_us,
+                                             sales_since_trigger)
+        # The engine may have rolled the tracker's window; that is not
+        # an input change, so the key is the version seen on arrival
+        valid_until = current_time + timedelta(microseconds=valid_until - now_us)
+        self._entries[sku_id] = (version, sales_since_trigger, current_time, valid_until,
+                                 decision)
+        self._entries.move_to_end(sku_id)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return dict(decision)
+
+    def _decide(self, velocity, current_time: datetime, now_us: int,
+                sales_since_trigger: int):
+        """Engine decision with the slot's RANDOM draw, and its expiry."""
+        config = self.engine.config
+        slot = now_us // self.slot_us
+        slot_start = slot * self.slot_us
+
+        # A count inside this slot has already answered its random check
+        last_count_us = datetime_to_epoch_us(velocity.last_count_timestamp)
+        draw = self.slot_draw(velocity.sku_id, slot) if last_count_us < slot_start else 1.0
+
+        decision = self.engine.should_trigger_count(velocity, current_time,
+                                                    sales_since_trigger, random_draw=draw)
+
+        valid_until = min(now_us + self.ttl_us,
+                          (now_us // _HOUR_US + 1) * _HOUR_US,
+                          slot_start + self.slot_us)
+        time_due = last_count_us + int(config['time_threshold_hours'] * _HOUR_US)
+        if now_us < time_due:
+            valid_until = min(valid_until, time_due)
+        elif decision.get('type') == 'TIME':
+            # The reason quotes hours to one decimal: it changes at
+            # every x.x5 hours since the count
+            step = _HOUR_US // 10
+            elapsed = now_us - last_count_us
+            valid_until = min(valid_until,
+                              last_count_us + ((elapsed - step // 2) // step + 1) * step + step // 2)
+        return decision, valid_until
+
+    def slot_draw(self, sku_id: str, slot: int) -> float:
+        """Uniform [0, 1) draw for one SKU and slot (splitmix64, like
+        the engine's batch draws)."""
+        x = ((zlib.crc32(sku_id.encode()) << 32) ^ slot ^ self._seed_mix) & _MASK64
+        x = (x + 0x9E3779B97F4A7C15) & _MASK64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+        x ^= x >> 31
+        return (x >> 11) * (1.0 / (1 << 53))
+
+
+    # ---------------------------------------------------------------
+    # MAINTENANCE
+    # ---------------------------------------------------------------
+
+    def invalidate(self, sku_id: str) -> bool:
+        """Drop one SKU's entry (inputs changed without a version bump)."""
+        return self._entries.pop(sku_id, None) is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from velocity_tracker import SalesVelocityTracker
+
+    now = datetime(2026, 2, 16, 9, 0)
+    tracker = SalesVelocityTracker('SKU_OIL_5L', last_count_timestamp=now - timedelta(hours=3))
+    cache = DecisionCache(AnomalyDetectionEngine(seed=7), max_entries=1000)
+
+    # A device polls every 10 s for an hour; a sale lands every 10 min
+    fired = set()
+    for poll in range(360):
+        t = now + timedelta(seconds=10 * poll)
+        if poll % 60 == 30:
+            tracker.record_sale(t, 2)
+        decision = cache.should_trigger_count(tracker, t, tracker.total_sales_since_count)
+        if decision['should_trigger']:
+            fired.add(decision['type'])
+
+    print(f"360 polls: {cache.stats()}")
+    print(f"Triggers seen: {sorted(fired) or 'none'}")
+
+    # Cached answers equal a fresh computation with the same slot draw
+    t = now + timedelta(minutes=59)
+    cached = cache.should_trigger_count(tracker, t, tracker.total_sales_since_count)
+    fresh, _ = cache._decide(tracker, t, datetime_to_epoch_us(t), tracker.total_sales_since_count)
+    print(f"Cached == fresh: {cached == fresh}")
+
+    # The slot draw is stable, however often it is asked
+    slot = datetime_to_epoch_us(now) // cache.slot_us
+    print(f"Slot draw stable: {cache.slot_draw('SKU_OIL_5L', slot) == cache.slot_draw('SKU_OIL_5L', slot)}")
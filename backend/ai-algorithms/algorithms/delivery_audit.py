@@ -0,0 +1,289 @@
+"""
+Smart Loss Control - Bulk Supplier Delivery Audit
+==================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+InventoryEngine.validate_delivery checks one ordered/received pair.
+DeliveryAuditor checks a month of restocks against the purchase orders
+in one go:
+
+  • The purchase-order table is indexed ONCE in a hash table keyed on
+    (order_id, sku_id); each batch of restock records probes it (a hash
+    join), giving the PO row for every delivery.
+  • discrepancy, discrepancy_pct, status and financial_impact are then
+    computed as whole NumPy columns — the same numbers as
+    validate_delivery(ordered, received, unit_price) row by row.
+  • Per-supplier totals (deliveries, flagged, flag rate, units short,
+    financial impact) are kept in arrays and updated with each batch,
+    so new deliveries only cost their own size.
+
+Restocks with no matching purchase-order line are reported as
+unmatched instead of being guessed at.
+
+Record shapes:
+    purchase order: {'order_id', 'sku_id', 'quantity_ordered',
+                     'unit_price', 'supplier_name'}
+    restock:        {'order_id', 'sku_id', 'quantity_received', ...}
+                    (the restock transaction shape plus its order_id)
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# status codes: DELIVERY_STATUSES[code] is the validate_delivery label
+DELIVERY_STATUSES = ('VERIFIED', 'FLAGGED')
+
+UNKNOWN_SUPPLIER = 'unknown'
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: DeliveryAuditor
+# -------------------------------------------------------------------
+
+class DeliveryAuditor:
+    """Hash-joins restocks to purchase orders and audits them in bulk"""
+
+    def __init__(self, purchase_orders: Iterable[Dict] = ()):
+        self._index: Dict[Tuple[str, str], int] = {}
+        self.ordered = np.zeros(0)
+        self.unit_price = np.zeros(0)
+        self.po_supplier = np.zeros(0, dtype=np.int64)
+
+        # Per-supplier running totals (codes into supplier_ids)
+        self.supplier_ids: List[str] = []
+        self._supplier_code: Dict[str, int] = {}
+        self.deliveries = np.zeros(0, dtype=np.int64)
+        self.flagged = np.zeros(0, dtype=np.int64)
+        self.units_short = np.zeros(0)
+        self.units_over = np.zeros(0)
+        self.impact = np.zeros(0)
+
+        self.add_orders(purchase_orders)
+
+    def add_orders(self, purchase_orders: Iterable[Dict]) -> None:
+        """Index more purchase-order lines (a re-sent line replaces the old one)."""
+        orders = list(purchase_orders)
+        if not orders:
+            return
+        start = len(self.ordered)
+        keys, ordered, price, supplier = zip(*[
+            ((po['order_id'], po['sku_id']), po['quantity_ordered'], po['unit_price'],
+             po.get('supplier_name') or UNKNOWN_SUPPLIER)
+            for po in orders
+        ])
+        self._index.update(zip(keys, range(start, start + len(orders))))
+        self.ordered = np.concatenate([self.ordered, np.array(ordered, dtype=np.float64)])
+        self.unit_price = np.concatenate([self.unit_price, np.array(price, dtype=np.float64)])
+        self.po_supplier = np.concatenate(
+            [self.po_supplier, np.array([self._supplier(s) for s in supplier], dtype=np.int64)])
+
+    def _supplier(self, name: str) -> int:
+        code = self._supplier_code.get(name)
+        if code is None:
+            code = self._supplier_code[name] = len(self.supplier_ids)
+            self.supplier_ids.append(name)
+            if code >= len(self.deliveries):
+                grow = max(len(self.deliveries), 16)
+                self.deliveries = np.concatenate([self.deliveries, np.zeros(grow, dtype=np.int64)])
+                self.flagged = np.concatenate([self.flagged, np.zeros(grow, dtype=np.int64)])
+                self.units_short = np.concatenate([self.units_short, np.zeros(grow)])
+                self.units_over = np.concatenate([self.units_over, np.zeros(grow)])
+                self.impact = np.concatenate([self.impact, np.zeros(grow)])
+        return code
+
+
+    # ---------------------------------------------------------------
+    # METHOD: audit
+    # ---------------------------------------------------------------
+
+    def audit(self, restocks: List[Dict]) -> Dict[str, np.ndarray]:
+        """
+        Audit a batch of restock records and fold it into the
+        per-supplier totals.
+
+        Returns:
+            Dictionary of NumPy arrays, one entry per restock:
+            - order_row (int64, -1 = no matching purchase-order line)
+            - ordered, received, discrepancy, discrepancy_pct,
+              financial_impact, accepted_qty (float64)
+            - status (int8 code; DELIVERY_STATUSES[code] is the label)
+            - supplier (int64 code into supplier_ids, -1 when unmatched)
+            Matched rows carry exactly what validate_delivery returns;
+            unmatched rows are zero and left out of supplier totals.
+        """
+
+        # -----------------------------------------------------------
+        # Hash join: probe the PO index with each (order_id, sku_id)
+        # -----------------------------------------------------------
+
+        index = self._index
+        rows, received = zip(*[
+            (index.get((r.get('order_id'), r.get('sku_id')), -1),
+             r.get('quantity_received', r.get('quantity', 0)))
+            for r in restocks
+        ]) if restocks else ((), ())
+        rows = np.array(rows, dtype=np.int64)
+        received = np.array(received, dtype=np.float64)
+        matched = rows >= 0
+        hit = rows[matched]
+
+        ordered = np.zeros(rows.size)
+        ordered[matched] = self.ordered[hit]
+        unit_price = np.zeros(rows.size)
+        unit_price[matched] = self.unit_price[hit]
+        supplier = np.full(rows.size, -1, dtype=np.int64)
+        supplier[matched] = self.po_supplier[hit]
+        received[~matched] = 0.0
+
+        # -----------------------------------------------------------
+        # validate_delivery, as columns
+        # -----------------------------------------------------------
+
+        discrepancy = received - ordered
+
+        # Percentage only where ordered > 0, zero elsewhere
+        discrepancy_pct = np.zeros_like(discrepancy)
+        np.divide(discrepancy, ordered, out=discrepancy_pct, where=ordered > 0)
+        discrepancy_pct *= 100
+
+        status = (discrepancy != 0).astype(np.int8)
+        financial_impact = np.abs(discrepancy) * unit_price
+
+        # -----------------------------------------------------------
+        # Per-supplier totals: only this batch's deliveries are added
+        # -----------------------------------------------------------
+
+        n = len(self.supplier_ids)
+        s = supplier[matched]
+        self.deliveries[:n] += np.bincount(s, minlength=n)
+        self.flagged[:n] += np.bincount(s, weights=status[matched], minlength=n).astype(np.int64)
+        self.units_short[:n] += np.bincount(s, weights=np.maximum(-discrepancy[matched], 0),
+                                            minlength=n)
+        self.units_over[:n] += np.bincount(s, weights=np.maximum(discrepancy[matched], 0),
+                                           minlength=n)
+        self.impact[:n] += np.bincount(s, weights=financial_impact[matched], minlength=n)
+
+        return {
+            'order_row': rows,
+            'ordered': ordered,
+            'received': received,
+            'discrepancy': discrepancy,
+            'discrepancy_pct': discrepancy_pct,
+            'status': status,
+            'financial_impact': financial_impact,
+            'accepted_qty': received,
+            'supplier': supplier,
+        }
+
+    def unmatched(self, restocks: List[Dict], result: Dict[str, np.ndarray]) -> List[Dict]:
+        """Restock records of a batch that had no purchase-order line."""
+        return [restocks[i] for i in np.flatnonzero(result['order_row'] < 0).tolist()]
+
+    def supplier_summary(self, min_deliveries: int = 1) -> Dict[str, Dict]:
+        """Running per-supplier totals, worst flag rate first."""
+        n = len(self.supplier_ids)
+        deliveries = self.deliveries[:n]
+        flag_rate = np.divide(self.flagged[:n], deliveries, out=np.zeros(n),
+                              where=deliveries > 0)
+        order = np.lexsort((-self.impact[:n], -flag_rate))
+        return {
+            self.supplier_ids[s]: {
+                'deliveries': int(deliveries[s]),
+                'flagged': int(self.flagged[s]),
+                'flag_rate': round(float(flag_rate[s]), 4),
+                'units_short': float(self.units_short[s]),
+                'units_over': float(self.units_over[s]),
+                'total_impact': round(float(self.impact[s]), 2),
+            }
+            for s in order.tolist() if deliveries[s] >= min_deliveries
+        }
+
+
+# -------------------------------------------------------------------
+# HELPERS
+# -------------------------------------------------------------------
+
+def as_records(result: Dict[str, np.ndarray], rows: Optional[Iterable[int]] = None) -> List[Dict]:
+    """validate_delivery-shaped dicts for some rows of an audit result."""
+    if rows is None:
+        rows = np.flatnonzero(result['order_row'] >= 0)
+    return [
+        {
+            'ordered': float(result['ordered'][i]),
+            'received': float(result['received'][i]),
+            'discrepancy': float(result['discrepancy'][i]),
+            'discrepancy_pct': float(result['discrepancy_pct'][i]),
+            'status': DELIVERY_STATUSES[result['status'][i]],
+            'financial_impact': float(result['financial_impact'][i]),
+            'accepted_qty': float(result['accepted_qty'][i]),
+        }
+        for i in np.asarray(rows).tolist()
+    ]
+
+
+def orders_from_restocks(restocks: List[Dict], suppliers: List[str],
+                         seed: int = 2026) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Split generated restock transactions (which carry quantity_ordered)
+    into a purchase-order table and order-linked restock records, with
+    each SKU buying from one supplier. For demos and benchmarks.
+    """
+    rng = np.random.default_rng(seed)
+    sku_supplier: Dict[str, str] = {}
+    orders, deliveries = [], []
+    for txn in restocks:
+        sku_id = txn['sku_id']
+        if sku_id not in sku_supplier:
+            sku_supplier[sku_id] = suppliers[rng.integers(len(suppliers))]
+        order_id = 'PO_' + txn['transaction_id'].split('_', 1)[1]
+        orders.append({
+            'order_id': order_id,
+            'sku_id': sku_id,
+            'quantity_ordered': txn['quantity_ordered'],
+            'unit_price': txn['cost_price_usd'],
+            'supplier_name': sku_supplier[sku_id],
+        })
+        delivery = {k: v for k, v in txn.items() if k not in ('quantity_ordered', 'discrepancy')}
+        delivery['order_id'] = order_id
+        deliveries.append(delivery)
+    return orders, deliveries
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from inventory_engine_v2 import InventoryEngine
+    from workload_generator import generate_workload
+
+    workload = generate_workload(shops=20, skus_per_shop=10, days=30)
+    restocks = [t for t in workload.iter_transactions() if t['type'] == 'restock']
+    orders, deliveries = orders_from_restocks(
+        restocks, ['Lagos Distributors Ltd', 'Kano Oil Mills', 'Accra Wholesale', 'Ibadan Foods'])
+
+    auditor = DeliveryAuditor(orders)
+    half = len(deliveries) // 2
+    first = auditor.audit(deliveries[:half])
+    late = deliveries[half:] + [{'order_id': 'PO_MISSING', 'sku_id': 'X', 'quantity_received': 5}]
+    second = auditor.audit(late)
+
+    print(f"{len(deliveries):,} deliveries in two batches; "
+          f"{len(auditor.unmatched(late, second))} unmatched")
+
+    # Same numbers as validate_delivery, row by row
+    expected = [InventoryEngine.validate_delivery(po['quantity_ordered'],
+                                                  d['quantity_received'], po['unit_price'])
+                for po, d in zip(orders, deliveries)]
+    print(f"Matches validate_delivery: {as_records(first) + as_records(second) == expected}")
+
+    print(f"\n  {'supplier':<24}{'deliveries':>11}{'flag rate':>10}{'impact USD':>12}")
+    for name, totals in auditor.supplier_summary().items():
+        print(f"  {name:<24}{totals['deliveries']:>11}{totals['flag_rate']:>10.1%}"
+              f"{totals['total_impact']:>12.2f}")
@@ -0,0 +1,468 @@
+"""
+Smart Loss Control - Micro-Batching Engine Service
+===================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Serves the Python engines to the Node.js backend over local HTTP (TCP
+or a Unix socket), so aiController.js can call them per request
+instead of re-implementing their logic.
+
+Endpoints (JSON in, JSON out):
+    POST /v1/should_trigger_count   one SKU's velocity inputs
+    POST /v1/process_count          one submitted quick count
+    POST /v1/calculate_variance     expected vs actual
+    POST /v1/detect_theft_patterns  a sales_log and shift_end
+    GET  /v1/stats                  latency p50/p99, batch sizes
+    GET  /health
+
+MICRO-BATCHING:
+Requests are not evaluated one by one. Each endpoint has a queue; a
+batch closes when it reaches --max-batch requests or when its first
+request has waited --max-wait-ms. The whole batch then goes through
+the engines' batch APIs in one pass (should_trigger_counts,
+process_counts, reconcile_batch, one timestamp parse for all theft
+logs).
+
+BACKPRESSURE:
+Each queue holds at most --max-pending requests. When it is full
+the service answers 503 with Retry-After straight away, so callers
+back off instead of piling up latency. A request header over 64 KiB
+gets 431 and a body over --max-body gets 413, without being read.
+
+Run:
+    python algorithms/engine_service.py --port 8765
+    python algorithms/engine_service.py --unix /tmp/smartloss.sock
+"""
+
+from typing import Callable, Dict, List, Optional
+from collections import deque
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from inventory_engine_v2 import InventoryEngine
+from anomaly_detection_v2 import (
+    AnomalyDetectionEngine, QuickCountManager, to_epoch_us
+)
+
+
+class Overloaded(Exception):
+    """Raised when an endpoint's queue is full (HTTP 503)."""
+
+
+class BadRequest(Exception):
+    """Raised for malformed request bodies (HTTP 400)."""
+
+
+# -------------------------------------------------------------------
+# MICRO-BATCHER
+# -------------------------------------------------------------------
+
+class MicroBatcher:
+    """Collects concurrent requests and evaluates them together"""
+
+    def __init__(self, evaluate: Callable[[List[Dict]], List[Dict]],
+                 max_batch: int = 256, max_wait: float = 0.002,
+                 max_pending: int = 4096):
+        self.evaluate = evaluate
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+
+        self._queue: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def submit(self, request: Dict) -> asyncio.Future:
+        if len(self._queue) >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((request, future))
+        self._wakeup.set()
+        return future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # Hold the batch open briefly unless it is already full
+            deadline = loop.time() + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [self._queue.popleft()
+                     for _ in range(min(self.max_batch, len(self._queue)))]
+            futures = [f for _, f in batch]
+
+            self.batches += 1
+            self.items += len(batch)
+
+            try:
+                results = self.evaluate([r for r, _ in batch])
+            except Exception:
+                # One malformed request must not fail its batch-mates:
+                # retry one by one so only the bad ones get the error
+                for request, future in batch:
+                    try:
+                        result = self.evaluate([request])[0]
+                    except Exception as exc:
+                        if not future.done():
+                            future.set_exception(exc)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                continue
+
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+# -------------------------------------------------------------------
+# BATCH EVALUATORS (one call per batch)
+# -------------------------------------------------------------------
+
+class EngineBatches:
+    """Turns a list of request bodies into one batched engine call each"""
+
+    def __init__(self, config: Optional[Dict] = None, seed: Optional[int] = None):
+        self.engine = AnomalyDetectionEngine(config)
+        self.seed = seed
+        self._trigger_batches = 0
+
+    def should_trigger_count(self, requests: List[Dict]) -> List[Dict]:
+        now = datetime.now()
+        try:
+            recent = [r['current_hour_sales'] for r in requests]
+            average = [r['seven_day_average'] for r in requests]
+            # Never counted → treat as counted at the epoch (TIME fires)
+            last_count = [r['last_count_timestamp'] or '1970-01-01T00:00:00'
+                          for r in requests]
+        except KeyError as exc:
+            raise BadRequest(f'missing field {exc}')
+        current = [r.get('current_time') or now.isoformat() for r in requests]
+        sales = [r.get('sales_since_trigger', 0) for r in requests]
+        shops = [r.get('shop_id', '') for r in requests]
+
+        # A fresh RANDOM stream per batch (draws restart per call)
+        seed = None
+        if self.seed is not None:
+            seed = self.seed * 1_000_003 + self._trigger_batches
+        self._trigger_batches += 1
+
+        result = self.engine.should_trigger_counts(
+            recent, average, last_count, to_epoch_us(current),
+            sales, shop_ids=shops, seed=seed
+        )
+
+        labels = AnomalyDetectionEngine.TRIGGER_TYPES
+        out = []
+        for k, (code, priority, hours) in enumerate(zip(
+                result['type'].tolist(), result['priority'].tolist(),
+                result['hours_since_count'].tolist())):
+            if not code:
+                out.append({'should_trigger': False})
+                continue
+            ttype = labels[code]
+            out.append({
+                'should_trigger': True,
+                'type': ttype,
+                'priority': priority,
+                'reason': self._reason(ttype, recent[k], average[k], hours, sales[k])
+            })
+        return out
+
+    @staticmethod
+    def _reason(ttype: str, recent: float, average: float,
+                hours: float, sales: int) -> str:
+        # Same wording as should_trigger_count
+        if ttype == 'RANDOM':
+            return 'Random security check'
+        if ttype == 'VOLUME':
+            return f'Sales spike: {recent:.1f} vs {average:.1f} avg'
+        if ttype == 'TIME':
+            return f'{hours:.1f} hours since last count'
+        return f'{sales} sales since last count'
+
+    def process_count(self, requests: List[Dict]) -> List[Dict]:
+        records = []
+        for r in requests:
+            try:
+                counted_at = r.get('counted_at')
+                records.append((
+                    r['expected'], r['actual'], r['unit_price'], r['staff_id'],
+                    datetime.fromisoformat(counted_at) if counted_at else None
+                ))
+            except KeyError as exc:
+                raise BadRequest(f'missing field {exc}')
+        result = QuickCountManager.process_counts(records, self.engine)
+        return QuickCountManager.count_records(result, np.arange(len(records)))
+
+    def calculate_variance(self, requests: List[Dict]) -> List[Dict]:
+        expected = np.array([r['expected'] for r in requests], dtype=np.float64)
+        actual = np.array([r['actual'] for r in requests], dtype=np.float64)
+
+        # reconcile_batch with no deliveries or sales: expected stays put
+        zeros = np.zeros_like(expected)
+        result = InventoryEngine.reconcile_batch(expected, zeros, zeros, actual, zeros)
+
+        statuses = InventoryEngine.VARIANCE_STATUSES
+        return [
+            {'expected': r['expected'], 'actual': r['actual'], 'variance': v,
+             'variance_pct': pct, 'status': statuses[s]}
+            for r, v, pct, s in zip(requests, result['variance'].tolist(),
+                                    result['variance_pct'].tolist(),
+                                    result['status'].tolist())
+        ]
+
+    def detect_theft_patterns(self, requests: List[Dict]) -> List[Dict]:
+        # Parse every log's timestamps in one go, then split per request
+        logs = [r.get('sales_log', []) for r in requests]
+        sizes = [len(log) for log in logs]
+        stamps = to_epoch_us([s for log in logs for s in log])
+        edges = np.cumsum([0] + sizes)
+
+        return [
+            self.engine.detect_theft_patterns_fast(
+                stamps[edges[k]:edges[k + 1]],
+                datetime.fromisoformat(r['shift_end'])
+            )
+            for k, r in enumerate(requests)
+        ]
+
+
+# -------------------------------------------------------------------
+# HTTP FRONT-END (HTTP/1.1, keep-alive, JSON bodies)
+# -------------------------------------------------------------------
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Content Too Large',
+               431: 'Request Header Fields Too Large',
+               500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class EngineService:
+    """The asyncio server: routing, batching, latency tracking"""
+
+    ROUTES = ('should_trigger_count', 'process_count',
+              'calculate_variance', 'detect_theft_patterns')
+
+    def __init__(self, max_batch: int = 256, max_wait_ms: float = 2.0,
+                 max_pending: int = 4096, config: Optional[Dict] = None,
+                 seed: Optional[int] = None, latency_window: int = 100_000,
+                 max_body: int = 1 << 20):
+        self.batches = EngineBatches(config, seed)
+        self.settings = {'max_batch': max_batch, 'max_wait_ms': max_wait_ms,
+                         'max_pending': max_pending, 'max_body': max_body}
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self.latency_ns: Dict[str, deque] = {
+            name: deque(maxlen=latency_window) for name in self.ROUTES
+        }
+        self._server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765,
+                    unix_path: Optional[str] = None):
+        for name in self.ROUTES:
+            batcher = MicroBatcher(
+                getattr(self.batches, name),
+                max_batch=self.settings['max_batch'],
+                max_wait=self.settings['max_wait_ms'] / 1000,
+                max_pending=self.settings['max_pending']
+            )
+            batcher.start()
+            self.batchers[name] = batcher
+
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._serve, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    def stats(self) -> Dict:
+        endpoints = {}
+        for name in self.ROUTES:
+            batcher = self.batchers[name]
+            lat = np.asarray(self.latency_ns[name], dtype=np.float64)
+            p50, p99 = np.percentile(lat, [50, 99]) / 1e3 if lat.size else (0.0, 0.0)
+            endpoints[name] = {
+                'requests': batcher.items,
+                'batches': batcher.batches,
+                'mean_batch_size': round(batcher.items / batcher.batches, 2)
+                if batcher.batches else 0.0,
+                'rejected': batcher.rejected,
+                'pending': len(batcher._queue),
+                'p50_us': round(float(p50), 1),
+                'p99_us': round(float(p99), 1),
+            }
+        return {'settings': self.settings, 'endpoints': endpoints}
+
+    async def _serve(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except (asyncio.LimitOverrunError, ValueError):
+                    # Header beyond the stream limit (64 KiB)
+                    await self._reject(writer, 431, 'request header too large')
+                    break
+                start = time.perf_counter_ns()
+
+                try:
+                    method, path, headers, length = self._parse_head(head)
+                except ValueError as exc:
+                    # The body cannot be framed: answer, then hang up
+                    await self._reject(writer, 400, f'malformed request: {exc}')
+                    break
+                if length > self.settings['max_body']:
+                    await self._reject(
+                        writer, 413, f"body over {self.settings['max_body']} bytes")
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b''
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                status, payload, extra = await self._route(method, path, body)
+                self._respond(writer, status, payload, extra)
+                await writer.drain()
+
+                route = path.rsplit('/', 1)[-1]
+                if status == 200 and route in self.latency_ns:
+                    self.latency_ns[route].append(time.perf_counter_ns() - start)
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        finally:
+            writer.close()
+
+    async def _reject(self, writer, status: int, error: str) -> None:
+        """Answer a request whose body is not read, then hang up."""
+        self._respond(writer, status, {'error': error}, {'Connection': 'close'})
+        await writer.drain()
+
+    @staticmethod
+    def _parse_head(head: bytes):
+        """(method, path, headers, content length); ValueError if malformed."""
+        lines = head.decode('latin-1').split('\r\n')
+        method, path, _ = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length < 0:
+            raise ValueError(f'negative content-length {length}')
+        return method, path, headers, length
+
+    async def _route(self, method: str, path: str, body: bytes):
+        if path == '/health':
+            return 200, {'status': 'ok'}, None
+        if path == '/v1/stats':
+            return 200, self.stats(), None
+
+        name = path[len('/v1/'):] if path.startswith('/v1/') else None
+        if name not in self.batchers:
+            return 404, {'error': f'unknown endpoint {path}'}, None
+        if method != 'POST':
+            return 405, {'error': 'use POST'}, None
+
+        try:
+            request = json.loads(body)
+            if not isinstance(request, dict):
+                raise BadRequest('request body must be a JSON object')
+            result = await self.batchers[name].submit(request)
+        except Overloaded:
+            return 503, {'error': 'overloaded, retry later'}, {'Retry-After': '1'}
+        except (ValueError, TypeError, KeyError, BadRequest) as exc:
+            return 400, {'error': str(exc)}, None
+        except Exception as exc:
+            return 500, {'error': repr(exc)}, None
+        return 200, result, None
+
+    @staticmethod
+    def _respond(writer, status: int, payload, extra: Optional[Dict]) -> None:
+        body = json.dumps(payload).encode()
+        head = [f'HTTP/1.1 {status} {STATUS_TEXT[status]}',
+                'Content-Type: application/json',
+                f'Content-Length: {len(body)}']
+        for key, value in (extra or {}).items():
+            head.append(f'{key}: {value}')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+
+
+# -------------------------------------------------------------------
+# ENTRY POINT
+# -------------------------------------------------------------------
+
+async def serve(args) -> None:
+    service = EngineService(args.max_batch, args.max_wait_ms, args.max_pending,
+                            seed=args.seed, max_body=args.max_body)
+    server = await service.start(args.host, args.port, args.unix)
+    where = args.unix or '%s:%d' % server.sockets[0].getsockname()[:2]
+    print(f'listening on {where}', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Smart Loss Control engine service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='serve on a Unix socket instead of TCP')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--max-pending', type=int, default=4096)
+    parser.add_argument('--seed', type=int, help='reproducible RANDOM triggers')
+    parser.add_argument('--max-body', type=int, default=1 << 20,
+                        help='largest request body in bytes (413 above it)')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
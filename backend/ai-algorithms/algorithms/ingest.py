@@ -0,0 +1,519 @@
+"""
+Smart Loss Control - Streaming JSONL Ingestion
+===============================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Command-line entry point for large exports: reads newline-delimited
+transaction records (the simulation_dataset.json transaction shape,
+one per line) from a file or stdin, keeps every SKU's expected stock
+up to date, and writes one JSONL result per quick count:
+
+    {"kind": "variance", "transaction_id": ..., "sku_id": ...,
+     "expected": ..., "actual": ..., "variance": ..., "status": ...,
+     "severity": ..., "financial_loss": ..., ...}
+
+plus an {"kind": "alert", ...} line for every count that needs one
+(RED), and {"kind": "error", ...} for lines that are not valid JSON,
+not a JSON object, miss a field their type needs (REQUIRED_FIELDS),
+carry a non-number where a number belongs (NUMERIC_FIELDS) or a
+timestamp that does not parse. A bad line never stops the stream.
+
+HOW IT STAYS FAST AND SMALL:
+• Lines are read in chunks; each chunk is decoded with ONE json.loads
+  call (the lines joined into an array), so the C decoder does the
+  parsing instead of a Python call per line.
+• A per-type schema turns the chunk into typed NumPy columns
+  (EventChunk): type code, SKU, signed stock change, sale price and
+  the counts' timestamp and quantity. The same pass checks every
+  value's type, so a clean chunk is validated without a per-record
+  Python check. The decoder itself still builds dicts: neither json
+  nor orjson can decode straight into typed columns.
+• Expected stock at each count comes from a grouped cumulative sum
+  over the chunk, exactly the running total InventoryReplayEngine
+  keeps event by event. The chunk's counts then go through
+  InventoryEngine.reconcile_batch (variance, loss) and
+  classify_variances (severity) as whole arrays.
+• State is per SKU (expected stock, price, last count time), never
+  per event, so memory stays flat however long the stream is.
+
+Each count is reported against the expected stock when it arrives;
+offline events that turn up later are not folded back into results
+already written. Transaction ids are not remembered (that would grow
+with the stream): de-duplicate re-delivered events upstream, or use
+checkpoint.EngineState when exactly-once replay matters.
+
+Run:
+    python algorithms/ingest.py events.jsonl --inventory test-data/simulation_dataset.json
+    cat events.jsonl | python algorithms/ingest.py - > results.jsonl
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from itertools import islice
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+# Optional: orjson decodes/encodes several times faster than the
+# standard library. Everything works without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from inventory_engine_v2 import InventoryEngine
+from anomaly_detection_v2 import AnomalyDetectionEngine
+from event_replay import EVENT_TYPES
+
+
+TYPE_CODE = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+# How each event type moves expected stock: (field, sign). Decants
+# without litres_added fall back to cartons_broken × CARTON_CONVERSION,
+# restocks without quantity_received to quantity (as event_replay).
+EVENT_SCHEMA = {
+    'sale': ('quantity', -1.0),
+    'restock': ('quantity_received', 1.0),
+    'decant': ('litres_added', 1.0),
+}
+
+# Fields an event type cannot do without (present and not null)
+REQUIRED_FIELDS = {
+    'quick_count': ('sku_id', 'timestamp', 'actual_quantity'),
+}
+
+# Numeric fields each event type reads: when present they must be a
+# JSON number (not null, a string or a boolean)
+NUMERIC_FIELDS = {
+    'sale': ('quantity', 'unit_price'),
+    'restock': ('quantity_received', 'quantity'),
+    'decant': ('litres_added', 'cartons_broken'),
+    'quick_count': ('actual_quantity',),
+}
+
+# Fields every event may carry: when present, a string (timestamps
+# must also parse as ISO 8601)
+STRING_FIELDS = ('type', 'sku_id', 'timestamp')
+
+_NUMBER = {int, float}
+_STRING = {str, type(None)}
+
+_loads = orjson.loads if orjson else json.loads
+
+if orjson:
+    def _dumps_lines(records: List[Dict]) -> bytes:
+        return b''.join(orjson.dumps(r) + b'\n' for r in records)
+else:
+    def _dumps_lines(records: List[Dict]) -> bytes:
+        return ''.join(json.dumps(r) + '\n' for r in records).encode()
+
+_SALE = TYPE_CODE['sale']
+
+
+# -------------------------------------------------------------------
+# DECODING
+# -------------------------------------------------------------------
+
+def shape_error(record) -> Optional[str]:
+    """Why a decoded line is not a usable event (None if it is)."""
+    if not isinstance(record, dict):
+        return f'expected a JSON object, got {type(record).__name__}'
+    for field in STRING_FIELDS:
+        if type(record.get(field)) not in _STRING:
+            return f'{field} must be a string'
+    kind = record.get('type')
+    missing = [f for f in REQUIRED_FIELDS.get(kind, ()) if record.get(f) is None]
+    if missing:
+        return f"{kind} without {', '.join(missing)}"
+    for field in NUMERIC_FIELDS.get(kind, ()):
+        if field in record and type(record[field]) not in _NUMBER:
+            return f'{kind} {field} must be a number'
+    stamp = record.get('timestamp')
+    if stamp is not None:
+        try:
+            parsed = np.datetime64(stamp, 'us')
+        except ValueError:
+            parsed = np.datetime64('NaT')
+        if np.isnat(parsed):
+            return f'timestamp {stamp!r} is not an ISO 8601 date'
+    return None
+
+
+def _stock_change(event: Dict) -> float:
+    field, sign = EVENT_SCHEMA[event['type']]
+    if field in event:
+        return sign * event[field]
+    if event['type'] == 'decant':
+        return event.get('cartons_broken', 0) * InventoryEngine.CARTON_CONVERSION
+    return sign * event.get('quantity', 0)
+
+
+class EventChunk:
+    """
+    A decoded chunk as typed columns, one row per event. Built by
+    from_records(), which raises TypeError / ValueError for any record
+    shape_error() would reject, so a clean chunk never pays for a
+    per-record check.
+
+    Every row: etype (TYPE_CODE, -1 for other types), sku_id, delta
+    (signed stock change) and price (a sale's unit price, else 0).
+    Quick counts only, at count_rows: stamp_us, actual and the fields
+    echoed in results (transaction_id, staff_id, timestamp).
+    """
+
+    __slots__ = ('etype', 'sku_id', 'delta', 'price', 'count_rows', 'stamp_us',
+                 'actual', 'transaction_id', 'staff_id', 'timestamp')
+
+    def __len__(self) -> int:
+        return len(self.etype)
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'EventChunk':
+        chunk = cls()
+        if {type(r) for r in records} - {dict}:
+            raise TypeError('expected JSON objects')
+
+        kinds, sku_ids, stamps = (zip(*[
+            (r.get('type'), r.get('sku_id'), r.get('timestamp')) for r in records
+        ]) if records else ((), (), ()))
+        for column in (kinds, sku_ids, stamps):
+            if set(map(type, column)) - _STRING:
+                raise TypeError('expected a string')
+
+        etype = np.array([TYPE_CODE.get(k, -1) for k in kinds], dtype=np.int8)
+        parsed = np.array(stamps, dtype='datetime64[us]')
+        if np.isnat(parsed).sum() != stamps.count(None):
+            raise ValueError('unparseable timestamp')
+
+        rows = {kind: np.flatnonzero(etype == code).tolist()
+                for kind, code in TYPE_CODE.items() if kind in NUMERIC_FIELDS}
+        for kind, fields in NUMERIC_FIELDS.items():
+            for field in fields:
+                if {type(records[i][field]) for i in rows[kind]
+                        if field in records[i]} - _NUMBER:
+                    raise TypeError(f'{kind} {field} must be a number')
+
+        count_rows = rows['quick_count']
+        counted = [records[i] for i in count_rows]
+        if any(r.get('sku_id') is None or r.get('timestamp') is None
+               or 'actual_quantity' not in r for r in counted):
+            raise ValueError('incomplete quick_count')
+
+        delta = np.zeros(len(records))
+        delta[rows['sale']] = [-records[i].get('quantity', 0) for i in rows['sale']]
+        for kind in ('restock', 'decant'):
+            delta[rows[kind]] = [_stock_change(records[i]) for i in rows[kind]]
+        price = np.zeros(len(records))
+        price[rows['sale']] = [records[i].get('unit_price', 0.0) for i in rows['sale']]
+
+        chunk.etype, chunk.sku_id, chunk.delta, chunk.price = etype, list(sku_ids), delta, price
+        chunk.count_rows = np.array(count_rows, dtype=np.int64)
+        chunk.stamp_us = parsed[count_rows].astype(np.int64)
+        chunk.actual = np.array([r['actual_quantity'] for r in counted], dtype=np.float64)
+        chunk.transaction_id = [r.get('transaction_id') for r in counted]
+        chunk.staff_id = [r.get('staff_id') for r in counted]
+        chunk.timestamp = [stamps[i] for i in count_rows]
+        return chunk
+
+
+def decode_lines(lines: List[bytes], first_line: int = 1) -> Tuple[EventChunk, List[Dict]]:
+    """
+    Decode a chunk of JSONL lines. Returns (events, errors); blank
+    lines are skipped. The whole chunk is one json.loads call and one
+    EventChunk.from_records unless it contains a bad line (invalid
+    JSON, a bad shape or a bad value), in which case lines are checked
+    one by one to pinpoint it.
+    """
+    try:
+        decoded = _loads(b'[' + b','.join(lines) + b']')
+    except ValueError:
+        decoded = None
+    else:
+        try:
+            return EventChunk.from_records(decoded), []
+        except (TypeError, ValueError):
+            pass
+
+    # Blank lines are allowed; anything else that fails is reported
+    records, errors = [], []
+    for offset, line in enumerate(lines):
+        if decoded is not None:
+            record = decoded[offset]
+        elif line.isspace():
+            continue
+        else:
+            try:
+                record = _loads(line)
+            except ValueError as exc:
+                errors.append({'kind': 'error', 'line': first_line + offset, 'error': str(exc)})
+                continue
+        problem = shape_error(record)
+        if problem:
+            errors.append({'kind': 'error', 'line': first_line + offset, 'error': problem})
+        else:
+            records.append(record)
+    return EventChunk.from_records(records), errors
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: StreamReconciler
+# -------------------------------------------------------------------
+
+class StreamReconciler:
+    """Per-SKU running expected stock, fed one decoded chunk at a time"""
+
+    def __init__(self, initial_inventory: Iterable[Dict] = (),
+                 engine: Optional[AnomalyDetectionEngine] = None):
+        self.engine = engine or AnomalyDetectionEngine()
+
+        self._codes: Dict[str, int] = {}
+        self.sku_ids: List[str] = []
+        self.expected = np.zeros(1024)
+        self.sell_price = np.zeros(1024)
+        self.last_count_us = np.full(1024, np.iinfo(np.int64).min)
+
+        for record in initial_inventory:
+            code = self._code(record['sku_id'])
+            self.expected[code] = record['quantity_litres']
+            self.sell_price[code] = record.get('sell_price_usd', 0.0)
+
+        self.events = 0
+        self.counts = 0
+        self.alerts = 0
+
+    def _code(self, sku_id: str) -> int:
+        """SKU code, registering new SKUs (opening stock 0)."""
+        code = self._codes.get(sku_id)
+        if code is None:
+            code = self._codes[sku_id] = len(self.sku_ids)
+            self.sku_ids.append(sku_id)
+            if code >= len(self.expected):
+                grow = len(self.expected)
+                self.expected = np.concatenate([self.expected, np.zeros(grow)])
+                self.sell_price = np.concatenate([self.sell_price, np.zeros(grow)])
+                self.last_count_us = np.concatenate(
+                    [self.last_count_us, np.full(grow, np.iinfo(np.int64).min)])
+        return code
+
+    def process(self, chunk: EventChunk) -> List[Dict]:
+        """Apply a decoded chunk of events in order; returns the output records."""
+
+        n = len(chunk)
+        if n == 0:
+            return []
+        self.events += n
+
+        codes, sku_ids = self._codes, chunk.sku_id
+        sku = np.array([codes.get(s, -2) for s in sku_ids], dtype=np.int64)
+        for i in np.flatnonzero(sku == -2).tolist():
+            # New SKU (or none at all: sync events, labels)
+            sku[i] = -1 if sku_ids[i] is None else self._code(sku_ids[i])
+
+        # Events without a SKU (sync, labels) do not touch stock
+        has_sku = sku >= 0
+        delta = np.where(has_sku, chunk.delta, 0.0)
+        sku_or_0 = np.where(has_sku, sku, 0)
+
+        # -----------------------------------------------------------
+        # Running expected stock per row (grouped cumulative sum)
+        # -----------------------------------------------------------
+
+        order = np.argsort(sku_or_0, kind='stable')
+        grouped = sku_or_0[order]
+        step = delta[order]
+        total = np.cumsum(step)
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+        within = total - np.repeat(total[starts] - step[starts], sizes)
+
+        running = np.empty(n)
+        running[order] = within
+        expected_here = self.expected[sku_or_0] + running
+
+        # First sale price values a SKU with no catalogue price
+        sales = np.flatnonzero(chunk.etype == _SALE)
+        sale_skus, first = np.unique(sku[sales], return_index=True)
+        first_sale = dict(zip(sale_skus.tolist(), sales[first].tolist()))
+
+        out = self._counts(chunk, sku, expected_here, first_sale)
+
+        # Commit the chunk's end state
+        self.expected[grouped[starts]] += within[starts + sizes - 1]
+        for code, i in first_sale.items():
+            if not self.sell_price[code]:
+                self.sell_price[code] = chunk.price[i]
+        return out
+
+    def _counts(self, chunk: EventChunk, sku: np.ndarray,
+                expected_here: np.ndarray, first_sale: Dict) -> List[Dict]:
+        """Variance, severity and alerts for the chunk's quick counts."""
+
+        rows = chunk.count_rows
+        if rows.size == 0:
+            return []
+
+        # An older count than the one already held is superseded
+        # (event_replay ignores it), so it gets no result
+        last = self.last_count_us
+        keep = []
+        for k, (code, stamp) in enumerate(zip(sku[rows].tolist(), chunk.stamp_us.tolist())):
+            if stamp >= last[code]:
+                last[code] = stamp
+                keep.append(k)
+        if not keep:
+            return []
+
+        keep = np.array(keep)
+        rows, codes = rows[keep], sku[rows[keep]]
+        self.counts += len(keep)
+
+        # Catalogue price, else the SKU's first sale before the count
+        price = self.sell_price[codes]
+        for k in np.flatnonzero(price == 0).tolist():
+            i = first_sale.get(int(codes[k]))
+            if i is not None and i < rows[k]:
+                price[k] = chunk.price[i]
+
+        # Inventory engine: variance and loss; anomaly engine: severity
+        result = InventoryEngine.reconcile_batch(
+            expected_here[rows], 0.0, 0.0, chunk.actual[keep], price
+        )
+        severity = self.engine.classify_variances(result['variance_pct'])
+
+        out = []
+        keep = keep.tolist()
+        columns = zip([chunk.transaction_id[k] for k in keep],
+                      [chunk.sku_id[i] for i in rows.tolist()],
+                      [chunk.staff_id[k] for k in keep],
+                      [chunk.timestamp[k] for k in keep],
+                      result['expected'].tolist(), result['actual'].tolist(),
+                      result['variance'].tolist(), result['variance_pct'].tolist(),
+                      result['status'].tolist(), result['loss'].tolist(),
+                      severity['severity'].tolist(), severity['send_alert'].tolist())
+        for (txn, sku_id, staff, stamp, expected, actual, variance, pct, status,
+             loss, level, alert) in columns:
+            record = {
+                'kind': 'variance',
+                'transaction_id': txn,
+                'sku_id': sku_id,
+                'expected': expected,
+                'actual': actual,
+                'variance': variance,
+                'variance_pct': pct,
+                'status': InventoryEngine.VARIANCE_STATUSES[status],
+                'severity': AnomalyDetectionEngine.SEVERITIES[level],
+                'send_alert': alert,
+                'financial_loss': loss,
+                'staff_id': staff,
+                'timestamp': stamp,
+            }
+            out.append(record)
+            if alert:
+                self.alerts += 1
+                out.append({**record, 'kind': 'alert'})
+        return out
+
+
+# -------------------------------------------------------------------
+# STREAM DRIVER
+# -------------------------------------------------------------------
+
+def run(source, sink, reconciler: StreamReconciler,
+        chunk_size: int = 8192) -> Dict:
+    """
+    Stream `source` (binary file object, JSONL) through `reconciler`,
+    writing JSONL results to `sink` (binary file object).
+    """
+    started = time.perf_counter()
+    line_no = 1
+    errors = 0
+
+    while True:
+        lines = list(islice(source, chunk_size))
+        if not lines:
+            break
+
+        chunk, bad = decode_lines(lines, first_line=line_no)
+        line_no += len(lines)
+        errors += len(bad)
+
+        out = bad + reconciler.process(chunk)
+        if out:
+            sink.write(_dumps_lines(out))
+
+    elapsed = time.perf_counter() - started
+    return {
+        'events': reconciler.events,
+        'counts': reconciler.counts,
+        'alerts': reconciler.alerts,
+        'errors': errors,
+        'skus': len(reconciler.sku_ids),
+        'seconds': round(elapsed, 3),
+        'events_per_second': round(reconciler.events / elapsed) if elapsed else 0,
+        'max_rss_mb': peak_memory_mb(),
+    }
+
+
+def peak_memory_mb() -> Optional[float]:
+    """
+    Peak resident memory of this process. Linux's VmHWM starts fresh
+    at exec; getrusage's maximum would include the memory of whatever
+    process forked us.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is not None:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return None
+
+
+def load_inventory(path) -> List[Dict]:
+    """initial_inventory records from a dataset JSON file or a bare list."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data['initial_inventory'] if isinstance(data, dict) else data
+
+
+# -------------------------------------------------------------------
+# COMMAND LINE
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Stream JSONL transactions through the engines')
+    parser.add_argument('input', nargs='?', default='-', help="JSONL file, or '-' for stdin")
+    parser.add_argument('--output', '-o', default='-', help="JSONL results, or '-' for stdout")
+    parser.add_argument('--inventory', help='initial_inventory (dataset JSON or list)')
+    parser.add_argument('--chunk-size', type=int, default=8192)
+    parser.add_argument('--quiet', action='store_true', help='no summary on stderr')
+    args = parser.parse_args()
+
+    reconciler = StreamReconciler(load_inventory(args.inventory) if args.inventory else ())
+
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    sink = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        stats = run(source, sink, reconciler, args.chunk_size)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout.buffer:
+            sink.close()
+
+    if not args.quiet:
+        print(json.dumps(stats), file=sys.stderr)
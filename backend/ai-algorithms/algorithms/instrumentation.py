@@ -0,0 +1,489 @@
+"""
+Smart Loss Control - Engine Instrumentation & Metrics Export
+=============================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Records what the engines do in production:
+
+• calls and errors per method (and per shop, if wanted)
+• latency histograms per method
+• how often each trigger type fires (RANDOM / VOLUME / TIME / COUNTER)
+• the GREEN / YELLOW / RED severity distribution
+• theft patterns found and variance statuses
+
+and exports it as Prometheus text format or as a JSON snapshot.
+
+ZERO COST WHEN OFF:
+Nothing in inventory_engine_v2.py or anomaly_detection_v2.py knows
+about metrics. `EngineMetrics.instrument()` swaps timing wrappers onto
+an engine instance (or class) only when instrumentation is enabled,
+and `restore()` puts the original methods back. Engines that were never
+instrumented run exactly the code they always did.
+
+Outcomes are recorded for the outermost instrumented call only:
+QuickCountManager.process_count calls classify_variance, and its
+severity is counted once (under process_count), not twice. The outcome
+takes the shop of the outermost call, or if that has none, of the
+first per-shop engine it called. Calls and latency are recorded for
+every wrapped method.
+
+An EngineMetrics object is not thread-safe; use one per thread or
+process and merge the snapshots.
+"""
+
+from typing import Dict, List, Optional
+from datetime import datetime
+from bisect import bisect_left
+import functools
+import json
+import time
+
+import numpy as np
+
+from inventory_engine_v2 import InventoryEngine
+from anomaly_detection_v2 import AnomalyDetectionEngine, QuickCountManager
+
+
+# -------------------------------------------------------------------
+# OUTCOME RECORDERS
+# -------------------------------------------------------------------
+# Each one reads a method's result and bumps outcome counters.
+# Batch results are counted with one bincount, not a Python loop.
+# -------------------------------------------------------------------
+
+def _trigger_one(metrics, method, shop, result):
+    ttype = result['type'] if result['should_trigger'] else 'NONE'
+    metrics._count('trigger', method, shop, ttype)
+
+
+def _trigger_many(metrics, method, shop, result):
+    counts = np.bincount(result['type'], minlength=len(AnomalyDetectionEngine.TRIGGER_TYPES))
+    metrics._count_codes('trigger', method, shop, AnomalyDetectionEngine.TRIGGER_TYPES, counts)
+
+
+def _severity_one(metrics, method, shop, result):
+    metrics._count('severity', method, shop, result['severity'])
+
+
+def _severity_many(metrics, method, shop, result):
+    counts = np.bincount(result['severity'], minlength=len(AnomalyDetectionEngine.SEVERITIES))
+    metrics._count_codes('severity', method, shop, AnomalyDetectionEngine.SEVERITIES, counts)
+
+
+def _patterns(metrics, method, shop, result):
+    for pattern in result['patterns']:
+        metrics._count('theft_pattern', method, shop, pattern['pattern'])
+
+
+def _status_one(metrics, method, shop, result):
+    metrics._count('variance_status', method, shop, result['status'])
+
+
+def _status_many(metrics, method, shop, result):
+    counts = np.bincount(result['status'], minlength=len(InventoryEngine.VARIANCE_STATUSES))
+    metrics._count_codes('variance_status', method, shop,
+                         InventoryEngine.VARIANCE_STATUSES, counts)
+
+
+def _delivery(metrics, method, shop, result):
+    metrics._count('delivery_status', method, shop, result['status'])
+
+
+# Methods wrapped per engine class, with the recorder for their result
+# (None = calls and latency only)
+INSTRUMENTED_METHODS = {
+    'AnomalyDetectionEngine': {
+        'should_trigger_count': _trigger_one,
+        'should_trigger_counts': _trigger_many,
+        'classify_variance': _severity_one,
+        'classify_variances': _severity_many,
+        'detect_theft_patterns': _patterns,
+        'detect_theft_patterns_fast': _patterns,
+    },
+    'QuickCountManager': {
+        'generate_prompt': None,
+        'process_count': _severity_one,
+        'process_counts': _severity_many,
+    },
+    'InventoryEngine': {
+        'calculate_expected': None,
+        'calculate_variance': _status_one,
+        'calculate_loss': None,
+        'reconcile_batch': _status_many,
+        'validate_delivery': _delivery,
+        'log_decant': None,
+    },
+}
+
+# Help text for each outcome family in the Prometheus export
+OUTCOME_HELP = {
+    'trigger': 'Count trigger decisions by type (NONE = no count)',
+    'severity': 'Variance classifications by severity',
+    'theft_pattern': 'Suspicious patterns found by detect_theft_patterns',
+    'variance_status': 'Expected vs actual comparisons by status',
+    'delivery_status': 'Supplier deliveries by validation status',
+}
+
+# Prometheus label name for each family's outcome
+OUTCOME_LABEL = {
+    'trigger': 'type',
+    'severity': 'severity',
+    'theft_pattern': 'pattern',
+    'variance_status': 'status',
+    'delivery_status': 'status',
+}
+
+# Histogram upper bounds in seconds (1µs … 2.5s)
+DEFAULT_LATENCY_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+
+# -------------------------------------------------------------------
+# DATA MODEL: _Series
+# -------------------------------------------------------------------
+# Calls, errors and latency histogram for one (method, shop) pair.
+# -------------------------------------------------------------------
+
+class _Series:
+
+    __slots__ = ('calls', 'errors', 'buckets', 'total_ns')
+
+    def __init__(self, n_buckets: int):
+        self.calls = 0
+        self.errors = 0
+        self.buckets = [0] * (n_buckets + 1)   # last slot = +Inf
+        self.total_ns = 0
+
+
+# -------------------------------------------------------------------
+# CORE: EngineMetrics
+# -------------------------------------------------------------------
+
+class EngineMetrics:
+    """Metrics registry plus the wrappers that feed it"""
+
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS,
+                 namespace: str = 'smartloss'):
+        self.namespace = namespace
+        self.latency_buckets = tuple(latency_buckets)
+
+        # Bucket bounds in ns so the hot path never converts units
+        self._bounds_ns = [int(round(b * 1e9)) for b in self.latency_buckets]
+
+        self._series: Dict[tuple, _Series] = {}   # (method, shop) -> series
+        self._outcomes: Dict[tuple, int] = {}     # (family, method, shop, label) -> n
+
+        # (target, attribute, original) for restore()
+        self._patched: List[tuple] = []
+
+        # Instrumented calls in progress (outcomes only at depth 0), and
+        # the shop the outermost call's outcomes are recorded under
+        self._depth = 0
+        self._call_shop = ''
+
+
+    # ---------------------------------------------------------------
+    # ENABLING / DISABLING
+    # ---------------------------------------------------------------
+
+    def instrument(self, target, shop_id: Optional[str] = None) -> 'EngineMetrics':
+        """
+        Start recording calls made through `target`.
+
+        `target` is an engine instance (only that object is wrapped,
+        e.g. one AnomalyDetectionEngine per shop with its shop_id) or
+        one of the engine classes (every call through the class and
+        its instances is wrapped).
+        """
+
+        cls = target if isinstance(target, type) else type(target)
+        methods = next(
+            (INSTRUMENTED_METHODS[k.__name__] for k in cls.__mro__
+             if k.__name__ in INSTRUMENTED_METHODS),
+            None
+        )
+        if methods is None:
+            raise TypeError(f'No instrumented methods for {cls.__name__}')
+
+        shop = shop_id or ''
+        for name, recorder in methods.items():
+            label = f'{cls.__name__}.{name}'
+
+            if isinstance(target, type):
+                # Wrap the raw function, keep the static/class binding
+                raw = target.__dict__.get(name)
+                if raw is None:
+                    continue
+                if isinstance(raw, (staticmethod, classmethod)):
+                    wrapped = type(raw)(self._wrap(raw.__func__, label, shop, recorder))
+                else:
+                    wrapped = self._wrap(raw, label, shop, recorder)
+                setattr(target, name, wrapped)
+                self._patched.append((target, name, raw))
+            else:
+                # Instance attribute shadows the class method
+                bound = getattr(target, name)
+                target.__dict__[name] = self._wrap(bound, label, shop, recorder)
+                self._patched.append((target, name, None))
+
+        return self
+
+    def restore(self) -> None:
+        """Put every wrapped method back (instrumentation off)."""
+        for target, name, raw in reversed(self._patched):
+            if raw is None:
+                target.__dict__.pop(name, None)
+            else:
+                setattr(target, name, raw)
+        self._patched.clear()
+
+    def __enter__(self) -> 'EngineMetrics':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.restore()
+
+    def reset(self) -> None:
+        """
+        Zero recorded values. Wrappers stay in place and keep their
+        series; calls in flight finish and are recorded normally.
+        """
+        for series in self._series.values():
+            series.calls = series.errors = series.total_ns = 0
+            series.buckets[:] = [0] * len(series.buckets)
+        self._outcomes.clear()
+
+
+    # ---------------------------------------------------------------
+    # HOT PATH
+    # ---------------------------------------------------------------
+
+    def _wrap(self, fn, method: str, shop: str, recorder):
+        series = self._series_for(method, shop)
+        bounds = self._bounds_ns
+        buckets = series.buckets
+        clock = time.perf_counter_ns
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            outer = not self._depth
+            if outer or (shop and not self._call_shop):
+                self._call_shop = shop
+            self._depth += 1
+            start = clock()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                series.errors += 1
+                raise
+            finally:
+                elapsed = clock() - start
+                self._depth -= 1
+                series.calls += 1
+                series.total_ns += elapsed
+                buckets[bisect_left(bounds, elapsed)] += 1
+            # Nested instrumented calls leave the outcome to the caller,
+            # which records it under the first shop seen in the call
+            # (a per-shop engine used inside a class-wide helper)
+            if recorder is not None and outer:
+                recorder(self, method, self._call_shop, result)
+            return result
+
+        return wrapper
+
+    def _series_for(self, method: str, shop: str) -> _Series:
+        key = (method, shop)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(len(self._bounds_ns))
+        return series
+
+    def _count(self, family: str, method: str, shop: str, label: str, n: int = 1) -> None:
+        key = (family, method, shop, label)
+        self._outcomes[key] = self._outcomes.get(key, 0) + n
+
+    def _count_codes(self, family: str, method: str, shop: str,
+                     labels, counts: np.ndarray) -> None:
+        for label, n in zip(labels, counts.tolist()):
+            if n:
+                self._count(family, method, shop, label, n)
+
+
+    # ---------------------------------------------------------------
+    # QUERIES
+    # ---------------------------------------------------------------
+
+    def calls(self, method: str, shop: str = '') -> int:
+        series = self._series.get((method, shop))
+        return series.calls if series else 0
+
+    def outcomes(self, family: str, shop: Optional[str] = None) -> Dict[str, int]:
+        """Totals per label for one family, over all methods (and shops)."""
+        totals: Dict[str, int] = {}
+        for (fam, _, s, label), n in self._outcomes.items():
+            if fam == family and (shop is None or s == shop):
+                totals[label] = totals.get(label, 0) + n
+        return totals
+
+    def latency_quantile(self, method: str, q: float, shop: str = '') -> float:
+        """
+        Latency quantile (seconds) estimated from the histogram, by
+        linear interpolation inside the bucket (as Prometheus does).
+        """
+        series = self._series.get((method, shop))
+        if not series or not series.calls:
+            return 0.0
+        rank = q * series.calls
+        cumulative = 0
+        lower = 0.0
+        for upper, count in zip(self.latency_buckets, series.buckets):
+            if count and cumulative + count >= rank:
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = upper
+        return self.latency_buckets[-1]
+
+
+    # ---------------------------------------------------------------
+    # EXPORT
+    # ---------------------------------------------------------------
+
+    def snapshot(self) -> Dict:
+        """Everything recorded so far as plain JSON-ready data."""
+
+        methods = []
+        for (method, shop), s in sorted(self._series.items()):
+            if not s.calls:
+                continue
+            methods.append({
+                'method': method,
+                'shop': shop,
+                'calls': s.calls,
+                'errors': s.errors,
+                'latency_sum_s': s.total_ns / 1e9,
+                'latency_mean_us': round(s.total_ns / s.calls / 1e3, 3),
+                'latency_p50_us': round(self.latency_quantile(method, 0.5, shop) * 1e6, 3),
+                'latency_p99_us': round(self.latency_quantile(method, 0.99, shop) * 1e6, 3),
+                'latency_buckets': list(s.buckets),
+            })
+
+        outcomes: Dict[str, List[Dict]] = {}
+        for (family, method, shop, label), n in sorted(self._outcomes.items()):
+            outcomes.setdefault(family, []).append(
+                {'method': method, 'shop': shop, 'label': label, 'count': n}
+            )
+
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'latency_buckets_s': list(self.latency_buckets),
+            'methods': methods,
+            'outcomes': outcomes,
+        }
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+
+        ns = self.namespace
+        lines = []
+
+        def labels(**kv) -> str:
+            body = ','.join(
+                f'{k}="{_escape(v)}"' for k, v in kv.items() if v != ''
+            )
+            return '{' + body + '}' if body else ''
+
+        series = [(k, s) for k, s in sorted(self._series.items()) if s.calls]
+
+        lines.append(f'# HELP {ns}_engine_calls_total Engine method calls')
+        lines.append(f'# TYPE {ns}_engine_calls_total counter')
+        for (method, shop), s in series:
+            lines.append(f'{ns}_engine_calls_total{labels(method=method, shop=shop)} {s.calls}')
+
+        lines.append(f'# HELP {ns}_engine_errors_total Engine method calls that raised')
+        lines.append(f'# TYPE {ns}_engine_errors_total counter')
+        for (method, shop), s in series:
+            lines.append(f'{ns}_engine_errors_total{labels(method=method, shop=shop)} {s.errors}')
+
+        name = f'{ns}_engine_latency_seconds'
+        lines.append(f'# HELP {name} Engine method latency')
+        lines.append(f'# TYPE {name} histogram')
+        for (method, shop), s in series:
+            cumulative = 0
+            for bound, count in zip(self.latency_buckets, s.buckets):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{labels(method=method, shop=shop, le=_fmt(bound))} {cumulative}'
+                )
+            lines.append(f'{name}_bucket{labels(method=method, shop=shop, le="+Inf")} {s.calls}')
+            lines.append(f'{name}_sum{labels(method=method, shop=shop)} {_fmt(s.total_ns / 1e9)}')
+            lines.append(f'{name}_count{labels(method=method, shop=shop)} {s.calls}')
+
+        families = sorted({key[0] for key in self._outcomes})
+        for family in families:
+            name = f'{ns}_{family}_total'
+            lines.append(f'# HELP {name} {OUTCOME_HELP.get(family, family)}')
+            lines.append(f'# TYPE {name} counter')
+            for (fam, method, shop, label), n in sorted(self._outcomes.items()):
+                if fam == family:
+                    key = OUTCOME_LABEL.get(family, 'label')
+                    lines.append(f'{name}{labels(method=method, shop=shop, **{key: label})} {n}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value))
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from datetime import timedelta
+    from anomaly_detection_v2 import SalesVelocityData
+
+    metrics = EngineMetrics()
+
+    # Per-shop engines, plus class-wide wrapping for the static helpers
+    engines = {shop: AnomalyDetectionEngine(seed=i)
+               for i, shop in enumerate(['SHOP_001', 'SHOP_002'])}
+    for shop, engine in engines.items():
+        metrics.instrument(engine, shop_id=shop)
+    metrics.instrument(QuickCountManager)
+    metrics.instrument(InventoryEngine)
+
+    now = datetime(2026, 2, 16, 18, 0)
+    velocity = SalesVelocityData('KINGS_5L', [2, 3, 9], 2.5,
+                                 now - timedelta(hours=5), 12)
+
+    for shop, engine in engines.items():
+        for _ in range(50):
+            engine.should_trigger_count(velocity, now, sales_since_trigger=3)
+        engine.classify_variances(np.array([0.5, -3.0, 12.0, -25.0]))
+
+    QuickCountManager.process_count(107, 106, 14.0, 'STAFF_01', now)
+    InventoryEngine.calculate_variance(135, 132)
+
+    print(metrics.to_prometheus()[:1200], '...\n')
+    print('Triggers:', metrics.outcomes('trigger'))
+    print('Severities:', metrics.outcomes('severity'))
+
+    metrics.restore()
+    assert not hasattr(QuickCountManager.process_count, '__wrapped__')
+    assert all('should_trigger_count' not in vars(e) for e in engines.values())
+    print('Restored; snapshot has',
+          len(metrics.snapshot()['methods']), 'method series')
@@ -28,15 +28,20 @@ from datetime import datetime
 # dataclass helps create simple data containers automatically
 from dataclasses import dataclass, field
 
+# NumPy powers the batch (column-at-a-time) reconciliation path
+import numpy as np
+
 
 # -------------------------------------------------------------------
 # DATA MODEL: InventoryState
 # -------------------------------------------------------------------
 # This represents the state of one product (SKU) at a given time.
 # Think of it as a a structured "record" of inventory information.
+# slots=True drops the per-instance __dict__; for millions of rows
+# see columnar_store.InventoryStateTable.
 # -------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class InventoryState:
     """Current inventory state for a single product (SKU)"""
 
@@ -74,6 +79,9 @@ class InventoryEngine:
     # Constant value: 1 carton equals 12 litres
     CARTON_CONVERSION = 12
 
+    # Status labels for the batch API, indexed by sign(variance) + 1
+    VARIANCE_STATUSES = ('SHORTAGE', 'MATCH', 'SURPLUS')
+
 
     # ---------------------------------------------------------------
     # METHOD: calculate_expected
@@ -168,6 +176,78 @@ class InventoryEngine:
         return abs(variance) * unit_price
 
 
+    # ---------------------------------------------------------------
+    # METHOD: reconcile_batch
+    # ---------------------------------------------------------------
+    # Runs expected → variance → loss for many SKUs in one pass.
+    # ---------------------------------------------------------------
+    @classmethod
+    def reconcile_batch(cls, initial_stock, cartons_received, units_sold,
+                        actual, unit_price,
+                        litres_per_carton=None) -> Dict[str, np.ndarray]:
+        """
+        Reconcile a whole column of SKUs at once.
+
+        Each argument is an array-like with one entry per SKU row.
+        The numbers are identical to calling calculate_expected,
+        calculate_variance and calculate_loss row by row, including
+        the "variance_pct = 0 when expected <= 0" guard.
+
+        Parameters:
+            initial_stock — quantity at start of day
+            cartons_received — cartons delivered during the day
+            units_sold — quantity sold during the day
+            actual — physically counted quantity
+            unit_price — price per unit (USD)
+            litres_per_carton — optional per-SKU carton size; when
+                omitted CARTON_CONVERSION is used, exactly like
+                calculate_expected
+
+        Returns:
+            Dictionary of NumPy arrays:
+            - expected, actual, variance, variance_pct, loss (float64)
+            - status (int8 code; VARIANCE_STATUSES[code] is the label)
+        """
+
+        initial_stock = np.asarray(initial_stock, dtype=np.float64)
+        cartons_received = np.asarray(cartons_received, dtype=np.float64)
+        units_sold = np.asarray(units_sold, dtype=np.float64)
+        actual = np.asarray(actual, dtype=np.float64)
+        unit_price = np.asarray(unit_price, dtype=np.float64)
+
+        if litres_per_carton is None:
+            litres_per_carton = cls.CARTON_CONVERSION
+        litres_per_carton = np.asarray(litres_per_carton, dtype=np.float64)
+
+        # Expected = Initial + (Cartons × carton size) - Units Sold
+        expected = cartons_received * litres_per_carton
+        expected += initial_stock
+        expected -= units_sold
+
+        variance = actual - expected
+
+        # Percentage only where expected > 0, zero elsewhere
+        variance_pct = np.zeros_like(variance)
+        np.divide(variance, expected, out=variance_pct, where=expected > 0)
+        variance_pct *= 100
+
+        # sign() gives -1 / 0 / +1 → SHORTAGE / MATCH / SURPLUS
+        status = np.sign(variance).astype(np.int8)
+        status += 1
+
+        loss = np.abs(variance)
+        loss *= unit_price
+
+        return {
+            'expected': expected,
+            'actual': actual,
+            'variance': variance,
+            'variance_pct': variance_pct,
+            'status': status,
+            'loss': loss
+        }
+
+
     # ---------------------------------------------------------------
     # METHOD: validate_delivery
     # ---------------------------------------------------------------
@@ -309,4 +389,25 @@ if __name__ == "__main__":
         f"Delivery: {delivery['status']}, "
         f"Discrepancy: {delivery['discrepancy']}, "
         f"Impact: ${delivery['financial_impact']:,.2f}"
-    )
\ No newline at end of file
+    )
+
+
+    # -----------------------------------------------------------
+    # TEST CASE 5: Batch reconciliation (same numbers, many SKUs)
+    # -----------------------------------------------------------
+    batch = engine.reconcile_batch(
+        initial_stock=[100, 50, 0],
+        cartons_received=[10, 0, 0],
+        units_sold=[85, 10, 0],
+        actual=[132, 40, 0],
+        unit_price=[25, 14, 3.47]
+    )
+
+    for i, code in enumerate(batch['status']):
+        print(
+            f"Batch row {i}: expected={batch['expected'][i]:.0f}, "
+            f"variance={batch['variance'][i]:.0f} "
+            f"({batch['variance_pct'][i]:.2f}%) - "
+            f"{engine.VARIANCE_STATUSES[code]}, "
+            f"loss=${batch['loss'][i]:,.2f}"
+        )
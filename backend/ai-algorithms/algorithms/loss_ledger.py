@@ -0,0 +1,455 @@
+"""
+Smart Loss Control - Fixed-Point Multi-Currency Loss Ledger
+============================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+calculate_loss, validate_delivery and QuickCountManager.process_count
+price a variance as abs(variance) * unit_price in binary floats, in
+USD. Adding millions of those up drifts by fractions of a cent, and
+shops outside Nigeria price in their own currency (shops.currency_code,
+the 004_africa_expansion countries), so every row had to be converted
+in Python before a roll-up.
+
+LossLedger keeps loss rows as columns instead:
+
+  • amount     int64, in MINOR units of the row's currency (cents,
+               kobo, ...; 0 decimals for UGX, RWF, XAF, XOF)
+  • currency   int16 code into ledger.currencies
+  • shop, sku, staff, day   int32 group keys
+
+Every amount is exact: the loss of a row is |variance| × unit_price
+computed in integers (quantity in thousandths × price in minor units)
+and rounded half away from zero to the minor unit — the cent a person
+with a calculator would write down, and the float method's answer
+rounded to the cent.
+
+totals(by=...) sums per shop / SKU / staff / day (any combination):
+  1. one grouped integer sum per (group, currency) — exact at any size
+  2. each subtotal converted ONCE against a rate snapshot, in integer
+     arithmetic (rates are NUMERIC(12,6): integer millionths), rounded
+     half away from zero to the target's minor unit
+  3. the converted subtotals summed per group
+
+A group's converted total is therefore "native subtotal per currency,
+converted, then added" — the same number whichever order rows arrive in.
+
+RateTable holds exchange_rates rows ((from_currency, to_currency, rate,
+effective_date), as in migration 004) and gives the snapshot in force
+on a date.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+import math
+
+import numpy as np
+
+
+# ISO 4217 minor-unit digits for the currencies of migration 004
+CURRENCY_EXPONENTS = {
+    'USD': 2, 'NGN': 2, 'KES': 2, 'GHS': 2, 'ZAR': 2, 'UGX': 0, 'TZS': 2,
+    'ETB': 2, 'XAF': 0, 'XOF': 0, 'RWF': 0, 'ZMW': 2, 'ZWL': 2, 'BWP': 2,
+    'MWK': 2,
+}
+
+# Quantities are priced in thousandths of a unit (litres to the ml)
+QUANTITY_DECIMALS = 3
+
+# exchange_rates.rate is NUMERIC(12,6)
+RATE_DECIMALS = 6
+
+# The rows migration 004 seeds into exchange_rates
+SEED_RATES = (
+    ('USD', 'USD', '1.000000', '2026-02-01'),
+    ('NGN', 'USD', '0.0013', '2026-02-01'),
+    ('KES', 'USD', '0.0077', '2026-02-01'),
+    ('GHS', 'USD', '0.083', '2026-02-01'),
+    ('ZAR', 'USD', '0.055', '2026-02-01'),
+)
+
+GROUP_KEYS = ('shop', 'sku', 'staff', 'day')
+
+_INT64_MAX = np.iinfo(np.int64).max
+_EXACT_FLOAT = 2 ** 53      # integer float sums below this are exact
+_DAY_US = 86_400_000_000
+
+
+# -------------------------------------------------------------------
+# FIXED-POINT HELPERS
+# -------------------------------------------------------------------
+
+def to_minor(values, decimals) -> np.ndarray:
+    """
+    Decimal amounts (floats as written, e.g. 2.675) to int64 units of
+    10**-decimals, rounded half away from zero.
+
+    `decimals` may be one number or an array (one per value). A float
+    like 2.675 is stored as 2.67499999...; the few-ulp nudge rounds it
+    the way the written number rounds.
+    """
+    scaled = np.asarray(np.multiply(values, np.power(10.0, decimals), dtype=np.float64))
+    negative = scaled < 0
+    np.abs(scaled, out=scaled)
+    scaled *= 1 + 4 * np.finfo(np.float64).eps
+    scaled += 0.5
+    np.floor(scaled, out=scaled)
+    out = scaled.astype(np.int64)
+    np.negative(out, out=out, where=negative)
+    return out
+
+
+def mul_div_round(amount, num, den) -> np.ndarray:
+    """
+    amount × num / den in integers, rounded half away from zero.
+
+    All arguments are int64 array-likes (broadcast together); den > 0.
+    The product is never formed: with q, r = divmod(|amount|, den) the
+    result is q × num + round(r × num / den), which only needs
+    r × num < 2**63. When that could overflow the rows are done in
+    Python integers instead.
+    """
+    amount = np.asarray(amount, dtype=np.int64)
+    num = np.asarray(num, dtype=np.int64)
+    den = np.asarray(den, dtype=np.int64)
+
+    magnitude = np.abs(amount)
+    if np.any((den - 1) * 1.0 * num >= _INT64_MAX):
+        magnitude, num, den = (np.asarray(a, dtype=object) for a in (magnitude, num, den))
+
+    q = magnitude // den
+    r = magnitude % den
+    r = r * num
+    r += den // 2
+    r //= den
+    q = q * num
+    q += r
+    out = np.asarray(q, dtype=np.int64)
+    np.negative(out, out=out, where=amount < 0)
+    return out
+
+
+def loss_minor(variance, unit_price, exponent=2) -> np.ndarray:
+    """
+    |variance| × unit_price as exact int64 minor units.
+
+    variance is a quantity (rounded to QUANTITY_DECIMALS), unit_price is
+    in major units of a currency with `exponent` minor digits (one
+    number or one per row). Equal to to_minor(calculate_loss(...),
+    exponent) row by row.
+    """
+    quantity = to_minor(np.abs(np.asarray(variance, dtype=np.float64)), QUANTITY_DECIMALS)
+    price = to_minor(unit_price, exponent)
+    return mul_div_round(quantity, price, 10 ** QUANTITY_DECIMALS)
+
+
+def to_decimal(amount: int, currency: str = 'USD') -> Decimal:
+    """One minor-unit amount as an exact Decimal in major units."""
+    return Decimal(int(amount)).scaleb(-CURRENCY_EXPONENTS[currency])
+
+
+def epoch_day(timestamp_us) -> np.ndarray:
+    """int64 epoch µs → int32 day numbers (days since 1970-01-01, UTC)."""
+    return (np.asarray(timestamp_us, dtype=np.int64) // _DAY_US).astype(np.int32)
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: RateTable
+# -------------------------------------------------------------------
+
+class RateTable:
+    """exchange_rates rows, with the snapshot in force on any date"""
+
+    def __init__(self, rows: Iterable = SEED_RATES):
+        # (from, to) → [(effective_date, rate in millionths)], date order
+        self._history: Dict[Tuple[str, str], List[Tuple[date, int]]] = {}
+        self.add_rows(rows)
+
+    def add_rows(self, rows: Iterable) -> None:
+        """Add (from_currency, to_currency, rate, effective_date) rows or
+        dicts with those keys; a row for an existing pair and date replaces it."""
+        for row in rows:
+            if isinstance(row, dict):
+                row = (row['from_currency'], row['to_currency'], row['rate'],
+                       row['effective_date'])
+            source, target, rate, effective = row
+            if isinstance(effective, str):
+                effective = date.fromisoformat(effective[:10])
+            # Via str() so a float rate is read as written, like NUMERIC
+            micros = int(Decimal(str(rate)).scaleb(RATE_DECIMALS)
+                         .quantize(Decimal(1), rounding=ROUND_HALF_UP))
+            if micros <= 0:
+                raise ValueError(f'rate {source}->{target} must be > 0, got {rate}')
+            history = self._history.setdefault((source, target), [])
+            history[:] = [h for h in history if h[0] != effective]
+            history.append((effective, micros))
+            history.sort()
+
+    def snapshot(self, as_of: Optional[date] = None) -> Dict[Tuple[str, str], int]:
+        """
+        {(from, to): rate in millionths} — for every pair the latest rate
+        effective on or before `as_of` (default: the latest of all).
+        """
+        if isinstance(as_of, str):
+            as_of = date.fromisoformat(as_of[:10])
+        rates = {}
+        for pair, history in self._history.items():
+            in_force = [micros for effective, micros in history
+                        if as_of is None or effective <= as_of]
+            if in_force:
+                rates[pair] = in_force[-1]
+        return rates
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: LossLedger
+# -------------------------------------------------------------------
+
+class LossLedger:
+    """Exact int64 minor-unit loss rows with vectorised group-by totals"""
+
+    COLUMNS = ('amount', 'currency') + GROUP_KEYS
+
+    def __init__(self, currencies: Sequence[str] = tuple(CURRENCY_EXPONENTS)):
+        self.currencies = list(currencies)
+        self._currency_code = {c: i for i, c in enumerate(self.currencies)}
+        self.exponents = np.array([CURRENCY_EXPONENTS[c] for c in self.currencies],
+                                  dtype=np.int64)
+        self._currency_lookup = np.full(1 << 21, -1, dtype=np.int16)
+        for code, name in enumerate(self.currencies):
+            a, b, c = (ord(ch) for ch in name)
+            self._currency_lookup[(a << 14) | (b << 7) | c] = code
+        self._chunks: List[Dict[str, np.ndarray]] = []
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return sum(len(chunk['amount']) for chunk in self._chunks)
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """All rows as one array per column (joined once per change)."""
+        if self._columns is None:
+            if not self._chunks:
+                self._columns = {name: np.zeros(0, dtype=np.int64 if name == 'amount'
+                                                else np.int16 if name == 'currency'
+                                                else np.int32)
+                                 for name in self.COLUMNS}
+            else:
+                self._columns = {name: np.concatenate([c[name] for c in self._chunks])
+                                 for name in self.COLUMNS}
+                self._chunks = [self._columns]
+        return self._columns
+
+    def currency_codes(self, currency) -> np.ndarray:
+        """ISO code(s) or ledger codes → int16 ledger codes."""
+        values = np.asarray(currency)
+        if values.dtype.kind in 'iu':
+            return values.astype(np.int16)
+        if values.ndim == 0:
+            return np.int16(self._currency_code[str(values)])
+        # Three ASCII letters pack into 21 bits: one table lookup per row
+        chars = np.ascontiguousarray(values, dtype='<U3').view(np.uint32).reshape(-1, 3)
+        if chars.size and chars.max() >= 128:
+            raise KeyError(f'unknown currency code in {np.unique(values)}')
+        packed = (chars[:, 0] << 14) | (chars[:, 1] << 7) | chars[:, 2]
+        codes = self._currency_lookup[packed]
+        if codes.size and codes.min() < 0:
+            unknown = np.unique(values.ravel()[codes < 0])
+            raise KeyError(f'currencies not in this ledger: {unknown.tolist()}')
+        return codes.reshape(values.shape)
+
+
+    # ---------------------------------------------------------------
+    # ADDING ROWS
+    # ---------------------------------------------------------------
+
+    def add(self, amount, currency, shop=0, sku=0, staff=0, day=0) -> None:
+        """Append loss rows already in minor units (scalars broadcast)."""
+        amount = np.asarray(amount, dtype=np.int64).ravel()
+        n = len(amount)
+        chunk = {'amount': amount,
+                 'currency': np.broadcast_to(self.currency_codes(currency), n).astype(np.int16)}
+        for name, value in zip(GROUP_KEYS, (shop, sku, staff, day)):
+            chunk[name] = np.broadcast_to(np.asarray(value, dtype=np.int32), n).copy()
+        self._chunks.append(chunk)
+        self._columns = None
+
+    def add_losses(self, variance, unit_price, currency, shop=0, sku=0, staff=0,
+                   day=0) -> np.ndarray:
+        """
+        Append |variance| × unit_price rows, unit_price in major units of
+        each row's currency. Returns the exact minor-unit amounts.
+        """
+        codes = self.currency_codes(currency)
+        amount = loss_minor(variance, unit_price, self.exponents[codes])
+        self.add(amount, codes, shop, sku, staff, day)
+        return amount
+
+    def add_amounts(self, amount, currency, shop=0, sku=0, staff=0, day=0) -> np.ndarray:
+        """
+        Append money already computed in major units (e.g. the
+        financial_loss / financial_impact of the scalar methods),
+        rounded to each currency's minor unit.
+        """
+        codes = self.currency_codes(currency)
+        minor = to_minor(amount, self.exponents[codes])
+        self.add(minor, codes, shop, sku, staff, day)
+        return minor
+
+
+    # ---------------------------------------------------------------
+    # TOTALS
+    # ---------------------------------------------------------------
+
+    def native_totals(self, by: Sequence[str] = ('shop',)) -> Dict[str, np.ndarray]:
+        """
+        Exact sums per group and currency, in that currency's minor
+        units: one array per `by` key plus 'currency' (codes) and
+        'amount', groups in key order.
+        """
+        columns = self.columns
+        keys = [columns[name] for name in by] + [columns['currency']]
+        groups, amount = _group_sum(keys, columns['amount'])
+        result = dict(zip(list(by) + ['currency'], groups))
+        result['amount'] = amount
+        return result
+
+    def totals(self, by: Sequence[str] = ('shop',),
+               rates: Optional[Dict[Tuple[str, str], int]] = None,
+               currency: str = 'USD') -> Dict[str, np.ndarray]:
+        """
+        Sums per group in one currency (minor units of `currency`).
+
+        Each group's subtotal in every currency is converted once with
+        `rates` (a RateTable snapshot; default the migration 004 seed
+        rates) and the converted subtotals are added. Raises KeyError
+        when a currency in the ledger has no rate to `currency`.
+        """
+        rates = RateTable().snapshot() if rates is None else rates
+        native = self.native_totals(by)
+
+        present = np.unique(native['currency'])
+        num = np.zeros(len(self.currencies), dtype=np.int64)
+        den = np.ones(len(self.currencies), dtype=np.int64)
+        target_exp = CURRENCY_EXPONENTS[currency]
+        for code in present.tolist():
+            source = self.currencies[code]
+            micros = rates.get((source, currency), 10 ** RATE_DECIMALS if source == currency else None)
+            if micros is None:
+                raise KeyError(f'no exchange rate {source}->{currency} in the snapshot')
+            # minor_t = minor_s × rate × 10**exp_t / (10**exp_s × 10**6)
+            n = micros * 10 ** target_exp
+            d = 10 ** (CURRENCY_EXPONENTS[source] + RATE_DECIMALS)
+            g = math.gcd(n, d)
+            num[code], den[code] = n // g, d // g
+
+        codes = native['currency']
+        converted = mul_div_round(native['amount'], num[codes], den[codes])
+        if not by:
+            return {'amount': np.array([converted.sum()], dtype=np.int64)}
+
+        # Native groups come in key order with currency last, so the
+        # subtotals of one group are adjacent
+        change = np.zeros(len(codes), dtype=bool)
+        change[:1] = True
+        for name in by:
+            change[1:] |= native[name][1:] != native[name][:-1]
+        starts = np.flatnonzero(change)
+        result = {name: native[name][starts] for name in by}
+        result['amount'] = (np.add.reduceat(converted, starts) if len(starts)
+                            else np.zeros(0, dtype=np.int64))
+        return result
+
+    def total(self, rates: Optional[Dict[Tuple[str, str], int]] = None,
+              currency: str = 'USD') -> int:
+        """Whole-ledger total in minor units of `currency`."""
+        return int(self.totals((), rates, currency)['amount'][0])
+
+
+# -------------------------------------------------------------------
+# GROUPED INTEGER SUM
+# -------------------------------------------------------------------
+
+def _group_sum(keys: List[np.ndarray], values: np.ndarray):
+    """
+    Exact int64 sums of `values` per distinct key tuple.
+
+    Keys are packed into one int64 (mixed radix over each key's range),
+    so groups come out in key order. A small packed range is summed with
+    a dense bincount — in float64, which is exact while every partial
+    sum stays below 2**53 (checked up front). Otherwise the packed keys
+    are sorted and each run added with np.add.reduceat, in int64.
+    """
+    n = len(values)
+    packed = np.zeros(n, dtype=np.int64)
+    lows, spans = [], []
+    for key in keys:
+        low = int(key.min()) if n else 0
+        span = int(key.max()) - low + 1 if n else 1
+        lows.append(low)
+        spans.append(span)
+    size = math.prod(spans)
+    if size >= _INT64_MAX:
+        raise OverflowError('group keys span too large to pack into int64')
+    for key, low, span in zip(keys, lows, spans):
+        packed *= span
+        packed += key
+        packed -= low
+
+    if size <= max(4 * n, 1 << 20) and int(np.abs(values).sum()) < _EXACT_FLOAT:
+        present = np.flatnonzero(np.bincount(packed, minlength=size))
+        sums = np.bincount(packed, weights=values, minlength=size)[present].astype(np.int64)
+    elif n:
+        order = np.argsort(packed)
+        packed = packed[order]
+        starts = np.flatnonzero(np.concatenate(([True], packed[1:] != packed[:-1])))
+        present = packed[starts]
+        sums = np.add.reduceat(values[order], starts)
+    else:
+        present = sums = np.zeros(0, dtype=np.int64)
+
+    # Unpack the group ids back to key columns
+    groups = []
+    for low, span, key in zip(reversed(lows), reversed(spans), reversed(keys)):
+        present, part = np.divmod(present, span)
+        groups.append((part + low).astype(key.dtype))
+    return groups[::-1], sums
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from anomaly_detection_v2 import QuickCountManager
+    from inventory_engine_v2 import InventoryEngine
+
+    # The float methods and the ledger agree to the cent
+    variance, price = 2.675, 1.0
+    print(f"calculate_loss(2.675, 1.00) = {InventoryEngine.calculate_loss(variance, price)!r}"
+          f" → ledger {loss_minor(variance, price)[()]} cents")
+
+    ledger = LossLedger()
+    count = QuickCountManager.process_count(50, 47.5, 1850.00, 'STAFF_7')
+    delivery = InventoryEngine.validate_delivery(24, 22, 9.99)
+    ledger.add_losses(count['variance'], 1850.00, 'NGN', shop=1, sku=10, staff=7, day=20500)
+    ledger.add_amounts(delivery['financial_impact'], 'USD', shop=1, sku=11, staff=0, day=20500)
+    ledger.add_losses([0.1] * 10, 0.10, 'USD', shop=2, sku=12, staff=8, day=20500)
+    ledger.add_losses(3, 1200, 'UGX', shop=3, sku=13, staff=9, day=20501)
+
+    print(f"process_count NGN loss:       {count['financial_loss']!r}")
+    print(f"validate_delivery impact:     {delivery['financial_impact']!r}")
+    print(f"10 × (0.1 × $0.10), floats:   {sum([abs(0.1) * 0.10] * 10)!r}")
+
+    rates = RateTable(SEED_RATES + (('UGX', 'USD', '0.000270', '2026-02-01'),)).snapshot()
+    native = ledger.native_totals(('shop',))
+    for shop, code, amount in zip(native['shop'], native['currency'], native['amount']):
+        name = ledger.currencies[code]
+        print(f"  shop {shop}: {to_decimal(amount, name)} {name}")
+    usd = ledger.totals(('shop',), rates)
+    print("USD per shop:", {int(s): str(to_decimal(a)) for s, a in zip(usd['shop'], usd['amount'])})
+    print(f"Ledger total: ${to_decimal(ledger.total(rates))}")
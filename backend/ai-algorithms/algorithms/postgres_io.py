@@ -0,0 +1,649 @@
+"""
+Smart Loss Control - Bulk Postgres I/O
+=======================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Reads the backend's tables (migrations/001_init.sql) straight into the
+engines' batch inputs, and writes their results back, without a query
+or an INSERT per row.
+
+  reads (one COPY each, streamed in batches of NumPy columns)
+    • read_transactions()      → timestamp / shop / sku / staff / type /
+                                 quantity / unit_price / offline, the
+                                 workload_generator column layout
+    • read_inventory()         → starting stock and prices per SKU row
+    • read_restocks(), read_decants(), read_velocity_metrics()
+  writes (COPY into a temp table, then one INSERT … SELECT)
+    • write_alerts()           → alerts
+    • write_suspicious_activities() → suspicious_activities
+    • upsert_velocity_metrics() → sales_velocity_metrics (ON CONFLICT
+                                 on shop, SKU, window, period_start)
+
+HOW:
+  • Connections come from a psycopg_pool.ConnectionPool (DATABASE_URL
+    by default, like src/config/db.js); each call borrows one and
+    commits on success.
+  • COPY … (FORMAT BINARY) with fixed-width, non-NULL columns (NULLs are
+    COALESCEd in the SELECT) gives rows of one size, so a whole block
+    is parsed with one np.frombuffer into a structured array — no
+    Python object per row, either way.
+  • UUIDs become int codes (KeyTable): shops, staff, and SKU ROWS —
+    one per (shop_id, sku_id), as the engines keep stock per shop and
+    product. The same tables turn codes back into UUIDs for writes.
+  • Money is written exactly: amounts go over as int64 cents
+    (loss_ledger.to_minor) and are divided in NUMERIC.
+
+ROW-LEVEL SECURITY:
+Pass shop_id to scope a call to one shop. It is set with
+set_config(..., true), i.e. for that transaction only: the backend's
+set_current_shop() sets it for the session, which would leak to the
+next borrower of a pooled connection. Fleet-wide calls need a role
+with BYPASSRLS.
+
+REQUIRES:
+psycopg 3 with its pool (pip install "psycopg[binary,pool]"); the rest
+of the engines do not need it. benchmarks/bench_postgres_io.py runs
+against a local Postgres.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import uuid
+
+import numpy as np
+
+# Optional: only needed to talk to Postgres
+try:
+    import psycopg
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    psycopg = None
+    ConnectionPool = None
+
+from anomaly_detection_v2 import to_epoch_us
+from event_replay import EVENT_TYPES
+from loss_ledger import to_minor
+
+
+TYPE_CODE = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+# transactions.type → EVENT_TYPES
+DB_EVENT_TYPES = {'SALE': 'sale', 'RESTOCK': 'restock', 'DECANT': 'decant',
+                  'AUDIT': 'quick_count'}
+
+TIME_WINDOWS = ('HOURLY', 'DAILY', 'WEEKLY')
+
+# Postgres timestamps count µs from 2000-01-01
+_PG_EPOCH_US = 946_684_800_000_000
+
+_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+_TRAILER = b'\xff\xff'
+_NIL_UUID = bytes(16)
+
+# Binary COPY wire format and SQL type of each column kind
+_WIRE = {'uuid': 'V16', 'int2': '>i2', 'int4': '>i4', 'int8': '>i8',
+         'float8': '>f8', 'bool': '?', 'timestamp': '>i8'}
+_SQL = {'uuid': 'uuid', 'int2': 'smallint', 'int4': 'integer', 'int8': 'bigint',
+        'float8': 'double precision', 'bool': 'boolean', 'timestamp': 'timestamp'}
+
+_WRITE_BATCH = 200_000
+
+
+def _require_psycopg() -> None:
+    if psycopg is None:
+        raise ImportError('postgres_io needs psycopg 3: pip install "psycopg[binary,pool]"')
+
+
+# -------------------------------------------------------------------
+# KEY TABLES (UUID ↔ int code)
+# -------------------------------------------------------------------
+
+class KeyTable:
+    """Dense int codes for keys seen so far, in first-seen order."""
+
+    def __init__(self):
+        self._codes: Dict = {}
+        self._keys: List = []
+        self._array: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def codes(self, values: np.ndarray) -> np.ndarray:
+        """
+        Codes for an array of keys (16-byte UUIDs or int64), adding new
+        ones. The nil UUID maps to -1 (a COALESCEd NULL).
+        """
+        values = np.ascontiguousarray(values)
+        if values.size == 0:
+            return np.empty(0, dtype=np.int32)
+        if values.dtype.kind == 'V':
+            # Dedupe on the first 8 bytes, then check the other 8
+            halves = values.view('>u8').reshape(-1, 2)
+            _, first, inverse = np.unique(halves[:, 0], return_index=True,
+                                          return_inverse=True)
+            if not np.array_equal(halves[first[inverse], 1], halves[:, 1]):
+                _, first, inverse = np.unique(values, return_index=True,
+                                              return_inverse=True)
+            unique = [bytes(v) for v in values[first]]
+            nil = _NIL_UUID
+        else:
+            unique, inverse = np.unique(values, return_inverse=True)
+            unique = unique.tolist()
+            nil = None
+
+        known = self._codes
+        mapped = np.empty(len(unique), dtype=np.int32)
+        for i, key in enumerate(unique):
+            code = known.get(key)
+            if code is None:
+                if key == nil:
+                    mapped[i] = -1
+                    continue
+                code = known[key] = len(self._keys)
+                self._keys.append(key)
+                self._array = None
+            mapped[i] = code
+        return mapped[inverse.reshape(-1)]
+
+    def add(self, keys: Iterable) -> np.ndarray:
+        """Codes for UUID strings (or uuid.UUID / int keys), adding new ones."""
+        keys = list(keys)
+        if keys and not isinstance(keys[0], (int, np.integer)):
+            raw = b''.join(uuid.UUID(str(k)).bytes for k in keys)
+            return self.codes(np.frombuffer(raw, dtype='V16'))
+        return self.codes(np.asarray(keys, dtype=np.int64))
+
+    @property
+    def keys(self) -> np.ndarray:
+        """Key of every code (V16 for UUIDs, int64 otherwise)."""
+        if self._array is None or len(self._array) != len(self._keys):
+            if self._keys and isinstance(self._keys[0], bytes):
+                self._array = np.frombuffer(b''.join(self._keys), dtype='V16')
+            else:
+                self._array = np.asarray(self._keys, dtype=np.int64)
+        return self._array
+
+    @property
+    def ids(self) -> List[str]:
+        """UUID strings in code order."""
+        return [str(uuid.UUID(bytes=k)) for k in self._keys]
+
+
+# -------------------------------------------------------------------
+# BINARY COPY ROWS
+# -------------------------------------------------------------------
+
+def _row_dtype(fields: Sequence[Tuple[str, str]]) -> np.dtype:
+    """One binary COPY row: field count, then (length, value) per field."""
+    parts = [('_count', '>i2')]
+    for name, kind in fields:
+        parts += [('_len_' + name, '>i4'), (name, _WIRE[kind])]
+    return np.dtype(parts)
+
+
+def _encode_rows(fields, columns: Dict, n: int) -> bytes:
+    rows = np.empty(n, dtype=_row_dtype(fields))
+    rows['_count'] = len(fields)
+    for name, kind in fields:
+        rows['_len_' + name] = np.dtype(_WIRE[kind]).itemsize
+        value = columns[name]
+        if kind == 'timestamp':
+            value = np.asarray(value, dtype=np.int64) - _PG_EPOCH_US
+        rows[name] = value
+    return rows.tobytes()
+
+
+def _check_rows(rows: np.ndarray, fields) -> None:
+    if not (rows['_count'] == len(fields)).all():
+        raise ValueError('unexpected column count in COPY data')
+    for name, kind in fields:
+        if not (rows['_len_' + name] == np.dtype(_WIRE[kind]).itemsize).all():
+            raise ValueError(f'column {name!r} is NULL or not {kind}; COALESCE / cast it')
+
+
+def collect(batches: Iterable[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate streamed batches into one set of columns."""
+    batches = list(batches)
+    if not batches:
+        return {}
+    return {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: PostgresIO
+# -------------------------------------------------------------------
+
+class PostgresIO:
+    """Pooled bulk reads and writes for the engines"""
+
+    def __init__(self, dsn: Optional[str] = None, min_size: int = 1, max_size: int = 4,
+                 pool=None):
+        if pool is None:
+            _require_psycopg()
+            dsn = dsn or os.environ['DATABASE_URL']
+            pool = ConnectionPool(dsn, min_size=min_size, max_size=max_size, open=True)
+        self.pool = pool
+
+        # Codes shared by every read and write through this object
+        self.shops = KeyTable()
+        self.skus = KeyTable()          # skus.id (products)
+        self.staff = KeyTable()
+        self.sku_rows = KeyTable()      # (shop code << 32 | product code)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def connection(self, shop_id: Optional[str] = None):
+        """A pooled connection in one transaction (RLS-scoped if shop_id)."""
+        with self.pool.connection() as conn:
+            if shop_id is not None:
+                conn.execute("SELECT set_config('app.current_shop_id', %s, true)",
+                             (str(shop_id),))
+            yield conn
+
+
+    # ---------------------------------------------------------------
+    # SKU ROWS
+    # ---------------------------------------------------------------
+
+    @property
+    def sku_shop(self) -> np.ndarray:
+        """Shop code of every SKU row."""
+        return (self.sku_rows.keys >> 32).astype(np.int32)
+
+    @property
+    def sku_product(self) -> np.ndarray:
+        """skus.id code of every SKU row."""
+        return (self.sku_rows.keys & 0xFFFFFFFF).astype(np.int32)
+
+    def row_codes(self, shop: np.ndarray, product: np.ndarray) -> np.ndarray:
+        """SKU row codes for (shop code, product code) pairs (-1 stays -1)."""
+        shop = np.asarray(shop, dtype=np.int64)
+        product = np.asarray(product, dtype=np.int64)
+        # Only real products may register rows
+        codes = np.full(product.shape, -1, dtype=np.int32)
+        known = product >= 0
+        codes[known] = self.sku_rows.codes((shop[known] << 32) | product[known])
+        return codes
+
+    def _row_uuids(self, sku) -> Tuple[np.ndarray, np.ndarray]:
+        """(shops.id, skus.id) as 16-byte values for SKU row codes."""
+        sku = np.asarray(sku, dtype=np.intp)
+        return (self.shops.keys[self.sku_shop[sku]],
+                self.skus.keys[self.sku_product[sku]])
+
+
+    # ---------------------------------------------------------------
+    # GENERIC COPY
+    # ---------------------------------------------------------------
+
+    def copy_out(self, query: str, params=None, fields: Sequence[Tuple[str, str]] = (),
+                 batch_rows: int = 500_000, shop_id: Optional[str] = None
+                 ) -> Iterator[np.ndarray]:
+        """
+        Stream `query` through COPY … TO STDOUT (FORMAT BINARY). Its
+        columns must match `fields` ((name, kind) pairs, kinds as in
+        _WIRE) and never be NULL. Yields structured arrays of about
+        batch_rows rows, with the wire (big-endian) types.
+        """
+        dtype = _row_dtype(fields)
+        size = dtype.itemsize
+        with self.connection(shop_id) as conn, conn.cursor() as cur:
+            with cur.copy(f'COPY ({query}) TO STDOUT (FORMAT BINARY)', params) as copy:
+                buf = bytearray()
+                header = True
+                for block in copy:
+                    buf += block
+                    if header:
+                        if len(buf) < 19:
+                            continue
+                        if bytes(buf[:11]) != _SIGNATURE:
+                            raise ValueError('not a binary COPY stream')
+                        del buf[:19 + int.from_bytes(buf[15:19], 'big')]
+                        header = False
+                    n = len(buf) // size
+                    if n >= batch_rows:
+                        rows = np.frombuffer(bytes(buf[:n * size]), dtype=dtype)
+                        del buf[:n * size]
+                        _check_rows(rows, fields)
+                        yield rows
+
+                if header or bytes(buf[-2:]) != _TRAILER or (len(buf) - 2) % size:
+                    raise ValueError('truncated COPY stream')
+                rows = np.frombuffer(bytes(buf[:-2]), dtype=dtype)
+                _check_rows(rows, fields)
+                if rows.size:
+                    yield rows
+
+    def copy_in(self, table: str, fields: Sequence[Tuple[str, str]], columns: Dict,
+                conn=None) -> int:
+        """
+        COPY NumPy columns into `table` (FORMAT BINARY). uuid columns
+        are 16-byte values (e.g. KeyTable.keys[codes]); timestamps are
+        epoch µs. Returns the number of rows.
+        """
+        if conn is None:
+            with self.connection() as conn:
+                return self.copy_in(table, fields, columns, conn)
+
+        n = len(columns[fields[0][0]])
+        names = ', '.join(name for name, _ in fields)
+        with conn.cursor() as cur, cur.copy(f'COPY {table} ({names}) FROM STDIN (FORMAT BINARY)') as copy:
+            copy.write(_SIGNATURE + bytes(8))
+            for start in range(0, n, _WRITE_BATCH):
+                part = {name: np.asarray(columns[name])[start:start + _WRITE_BATCH]
+                        for name, _ in fields}
+                copy.write(_encode_rows(fields, part, min(_WRITE_BATCH, n - start)))
+            copy.write(_TRAILER)
+        return n
+
+    def _stage(self, conn, fields, columns: Dict) -> int:
+        """COPY columns into a temp table `_stage`, dropped at commit."""
+        conn.execute('CREATE TEMP TABLE _stage ('
+                     + ', '.join(f'{name} {_SQL[kind]}' for name, kind in fields)
+                     + ') ON COMMIT DROP')
+        return self.copy_in('_stage', fields, columns, conn)
+
+    def _decode(self, rows: np.ndarray, fields) -> Dict[str, np.ndarray]:
+        """Wire columns → native ones; shop / staff UUIDs → codes, other UUIDs → SKU rows."""
+        out = {}
+        for name, kind in fields:
+            value = rows[name]
+            if kind == 'timestamp':
+                out[name] = value.astype(np.int64) + _PG_EPOCH_US
+            elif kind == 'uuid':
+                out[name] = value
+            else:
+                out[name] = value.astype(value.dtype.newbyteorder('='))
+
+        shop = self.shops.codes(out['shop']) if 'shop' in out else None
+        for name, kind in fields:
+            if kind != 'uuid' or name == 'shop':
+                continue
+            if name == 'staff':
+                out[name] = self.staff.codes(out[name])
+            else:
+                out[name] = self.row_codes(shop, self.skus.codes(out[name]))
+        if shop is not None:
+            out['shop'] = shop
+        return out
+
+    def _stream(self, query, params, fields, batch_rows, shop_id):
+        for rows in self.copy_out(query, params, fields, batch_rows, shop_id):
+            yield self._decode(rows, fields)
+
+
+    # ---------------------------------------------------------------
+    # READS
+    # ---------------------------------------------------------------
+
+    @staticmethod
+    def _where(column: str, since, until, extra: Sequence[str] = ()):
+        clauses, params = list(extra), []
+        if since is not None:
+            clauses.append(f'{column} >= %s')
+            params.append(since)
+        if until is not None:
+            clauses.append(f'{column} < %s')
+            params.append(until)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def read_transactions(self, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None,
+                          types: Optional[Sequence[str]] = None,
+                          shop_id: Optional[str] = None,
+                          batch_rows: int = 500_000) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        transactions (occurred_at in [since, until)) as event columns:
+        timestamp (epoch µs), shop, sku (SKU row), staff (-1 = none),
+        type (EVENT_TYPES code), quantity (units sold for sales, which
+        the backend stores negative; the signed stock change otherwise),
+        unit_price (the row's inventory selling_price, 0 if none),
+        offline. Table order.
+
+        Prices come from one inventory snapshot taken first and looked up
+        by SKU row here; joining inventory on the server costs more than
+        the rest of the query on a large table.
+        """
+        price_fields = (('shop', 'uuid'), ('sku', 'uuid'), ('price', 'float8'))
+        prices = collect(self._stream('SELECT shop_id, sku_id, selling_price::float8 FROM inventory',
+                                      None, price_fields, 1 << 30, shop_id))
+        price = np.zeros(max(len(self.sku_rows), 1))
+        if prices:
+            price[prices['sku']] = prices['price']
+
+        case = ' '.join(f"WHEN '{db}' THEN {TYPE_CODE[name]}"
+                        for db, name in DB_EVENT_TYPES.items())
+        extra = ['t.type = ANY(%s)'] if types else []
+        where, params = self._where('t.occurred_at', since, until, extra)
+        if types:
+            params.insert(0, list(types))
+        query = f"""
+            SELECT t.occurred_at, t.shop_id,
+                   COALESCE(t.sku_id, '{uuid.UUID(int=0)}'),
+                   COALESCE(t.user_id, '{uuid.UUID(int=0)}'),
+                   (CASE t.type {case} END)::int2,
+                   CASE t.type WHEN 'SALE' THEN -t.quantity ELSE t.quantity END,
+                   t.is_offline
+            FROM transactions t{where}"""
+        fields = (('timestamp', 'timestamp'), ('shop', 'uuid'), ('sku', 'uuid'),
+                  ('staff', 'uuid'), ('type', 'int2'), ('quantity', 'int4'),
+                  ('offline', 'bool'))
+
+        for c in self._stream(query, params, fields, batch_rows, shop_id):
+            known = (c['sku'] >= 0) & (c['sku'] < price.size)
+            yield {
+                'timestamp': c['timestamp'], 'shop': c['shop'], 'sku': c['sku'],
+                'staff': c['staff'], 'type': c['type'].astype(np.int8),
+                'quantity': c['quantity'].astype(np.float64),
+                'unit_price': np.where(known, price[np.where(known, c['sku'], 0)], 0.0),
+                'offline': c['offline'],
+            }
+
+    def read_inventory(self, shop_id: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        inventory as one set of columns: shop, sku (SKU row), quantity,
+        cost_price, selling_price, reorder_level, last_count_at
+        (epoch µs, 0 if never counted).
+        """
+        query = """
+            SELECT shop_id, sku_id, quantity, cost_price::float8, selling_price::float8,
+                   reorder_level, COALESCE(last_count_at, 'epoch')
+            FROM inventory"""
+        fields = (('shop', 'uuid'), ('sku', 'uuid'), ('quantity', 'int4'),
+                  ('cost_price', 'float8'), ('selling_price', 'float8'),
+                  ('reorder_level', 'int4'), ('last_count_at', 'timestamp'))
+        return collect(self._stream(query, None, fields, 1 << 30, shop_id))
+
+    def read_restocks(self, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None, shop_id: Optional[str] = None,
+                      batch_rows: int = 500_000) -> Iterator[Dict[str, np.ndarray]]:
+        """restocks: timestamp, shop, sku, staff, ordered_qty, received_qty, prices."""
+        where, params = self._where('created_at', since, until)
+        query = f"""
+            SELECT created_at, shop_id, sku_id, COALESCE(user_id, '{uuid.UUID(int=0)}'),
+                   ordered_qty, received_qty, cost_price::float8, selling_price::float8
+            FROM restocks{where}"""
+        fields = (('timestamp', 'timestamp'), ('shop', 'uuid'), ('sku', 'uuid'),
+                  ('staff', 'uuid'), ('ordered_qty', 'int4'), ('received_qty', 'int4'),
+                  ('cost_price', 'float8'), ('selling_price', 'float8'))
+        return self._stream(query, params, fields, batch_rows, shop_id)
+
+    def read_decants(self, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, shop_id: Optional[str] = None,
+                     batch_rows: int = 500_000) -> Iterator[Dict[str, np.ndarray]]:
+        """decants: timestamp, shop, carton_sku, unit_sku (SKU rows), staff, counts."""
+        where, params = self._where('created_at', since, until)
+        query = f"""
+            SELECT created_at, shop_id, carton_sku_id, unit_sku_id,
+                   COALESCE(user_id, '{uuid.UUID(int=0)}'), cartons_used, units_created
+            FROM decants{where}"""
+        fields = (('timestamp', 'timestamp'), ('shop', 'uuid'), ('carton_sku', 'uuid'),
+                  ('unit_sku', 'uuid'), ('staff', 'uuid'), ('cartons_used', 'int4'),
+                  ('units_created', 'int4'))
+        return self._stream(query, params, fields, batch_rows, shop_id)
+
+    def read_velocity_metrics(self, time_window: str = 'HOURLY',
+                              since: Optional[datetime] = None,
+                              until: Optional[datetime] = None,
+                              shop_id: Optional[str] = None,
+                              batch_rows: int = 500_000) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        sales_velocity_metrics of one window: shop, sku, period_start,
+        period_end (epoch µs), units_sold, avg_velocity (NaN if NULL).
+        """
+        if time_window not in TIME_WINDOWS:
+            raise ValueError(f'time_window must be one of {TIME_WINDOWS}')
+        where, params = self._where('period_start', since, until, ['time_window = %s'])
+        params.insert(0, time_window)
+        query = f"""
+            SELECT shop_id, sku_id, period_start, period_end, units_sold,
+                   COALESCE(avg_velocity::float8, 'NaN')
+            FROM sales_velocity_metrics{where}"""
+        fields = (('shop', 'uuid'), ('sku', 'uuid'), ('period_start', 'timestamp'),
+                  ('period_end', 'timestamp'), ('units_sold', 'int4'),
+                  ('avg_velocity', 'float8'))
+        return self._stream(query, params, fields, batch_rows, shop_id)
+
+
+    # ---------------------------------------------------------------
+    # WRITES
+    # ---------------------------------------------------------------
+
+    def write_alerts(self, sku, deviation, estimated_loss, created_at=None) -> int:
+        """
+        One alerts row per SKU row code: deviation (rounded to whole
+        units), estimated_loss (rounded half away from zero to the cent),
+        created_at (epoch µs or datetimes; default now).
+        """
+        shop_id, sku_id = self._row_uuids(sku)
+        columns = {
+            'shop_id': shop_id, 'sku_id': sku_id,
+            'deviation': np.rint(np.asarray(deviation, dtype=np.float64)),
+            'loss_cents': to_minor(estimated_loss, 2),
+        }
+        fields = [('shop_id', 'uuid'), ('sku_id', 'uuid'), ('deviation', 'int4'),
+                  ('loss_cents', 'int8')]
+        if created_at is not None:
+            columns['created_at'] = to_epoch_us(created_at)
+            fields.append(('created_at', 'timestamp'))
+
+        with self.connection() as conn:
+            self._stage(conn, fields, columns)
+            stamp = ', created_at' if created_at is not None else ''
+            cur = conn.execute(
+                f'INSERT INTO alerts (shop_id, sku_id, deviation, estimated_loss{stamp}) '
+                f'SELECT shop_id, sku_id, deviation, loss_cents::numeric / 100{stamp} FROM _stage')
+            return cur.rowcount
+
+    def write_suspicious_activities(self, records: Iterable[Dict]) -> int:
+        """
+        One row per detected pattern. Each record is a pattern dict
+        (detect_theft_patterns()['patterns'] entries) plus 'shop'
+        (code), optional 'sku' (SKU row code) and 'detected_at'
+        (datetime, default now). pattern / severity are upper-cased;
+        the other keys go to details.
+        """
+        shop_ids, sku_ids = self.shops.ids, None
+        now = datetime.now()
+        n = 0
+        with self.connection() as conn, conn.cursor() as cur:
+            with cur.copy('COPY suspicious_activities '
+                          '(shop_id, sku_id, pattern, severity, details, detected_at) '
+                          'FROM STDIN') as copy:
+                for record in records:
+                    details = {k: v for k, v in record.items()
+                               if k not in ('shop', 'sku', 'detected_at')}
+                    sku = record.get('sku')
+                    if sku is not None and sku >= 0:
+                        if sku_ids is None:
+                            sku_ids = self.skus.ids
+                        product = sku_ids[self.sku_product[sku]]
+                    else:
+                        product = None
+                    copy.write_row((shop_ids[record['shop']], product,
+                                    record['pattern'].upper(), record['severity'].upper(),
+                                    json.dumps(details), record.get('detected_at') or now))
+                    n += 1
+        return n
+
+    def upsert_velocity_metrics(self, time_window: str, sku, period_start, period_end,
+                                units_sold, avg_velocity) -> int:
+        """
+        Insert or update sales_velocity_metrics rows, keyed on (shop,
+        SKU, time_window, period_start); one row per SKU row code.
+        Periods are epoch µs (or datetimes); units_sold is rounded to
+        whole units, avg_velocity to 2 decimals. Keys must be unique
+        within one call. Unchanged rows are left alone; returns the
+        number inserted or changed.
+        """
+        if time_window not in TIME_WINDOWS:
+            raise ValueError(f'time_window must be one of {TIME_WINDOWS}')
+        shop_id, sku_id = self._row_uuids(sku)
+        columns = {
+            'shop_id': shop_id, 'sku_id': sku_id,
+            'period_start': to_epoch_us(period_start), 'period_end': to_epoch_us(period_end),
+            'units_sold': np.rint(np.asarray(units_sold, dtype=np.float64)),
+            'avg_velocity': np.asarray(avg_velocity, dtype=np.float64),
+        }
+        fields = (('shop_id', 'uuid'), ('sku_id', 'uuid'), ('period_start', 'timestamp'),
+                  ('period_end', 'timestamp'), ('units_sold', 'int4'),
+                  ('avg_velocity', 'float8'))
+
+        with self.connection() as conn:
+            self._stage(conn, fields, columns)
+            cur = conn.execute("""
+                INSERT INTO sales_velocity_metrics
+                    (shop_id, sku_id, time_window, period_start, period_end,
+                     units_sold, avg_velocity)
+                SELECT shop_id, sku_id, %s, period_start, period_end, units_sold,
+                       round(avg_velocity::numeric, 2)
+                FROM _stage
+                ON CONFLICT (shop_id, sku_id, time_window, period_start) DO UPDATE
+                SET period_end = EXCLUDED.period_end,
+                    units_sold = EXCLUDED.units_sold,
+                    avg_velocity = EXCLUDED.avg_velocity
+                WHERE (sales_velocity_metrics.period_end, sales_velocity_metrics.units_sold,
+                       sales_velocity_metrics.avg_velocity)
+                      IS DISTINCT FROM (EXCLUDED.period_end, EXCLUDED.units_sold,
+                                        EXCLUDED.avg_velocity)""", (time_window,))
+            return cur.rowcount
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    # Needs a database with the backend's migrations applied:
+    #   DATABASE_URL=postgresql://... python algorithms/postgres_io.py
+    if psycopg is None or 'DATABASE_URL' not in os.environ:
+        print('Set DATABASE_URL (and install "psycopg[binary,pool]") to run this demo.')
+        raise SystemExit(0)
+
+    with PostgresIO() as io:
+        inventory = io.read_inventory()
+        print(f"Inventory: {len(inventory.get('sku', ())):,} SKU rows in {len(io.shops):,} shops")
+
+        events = 0
+        for batch in io.read_transactions():
+            events += len(batch['timestamp'])
+        print(f"Transactions: {events:,} events, {len(io.sku_rows):,} SKU rows seen")
+
+        hourly = collect(io.read_velocity_metrics('HOURLY'))
+        print(f"Hourly velocity rows: {len(hourly.get('sku', ())):,}")
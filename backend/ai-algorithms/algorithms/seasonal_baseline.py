@@ -0,0 +1,298 @@
+"""
+Smart Loss Control - Seasonal Sales Baselines (EWMA per Hour of Day)
+=====================================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Keeps a "normal sales for this hour of the day" baseline for every
+SKU in the fleet, so the volume-spike check compares 8am with past
+8ams instead of with a flat 7-day average that every morning rush
+exceeds.
+
+For each SKU and each of the 24 hours of the day it keeps an
+exponentially weighted mean and variance of the units sold in that
+hour (Welford-style update, weight `alpha` on the newest day):
+
+    delta = x - mean
+    mean += alpha × delta
+    var   = (1 - alpha) × (var + alpha × delta²)
+
+• Recording a sale is O(1): it only adds to the SKU's open hour.
+• When an hour closes, its total is folded into that hour's
+  bucket. Hours with no sales fold in as zeros in closed form
+  (no loop over the quiet hours).
+• All state is a few NumPy arrays (SKUs × 24), so a whole fleet
+  lives in memory and is updated without per-SKU database reads.
+
+The engine uses it through `velocity(row, ...)` views (attribute
+`hour_baseline`) or `trigger_inputs()` for should_trigger_counts.
+"""
+
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+
+import numpy as np
+
+from velocity_tracker import hour_index
+
+
+HOURS_PER_DAY = 24
+
+
+# -------------------------------------------------------------------
+# CORE TABLE: SeasonalBaseline
+# -------------------------------------------------------------------
+
+class SeasonalBaseline:
+    """EWMA mean / variance of hourly units, per SKU × hour of day"""
+
+    def __init__(self, n_skus: int, alpha: float = 0.1,
+                 min_observations: int = 7):
+        self.alpha = alpha
+
+        # A bucket is trusted after this many days of observations
+        self.min_observations = min_observations
+
+        self.mean = np.zeros((n_skus, HOURS_PER_DAY))
+        self.var = np.zeros((n_skus, HOURS_PER_DAY))
+        self.n_obs = np.zeros((n_skus, HOURS_PER_DAY), dtype=np.int32)
+
+        # The hour currently being filled (absolute hour, -1 = none)
+        self.open_hour = np.full(n_skus, -1, dtype=np.int64)
+        self.open_sales = np.zeros(n_skus)
+
+    def __len__(self) -> int:
+        return len(self.open_hour)
+
+
+    # ---------------------------------------------------------------
+    # STREAMING UPDATES
+    # ---------------------------------------------------------------
+
+    def record_sale(self, row: int, timestamp: datetime, quantity: float = 1) -> bool:
+        """
+        Add a sale for SKU `row`. O(1) unless it opens a new hour, in
+        which case the previous hour is folded in (O(24) at most).
+
+        Returns:
+            False for a late sale whose hour is already folded in
+            (the baseline is not rewound; offline bursts are small
+            next to a day's worth of history)
+        """
+        hour = hour_index(timestamp)
+        current = self.open_hour[row]
+
+        if hour > current:
+            self._close(np.array([row]), hour)
+        elif hour < current:
+            return False
+
+        self.open_sales[row] += quantity
+        return True
+
+    def advance(self, now: datetime, rows=None) -> None:
+        """
+        Close every open hour older than `now`'s hour (all SKUs, or
+        just `rows`). Call once per hour on a fleet-wide tick so
+        quiet SKUs fold in their zero hours too.
+        """
+        hour = hour_index(now)
+        rows = np.arange(len(self)) if rows is None else np.atleast_1d(rows)
+        self._close(rows[self.open_hour[rows] < hour], hour)
+
+    def _close(self, rows: np.ndarray, hour: int) -> None:
+        """Fold rows' open hours, then the empty hours up to `hour`."""
+
+        opened = rows[self.open_hour[rows] >= 0]
+        if opened.size:
+            last = self.open_hour[opened]
+            self._fold(opened, last % HOURS_PER_DAY, self.open_sales[opened])
+
+            # Hours strictly between the open hour and `hour` had no
+            # sales: bucket b gets m[b] zero observations
+            gap = hour - last - 1
+            offset = (np.arange(HOURS_PER_DAY)[None, :] - (last[:, None] + 1)) % HOURS_PER_DAY
+            zeros = gap[:, None] // HOURS_PER_DAY + (offset < gap[:, None] % HOURS_PER_DAY)
+            self._fold_zeros(opened, zeros)
+
+        self.open_hour[rows] = hour
+        self.open_sales[rows] = 0.0
+
+    def _fold(self, rows: np.ndarray, bucket: np.ndarray, x: np.ndarray) -> None:
+        """One observation per row into its bucket (vectorised)."""
+        a = self.alpha
+        mean = self.mean[rows, bucket]
+        var = self.var[rows, bucket]
+        first = self.n_obs[rows, bucket] == 0
+
+        delta = x - mean
+        new_mean = np.where(first, x, mean + a * delta)
+        new_var = np.where(first, 0.0, (1 - a) * (var + a * delta * delta))
+
+        self.mean[rows, bucket] = new_mean
+        self.var[rows, bucket] = new_var
+        self.n_obs[rows, bucket] += 1
+
+    def _fold_zeros(self, rows: np.ndarray, m: np.ndarray) -> None:
+        """
+        m[i, b] zero observations into bucket b of rows[i], in closed
+        form. With r = 1 - alpha, m zeros take (mean, var) to
+            mean × r^m,   r^m × (var + mean² × (1 - r^m))
+        """
+        if not m.any():
+            return
+        mean = self.mean[rows]
+        var = self.var[rows]
+        fresh = (self.n_obs[rows] == 0) & (m > 0)
+
+        decay = (1 - self.alpha) ** m
+        new_mean = np.where(fresh, 0.0, mean * decay)
+        new_var = np.where(fresh, 0.0, decay * (var + mean * mean * (1 - decay)))
+
+        self.mean[rows] = new_mean
+        self.var[rows] = new_var
+        self.n_obs[rows] += m.astype(np.int32)
+
+    def fit_hourly(self, hourly: np.ndarray, first_hour: int) -> None:
+        """
+        Bulk warm-up from an (SKUs × hours) matrix of units sold,
+        column 0 being absolute hour `first_hour`. One vectorised
+        fold per hour across the whole fleet.
+        """
+        rows = np.arange(len(self))
+        for k in range(hourly.shape[1]):
+            self._fold(rows, np.full(len(rows), (first_hour + k) % HOURS_PER_DAY),
+                       hourly[:, k])
+        self.open_hour[:] = first_hour + hourly.shape[1]
+        self.open_sales[:] = 0.0
+
+
+    # ---------------------------------------------------------------
+    # READS
+    # ---------------------------------------------------------------
+
+    def baseline(self, rows, hour_of_day) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (mean, std) for each row at the given hour of day. NaN where
+        the bucket has fewer than min_observations days behind it.
+        """
+        rows = np.asarray(rows)
+        hour_of_day = np.broadcast_to(np.asarray(hour_of_day), rows.shape)
+        ready = self.n_obs[rows, hour_of_day] >= self.min_observations
+        mean = np.where(ready, self.mean[rows, hour_of_day], np.nan)
+        std = np.where(ready, np.sqrt(self.var[rows, hour_of_day]), np.nan)
+        return mean, std
+
+    def daily_average(self) -> np.ndarray:
+        """Average hourly units over the 24 buckets (flat comparison)."""
+        return self.mean.mean(axis=1)
+
+    def trigger_inputs(self, now: datetime) -> Dict[str, np.ndarray]:
+        """
+        Arrays for AnomalyDetectionEngine.should_trigger_counts: open
+        hour sales plus the matching hour's baseline (NaN = not ready,
+        the engine then falls back to seven_day_average).
+        """
+        self.advance(now)
+        rows = np.arange(len(self))
+        mean, std = self.baseline(rows, hour_index(now) % HOURS_PER_DAY)
+        return {
+            'current_hour_sales': self.open_sales.copy(),
+            'seven_day_average': self.daily_average(),
+            'baseline_mean': mean,
+            'baseline_std': std,
+        }
+
+    def velocity(self, row: int, last_count_timestamp: datetime,
+                 total_sales_since_count: int = 0) -> 'BaselineVelocity':
+        """A SalesVelocityData-like view of one SKU for should_trigger_count."""
+        return BaselineVelocity(self, row, last_count_timestamp, total_sales_since_count)
+
+
+# -------------------------------------------------------------------
+# ROW VIEW: BaselineVelocity
+# -------------------------------------------------------------------
+# Same attributes the engine reads from SalesVelocityData, plus
+# hour_baseline (mean, std) for the hour being checked.
+# -------------------------------------------------------------------
+
+class BaselineVelocity:
+
+    __slots__ = ('_table', '_row', 'last_count_timestamp', 'total_sales_since_count')
+
+    def __init__(self, table: SeasonalBaseline, row: int,
+                 last_count_timestamp: datetime, total_sales_since_count: int = 0):
+        self._table = table
+        self._row = row
+        self.last_count_timestamp = last_count_timestamp
+        self.total_sales_since_count = total_sales_since_count
+
+    def advance(self, now: datetime) -> None:
+        self._table.advance(now, rows=self._row)
+
+    @property
+    def current_hour_sales(self) -> float:
+        return float(self._table.open_sales[self._row])
+
+    @property
+    def seven_day_average(self) -> float:
+        return float(self._table.mean[self._row].mean())
+
+    @property
+    def hour_baseline(self) -> Optional[Tuple[float, float]]:
+        """(mean, std) of the open hour's bucket, None until trusted."""
+        hour = self._table.open_hour[self._row]
+        if hour < 0:
+            return None
+        mean, std = self._table.baseline(self._row, hour % HOURS_PER_DAY)
+        if np.isnan(mean):
+            return None
+        return float(mean), float(std)
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from datetime import timedelta
+
+    from anomaly_detection_v2 import AnomalyDetectionEngine
+
+    start = datetime(2026, 2, 2)
+    table = SeasonalBaseline(n_skus=1)
+
+    # Two weeks of a shop with a strong 8am rush (12 units) and
+    # 2 units in other opening hours
+    for day in range(14):
+        for hour in range(6, 21):
+            units = 12 if hour == 8 else 2
+            table.record_sale(0, start + timedelta(days=day, hours=hour), units)
+
+    velocity = table.velocity(0, last_count_timestamp=start + timedelta(days=14))
+    quiet = {'random_probability': 0.0, 'time_threshold_hours': 1e9}
+    multiplier = AnomalyDetectionEngine(quiet)
+    zscore = AnomalyDetectionEngine({**quiet, 'volume_test': 'zscore'})
+
+    for hour, units in ((8, 12), (9, 30), (15, 3), (16, 7)):
+        now = start + timedelta(days=14, hours=hour)
+        table.advance(now)
+        table.record_sale(0, now, units)
+        mean, std = velocity.hour_baseline
+        flat = velocity.seven_day_average
+        print(f"{hour:02d}:00 sold {units:>2}: flat 2× avg ({flat:.1f}) "
+              f"{'SPIKE' if units > 2 * flat else 'ok':>5} | hour 2× mean ({mean:.1f}) "
+              f"{'SPIKE' if multiplier.should_trigger_count(velocity, now)['should_trigger'] else 'ok':>5}"
+              f" | hour z-score "
+              f"{'SPIKE' if zscore.should_trigger_count(velocity, now)['should_trigger'] else 'ok':>5}")
+
+    # Batch path: NaN baselines (not yet trusted) keep the flat test
+    inputs = table.trigger_inputs(start + timedelta(days=14, hours=16, minutes=30))
+    decisions = zscore.should_trigger_counts(
+        inputs['current_hour_sales'], inputs['seven_day_average'],
+        [start + timedelta(days=14)], start + timedelta(days=14, hours=16, minutes=30),
+        baseline_mean=inputs['baseline_mean'], baseline_std=inputs['baseline_std'])
+    print(f"\nBatch at 16:30: {AnomalyDetectionEngine.TRIGGER_TYPES[decisions['type'][0]]}")
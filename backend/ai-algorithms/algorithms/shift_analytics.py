@@ -0,0 +1,306 @@
+"""
+Smart Loss Control - Per-Staff / Per-Shift Pattern Analytics
+=============================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Runs the theft-pattern checks (end-of-shift spike, extended gap) for
+EVERY staff member × shift of a transaction table at once, instead of
+filtering a sales_log per shift and calling detect_theft_patterns
+thousands of times.
+
+• ShiftIndex sorts the table's sales once by (staff, timestamp) and
+  once by (sku, timestamp). Each staff member's (or SKU's) sales are
+  then one contiguous, time-ordered slice, found by binary search.
+• A shift is one staff member's sales on one calendar day (days can
+  start at another hour, e.g. 04:00 for late shops). It ends at the
+  last sale unless scheduled ends are given.
+• shift_patterns() finds every shift's window count with one
+  searchsorted over a composite (shift, time) key and every shift's
+  largest gap with one maximum.reduceat — no Python loop per shift.
+• staff_risk() rolls shifts up into a per-staff risk score.
+
+Each shift's result is exactly what detect_theft_patterns returns for
+that shift's sales (in time order) and shift end.
+
+Works on workload_generator.Workload or TransactionArchive columns.
+"""
+
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, datetime_to_epoch_us
+from event_replay import EVENT_TYPES
+
+
+_SALE = EVENT_TYPES.index('sale')
+_DAY_US = 86_400_000_000
+_MINUTE_US = 60_000_000
+
+# How much each pattern adds to a staff member's risk score
+RISK_WEIGHTS = {'high': 3.0, 'medium': 1.0}
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: ShiftIndex
+# -------------------------------------------------------------------
+
+class ShiftIndex:
+    """Sales sorted by (staff, time) and (sku, time), plus shift groups"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], staff_ids: List[str],
+                 sku_ids: List[str], day_start_hour: int = 0):
+        self.staff_ids = staff_ids
+        self.sku_ids = sku_ids
+        self._staff_code = {s: i for i, s in enumerate(staff_ids)}
+        self._sku_code = {s: i for i, s in enumerate(sku_ids)}
+
+        sales = np.flatnonzero(columns['type'] == _SALE)
+        times = np.asarray(columns['timestamp'])[sales]
+        staff = np.asarray(columns['staff'])[sales].astype(np.int64)
+        sku = np.asarray(columns['sku'])[sales].astype(np.int64)
+
+        # (staff, time) order; stable so equal times keep log order
+        order = np.lexsort((times, staff))
+        self.rows = sales[order]                 # table rows, staff order
+        self.times = times[order]
+        self.staff = staff[order]
+        self.staff_offsets = _offsets(self.staff, len(staff_ids))
+
+        # (sku, time) order
+        order = np.lexsort((times, sku))
+        self.sku_rows = sales[order]
+        self.sku_times = times[order]
+        self.sku_offsets = _offsets(sku[order], len(sku_ids))
+
+        # Shifts: contiguous runs of one staff member on one day
+        self.day_start_us = day_start_hour * 3_600_000_000
+        day = (self.times - self.day_start_us) // _DAY_US
+        new_shift = np.r_[True, (self.staff[1:] != self.staff[:-1]) | (day[1:] != day[:-1])]
+        self.shift_starts = np.flatnonzero(new_shift)
+        self.shift_sizes = np.diff(np.r_[self.shift_starts, self.times.size])
+        self.shift_staff = self.staff[self.shift_starts]
+        self.shift_day = day[self.shift_starts]
+
+    @classmethod
+    def from_workload(cls, workload, day_start_hour: int = 0) -> 'ShiftIndex':
+        return cls(workload.columns, workload.staff_ids, workload.sku_ids, day_start_hour)
+
+    @classmethod
+    def from_archive(cls, archive, day_start_hour: int = 0) -> 'ShiftIndex':
+        return cls(archive.columns, archive.staff_ids, archive.sku_ids, day_start_hour)
+
+    def __len__(self) -> int:
+        """Number of shifts."""
+        return self.shift_starts.size
+
+
+    # ---------------------------------------------------------------
+    # POINT QUERIES (binary search inside one group)
+    # ---------------------------------------------------------------
+
+    def staff_sales(self, staff_id: str, since=None, until=None) -> np.ndarray:
+        """Epoch-µs times of one staff member's sales in [since, until]."""
+        code = self._staff_code[staff_id]
+        return _window(self.times, self.staff_offsets, code, since, until)
+
+    def sku_sales(self, sku_id: str, since=None, until=None) -> np.ndarray:
+        """Epoch-µs times of one SKU's sales in [since, until]."""
+        code = self._sku_code[sku_id]
+        return _window(self.sku_times, self.sku_offsets, code, since, until)
+
+    def shift_date(self, i: int) -> date:
+        return (datetime(1970, 1, 1) + timedelta(days=int(self.shift_day[i]))).date()
+
+    def shift_times(self, i: int) -> np.ndarray:
+        """Sales times of shift i (time order)."""
+        start = self.shift_starts[i]
+        return self.times[start:start + self.shift_sizes[i]]
+
+
+    # ---------------------------------------------------------------
+    # ALL SHIFTS AT ONCE
+    # ---------------------------------------------------------------
+
+    def shift_patterns(self, engine: Optional[AnomalyDetectionEngine] = None,
+                       shift_ends=None) -> Dict[str, np.ndarray]:
+        """
+        End-of-shift spike and extended gap for every shift.
+
+        `shift_ends` (epoch µs, one per shift) overrides the default
+        end of each shift, its last sale.
+
+        Returns:
+            Dictionary of arrays, one entry per shift:
+            - staff (int code into staff_ids), day (days since 1970)
+            - sales, shift_end (epoch µs)
+            - spike_count, max_gap_min (0 with fewer than two sales)
+            - end_of_shift_spike, extended_gap (bool)
+        """
+        engine = engine or AnomalyDetectionEngine()
+        config = engine.config
+        window = config['shift_window_min'] * _MINUTE_US
+
+        starts, sizes = self.shift_starts, self.shift_sizes
+        first = self.times[starts]
+        last = self.times[starts + sizes - 1]
+        ends = last if shift_ends is None else np.asarray(shift_ends, dtype=np.int64)
+
+        # -----------------------------------------------------------
+        # Window counts: one searchsorted over a (shift, time) key.
+        # Times are offset from each shift's first sale minus the
+        # window, so keys of different shifts never overlap.
+        # -----------------------------------------------------------
+
+        base = first - window
+        span = int(np.maximum(last, ends).max() - base.min()) + 1 if len(self) else 1
+        shift_of = np.repeat(np.arange(len(self), dtype=np.int64), sizes)
+        key = shift_of * span + (self.times - np.repeat(base, sizes))
+
+        rank = np.arange(len(self), dtype=np.int64) * span
+        low = rank + np.clip(ends - window - base, 0, span - 1)
+        high = rank + np.clip(ends - base, 0, span - 1)
+        spike = (np.searchsorted(key, high, side='right')
+                 - np.searchsorted(key, low, side='left'))
+        spike[ends < base] = 0
+
+        # -----------------------------------------------------------
+        # Largest gap inside each shift: one reduceat over the diffs,
+        # with the diffs that cross shift boundaries zeroed
+        # -----------------------------------------------------------
+
+        gaps = np.zeros(self.times.size + 1, dtype=np.int64)
+        gaps[:-1][:-1] = np.diff(self.times)
+        gaps[starts[1:] - 1] = 0
+        max_gap = np.maximum.reduceat(gaps, starts) if len(self) else gaps[:0]
+        max_gap_min = max_gap / 1e6 / 60
+
+        return {
+            'staff': self.shift_staff,
+            'day': self.shift_day,
+            'sales': sizes,
+            'shift_end': ends,
+            'spike_count': spike,
+            'max_gap_min': max_gap_min,
+            'end_of_shift_spike': spike >= config['suspicious_sales'],
+            'extended_gap': (sizes > 1) & (max_gap_min > config['gap_threshold_min']),
+        }
+
+    def shift_results(self, result: Dict[str, np.ndarray], rows=None,
+                      engine: Optional[AnomalyDetectionEngine] = None) -> List[Dict]:
+        """
+        detect_theft_patterns-shaped dicts (plus staff_id, shift_date
+        and shift_end) for some shifts of a shift_patterns result —
+        by default the ones with a pattern.
+        """
+        engine = engine or AnomalyDetectionEngine()
+        window_min = engine.config['shift_window_min']
+        if rows is None:
+            rows = np.flatnonzero(result['end_of_shift_spike'] | result['extended_gap'])
+
+        out = []
+        for i in np.asarray(rows).tolist():
+            patterns = []
+            if result['end_of_shift_spike'][i]:
+                patterns.append({
+                    'pattern': 'end_of_shift_spike',
+                    'severity': 'high',
+                    'description': f'{result["spike_count"][i]} sales in final {window_min} min'
+                })
+            if result['extended_gap'][i]:
+                patterns.append({
+                    'pattern': 'extended_gap',
+                    'severity': 'medium',
+                    'description': f'{result["max_gap_min"][i]:.0f} min gap between sales'
+                })
+            out.append({
+                'staff_id': self.staff_ids[result['staff'][i]],
+                'shift_date': self.shift_date(i).isoformat(),
+                'shift_end': np.datetime64(int(result['shift_end'][i]), 'us').item().isoformat(),
+                **AnomalyDetectionEngine.pattern_result(patterns),
+            })
+        return out
+
+    def staff_risk(self, result: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+        """
+        Per-staff roll-up of a shift_patterns result. risk_score is the
+        pattern weight (RISK_WEIGHTS) per shift worked, so staff with
+        many shifts are not penalised for volume alone.
+        """
+        n = len(self.staff_ids)
+        staff = result['staff']
+        shifts = np.bincount(staff, minlength=n)
+        spikes = np.bincount(staff, weights=result['end_of_shift_spike'], minlength=n)
+        gaps = np.bincount(staff, weights=result['extended_gap'], minlength=n)
+        score = (RISK_WEIGHTS['high'] * spikes + RISK_WEIGHTS['medium'] * gaps)
+        score = np.divide(score, shifts, out=np.zeros(n), where=shifts > 0)
+
+        return {
+            self.staff_ids[s]: {
+                'shifts': int(shifts[s]),
+                'spike_shifts': int(spikes[s]),
+                'gap_shifts': int(gaps[s]),
+                'risk_score': round(float(score[s]), 4),
+                'risk_level': ('high' if spikes[s] else 'medium' if gaps[s] else 'low'),
+            }
+            for s in np.flatnonzero(shifts).tolist()
+        }
+
+
+# -------------------------------------------------------------------
+# HELPERS
+# -------------------------------------------------------------------
+
+def _offsets(codes: np.ndarray, n: int) -> np.ndarray:
+    """Start of each code's run in an array sorted by code (n + 1 entries)."""
+    return np.r_[0, np.cumsum(np.bincount(codes, minlength=n))]
+
+
+def _window(times: np.ndarray, offsets: np.ndarray, code: int, since, until) -> np.ndarray:
+    group = times[offsets[code]:offsets[code + 1]]
+    lo = 0 if since is None else np.searchsorted(group, _as_us(since), side='left')
+    hi = group.size if until is None else np.searchsorted(group, _as_us(until), side='right')
+    return group[lo:hi]
+
+
+def _as_us(value) -> int:
+    return datetime_to_epoch_us(value) if isinstance(value, datetime) else int(value)
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from workload_generator import generate_workload
+
+    workload = generate_workload(shops=20, skus_per_shop=10, days=7, mean_daily_sales=12)
+    index = ShiftIndex.from_workload(workload)
+    engine = AnomalyDetectionEngine()
+    result = index.shift_patterns(engine)
+
+    print(f"{len(index):,} staff shifts from {index.times.size:,} sales")
+    flagged = index.shift_results(result)
+    for record in flagged[:3]:
+        print(f"  {record['staff_id']} {record['shift_date']}: {record['risk_level']} - "
+              f"{[p['description'] for p in record['patterns']]}")
+
+    # Same answer as one detect_theft_patterns call per shift
+    mismatches = 0
+    for i in range(len(index)):
+        log = [{'timestamp': t.isoformat()}
+               for t in index.shift_times(i).astype('datetime64[us]').astype(datetime)]
+        expected = engine.detect_theft_patterns(
+            log, np.datetime64(int(result['shift_end'][i]), 'us').item())
+        record = index.shift_results(result, [i], engine)[0]
+        mismatches += {key: record[key] for key in expected} != expected
+    print(f"Matches detect_theft_patterns on all {len(index):,} shifts: {mismatches == 0}")
+
+    top = sorted(index.staff_risk(result).items(), key=lambda kv: -kv[1]['risk_score'])[:3]
+    for staff_id, risk in top:
+        print(f"  {staff_id}: score {risk['risk_score']}, {risk['risk_level']}")
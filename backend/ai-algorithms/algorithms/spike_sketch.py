@@ -0,0 +1,349 @@
+"""
+Smart Loss Control - Fleet-Wide Spike Sketch
+=============================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+The VOLUME trigger needs, for every (shop, SKU), this hour's units and
+the 7-day hourly average: a 168-hour SalesVelocityTracker per SKU, most
+of which never come near volume_multiplier. SpikeSketch replaces that
+with a fixed amount of memory for the whole fleet, fed by sale events,
+and names the few (shop, SKU) pairs worth an exact check.
+
+HOW:
+  • Count-min sketch: `depth` rows of `width` counters. A (shop, SKU)
+    key adds its units to one counter per row (a different hash per
+    row); its estimate is the smallest of its `depth` counters.
+  • Sliding window: a sketch for the current hour, and a ring of
+    sketches of `block_hours` each (4 h: 43 blocks for the week) plus
+    their running sum. Entering a new block subtracts the one falling
+    out of the window, as SalesVelocityTracker does per hour.
+  • Top-K: each batch, the keys it touched in the current hour are
+    tested with the engine's rule on sketch estimates,
+        current > volume_multiplier × average
+    and those that pass are kept in a table of at most `top_k` keys,
+    ranked by current / average. When the hour closes, the survivors
+    are re-tested on the final counts and returned as candidates.
+  • confirm() runs AnomalyDetectionEngine._is_volume_spike on exact
+    data for the candidates only (e.g. from sales_velocity_metrics).
+
+ERROR BOUNDS (count-min, units added ≥ 0):
+With ε = e / width and δ = e^-depth, for every key and sketch
+    true ≤ estimate ≤ true + ε × N     with probability ≥ 1 − δ
+where N is all units in that sketch (the fleet's hour or week). So:
+  • the current hour is never under-counted: collisions can only add
+    candidates, not hide them
+  • the week is over-counted by at most ε × N_week, so a spike is
+    certain to be a candidate (with probability ≥ 1 − δ) when
+        current × 168 / volume_multiplier − week ≥ ε × N_week
+    Smaller margins can be missed: in practice a key shares counters
+    with about (active keys / width) others, so recall drops once the
+    fleet's active SKUs outnumber `width` (bench_spike_sketch.py)
+  • blocks: the week runs from the start of the oldest block, i.e.
+    168 to 168 + block_hours − 1 hours, averaged over what it covers
+    (block_hours=1 gives the engine's exact 168-hour window, at
+    block_hours × the ring's memory)
+  • if more than top_k keys pass in one hour the lowest-ranked are
+    dropped (counted in `overflow`)
+Memory does not grow with SKUs; the error does (N grows with the
+fleet), so width is sized to the fleet's active SKUs.
+
+LIMITS:
+Only the flat multiplier test is sketched (not the seasonal / z-score
+baselines). Late sales still land in their block (inside the window),
+but an hour that has closed is not re-tested.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from anomaly_detection_v2 import AnomalyDetectionEngine
+
+
+_HOUR_US = 3_600_000_000
+
+
+def pair_keys(shop, sku) -> np.ndarray:
+    """(shop, SKU) codes → one uint64 key per pair."""
+    shop = np.asarray(shop, dtype=np.uint64)
+    sku = np.asarray(sku, dtype=np.uint64)
+    return (shop << np.uint64(32)) | sku
+
+
+def _mix64(keys: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser (spreads structured keys over 64 bits)."""
+    with np.errstate(over='ignore'):
+        x = keys ^ (keys >> np.uint64(30))
+        x = x * np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x = x * np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return x
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: SpikeSketch
+# -------------------------------------------------------------------
+
+class SpikeSketch:
+    """Count-min sketches over a sliding week + top-K spike candidates"""
+
+    WINDOW_HOURS = 168
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4, top_k: int = 16_384,
+                 block_hours: int = 4, engine: Optional[AnomalyDetectionEngine] = None,
+                 window_hours: int = WINDOW_HOURS, seed: int = 2026):
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        if window_hours % block_hours:
+            raise ValueError("block_hours must divide window_hours")
+        self.engine = engine or AnomalyDetectionEngine()
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.block_hours = block_hours
+        self.window_hours = window_hours
+        self._shift = np.uint64(64 - (width.bit_length() - 1))
+
+        # Multiply-shift hash per row: (a × mix(key) + b) >> (64 − log2 width)
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(0, 1 << 63, depth, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, depth, dtype=np.uint64)
+        self._rows = np.arange(depth)[:, None]
+
+        # Block b (hours b × block_hours …) lives in slot b % n_blocks;
+        # the oldest block is only partly inside the 168 hours
+        self._n_blocks = window_hours // block_hours + 1
+        self._blocks = np.zeros((self._n_blocks, depth, width), dtype=np.float32)
+        self._week = np.zeros((depth, width), dtype=np.float64)    # sum of the ring
+        self._current = np.zeros((depth, width), dtype=np.float32)
+        self._head_hour: Optional[int] = None
+
+        # Current hour's candidates: key → score (current / average)
+        self._cand_keys = np.empty(0, dtype=np.uint64)
+        self._cand_score = np.empty(0, dtype=np.float64)
+
+        self.events = 0
+        self.dropped_late = 0
+        self.overflow = 0
+
+    @property
+    def epsilon(self) -> float:
+        return float(np.e / self.width)
+
+    @property
+    def delta(self) -> float:
+        return float(np.exp(-self.depth))
+
+    @property
+    def memory_bytes(self) -> int:
+        return (self._blocks.nbytes + self._week.nbytes + self._current.nbytes
+                + self.top_k * 16)
+
+
+    # ---------------------------------------------------------------
+    # HASHING / ESTIMATES
+    # ---------------------------------------------------------------
+
+    def _cells(self, keys: np.ndarray) -> np.ndarray:
+        """(depth × n) counter index of every key in every row."""
+        with np.errstate(over='ignore'):
+            h = self._a[:, None] * _mix64(keys)[None, :] + self._b[:, None]
+        return (h >> self._shift).astype(np.intp)
+
+    def _estimate(self, cells: np.ndarray):
+        """(current hour, hourly average) count-min estimates for hashed keys."""
+        current = self._current[self._rows, cells].min(axis=0).astype(np.float64)
+        span = self.window_hours + self._head_hour % self.block_hours
+        return current, self._week[self._rows, cells].min(axis=0) / span
+
+    def estimate(self, shop, sku) -> Dict:
+        """Current-hour units and 7-day hourly average per (shop, SKU)."""
+        n = np.size(shop)
+        if self._head_hour is None:
+            return {'current_hour_sales': np.zeros(n), 'seven_day_average': np.zeros(n)}
+        current, average = self._estimate(self._cells(pair_keys(shop, sku)))
+        return {'current_hour_sales': current, 'seven_day_average': average}
+
+
+    # ---------------------------------------------------------------
+    # STREAMING
+    # ---------------------------------------------------------------
+
+    def add(self, shop, sku, timestamp_us, quantity) -> List[Dict]:
+        """
+        Feed a batch of sale events (codes, epoch µs, units; any order).
+
+        Returns the candidates of every hour this batch closed, oldest
+        first (see close_hour). Sales older than the window are dropped.
+        """
+        keys = pair_keys(shop, sku)
+        hours = np.asarray(timestamp_us, dtype=np.int64) // _HOUR_US
+        quantity = np.asarray(quantity, dtype=np.float64)
+        self.events += keys.size
+        closed = []
+        if keys.size == 0:
+            return closed
+
+        cells = self._cells(keys)
+        for hour in np.unique(hours).tolist():
+            block = hour // self.block_hours
+            if self._head_hour is None:
+                self._head_hour = hour
+            elif hour > self._head_hour:
+                closed.extend(self._roll_to(hour))
+            elif block <= self._head_hour // self.block_hours - self._n_blocks:
+                self.dropped_late += int(np.count_nonzero(hours == hour))
+                continue
+
+            m = hours == hour
+            keys_h, first, inverse = np.unique(keys[m], return_index=True, return_inverse=True)
+            units = np.bincount(inverse, weights=quantity[m])
+            cells_h = cells[:, m][:, first]
+            slot = self._blocks[block % self._n_blocks]
+            current = hour == self._head_hour
+            for r in range(self.depth):
+                added = np.bincount(cells_h[r], weights=units, minlength=self.width)
+                slot[r] += added
+                self._week[r] += added
+                if current:
+                    self._current[r] += added
+            if current:
+                self._screen(keys_h, cells_h)
+        return closed
+
+    def _screen(self, keys: np.ndarray, cells: np.ndarray) -> None:
+        """Test keys touched this hour; keep the top_k that pass."""
+        current, average = self._estimate(cells)
+        passed = current > self.engine.config['volume_multiplier'] * average
+        if not passed.any():
+            return
+
+        # Newest score wins for keys already in the table
+        merged = np.concatenate([keys[passed], self._cand_keys])
+        score = np.concatenate([current[passed] / average[passed], self._cand_score])
+        merged, first = np.unique(merged, return_index=True)
+        score = score[first]
+        if merged.size > self.top_k:
+            # Full: re-test everyone on the latest counts first (a key
+            # that passed on its first sale of the hour may not now)
+            current, average = self._estimate(self._cells(merged))
+            passed = current > self.engine.config['volume_multiplier'] * average
+            merged, score = merged[passed], current[passed] / average[passed]
+        if merged.size > self.top_k:
+            self.overflow += merged.size - self.top_k
+            keep = np.argpartition(score, merged.size - self.top_k)[-self.top_k:]
+            merged, score = merged[keep], score[keep]
+        self._cand_keys, self._cand_score = merged, score
+
+    def _roll_to(self, hour: int) -> List[Dict]:
+        """Close the head hour, then slide the window to `hour`."""
+        closed = [self.close_hour()]
+        head_block = self._head_hour // self.block_hours
+        block = hour // self.block_hours
+        if block - head_block >= self._n_blocks:
+            self._blocks[:] = 0.0
+            self._week[:] = 0.0
+        else:
+            for b in range(head_block + 1, block + 1):
+                slot = self._blocks[b % self._n_blocks]
+                self._week -= slot
+                slot[:] = 0.0
+        self._current[:] = 0.0
+        self._head_hour = hour
+        return closed
+
+    def candidates(self) -> Dict:
+        """
+        The current hour's candidates re-tested on the latest counts:
+        {'hour', 'shop', 'sku', 'current_hour_sales', 'seven_day_average'},
+        highest current / average first.
+        """
+        keys = self._cand_keys
+        current = average = np.empty(0)
+        if keys.size:
+            current, average = self._estimate(self._cells(keys))
+            passed = current > self.engine.config['volume_multiplier'] * average
+            order = np.argsort(-(current[passed] / average[passed]), kind='stable')
+            keys = keys[passed][order]
+            current, average = current[passed][order], average[passed][order]
+        return {
+            'hour': self._head_hour,
+            'shop': (keys >> np.uint64(32)).astype(np.int64),
+            'sku': (keys & np.uint64(0xFFFFFFFF)).astype(np.int64),
+            'current_hour_sales': current,
+            'seven_day_average': average,
+        }
+
+    def close_hour(self) -> Dict:
+        """Final candidates of the head hour; starts an empty table."""
+        result = self.candidates()
+        self._cand_keys = np.empty(0, dtype=np.uint64)
+        self._cand_score = np.empty(0, dtype=np.float64)
+        return result
+
+
+    # ---------------------------------------------------------------
+    # EXACT CHECK
+    # ---------------------------------------------------------------
+
+    def confirm(self, candidates: Dict, velocity_of) -> np.ndarray:
+        """
+        Exact VOLUME check for each candidate: `velocity_of(shop, sku,
+        hour)` returns its SalesVelocityData (or tracker) for that hour,
+        passed to engine._is_volume_spike. Returns a boolean mask.
+        """
+        hour = candidates['hour']
+        return np.array([
+            self.engine._is_volume_spike(velocity_of(shop, sku, hour))
+            for shop, sku in zip(candidates['shop'].tolist(), candidates['sku'].tolist())
+        ], dtype=bool)
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from datetime import datetime
+
+    from anomaly_detection_v2 import SalesVelocityData
+
+    rng = np.random.default_rng(1)
+    shops, skus = 200, 20
+    start_hour = 20_500 * 24
+    sketch = SpikeSketch(width=1 << 14, top_k=1024)
+
+    # A week of 1 unit per SKU-hour on average, then one hour where
+    # shop 42's SKU 7 sells 30 units
+    exact = {}
+    for hour in range(start_hour, start_hour + 169):
+        n = rng.poisson(shops * skus)
+        shop = rng.integers(0, shops, n)
+        sku = rng.integers(0, skus, n)
+        if hour == start_hour + 168:
+            shop = np.append(shop, [42] * 30)
+            sku = np.append(sku, [7] * 30)
+        for pair in zip(shop.tolist(), sku.tolist()):
+            exact[pair, hour] = exact.get((pair, hour), 0) + 1
+        ts = hour * _HOUR_US + rng.integers(0, _HOUR_US, shop.size)
+        sketch.add(shop, sku, ts, np.ones(shop.size))
+
+    found = sketch.close_hour()
+    print(f"Memory: {sketch.memory_bytes / 1e6:.1f} MB for {shops * skus:,} pairs "
+          f"(ε = {sketch.epsilon:.5f}, δ = {sketch.delta:.3f})")
+    print(f"Candidates in the last hour: {len(found['shop'])}")
+
+    def velocity_of(shop, sku, hour):
+        units = [exact.get(((shop, sku), h), 0) for h in range(hour - 167, hour + 1)]
+        return SalesVelocityData(f'{shop}:{sku}', [units[-1]], sum(units) / 168,
+                                 datetime(2026, 2, 16), 0)
+
+    confirmed = sketch.confirm(found, velocity_of)
+    pairs = list(zip(found['shop'][confirmed].tolist(), found['sku'][confirmed].tolist()))
+    print(f"Confirmed by _is_volume_spike: {len(pairs)}, shop 42 / SKU 7 among them: "
+          f"{(42, 7) in pairs}")
@@ -0,0 +1,497 @@
+"""
+Smart Loss Control - Memory-Mapped Transaction Archive
+=======================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Stores a transaction log on disk as fixed-width binary columns, so
+history can be opened without json.load copying every event into a
+Python dict first.
+
+FILE LAYOUT (little-endian):
+• 8-byte magic  b'SLCTXA\\x00\\x01'
+• uint32 format version, uint32 header length
+• JSON header: row count, column table (name, dtype, offset, bytes),
+  string dictionaries (shops, SKUs, staff, event types), the
+  initial_inventory records and free-form metadata
+• column data, each column starting on a 64-byte boundary
+
+Columns (one row per event, in arrival order):
+    timestamp  int64 epoch µs       type     int8 (EVENT_TYPES code)
+    shop / sku / staff  int32 codes into the dictionaries (-1 = none)
+    quantity   float64  (sale qty, litres decanted, qty received,
+                         counted qty, stolen qty)
+    unit_price float64  (sell price; cost price for restocks)
+    offline    bool
+    quantity_ordered / expected_quantity  float64, cartons  int32
+    transaction_id  fixed-width bytes
+
+Opening memory-maps the file; every column is a read-only NumPy view
+of the mapping (no copy, nothing read until touched), ready for
+InventoryEngine.reconcile_batch and the anomaly engine's fast paths.
+"""
+
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime
+from pathlib import Path
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from event_replay import EVENT_TYPES
+from anomaly_detection_v2 import to_epoch_us
+
+
+MAGIC = b'SLCTXA\x00\x01'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+# Column name → on-disk dtype (transaction_id width is set per file)
+COLUMNS = {
+    'timestamp': '<i8',
+    'shop': '<i4',
+    'sku': '<i4',
+    'staff': '<i4',
+    'type': '|i1',
+    'quantity': '<f8',
+    'unit_price': '<f8',
+    'offline': '|b1',
+    'quantity_ordered': '<f8',
+    'expected_quantity': '<f8',
+    'cartons': '<i4',
+}
+
+TYPE_CODE = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+
+# -------------------------------------------------------------------
+# WRITING
+# -------------------------------------------------------------------
+
+def write_archive(path, columns: Dict[str, np.ndarray],
+                  shop_ids: List[str], sku_ids: List[str], staff_ids: List[str],
+                  initial_inventory: Optional[List[Dict]] = None,
+                  metadata: Optional[Dict] = None) -> Path:
+    """
+    Write event columns (see COLUMNS) to `path`.
+
+    Missing optional columns are filled with defaults. The file is
+    written next to its destination and renamed into place, so readers
+    never see a half-written archive.
+    """
+
+    path = Path(path)
+    rows = len(columns['timestamp'])
+
+    data = {}
+    for name, dtype in COLUMNS.items():
+        if name in columns:
+            data[name] = np.ascontiguousarray(columns[name], dtype=dtype)
+        else:
+            fill = -1 if name in ('shop', 'sku', 'staff') else 0
+            data[name] = np.full(rows, fill, dtype=dtype)
+        if len(data[name]) != rows:
+            raise ValueError(f"Column '{name}' has {len(data[name])} rows, expected {rows}")
+
+    txn_ids = columns.get('transaction_id')
+    if txn_ids is not None:
+        data['transaction_id'] = np.asarray(txn_ids, dtype=np.bytes_)
+
+    # Lay the columns out first so the header can record offsets
+    header = {
+        'rows': rows,
+        'columns': [],
+        'dictionaries': {
+            'shop': list(shop_ids),
+            'sku': list(sku_ids),
+            'staff': list(staff_ids),
+            'type': list(EVENT_TYPES),
+        },
+        'initial_inventory': initial_inventory or [],
+        'metadata': metadata or {},
+    }
+
+    # Offsets are relative to the start of the data section
+    offset = 0
+    for name, array in data.items():
+        header['columns'].append({
+            'name': name, 'dtype': array.dtype.str,
+            'offset': offset, 'nbytes': array.nbytes
+        })
+        offset += _aligned(array.nbytes)
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - f.tell()))
+
+        for array in data.values():
+            f.write(memoryview(array).cast('B'))
+            f.write(b'\0' * (_aligned(array.nbytes) - array.nbytes))
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+    return path
+
+
+def columns_from_transactions(transactions: Iterable[Dict],
+                              default_shop: str = '',
+                              sku_ids: Iterable[str] = ()) -> Dict:
+    """
+    Encode simulation_dataset.json-style transaction dicts as archive
+    columns plus the string dictionaries they refer to. `sku_ids`
+    pre-seeds the SKU dictionary (e.g. from initial_inventory) so SKUs
+    without events still get a code.
+    """
+
+    shops: Dict[str, int] = {}
+    skus: Dict[str, int] = {sku_id: i for i, sku_id in enumerate(sku_ids)}
+    staff: Dict[str, int] = {}
+
+    def code(table, value):
+        if value is None:
+            return -1
+        found = table.get(value)
+        if found is None:
+            found = table[value] = len(table)
+        return found
+
+    stamps, shop, sku, who, etype = [], [], [], [], []
+    quantity, price, offline, ordered, expected, cartons, txn_ids = \
+        [], [], [], [], [], [], []
+
+    for txn in transactions:
+        kind = txn['type']
+        stamps.append(txn['timestamp'])
+        shop.append(code(shops, txn.get('shop_id', default_shop)))
+        sku.append(code(skus, txn.get('sku_id')))
+        who.append(code(staff, txn.get('staff_id')))
+        etype.append(TYPE_CODE[kind])
+        txn_ids.append(txn.get('transaction_id', ''))
+
+        qty = txn.get('quantity', 0)
+        unit_price = txn.get('unit_price', 0)
+        n_cartons = qty_ordered = qty_expected = 0
+
+        if kind == 'decant':
+            n_cartons = txn.get('cartons_broken', 0)
+            qty = txn.get('litres_added', 0)
+        elif kind == 'restock':
+            qty = txn.get('quantity_received', 0)
+            qty_ordered = txn.get('quantity_ordered', qty)
+            unit_price = txn.get('cost_price_usd', 0)
+        elif kind == 'quick_count':
+            qty = txn.get('actual_quantity', 0)
+            qty_expected = txn.get('expected_quantity', 0)
+
+        quantity.append(qty)
+        price.append(unit_price)
+        offline.append(bool(txn.get('offline', False)))
+        ordered.append(qty_ordered)
+        expected.append(qty_expected)
+        cartons.append(n_cartons)
+
+    return {
+        'columns': {
+            'timestamp': to_epoch_us(stamps),
+            'shop': np.array(shop, dtype=np.int32),
+            'sku': np.array(sku, dtype=np.int32),
+            'staff': np.array(who, dtype=np.int32),
+            'type': np.array(etype, dtype=np.int8),
+            'quantity': np.array(quantity, dtype=np.float64),
+            'unit_price': np.array(price, dtype=np.float64),
+            'offline': np.array(offline, dtype=bool),
+            'quantity_ordered': np.array(ordered, dtype=np.float64),
+            'expected_quantity': np.array(expected, dtype=np.float64),
+            'cartons': np.array(cartons, dtype=np.int32),
+            'transaction_id': np.array(txn_ids, dtype=np.bytes_),
+        },
+        'shop_ids': list(shops),
+        'sku_ids': list(skus),
+        'staff_ids': list(staff),
+    }
+
+
+def convert_json(json_path, archive_path) -> Path:
+    """Convert a simulation_dataset.json-shaped file into an archive."""
+
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+
+    meta = data.get('simulation_metadata', {})
+    inventory = data.get('initial_inventory', [])
+    encoded = columns_from_transactions(
+        data['transactions'], default_shop=meta.get('shop_name', ''),
+        sku_ids=[record['sku_id'] for record in inventory]
+    )
+
+    return write_archive(
+        archive_path, encoded['columns'],
+        encoded['shop_ids'], encoded['sku_ids'], encoded['staff_ids'],
+        initial_inventory=inventory,
+        metadata=meta
+    )
+
+
+def write_workload(path, workload) -> Path:
+    """Write a workload_generator.Workload straight from its columns."""
+
+    c = workload.columns
+    columns = {name: c[name] for name in COLUMNS if name in c}
+    columns['transaction_id'] = np.char.add(
+        'TXN_', np.char.zfill(np.arange(1, workload.size + 1).astype(str), 7)
+    ).astype(np.bytes_)
+
+    return write_archive(
+        path, columns, workload.shop_ids, workload.sku_ids, workload.staff_ids,
+        initial_inventory=workload.initial_inventory(),
+        metadata={'seed': workload.seed, 'days': workload.days,
+                  'date': workload.start_date.isoformat()}
+    )
+
+
+def _aligned(n: int) -> int:
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+# -------------------------------------------------------------------
+# READING
+# -------------------------------------------------------------------
+
+class TransactionArchive:
+    """Read-only, memory-mapped view of an archive file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{self.path} is not a transaction archive')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'Unsupported archive version {version}')
+
+        header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        data_start = _aligned(_PREAMBLE.size + header_len)
+
+        self.rows: int = header['rows']
+        self.shop_ids: List[str] = header['dictionaries']['shop']
+        self.sku_ids: List[str] = header['dictionaries']['sku']
+        self.staff_ids: List[str] = header['dictionaries']['staff']
+        self.event_types: List[str] = header['dictionaries']['type']
+        self.initial_inventory: List[Dict] = header['initial_inventory']
+        self.metadata: Dict = header['metadata']
+
+        # Zero-copy views straight onto the mapping
+        self.columns: Dict[str, np.ndarray] = {
+            col['name']: np.frombuffer(
+                self._mmap, dtype=np.dtype(col['dtype']),
+                count=self.rows, offset=data_start + col['offset']
+            )
+            for col in header['columns']
+        }
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __enter__(self) -> 'TransactionArchive':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Drop the column views and unmap the file. If views handed out
+        earlier are still alive, the mapping stays open until they go.
+        """
+        self.columns = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+    # ---------------------------------------------------------------
+    # LOOKUPS
+    # ---------------------------------------------------------------
+
+    def code(self, kind: str, value: str) -> int:
+        """Dictionary code of a shop / sku / staff id (-1 if absent)."""
+        table = {'shop': self.shop_ids, 'sku': self.sku_ids, 'staff': self.staff_ids}[kind]
+        try:
+            return table.index(value)
+        except ValueError:
+            return -1
+
+    def mask(self, type: Optional[str] = None, shop: Optional[str] = None,
+             sku: Optional[str] = None, staff: Optional[str] = None) -> np.ndarray:
+        """Boolean row mask for the given event type / ids."""
+        keep = np.ones(self.rows, dtype=bool)
+        if type is not None:
+            keep &= self.columns['type'] == TYPE_CODE[type]
+        for kind, value in (('shop', shop), ('sku', sku), ('staff', staff)):
+            if value is not None:
+                keep &= self.columns[kind] == self.code(kind, value)
+        return keep
+
+    def timestamps(self, rows=None) -> np.ndarray:
+        """Timestamps as datetime64[us] (a view when rows is None)."""
+        stamps = self.columns['timestamp'] if rows is None else self.columns['timestamp'][rows]
+        return stamps.view('datetime64[us]')
+
+
+    # ---------------------------------------------------------------
+    # ENGINE INPUTS
+    # ---------------------------------------------------------------
+
+    def sales_epochs(self, staff: Optional[str] = None, shop: Optional[str] = None,
+                     since: Optional[datetime] = None,
+                     until: Optional[datetime] = None) -> np.ndarray:
+        """
+        Sorted sale timestamps (int64 epoch µs), the pre-parsed input
+        AnomalyDetectionEngine.detect_theft_patterns_fast accepts with
+        assume_sorted=True.
+        """
+        keep = self.mask(type='sale', shop=shop, staff=staff)
+        stamps = self.columns['timestamp']
+        if since is not None:
+            keep &= stamps >= to_epoch_us([since])[0]
+        if until is not None:
+            keep &= stamps <= to_epoch_us([until])[0]
+        return np.sort(stamps[keep])
+
+    def stock_totals(self, until=None) -> Dict[str, np.ndarray]:
+        """
+        Per-SKU totals (index = sku code), one bincount per event type:
+        units_sold, received (restocks), decanted (litres moved to the
+        shelf) and stolen (labelled THEFT_EVENTs).
+
+        `until` (epoch µs, scalar or one value per SKU) keeps only
+        events stamped at or before it, e.g. each SKU's last count.
+        """
+        n = len(self.sku_ids)
+        etype = self.columns['type']
+        sku = self.columns['sku']
+        quantity = self.columns['quantity']
+
+        has_sku = sku >= 0
+        if until is not None:
+            cutoff = np.broadcast_to(np.asarray(until, dtype=np.int64), (n,))
+            has_sku &= self.columns['timestamp'] <= cutoff[np.where(has_sku, sku, 0)]
+
+        def total(kind):
+            rows = has_sku & (etype == TYPE_CODE[kind])
+            return np.bincount(sku[rows], weights=quantity[rows], minlength=n)
+
+        return {
+            'units_sold': total('sale'),
+            'received': total('restock'),
+            'decanted': total('decant'),
+            'stolen': total('THEFT_EVENT'),
+        }
+
+    def last_counts(self) -> Dict[str, np.ndarray]:
+        """
+        Latest quick count per SKU code: actual quantity (NaN if never
+        counted) and counted_at (epoch µs; int64 max if never counted).
+        """
+        n = len(self.sku_ids)
+        rows = np.flatnonzero(self.columns['type'] == TYPE_CODE['quick_count'])
+        rows = rows[np.argsort(self.columns['timestamp'][rows], kind='stable')]
+
+        actual = np.full(n, np.nan)
+        counted_at = np.full(n, np.iinfo(np.int64).max)
+
+        # Later rows overwrite earlier ones for the same SKU
+        sku = self.columns['sku'][rows]
+        actual[sku] = self.columns['quantity'][rows]
+        counted_at[sku] = self.columns['timestamp'][rows]
+        return {'actual': actual, 'counted_at': counted_at}
+
+    def inventory_columns(self) -> Dict[str, np.ndarray]:
+        """Opening stock and sell price per SKU code, from the header."""
+        n = len(self.sku_ids)
+        initial = np.zeros(n)
+        price = np.zeros(n)
+        for record in self.initial_inventory:
+            i = self.code('sku', record['sku_id'])
+            if i >= 0:
+                initial[i] = record['quantity_litres']
+                price[i] = record.get('sell_price_usd', 0.0)
+        return {'initial_stock': initial, 'unit_price': price}
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    import tempfile
+    import time
+
+    from inventory_engine_v2 import InventoryEngine
+    from anomaly_detection_v2 import AnomalyDetectionEngine
+
+    dataset_path = (
+        Path(__file__).resolve().parent.parent
+        / 'test-data' / 'simulation_dataset.json'
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_path = convert_json(dataset_path, Path(tmp) / 'simulation.slca')
+
+        start = time.perf_counter()
+        archive = TransactionArchive(archive_path)
+        opened_ms = (time.perf_counter() - start) * 1000
+
+        print(f"Archive: {len(archive)} events, {archive_path.stat().st_size:,} bytes, "
+              f"opened in {opened_ms:.2f} ms")
+
+        # Variance at each SKU's last count, straight from the columns
+        counts = archive.last_counts()
+        totals = archive.stock_totals(until=counts['counted_at'])
+        inv = archive.inventory_columns()
+        counted = np.flatnonzero(~np.isnan(counts['actual']))
+        result = InventoryEngine.reconcile_batch(
+            inv['initial_stock'][counted],
+            (totals['received'] + totals['decanted'])[counted],
+            totals['units_sold'][counted],
+            counts['actual'][counted],
+            inv['unit_price'][counted],
+            litres_per_carton=1
+        )
+        for k, i in enumerate(counted.tolist()):
+            print(f"  {archive.sku_ids[i]}: expected {result['expected'][k]:.0f}, "
+                  f"counted {result['actual'][k]:.0f}, "
+                  f"variance {result['variance'][k]:+.0f}")
+
+        # One staff member's sales, no dict parsing
+        engine = AnomalyDetectionEngine()
+        for staff_id in archive.staff_ids:
+            epochs = archive.sales_epochs(staff=staff_id)
+            if epochs.size:
+                shift_end = archive.timestamps()[archive.mask(staff=staff_id)].max().item()
+                risk = engine.detect_theft_patterns_fast(epochs, shift_end, assume_sorted=True)
+                print(f"  {staff_id}: {epochs.size} sales → {risk['risk_level']}")
+
+        archive.close()
@@ -0,0 +1,383 @@
+"""
+Smart Loss Control - Incremental Velocity Rollups (Hourly → Daily → Weekly)
+============================================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Fills the HOURLY / DAILY / WEEKLY rows of sales_velocity_metrics from
+the stream of sales, for every SKU row in the fleet, without ever
+re-reading old transactions.
+
+    hour bucket   one per SKU row and hour, filled by the sales
+    day / week    when an hour CLOSES, its units are folded into the
+                  day and the (Monday-start) week it belongs to
+
+• A sale is added to its open hour. O(1) per sale, vectorised per batch.
+• The newest hour seen is the open one; older hours are closed. Each
+  closing hour is folded into its day and week in one pass over the
+  fleet, and emitted. A day (week) is emitted once its last hour closes.
+• A LATE sale (offline, synced after its hour closed) reopens only
+  the buckets it touches: its hour, its day and its week get the
+  units added directly (they are sums, so no refold) and those rows
+  are emitted again with their new totals.
+• A running 168-hour sum per SKU gives seven_day_average (units per
+  hour over the last 7 days, the open hour included) for
+  AnomalyDetectionEngine — the same value SalesVelocityTracker reads.
+
+avg_velocity is units per hour of the bucket: units_sold / 1, / 24
+or / 168.
+
+MEMORY:
+history_days (≥ 7) of hourly buckets, plus the days and weeks they
+span, per SKU row: 8 days × 40,000 SKU rows ≈ 64 MB. Sales older than
+that (relative to the open hour) cannot be folded and are only counted
+in `dropped`; size history_days to the longest offline gap.
+
+FUTURE TIMESTAMPS:
+Every hour up to the newest sale is closed, one pass over the fleet
+each, so one device with its clock a year ahead would cost ~8,760
+passes and wipe the rings. Sales more than max_ahead_hours past the
+open hour or the wall clock (whichever is later) are left out and
+counted in `future`. Replaying old logs with the clock on is fine;
+gaps in them longer than max_ahead_hours need an advance() across.
+
+OUTPUT:
+add() and advance() return {time_window: columns} with sku,
+period_start, period_end (epoch µs), units_sold and avg_velocity,
+one row per bucket — the arguments of
+PostgresIO.upsert_velocity_metrics (see upsert()). Only non-empty
+buckets are emitted.
+"""
+
+from typing import Callable, Dict, Optional
+from datetime import datetime
+import time
+
+import numpy as np
+
+from anomaly_detection_v2 import SalesVelocityData, datetime_to_epoch_us, to_epoch_us
+from velocity_tracker import hour_index
+
+
+HOUR_US = 3_600_000_000
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 168
+
+# 1970-01-01 was a Thursday: day + 3 counts from a Monday
+_WEEK_SHIFT = 3
+
+WINDOW_HOURS = {'HOURLY': 1, 'DAILY': HOURS_PER_DAY, 'WEEKLY': HOURS_PER_WEEK}
+
+
+def week_of(hour):
+    """Monday-start week number of an absolute hour."""
+    return (hour // HOURS_PER_DAY + _WEEK_SHIFT) // 7
+
+
+def week_start(week):
+    """First absolute hour of a week_of() week."""
+    return (week * 7 - _WEEK_SHIFT) * HOURS_PER_DAY
+
+
+def _scatter_add(target: np.ndarray, index: np.ndarray, values: np.ndarray) -> None:
+    """target.flat[index] += values, duplicates summed (O(events), not O(target))."""
+    keys, inverse = np.unique(index, return_inverse=True)
+    target.reshape(-1)[keys] += np.bincount(inverse, weights=values, minlength=keys.size)
+
+
+def upsert(io, rows: Dict[str, Dict[str, np.ndarray]]) -> int:
+    """Write add() / advance() output with PostgresIO.upsert_velocity_metrics."""
+    return sum(io.upsert_velocity_metrics(window, **columns)
+               for window, columns in rows.items())
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: VelocityRollup
+# -------------------------------------------------------------------
+
+class VelocityRollup:
+    """Hour / day / week units sold per SKU row, folded as hours close"""
+
+    def __init__(self, n_skus: int, history_days: int = 8, max_ahead_hours: int = 48,
+                 clock: Optional[Callable[[], float]] = time.time):
+        if history_days < 7:
+            raise ValueError('history_days must cover the 7-day average (>= 7)')
+        self.history_hours = history_days * HOURS_PER_DAY
+
+        # Ring buffers, one row per bucket: hour h lives in row
+        # h % history_hours, day d in d % len(days), week w likewise
+        self._hours = np.zeros((self.history_hours, n_skus))
+        self._days = np.zeros((history_days + 1, n_skus))
+        self._weeks = np.zeros((history_days // 7 + 2, n_skus))
+
+        # Units in the 168 hours up to and including the open hour
+        self._week_sum = np.zeros(n_skus)
+
+        # The open hour (absolute hour, None until the first sale)
+        self.head: Optional[int] = None
+
+        # Sales may be at most max_ahead_hours past the open hour or
+        # clock() (epoch seconds; None = the open hour only)
+        self.max_ahead_hours = max_ahead_hours
+        self.clock = clock
+
+        # Late sales folded into closed buckets / too old to fold /
+        # stamped too far ahead
+        self.late = 0
+        self.dropped = 0
+        self.future = 0
+
+    def __len__(self) -> int:
+        return self._hours.shape[1]
+
+    def _grow(self, n_skus: int) -> None:
+        """Room for SKU rows up to n_skus (new rows start empty)."""
+        extra = n_skus - len(self)
+        if extra <= 0:
+            return
+        extra = max(extra, len(self))
+        self._hours = np.pad(self._hours, ((0, 0), (0, extra)))
+        self._days = np.pad(self._days, ((0, 0), (0, extra)))
+        self._weeks = np.pad(self._weeks, ((0, 0), (0, extra)))
+        self._week_sum = np.pad(self._week_sum, (0, extra))
+
+
+    # ---------------------------------------------------------------
+    # STREAMING UPDATES
+    # ---------------------------------------------------------------
+
+    def add(self, sku, timestamp_us, quantity) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Add a batch of sales (SKU row codes, epoch µs, units), in
+        arrival order. The newest hour in the batch becomes the open
+        hour; every hour before it is closed and emitted, along with
+        buckets reopened by late sales. Sales stamped beyond the
+        max_ahead_hours limit are skipped (counted in `future`).
+        """
+        sku = np.asarray(sku, dtype=np.int64)
+        hours = to_epoch_us(np.asarray(timestamp_us)) // HOUR_US
+        quantity = np.asarray(quantity, dtype=np.float64)
+        if sku.size == 0:
+            return {}
+
+        ahead = hours > self._ahead_limit(int(hours.min()))
+        if ahead.any():
+            self.future += int(ahead.sum())
+            sku, hours, quantity = sku[~ahead], hours[~ahead], quantity[~ahead]
+            if sku.size == 0:
+                return {}
+        self._grow(int(sku.max()) + 1)
+        if self.head is None:
+            self.head = int(hours.min())
+
+        out = {window: [] for window in WINDOW_HOURS}
+        head = self.head
+        oldest = head - self.history_hours + 1
+
+        too_old = hours < oldest
+        self.dropped += int(too_old.sum())
+        late = (hours < head) & ~too_old
+        if late.any():
+            self._reopen(sku[late], hours[late], quantity[late], out)
+
+        # On-time sales, hour by hour: each hour's sales go in, then the
+        # hour closes (all but the newest)
+        on_time = hours >= head
+        sku, hours, quantity = sku[on_time], hours[on_time], quantity[on_time]
+        order = np.argsort(hours, kind='stable')
+        sku, hours, quantity = sku[order], hours[order], quantity[order]
+        top = int(hours[-1]) if hours.size else head
+        bounds = np.searchsorted(hours, np.arange(head, top + 2))
+        for k, h in enumerate(range(head, top + 1)):
+            if h > head:
+                self._open(h)
+            lo, hi = bounds[k], bounds[k + 1]
+            if hi > lo:
+                slot = h % self.history_hours
+                np.add.at(self._hours[slot], sku[lo:hi], quantity[lo:hi])
+                np.add.at(self._week_sum, sku[lo:hi], quantity[lo:hi])
+            if h < top:
+                self._close(h, out)
+        return self._columns(out)
+
+    def advance(self, now) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Close every hour before `now`'s hour (a datetime or epoch µs),
+        with or without sales. Call on a fleet-wide tick so quiet
+        hours, days and weeks are emitted on time. Raises ValueError
+        for a `now` more than max_ahead_hours past clock().
+        """
+        if isinstance(now, datetime):
+            hour = hour_index(now)
+        else:
+            hour = int(now) // HOUR_US
+        if self.clock is not None and hour > self._clock_hour() + self.max_ahead_hours:
+            raise ValueError(f'advance() to hour {hour} is more than '
+                             f'{self.max_ahead_hours} h past the clock')
+        out = {window: [] for window in WINDOW_HOURS}
+        if self.head is None:
+            self.head = hour
+        while self.head < hour:
+            self._close(self.head, out)
+            self._open(self.head + 1)
+        return self._columns(out)
+
+    def _clock_hour(self) -> int:
+        return int(self.clock() * 1_000_000) // HOUR_US
+
+    def _ahead_limit(self, first_hour: int) -> int:
+        """Newest hour a sale may carry (first_hour: the batch's oldest)."""
+        reference = [self.head if self.head is not None else first_hour]
+        if self.clock is not None:
+            reference.append(self._clock_hour())
+        return max(reference) + self.max_ahead_hours
+
+    def _open(self, hour: int) -> None:
+        """Make `hour` the open hour: expire what leaves the rings."""
+        self._week_sum -= self._hours[(hour - HOURS_PER_WEEK) % self.history_hours]
+        self._hours[hour % self.history_hours] = 0.0
+        if hour % HOURS_PER_DAY == 0:
+            self._days[(hour // HOURS_PER_DAY) % len(self._days)] = 0.0
+        if week_of(hour) != week_of(hour - 1):
+            self._weeks[week_of(hour) % len(self._weeks)] = 0.0
+        self.head = hour
+
+    def _close(self, hour: int, out) -> None:
+        """Fold a finished hour into its day and week; emit what closed."""
+        units = self._hours[hour % self.history_hours]
+        day = self._days[(hour // HOURS_PER_DAY) % len(self._days)]
+        week = self._weeks[week_of(hour) % len(self._weeks)]
+        day += units
+        week += units
+
+        sold = np.flatnonzero(units)
+        out['HOURLY'].append((sold, np.full(sold.size, hour), units[sold]))
+        if (hour + 1) % HOURS_PER_DAY == 0:
+            sold = np.flatnonzero(day)
+            out['DAILY'].append((sold, np.full(sold.size, hour + 1 - HOURS_PER_DAY), day[sold]))
+        if week_of(hour + 1) != week_of(hour):
+            sold = np.flatnonzero(week)
+            out['WEEKLY'].append((sold, np.full(sold.size, hour + 1 - HOURS_PER_WEEK), week[sold]))
+
+    def _reopen(self, sku, hours, quantity, out) -> None:
+        """Late sales: add to their hour, day and week; re-emit closed ones."""
+        self.late += sku.size
+        n = len(self)
+        days = hours // HOURS_PER_DAY
+        weeks = week_of(hours)
+        _scatter_add(self._hours, (hours % self.history_hours) * n + sku, quantity)
+        _scatter_add(self._days, (days % len(self._days)) * n + sku, quantity)
+        _scatter_add(self._weeks, (weeks % len(self._weeks)) * n + sku, quantity)
+        recent = hours > self.head - HOURS_PER_WEEK
+        _scatter_add(self._week_sum, sku[recent], quantity[recent])
+
+        # Days / weeks still open are emitted when they close
+        day_start = days * HOURS_PER_DAY
+        first_hour = week_start(weeks)
+        for window, start, closed in (
+                ('HOURLY', hours, hours < self.head),
+                ('DAILY', day_start, day_start + HOURS_PER_DAY <= self.head),
+                ('WEEKLY', first_hour, first_hour + HOURS_PER_WEEK <= self.head)):
+            keys = np.unique(start[closed] * n + sku[closed])
+            start_hour, rows = np.divmod(keys, n)
+            out[window].append((rows, start_hour, self._bucket(window, start_hour, rows)))
+
+    def _bucket(self, window: str, start_hour, rows) -> np.ndarray:
+        """Current units of buckets (given by their first hour) for rows."""
+        if window == 'HOURLY':
+            return self._hours[start_hour % self.history_hours, rows]
+        if window == 'DAILY':
+            return self._days[(start_hour // HOURS_PER_DAY) % len(self._days), rows]
+        return self._weeks[week_of(start_hour) % len(self._weeks), rows]
+
+    @staticmethod
+    def _columns(out) -> Dict[str, Dict[str, np.ndarray]]:
+        result = {}
+        for window, parts in out.items():
+            if not parts:
+                continue
+            sku = np.concatenate([p[0] for p in parts])
+            if not sku.size:
+                continue
+            start = np.concatenate([p[1] for p in parts]).astype(np.int64) * HOUR_US
+            units = np.concatenate([p[2] for p in parts])
+            result[window] = {
+                'sku': sku,
+                'period_start': start,
+                'period_end': start + WINDOW_HOURS[window] * HOUR_US,
+                'units_sold': units,
+                'avg_velocity': units / WINDOW_HOURS[window],
+            }
+        return result
+
+
+    # ---------------------------------------------------------------
+    # READS
+    # ---------------------------------------------------------------
+
+    def current_hour_sales(self) -> np.ndarray:
+        """Units in the open hour, per SKU row."""
+        if self.head is None:
+            return np.zeros(len(self))
+        return self._hours[self.head % self.history_hours].copy()
+
+    def seven_day_average(self) -> np.ndarray:
+        """Average hourly units over the last 168 hours (open hour included)."""
+        return self._week_sum / HOURS_PER_WEEK
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._hours.nbytes + self._days.nbytes + self._weeks.nbytes + self._week_sum.nbytes
+
+    def trigger_inputs(self) -> Dict[str, np.ndarray]:
+        """Arrays for AnomalyDetectionEngine.should_trigger_counts."""
+        return {
+            'current_hour_sales': self.current_hour_sales(),
+            'seven_day_average': self.seven_day_average(),
+        }
+
+    def velocity(self, row: int, sku_id: str, last_count_timestamp: datetime,
+                 total_sales_since_count: int = 0) -> SalesVelocityData:
+        """SalesVelocityData for one SKU row, for should_trigger_count."""
+        current = float(self._hours[self.head % self.history_hours, row]) if self.head is not None else 0.0
+        return SalesVelocityData(sku_id, [current], float(self._week_sum[row]) / HOURS_PER_WEEK,
+                                 last_count_timestamp, total_sales_since_count)
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    start = datetime(2026, 10, 5)           # a Monday
+    t0 = datetime_to_epoch_us(start)
+    rollup = VelocityRollup(n_skus=2)
+
+    # Two SKUs, 3 units an hour for 8 days (SKU 1 sells 1)
+    hours = np.arange(8 * 24)
+    sku = np.concatenate([np.zeros(hours.size, dtype=int), np.ones(hours.size, dtype=int)])
+    ts = np.concatenate([hours, hours]) * HOUR_US + t0 + 60_000_000
+    qty = np.concatenate([np.full(hours.size, 3.0), np.ones(hours.size)])
+    order = np.argsort(ts, kind='stable')
+    rows = rollup.add(sku[order], ts[order], qty[order])
+    for window, columns in rows.items():
+        print(f"{window:<7} {columns['sku'].size:>4} rows, "
+              f"SKU 0 first: {columns['units_sold'][0]:.0f} units, "
+              f"{columns['avg_velocity'][0]:.2f}/h")
+
+    print(f"\n7-day average: {rollup.seven_day_average()} (expect [3, 1])")
+    print(f"Open hour:     {rollup.current_hour_sales()}")
+
+    # An offline sale from day 2, synced late: reopens its hour, day, week
+    late = rollup.add([0], [t0 + 30 * HOUR_US + 5], [12.0])
+    for window, columns in late.items():
+        print(f"Reopened {window:<7} units_sold={columns['units_sold'][0]:.0f}")
+    print(f"late={rollup.late}, dropped={rollup.dropped}")
+
+    # A device clock a year ahead: skipped, the open hour stays put
+    head = rollup.head
+    rollup.add([1], [t0 + 365 * 24 * HOUR_US], [1.0])
+    print(f"future={rollup.future}, open hour unchanged: {rollup.head == head}")
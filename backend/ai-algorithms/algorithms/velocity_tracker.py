@@ -0,0 +1,242 @@
+"""
+Smart Loss Control - Ring-Buffer Sales Velocity Tracker
+========================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Keeps the last 7 days (168 hours) of sales for ONE SKU in a
+fixed-size array of hourly buckets, so that:
+
+• recording a sale is O(1)
+• "sales this hour" is an O(1) read
+• the 7-day hourly average is an O(1) read (running sum / 168)
+
+The tracker exposes the same attributes the anomaly engine reads
+from SalesVelocityData (current_hour_sales, seven_day_average,
+last_count_timestamp, total_sales_since_count), so it can be passed
+straight to AnomalyDetectionEngine.should_trigger_count without a
+7-day aggregate query per SKU.
+"""
+
+from typing import List, Optional
+from datetime import datetime, timezone
+import itertools
+
+import numpy as np
+
+
+# Reference point for turning datetimes into absolute hour numbers
+_EPOCH = datetime(1970, 1, 1)
+
+# Process-wide so two trackers (e.g. before and after a restore) never
+# share a version number
+_VERSIONS = itertools.count(1)
+
+
+def hour_index(timestamp: datetime) -> int:
+    """Absolute hour number of a timestamp (hours since 1970-01-01)."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((timestamp - _EPOCH).total_seconds() // 3600)
+
+
+# -------------------------------------------------------------------
+# CORE CLASS: SalesVelocityTracker
+# -------------------------------------------------------------------
+
+class SalesVelocityTracker:
+    """Fixed-size hourly ring buffer for one product (SKU)"""
+
+    # One week of hourly buckets
+    WINDOW_HOURS = 168
+
+    def __init__(self, sku_id: str, last_count_timestamp: datetime,
+                 window_hours: int = WINDOW_HOURS):
+        self.sku_id = sku_id
+        self.window_hours = window_hours
+
+        # Bucket for absolute hour h lives at index h % window_hours
+        self._buckets = np.zeros(window_hours, dtype=np.float64)
+
+        # Absolute hour of the newest bucket (None until first event)
+        self._head_hour: Optional[int] = None
+
+        # Sum of every bucket currently inside the window
+        self._window_sum = 0.0
+
+        self.last_count_timestamp = last_count_timestamp
+        self.total_sales_since_count = 0
+
+        # Changes whenever a sale or count changes the trigger inputs
+        # (decision_cache.py keys cached decisions on it)
+        self.version = next(_VERSIONS)
+
+
+    @classmethod
+    def from_window(cls, sku_id: str, last_count_timestamp: datetime,
+                    buckets: np.ndarray, head_hour: Optional[int],
+                    window_sum: float,
+                    total_sales_since_count: float = 0) -> 'SalesVelocityTracker':
+        """
+        Rebuild a tracker from a saved window (see checkpoint.py).
+        `buckets` is used as-is, not copied; `window_sum` is restored
+        rather than re-added so averages match the saved tracker exactly.
+        """
+        tracker = cls.__new__(cls)
+        tracker.sku_id = sku_id
+        tracker.window_hours = len(buckets)
+        tracker._buckets = buckets
+        tracker._head_hour = head_hour
+        tracker._window_sum = window_sum
+        tracker.last_count_timestamp = last_count_timestamp
+        tracker.total_sales_since_count = total_sales_since_count
+        tracker.version = next(_VERSIONS)
+        return tracker
+
+
+    # ---------------------------------------------------------------
+    # WINDOW MAINTENANCE
+    # ---------------------------------------------------------------
+
+    def advance(self, now: datetime) -> None:
+        """
+        Roll the window forward so the newest bucket is `now`'s hour.
+
+        Buckets that fall out of the window are zeroed and removed from
+        the running sum (clamped at zero). At most window_hours buckets
+        are touched, so the cost is bounded no matter how much time has
+        passed.
+        """
+        self._advance_to(hour_index(now))
+
+    def _advance_to(self, hour: int) -> None:
+        if self._head_hour is None:
+            self._head_hour = hour
+            return
+
+        steps = hour - self._head_hour
+        if steps <= 0:
+            return
+
+        if steps >= self.window_hours:
+            # Everything expired: start from a clean window
+            self._buckets[:] = 0.0
+            self._window_sum = 0.0
+        else:
+            for h in range(self._head_hour + 1, hour + 1):
+                slot = h % self.window_hours
+                self._window_sum -= self._buckets[slot]
+                self._buckets[slot] = 0.0
+            # Fractional quantities leave rounding in the running sum;
+            # never let it go below zero (0 > 2 × negative would be a
+            # VOLUME spike on an hour with no sales)
+            self._window_sum = max(self._window_sum, 0.0)
+
+        self._head_hour = hour
+
+
+    # ---------------------------------------------------------------
+    # EVENTS
+    # ---------------------------------------------------------------
+
+    def record_sale(self, timestamp: datetime, quantity: float = 1) -> bool:
+        """
+        Add a sale to its hourly bucket.
+
+        Sales newer than the window move it forward; late (offline)
+        sales still inside the window land in their own hour. Sales
+        older than the whole window are ignored for velocity.
+
+        Returns:
+            True if the sale was counted in the window
+        """
+        hour = hour_index(timestamp)
+        self._advance_to(hour)
+        self.version = next(_VERSIONS)
+
+        # Units sold since the last count are tracked regardless
+        if timestamp > self.last_count_timestamp:
+            self.total_sales_since_count += quantity
+
+        if hour <= self._head_hour - self.window_hours:
+            return False
+
+        self._buckets[hour % self.window_hours] += quantity
+        self._window_sum += quantity
+        return True
+
+    def record_count(self, timestamp: datetime) -> None:
+        """A physical count happened: reset the since-count counter."""
+        if timestamp >= self.last_count_timestamp:
+            self.last_count_timestamp = timestamp
+            self.total_sales_since_count = 0
+            self.version = next(_VERSIONS)
+
+
+    # ---------------------------------------------------------------
+    # O(1) READS (same names as SalesVelocityData)
+    # ---------------------------------------------------------------
+
+    @property
+    def current_hour_sales(self) -> float:
+        """Sales in the newest hourly bucket."""
+        if self._head_hour is None:
+            return 0
+        return float(self._buckets[self._head_hour % self.window_hours])
+
+    @property
+    def seven_day_average(self) -> float:
+        """Average hourly sales across the whole window."""
+        return self._window_sum / self.window_hours
+
+    @property
+    def hourly_sales(self) -> List[float]:
+        """
+        Chronological copy of the window, oldest hour first.
+        Only for reporting — this one is O(window_hours).
+        """
+        if self._head_hour is None:
+            return []
+        start = (self._head_hour + 1) % self.window_hours
+        return np.roll(self._buckets, -start).tolist()
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from datetime import timedelta
+
+    from anomaly_detection_v2 import AnomalyDetectionEngine
+
+    now = datetime(2026, 2, 16, 15, 0)
+
+    tracker = SalesVelocityTracker(
+        "KINGS_5L", last_count_timestamp=now - timedelta(hours=2)
+    )
+
+    # A quiet week: 5 sales every hour
+    for hours_ago in range(167, 0, -1):
+        tracker.record_sale(now - timedelta(hours=hours_ago), quantity=5)
+
+    # ...then a spike in the current hour
+    tracker.record_sale(now + timedelta(minutes=10), quantity=15)
+
+    print(f"Current hour:   {tracker.current_hour_sales:.1f}")
+    print(f"7-day average:  {tracker.seven_day_average:.2f}")
+    print(f"Since count:    {tracker.total_sales_since_count}")
+
+    engine = AnomalyDetectionEngine({'random_probability': 0.0})
+    decision = engine.should_trigger_count(
+        tracker, now + timedelta(minutes=20),
+        tracker.total_sales_since_count
+    )
+    print(f"Trigger: {decision.get('type')} - {decision.get('reason')}")
+
+    # A day later the spike has not expired, but the hour has moved on
+    engine.should_trigger_count(tracker, now + timedelta(days=1))
+    print(f"Next day current hour: {tracker.current_hour_sales:.1f}")
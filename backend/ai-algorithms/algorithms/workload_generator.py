@@ -0,0 +1,564 @@
+"""
+Smart Loss Control - Synthetic Workload Generator
+==================================================
+
+Author: Data Science Team
+Date: October 17, 2026
+
+WHAT THIS FILE DOES:
+Grows test-data/simulation_dataset.json into N shops × M SKUs × D days
+so the engines can be measured at fleet volume.
+
+Each shop-day gets:
+• sales that follow a morning / evening rush curve
+• decants (bulk cartons broken onto the shelf)
+• supplier restocks, a few with short deliveries
+• offline bursts: sales saved on the device, delivered after a sync
+• quick counts every few hours plus an end-of-day count per SKU
+• injected THEFT_EVENTs (unlogged removals) at known positions
+
+Everything is generated as NumPy columns first (fast, compact), then
+turned into the JSON dataset shape on request. The same seed always
+gives the same workload.
+"""
+
+from typing import Dict, Iterator, List
+from datetime import date
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from event_replay import EVENT_TYPES
+
+
+# -------------------------------------------------------------------
+# PRODUCT CATALOGUE (brands and sizes from the simulation dataset)
+# -------------------------------------------------------------------
+
+CATALOGUE = [
+    # (sku code, brand, size, litres, sell price USD, cost price USD)
+    ('KINGS_5L', "King's Oil", '5L', 5, 14.00, 12.33),
+    ('KINGS_1L', "King's Oil", '1L', 1, 3.20, 2.75),
+    ('MAMADOR_2L', 'Mamador', '2L', 2, 6.67, 5.67),
+    ('MAMADOR_1L', 'Mamador', '1L', 1, 3.47, 3.00),
+    ('GOLDENTERRA_3L', 'Golden Terra', '3L', 3, 9.33, 8.00),
+    ('DEVONKINGS_5L', 'Devon Kings', '5L', 5, 13.50, 11.90),
+    ('DEVONKINGS_3L', 'Devon Kings', '3L', 3, 8.60, 7.40),
+]
+
+# Relative sales weight of each opening hour (06:00 → 20:00)
+OPEN_HOUR = 6
+CLOSE_HOUR = 21
+HOURLY_CURVE = np.array([
+    0.6, 1.4, 1.8, 1.3, 0.9, 0.8, 1.0, 0.9,
+    0.7, 0.8, 1.0, 1.6, 1.9, 1.3, 0.6
+])
+
+TYPE_CODE = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+
+# -------------------------------------------------------------------
+# DATA MODEL: Workload
+# -------------------------------------------------------------------
+
+@dataclass
+class Workload:
+    """A generated workload: lookup tables plus event columns."""
+
+    seed: int
+    start_date: date
+    days: int
+
+    shop_ids: List[str]
+    staff_ids: List[str]
+
+    # One row per (shop, SKU); `sku_shop` maps a row to its shop
+    sku_ids: List[str]
+    sku_shop: np.ndarray
+    sku_brand: List[str]
+    sku_size: List[str]
+    sell_price: np.ndarray
+    cost_price: np.ndarray
+    initial_litres: np.ndarray
+    initial_cartons: np.ndarray
+
+    # Event columns in ARRIVAL order (offline sales land after a sync)
+    #   timestamp  int64 epoch µs      shop / sku / staff  int32 index
+    #   type       int8 (EVENT_TYPES)  quantity            float64
+    #   unit_price float64             offline             bool
+    #   quantity_ordered (restocks), expected_quantity (counts),
+    #   cartons (decants), burst (offline burst id, -1 = none)
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.columns['timestamp'])
+
+    def theft_positions(self) -> np.ndarray:
+        """Row numbers (in arrival order) of the injected thefts."""
+        return np.flatnonzero(self.columns['type'] == TYPE_CODE['THEFT_EVENT'])
+
+    def shop_rows(self, shop: int) -> np.ndarray:
+        """Row numbers of one shop's events (arrival order kept)."""
+        return np.flatnonzero(self.columns['shop'] == shop)
+
+
+    # ---------------------------------------------------------------
+    # JSON SHAPES (same keys as simulation_dataset.json)
+    # ---------------------------------------------------------------
+
+    def initial_inventory(self, shop: int = None) -> List[Dict]:
+        rows = range(len(self.sku_ids)) if shop is None else \
+            np.flatnonzero(self.sku_shop == shop).tolist()
+        return [
+            {
+                'shop_id': self.shop_ids[self.sku_shop[i]],
+                'sku_id': self.sku_ids[i],
+                'brand': self.sku_brand[i],
+                'size': self.sku_size[i],
+                'quantity_cartons': int(self.initial_cartons[i]),
+                'quantity_litres': int(self.initial_litres[i]),
+                'cost_price_usd': float(self.cost_price[i]),
+                'sell_price_usd': float(self.sell_price[i])
+            }
+            for i in rows
+        ]
+
+    def iter_transactions(self, rows=None) -> Iterator[Dict]:
+        """Yield transaction dicts one at a time (constant memory)."""
+
+        c = self.columns
+        rows = range(self.size) if rows is None else rows
+
+        # Offline bursts: sync events list the ids they delivered
+        synced = {}
+        offline = np.flatnonzero(c['offline'])
+        for burst, row in zip(c['burst'][offline].tolist(), offline.tolist()):
+            synced.setdefault(burst, []).append(self._txn_id(row))
+
+        for row in rows:
+            yield self._transaction(int(row), synced)
+
+    def to_dataset(self) -> Dict:
+        """Whole workload as one simulation_dataset.json-shaped dict."""
+
+        transactions = list(self.iter_transactions())
+        type_counts = np.bincount(self.columns['type'], minlength=len(EVENT_TYPES))
+
+        return {
+            'simulation_metadata': {
+                'description': 'Generated workload (workload_generator.py)',
+                'shops': self.shop_ids,
+                'date': self.start_date.isoformat(),
+                'simulation_duration_hours': 24 * self.days,
+                'total_transactions': len(transactions),
+                'theft_events': int(type_counts[TYPE_CODE['THEFT_EVENT']]),
+                'seed': self.seed
+            },
+            'initial_inventory': self.initial_inventory(),
+            'transactions': transactions,
+            'theft_labels': [
+                {
+                    'transaction_id': self._txn_id(row),
+                    'position': int(row),
+                    'shop_id': self.shop_ids[self.columns['shop'][row]],
+                    'sku_id': self.sku_ids[self.columns['sku'][row]],
+                    'timestamp': self._iso(row),
+                    'quantity': float(self.columns['quantity'][row])
+                }
+                for row in self.theft_positions().tolist()
+            ]
+        }
+
+    @staticmethod
+    def _txn_id(row: int) -> str:
+        return f'TXN_{row + 1:07d}'
+
+    def _iso(self, row: int) -> str:
+        stamp = np.datetime64(int(self.columns['timestamp'][row]), 'us')
+        return stamp.astype('datetime64[s]').item().isoformat()
+
+    def _transaction(self, row: int, synced: Dict) -> Dict:
+        c = self.columns
+        etype = EVENT_TYPES[c['type'][row]]
+        sku = int(c['sku'][row])
+
+        txn = {
+            'transaction_id': self._txn_id(row),
+            'shop_id': self.shop_ids[c['shop'][row]],
+            'timestamp': self._iso(row),
+            'type': etype,
+            'staff_id': self.staff_ids[c['staff'][row]],
+        }
+        if sku >= 0:
+            txn['sku_id'] = self.sku_ids[sku]
+
+        quantity = float(c['quantity'][row])
+
+        if etype == 'sale':
+            price = float(c['unit_price'][row])
+            txn.update({
+                'quantity': quantity,
+                'unit_price': price,
+                'total_amount': round(quantity * price, 2),
+                'offline': bool(c['offline'][row])
+            })
+            if c['offline'][row]:
+                txn['sync_status'] = 'pending'
+
+        elif etype == 'decant':
+            txn.update({
+                'cartons_broken': int(c['cartons'][row]),
+                'litres_added': quantity
+            })
+
+        elif etype == 'restock':
+            ordered = float(c['quantity_ordered'][row])
+            cost = float(c['unit_price'][row])
+            txn.update({
+                'quantity_ordered': ordered,
+                'quantity_received': quantity,
+                'discrepancy': quantity - ordered,
+                'cost_price_usd': cost,
+                'total_cost_usd': round(quantity * cost, 2)
+            })
+
+        elif etype == 'quick_count':
+            expected = float(c['expected_quantity'][row])
+            txn.update({
+                'expected_quantity': expected,
+                'actual_quantity': quantity,
+                'variance': quantity - expected
+            })
+
+        elif etype == 'sync':
+            txn['synced_transactions'] = synced.get(int(c['burst'][row]), [])
+
+        elif etype == 'THEFT_EVENT':
+            txn.update({'quantity': quantity, 'detection_target': True})
+
+        return txn
+
+
+# -------------------------------------------------------------------
+# GENERATOR
+# -------------------------------------------------------------------
+
+def generate_workload(shops: int = 1, skus_per_shop: int = 4, days: int = 1,
+                      seed: int = 2026, start_date: date = date(2026, 2, 16),
+                      staff_per_shop: int = 2,
+                      mean_daily_sales: float = 6.0,
+                      theft_rate: float = 0.02,
+                      offline_rate: float = 0.3,
+                      restock_rate: float = 0.15,
+                      short_delivery_rate: float = 0.1,
+                      decant_rate: float = 0.2,
+                      count_interval_hours: int = 4) -> Workload:
+    """
+    Generate a reproducible N shops × M SKUs × D days workload.
+
+    Rates are probabilities per SKU-day (theft, restock, decant) or
+    per shop-day (offline burst). `mean_daily_sales` is the average
+    number of sale events per SKU per day; each SKU gets its own
+    popularity around it.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_skus = shops * skus_per_shop
+
+    # ---------------------------------------------------------------
+    # Lookup tables
+    # ---------------------------------------------------------------
+
+    shop_ids = [f'SHOP_{s + 1:04d}' for s in range(shops)]
+
+    staff_ids = ['system', 'unknown']
+    for s in range(shops):
+        staff_ids.append(f'OWNER_{s + 1:04d}')
+        staff_ids.extend(f'STAFF_{s + 1:04d}_{k + 1}' for k in range(staff_per_shop))
+    owner_index = 2 + np.arange(shops) * (staff_per_shop + 1)
+
+    product = np.arange(n_skus) % len(CATALOGUE)
+    sku_shop = np.repeat(np.arange(shops), skus_per_shop).astype(np.int32)
+    sku_ids = [
+        f'{CATALOGUE[p][0]}_{i // skus_per_shop + 1:04d}_{i % skus_per_shop + 1:03d}'
+        for i, p in enumerate(product.tolist())
+    ]
+    sell_price = np.array([CATALOGUE[p][4] for p in product])
+    cost_price = np.array([CATALOGUE[p][5] for p in product])
+
+    # Opening stock in litres, of which whole 12-litre cartons are the
+    # sealed part: cartons × 12 never exceeds the total
+    initial_cartons = rng.integers(2, 12, n_skus)
+    initial_litres = rng.integers(4, 16, n_skus) * 12
+    initial_cartons = np.minimum(initial_cartons, initial_litres // 12)
+
+    # Per-SKU popularity (lognormal around the mean)
+    popularity = mean_daily_sales * rng.lognormal(0.0, 0.5, n_skus)
+
+    day_start = (
+        np.datetime64(start_date, 'us').astype(np.int64)
+        + np.arange(days, dtype=np.int64) * 86_400_000_000
+    )
+    hour_us = 3_600_000_000
+    open_hours = CLOSE_HOUR - OPEN_HOUR
+
+    def stamp(day, hour_float):
+        return day_start[day] + (hour_float * hour_us).astype(np.int64)
+
+    parts = []
+
+    def add(**cols):
+        parts.append(cols)
+
+    # ---------------------------------------------------------------
+    # Sales: Poisson count per SKU-day, times from the intraday curve
+    # ---------------------------------------------------------------
+
+    per_sku_day = rng.poisson(np.repeat(popularity, days))
+    sale_sku = np.repeat(np.repeat(np.arange(n_skus), days), per_sku_day)
+    sale_day = np.repeat(np.tile(np.arange(days), n_skus), per_sku_day)
+    n_sales = sale_sku.size
+
+    curve = HOURLY_CURVE / HOURLY_CURVE.sum()
+    sale_hour = rng.choice(open_hours, n_sales, p=curve) + rng.random(n_sales)
+    # Whole seconds, like the simulation dataset
+    sale_ts = stamp(sale_day, OPEN_HOUR + sale_hour) // 1_000_000 * 1_000_000
+
+    # Staff work consecutive blocks of the opening hours
+    shift = np.minimum((sale_hour * staff_per_shop / open_hours).astype(np.int64),
+                       staff_per_shop - 1)
+    sale_staff = owner_index[sku_shop[sale_sku]] + 1 + shift
+
+    add(timestamp=sale_ts, sku=sale_sku, staff=sale_staff,
+        type=TYPE_CODE['sale'],
+        quantity=(1 + rng.poisson(0.8, n_sales)).astype(np.float64),
+        unit_price=sell_price[sale_sku])
+
+    # ---------------------------------------------------------------
+    # Decants (morning) and restocks (afternoon)
+    # ---------------------------------------------------------------
+
+    sku_day_sku = np.repeat(np.arange(n_skus), days)
+    sku_day_day = np.tile(np.arange(days), n_skus)
+
+    pick = rng.random(sku_day_sku.size) < decant_rate
+    cartons = rng.integers(1, 3, pick.sum())
+    add(timestamp=stamp(sku_day_day[pick], 0.5 + OPEN_HOUR + rng.random(pick.sum()) * 2)
+        // 1_000_000 * 1_000_000,
+        sku=sku_day_sku[pick],
+        staff=owner_index[sku_shop[sku_day_sku[pick]]] + 1,
+        type=TYPE_CODE['decant'], quantity=(cartons * 12).astype(np.float64),
+        cartons=cartons)
+
+    pick = rng.random(sku_day_sku.size) < restock_rate
+    n_restock = pick.sum()
+    ordered = (rng.integers(2, 6, n_restock) * 12).astype(np.float64)
+    short = rng.random(n_restock) < short_delivery_rate
+    received = ordered - short * rng.integers(1, 7, n_restock)
+    add(timestamp=stamp(sku_day_day[pick], 14 + rng.random(n_restock) * 3)
+        // 1_000_000 * 1_000_000,
+        sku=sku_day_sku[pick], staff=owner_index[sku_shop[sku_day_sku[pick]]],
+        type=TYPE_CODE['restock'], quantity=received,
+        unit_price=cost_price[sku_day_sku[pick]], quantity_ordered=ordered)
+
+    # ---------------------------------------------------------------
+    # Theft: unlogged removals at known positions
+    # ---------------------------------------------------------------
+
+    pick = rng.random(sku_day_sku.size) < theft_rate
+    n_theft = pick.sum()
+    add(timestamp=stamp(sku_day_day[pick], OPEN_HOUR + rng.random(n_theft) * open_hours)
+        // 1_000_000 * 1_000_000,
+        sku=sku_day_sku[pick], staff=np.ones(n_theft, dtype=np.int64),
+        type=TYPE_CODE['THEFT_EVENT'],
+        quantity=rng.integers(1, 3, n_theft).astype(np.float64))
+
+    # ---------------------------------------------------------------
+    # Quick counts: one random SKU per shop every few hours, plus an
+    # end-of-day count of every SKU at closing
+    # ---------------------------------------------------------------
+
+    count_hours = np.arange(OPEN_HOUR + 2, CLOSE_HOUR, count_interval_hours)
+    slots = np.array(np.meshgrid(np.arange(shops), np.arange(days),
+                                 count_hours, indexing='ij')).reshape(3, -1)
+    slot_sku = slots[0] * skus_per_shop + rng.integers(0, skus_per_shop, slots.shape[1])
+    eod_sku, eod_day = sku_day_sku, sku_day_day
+
+    count_sku = np.concatenate([slot_sku, eod_sku])
+    count_ts = np.concatenate([
+        stamp(slots[1], slots[2].astype(np.float64)),
+        stamp(eod_day, np.full(eod_day.size, float(CLOSE_HOUR)))
+    ])
+    add(timestamp=count_ts, sku=count_sku,
+        staff=owner_index[sku_shop[count_sku]] + staff_per_shop,
+        type=TYPE_CODE['quick_count'])
+
+    # ---------------------------------------------------------------
+    # Assemble, fill the per-event columns
+    # ---------------------------------------------------------------
+
+    n = sum(len(p['timestamp']) for p in parts)
+    columns = {
+        'timestamp': np.empty(n, dtype=np.int64),
+        'shop': np.empty(n, dtype=np.int32),
+        'sku': np.empty(n, dtype=np.int32),
+        'staff': np.empty(n, dtype=np.int32),
+        'type': np.empty(n, dtype=np.int8),
+        'quantity': np.zeros(n, dtype=np.float64),
+        'unit_price': np.zeros(n, dtype=np.float64),
+        'offline': np.zeros(n, dtype=bool),
+        'quantity_ordered': np.zeros(n, dtype=np.float64),
+        'expected_quantity': np.zeros(n, dtype=np.float64),
+        'cartons': np.zeros(n, dtype=np.int16),
+        'burst': np.full(n, -1, dtype=np.int32),
+    }
+
+    start = 0
+    for part in parts:
+        end = start + len(part['timestamp'])
+        for name, values in part.items():
+            columns[name][start:end] = values
+        start = end
+    columns['shop'][:] = sku_shop[columns['sku']]
+
+    columns = _add_offline_bursts(columns, rng, shops, days, day_start,
+                                  offline_rate, hour_us)
+    _fill_counts(columns, initial_litres)
+
+    # Arrival order: by arrival time, then event time
+    order = np.lexsort((columns['timestamp'], columns.pop('arrival')))
+    columns = {name: values[order] for name, values in columns.items()}
+
+    return Workload(
+        seed=seed, start_date=start_date, days=days,
+        shop_ids=shop_ids, staff_ids=staff_ids,
+        sku_ids=sku_ids, sku_shop=sku_shop,
+        sku_brand=[CATALOGUE[p][1] for p in product],
+        sku_size=[CATALOGUE[p][2] for p in product],
+        sell_price=sell_price, cost_price=cost_price,
+        initial_litres=initial_litres, initial_cartons=initial_cartons,
+        columns=columns
+    )
+
+
+def _add_offline_bursts(columns, rng, shops, days, day_start,
+                        offline_rate, hour_us):
+    """Mark sales inside offline windows and add one sync per window."""
+
+    ts = columns['timestamp']
+    arrival = ts.copy()
+
+    shop_day = np.array(np.meshgrid(np.arange(shops), np.arange(days),
+                                    indexing='ij')).reshape(2, -1)
+    pick = rng.random(shop_day.shape[1]) < offline_rate
+    burst_shop, burst_day = shop_day[0][pick], shop_day[1][pick]
+    n_bursts = burst_shop.size
+
+    begin = day_start[burst_day] + (
+        (OPEN_HOUR + rng.random(n_bursts) * (CLOSE_HOUR - OPEN_HOUR - 1)) * hour_us
+    ).astype(np.int64) // 1_000_000 * 1_000_000
+    end = begin + rng.integers(20, 61, n_bursts) * 60_000_000
+
+    # At most one burst per shop-day: look each sale's burst up directly
+    burst_of = np.full((shops, days), -1, dtype=np.int64)
+    burst_of[burst_shop, burst_day] = np.arange(n_bursts)
+
+    day = np.clip((ts - day_start[0]) // 86_400_000_000, 0, days - 1)
+    burst = burst_of[columns['shop'], day]
+    safe = np.maximum(burst, 0)
+    inside = (
+        (columns['type'] == TYPE_CODE['sale']) & (burst >= 0)
+        & (ts >= begin[safe]) & (ts < end[safe])
+    ) if n_bursts else np.zeros(ts.size, dtype=bool)
+
+    columns['offline'][inside] = True
+    columns['burst'][inside] = burst[inside]
+    arrival[inside] = end[burst[inside]]
+
+    sync = {
+        'timestamp': end, 'shop': burst_shop.astype(np.int32),
+        'sku': np.full(n_bursts, -1, dtype=np.int32),
+        'staff': np.zeros(n_bursts, dtype=np.int32),
+        'type': np.full(n_bursts, TYPE_CODE['sync'], dtype=np.int8),
+        'burst': np.arange(n_bursts, dtype=np.int32),
+    }
+
+    merged = {}
+    for name, values in columns.items():
+        extra = sync.get(name, np.zeros(n_bursts, dtype=values.dtype))
+        merged[name] = np.concatenate([values, extra])
+    # Syncs arrive a hair before the events they deliver
+    merged['arrival'] = np.concatenate([arrival, end - 1])
+    return merged
+
+
+def _fill_counts(columns, initial_litres) -> None:
+    """
+    Set expected (book) and actual quantity on every quick_count.
+
+    Book stock moves with sales, restocks and decants; thefts only
+    move the real shelf, so actual = book - thefts so far.
+    """
+
+    etype = columns['type']
+    quantity = columns['quantity']
+
+    book_delta = np.zeros(etype.size)
+    book_delta[etype == TYPE_CODE['sale']] = -quantity[etype == TYPE_CODE['sale']]
+    for name in ('restock', 'decant'):
+        book_delta[etype == TYPE_CODE[name]] = quantity[etype == TYPE_CODE[name]]
+    theft_delta = np.where(etype == TYPE_CODE['THEFT_EVENT'], quantity, 0.0)
+
+    has_sku = columns['sku'] >= 0
+    rows = np.flatnonzero(has_sku)
+
+    # Group by SKU, then time; at equal times counts go last
+    is_count = etype[rows] == TYPE_CODE['quick_count']
+    order = rows[np.lexsort((is_count, columns['timestamp'][rows], columns['sku'][rows]))]
+    sku = columns['sku'][order]
+
+    book = np.cumsum(book_delta[order])
+    theft = np.cumsum(theft_delta[order])
+    first = np.r_[True, sku[1:] != sku[:-1]]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(order.size), 0))
+    book -= (book - book_delta[order])[group_start]
+    theft -= (theft - theft_delta[order])[group_start]
+
+    counts = etype[order] == TYPE_CODE['quick_count']
+    expected = initial_litres[sku[counts]] + book[counts]
+    columns['expected_quantity'][order[counts]] = expected
+    columns['quantity'][order[counts]] = expected - theft[counts]
+
+
+# -------------------------------------------------------------------
+# QUICK TEST SECTION
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    import time
+
+    from event_replay import InventoryReplayEngine
+
+    start = time.perf_counter()
+    workload = generate_workload(shops=100, skus_per_shop=20, days=7)
+    elapsed = time.perf_counter() - start
+
+    counts = np.bincount(workload.columns['type'], minlength=len(EVENT_TYPES))
+    print(f"Generated {workload.size:,} events in {elapsed:.2f}s")
+    for name, count in zip(EVENT_TYPES, counts.tolist()):
+        print(f"  {name:<12} {count:>9,}")
+
+    # Replaying one shop must see exactly the injected thefts
+    shop = 0
+    engine = InventoryReplayEngine.from_initial_inventory(workload.initial_inventory(shop))
+    engine.apply_batch(workload.iter_transactions(workload.shop_rows(shop)))
+
+    thefts = workload.theft_positions()
+    thefts = thefts[workload.columns['shop'][thefts] == shop]
+    injected = workload.columns['quantity'][thefts].sum()
+    found = -sum(s['variance'] for s in engine.inventory_snapshots().values())
+
+    print(f"Shop {workload.shop_ids[shop]}: injected {injected:.0f} "
+          f"units stolen, replay found {found:.0f}")
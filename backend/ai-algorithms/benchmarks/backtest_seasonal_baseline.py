@@ -0,0 +1,136 @@
+"""
+Smart Loss Control - Seasonal Baseline Backtest
+================================================
+
+Replays generated sales hour by hour and compares the VOLUME trigger
+with three baselines:
+  1. flat: 2× the trailing 7-day hourly average (current behaviour)
+  2. hour ×2: 2× the SKU's EWMA for the same hour of day
+  3. hour z: z-score against the same hour's EWMA mean / std
+
+The generator's opening-hours curve (morning and evening rushes) is
+normal trade, so every VOLUME trigger on unmodified hours counts as a
+false positive. A few SKU-hours get extra units injected (a burst of
+unrecorded stock leaving) to measure how many real spikes each
+baseline still catches.
+
+All decisions go through AnomalyDetectionEngine.should_trigger_counts
+(RANDOM / TIME / COUNTER switched off).
+
+Run:
+    python benchmarks/backtest_seasonal_baseline.py [shops] [skus_per_shop] [days]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, datetime_to_epoch_us
+from seasonal_baseline import SeasonalBaseline
+from velocity_tracker import hour_index
+from workload_generator import CLOSE_HOUR, OPEN_HOUR, TYPE_CODE, generate_workload
+
+WARMUP_DAYS = 14
+SPIKE_RATE = 0.005        # Share of open SKU-hours given a spike
+SPIKE_FACTOR = 3.0        # Injected units = factor × that hour's usual sales
+
+
+def hourly_units(workload, start):
+    """(SKUs × hours) matrix of units sold."""
+    c = workload.columns
+    sales = c['type'] == TYPE_CODE['sale']
+    start_us = datetime_to_epoch_us(start)
+    hour = (c['timestamp'][sales] - start_us) // 3_600_000_000
+    hours = workload.days * 24
+    n = len(workload.sku_shop)
+    flat = np.bincount(c['sku'][sales] * hours + hour,
+                       weights=c['quantity'][sales], minlength=n * hours)
+    return flat.reshape(n, hours)
+
+
+def inject_spikes(hourly, rng):
+    """Add bursts to random open hours after warm-up; returns the mask."""
+    n, hours = hourly.shape
+    hod = np.arange(hours) % 24
+    open_hour = (hod >= OPEN_HOUR) & (hod < CLOSE_HOUR)
+    eligible = np.zeros(hourly.shape, dtype=bool)
+    eligible[:, WARMUP_DAYS * 24:] = open_hour[WARMUP_DAYS * 24:]
+
+    spikes = eligible & (rng.random(hourly.shape) < SPIKE_RATE)
+
+    # "Usual" = the SKU's average for that hour of day over the run
+    usual = hourly.reshape(n, -1, 24).mean(axis=1)[:, hod]
+    spiked = hourly + spikes * np.ceil(SPIKE_FACTOR * np.maximum(usual, 1.0))
+    return spiked, spikes, eligible
+
+
+def backtest(hourly, start, engines):
+    """
+    Walk the evaluation hours; return {name: flags (SKUs × hours)}.
+    The seasonal table only ever sees hours before the one checked.
+    """
+    n, hours = hourly.shape
+    first = hour_index(start)
+    table = SeasonalBaseline(n)
+    table.fit_hourly(hourly[:, :WARMUP_DAYS * 24], first)
+
+    never = np.full(n, start)          # TIME trigger is disabled anyway
+    flags = {name: np.zeros(hourly.shape, dtype=bool) for name in engines}
+
+    for t in range(WARMUP_DAYS * 24, hours):
+        now = start + timedelta(hours=t)
+        recent = hourly[:, t]
+        flat = hourly[:, t - 168:t].sum(axis=1) / 168
+        mean, std = table.baseline(np.arange(n), t % 24)
+
+        for name, (engine, seasonal) in engines.items():
+            result = engine.should_trigger_counts(
+                recent, flat, never, now,
+                baseline_mean=mean if seasonal else None,
+                baseline_std=std if seasonal else None)
+            flags[name][:, t] = result['type'] == 2     # VOLUME
+
+        table.fit_hourly(hourly[:, t:t + 1], first + t)
+
+    return flags
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 42
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days,
+                                 mean_daily_sales=20.0)
+    start = datetime.combine(workload.start_date, datetime.min.time())
+    hourly, spikes, eligible = inject_spikes(hourly_units(workload, start),
+                                             np.random.default_rng(7))
+
+    quiet = {'random_probability': 0.0, 'time_threshold_hours': 1e9,
+             'sales_counter_max': 1 << 60}
+    engines = {
+        'flat 2× 7-day avg': (AnomalyDetectionEngine(quiet), False),
+        'hour-of-day 2× mean': (AnomalyDetectionEngine(quiet), True),
+        'hour-of-day z > 3': (AnomalyDetectionEngine({**quiet, 'volume_test': 'zscore'}), True),
+    }
+
+    began = time.perf_counter()
+    flags = backtest(hourly, start, engines)
+    elapsed = time.perf_counter() - began
+
+    normal = eligible & ~spikes
+    print(f"{shops} shops × {skus} SKUs, {days} days ({WARMUP_DAYS} warm-up): "
+          f"{normal.sum():,} normal open SKU-hours, {spikes.sum():,} injected spikes "
+          f"({elapsed:.1f} s)\n")
+    print(f"  {'baseline':<22}{'false positives':>18}{'FP rate':>10}{'spikes caught':>16}")
+    for name, flagged in flags.items():
+        fp = (flagged & normal).sum()
+        caught = (flagged & spikes).sum()
+        print(f"  {name:<22}{fp:>18,}{fp / normal.sum():>10.2%}"
+              f"{caught / max(spikes.sum(), 1):>16.1%}")
@@ -0,0 +1,111 @@
+"""
+Smart Loss Control - Transaction Archive Load Benchmark
+========================================================
+
+A year of history for one shop, loaded two ways:
+  1. json.load of the simulation_dataset.json-shaped export
+  2. TransactionArchive (memory-mapped binary columns)
+
+Both are followed by the same first analysis: per-SKU sales totals
+and the theft-pattern check on the busiest staff member's sales.
+
+Run:
+    python benchmarks/bench_archive.py [days] [skus]
+"""
+
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, to_epoch_us
+from transaction_archive import TransactionArchive, convert_json, write_workload
+from workload_generator import generate_workload
+
+
+def best_of(fn, repeat=5):
+    """Fastest of `repeat` runs (ms) and the last result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+def from_json(path):
+    with open(path) as f:
+        data = json.load(f)
+
+    sold = {}
+    by_staff = {}
+    for txn in data['transactions']:
+        if txn['type'] == 'sale':
+            sold[txn['sku_id']] = sold.get(txn['sku_id'], 0) + txn['quantity']
+            by_staff.setdefault(txn['staff_id'], []).append(txn)
+
+    staff = max(by_staff, key=lambda s: len(by_staff[s]))
+    log = sorted(by_staff[staff], key=lambda t: t['timestamp'])
+    shift_end = datetime.fromisoformat(log[-1]['timestamp'])
+    risk = AnomalyDetectionEngine().detect_theft_patterns_fast(log, shift_end)
+    return sold, risk
+
+
+def from_archive(path):
+    archive = TransactionArchive(path)
+    sold = archive.stock_totals()['units_sold']
+
+    sales = archive.mask(type='sale')
+    staff = np.bincount(archive['staff'][sales]).argmax()
+    epochs = archive.sales_epochs(staff=archive.staff_ids[staff])
+    shift_end = np.datetime64(int(epochs[-1]), 'us').item()
+    risk = AnomalyDetectionEngine().detect_theft_patterns_fast(
+        epochs, shift_end, assume_sorted=True)
+    return sold, risk
+
+
+if __name__ == "__main__":
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    workload = generate_workload(shops=1, skus_per_shop=skus, days=days)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        json_path = tmp / 'history.json'
+        json_path.write_text(json.dumps(workload.to_dataset()))
+        archive_path = write_workload(tmp / 'history.slca', workload)
+
+        # The JSON converter must give the same columns
+        converted = TransactionArchive(convert_json(json_path, tmp / 'converted.slca'))
+        direct = TransactionArchive(archive_path)
+        for name in ('timestamp', 'type', 'quantity', 'unit_price', 'offline',
+                     'quantity_ordered', 'expected_quantity', 'cartons'):
+            assert np.array_equal(converted[name], direct[name]), name
+        assert np.array_equal(to_epoch_us(direct.timestamps()), direct['timestamp'])
+
+        print(f"One shop, {skus} SKUs, {days} days: {workload.size:,} events")
+        print(f"  JSON file     {json_path.stat().st_size / 2**20:8.1f} MiB")
+        print(f"  archive file  {archive_path.stat().st_size / 2**20:8.1f} MiB")
+
+        t_json_load, _ = best_of(lambda: json.loads(json_path.read_text()), 3)
+        t_open, _ = best_of(lambda: TransactionArchive(archive_path), 20)
+        t_json, (sold_json, risk_json) = best_of(lambda: from_json(json_path), 3)
+        t_arch, (sold_arch, risk_arch) = best_of(lambda: from_archive(archive_path), 20)
+
+        for i, sku_id in enumerate(direct.sku_ids):
+            assert abs(sold_json.get(sku_id, 0) - sold_arch[i]) < 1e-6
+        assert risk_json == risk_arch
+
+        print(f"\n  json.load                       {t_json_load:9.2f} ms")
+        print(f"  TransactionArchive open         {t_open:9.2f} ms")
+        print(f"\n  load + first analysis (JSON)    {t_json:9.2f} ms")
+        print(f"  load + first analysis (archive) {t_arch:9.2f} ms"
+              f"   ({t_json / t_arch:.0f}× faster)")
@@ -0,0 +1,109 @@
+"""
+Smart Loss Control - Checkpoint / Restore Benchmark
+====================================================
+
+Warm restart of a fleet-sized EngineState (running expected stock,
+168-hour velocity windows, since-count counters, seasonal baselines):
+  1. cold start: replay the whole transaction log
+  2. warm start: load the latest checkpoint, replay only the tail
+
+The restored state must match an uninterrupted replay exactly.
+
+Run:
+    python benchmarks/bench_checkpoint.py [shops] [skus_per_shop] [days]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine
+from checkpoint import Checkpointer, EngineState
+from event_replay import InventoryReplayEngine
+from seasonal_baseline import SeasonalBaseline
+from workload_generator import generate_workload
+
+RESTORE_BUDGET_S = 1.0
+
+
+def fresh_state(workload):
+    return EngineState(
+        engine=AnomalyDetectionEngine(seed=2026),
+        replay=InventoryReplayEngine.from_initial_inventory(workload.initial_inventory()),
+        baseline=SeasonalBaseline(len(workload.sku_ids)),
+        baseline_rows={sku_id: row for row, sku_id in enumerate(workload.sku_ids)},
+    )
+
+
+def same_state(a, b):
+    """Field-by-field comparison of two EngineStates."""
+    if a.position != b.position or a.replay.skus != b.replay.skus:
+        return False
+    if a.replay._seen != b.replay._seen or a.velocity.keys() != b.velocity.keys():
+        return False
+    for sku_id, tracker in a.velocity.items():
+        other = b.velocity[sku_id]
+        if (tracker._head_hour, tracker._window_sum, tracker.last_count_timestamp,
+                tracker.total_sales_since_count) != (
+                other._head_hour, other._window_sum, other.last_count_timestamp,
+                other.total_sales_since_count):
+            return False
+        if not np.array_equal(tracker._buckets, other._buckets):
+            return False
+    return all(np.array_equal(getattr(a.baseline, name), getattr(b.baseline, name))
+               for name in ('mean', 'var', 'n_obs', 'open_hour', 'open_sales'))
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    log = list(workload.iter_transactions())
+    snapshot_at = len(log) * 9 // 10
+    print(f"{shops:,} shops × {skus} SKUs = {shops * skus:,} SKUs, "
+          f"{len(log):,} events; snapshot after {snapshot_at:,}")
+
+    # Cold start: the whole history
+    start = time.perf_counter()
+    reference = fresh_state(workload)
+    reference.apply_batch(log)
+    cold = time.perf_counter() - start
+    print(f"\n  cold start (replay {len(log):,} events)   {cold:8.3f} s")
+
+    live = fresh_state(workload)
+    live.apply_batch(log[:snapshot_at])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpointer = Checkpointer(tmp)
+
+        start = time.perf_counter()
+        path = checkpointer.save(live)
+        saved = time.perf_counter() - start
+        size = path.stat().st_size
+        print(f"  save checkpoint ({size / 1e6:,.1f} MB)            {saved:8.3f} s")
+
+        start = time.perf_counter()
+        state = EngineState.load(path)
+        loaded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        state.catch_up(log)
+        tail = time.perf_counter() - start
+
+    print(f"  warm start: load checkpoint            {loaded:8.3f} s"
+          f"   ({'within' if loaded < RESTORE_BUDGET_S else 'OVER'} the "
+          f"{RESTORE_BUDGET_S:.0f} s budget)")
+    print(f"              replay {len(log) - snapshot_at:,} tail events      {tail:8.3f} s")
+    print(f"              total                      {loaded + tail:8.3f} s"
+          f"   ({cold / (loaded + tail):.1f}× faster than cold)")
+
+    assert same_state(state, reference), 'restored state differs from full replay'
+    print("\n  restored + tail == uninterrupted replay: OK")
@@ -0,0 +1,122 @@
+"""
+Smart Loss Control - Config Sweep Backtest Benchmark
+=====================================================
+
+A 1,000-config grid (volume_multiplier × time_threshold_hours ×
+sales_counter_max × random_probability × green_max) scored on a month
+of fleet data with injected thefts:
+  1. ConfigBacktester.run: every config side by side
+  2. the same replay one engine call at a time
+     (should_trigger_count + QuickCountManager.process_count per SKU
+     and hour) for a few configs on a small fleet, timed and compared
+     metric by metric; its time is scaled up to the full sweep
+
+Prints the best configs by detection rate within a spot-check budget.
+
+Run:
+    python benchmarks/bench_config_backtest.py [shops] [skus_per_shop] [days] [workers]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, QuickCountManager, SalesVelocityData
+from config_backtest import ConfigBacktester, config_grid, performance_metrics
+from workload_generator import generate_workload
+
+GRID = dict(volume_multiplier=[2, 3, 4, 6, 8], time_threshold_hours=[4, 6, 8, 12, 24],
+            sales_counter_max=[10, 20, 40, 80], random_probability=[0.02, 0.2],
+            green_max=[0.5, 1, 2, 3, 5])
+BUDGET = 2           # spot checks per SKU per day
+
+
+def replay_by_hand(bt, config, start):
+    """One engine call per SKU and check tick, on the backtester's inputs."""
+    engine = AnomalyDetectionEngine(config)
+    tally = dict(checks=0, true_positives=0, false_positives=0, detected=0, red_alerts=0)
+    n, ticks = bt.current_hour_sales.shape
+    times = [start + timedelta(hours=int(t)) for t in bt.tick_time]
+    for s in range(n):
+        last, last_k = start, 0
+        for k in range(ticks):
+            velocity = SalesVelocityData(str(s), [bt.current_hour_sales[s, k]],
+                                         bt.seven_day_average[s, k], last, 0)
+            since = bt.sale_events[s, k + 1] - bt.sale_events[s, last_k]
+            decision = engine.should_trigger_count(velocity, times[k], since,
+                                                   random_draw=bt.random_draws[s, k])
+            if not decision['should_trigger']:
+                continue
+            expected = bt.book_stock[s, k + 1] - bt.stolen[s, last_k]
+            actual = expected - (bt.stolen[s, k + 1] - bt.stolen[s, last_k]) + bt.miscount[s, k]
+            count = QuickCountManager.process_count(expected, actual, 0.0, 'STAFF', times[k], engine)
+            events = bt.thefts[s, k + 1] - bt.thefts[s, last_k]
+            flagged = count['severity'] != 'GREEN'
+            tally['checks'] += 1
+            tally['true_positives'] += flagged and events > 0
+            tally['false_positives'] += flagged and events == 0
+            tally['detected'] += events if flagged else 0
+            tally['red_alerts'] += count['send_alert']
+            last, last_k = times[k], k + 1
+    return tally
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+
+    configs = config_grid(**GRID)
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    start = time.perf_counter()
+    bt = ConfigBacktester.from_workload(workload)
+    prepared = time.perf_counter() - start
+    print(f"{shops:,} shops × {skus} SKUs × {days} days: {workload.size:,} events, "
+          f"{bt.total_thefts:,} thefts, {len(bt.shifts):,} staff shifts")
+
+    start = time.perf_counter()
+    result = bt.run(configs, workers=workers)
+    swept = time.perf_counter() - start
+    print(f"\n  prepare replay inputs                {prepared:8.2f} s")
+    print(f"  {len(configs):,} configs, {workers} worker(s)           {swept:8.2f} s")
+
+    # Reference: the scalar engine path on a small fleet
+    small = generate_workload(shops=4, skus_per_shop=skus, days=days, seed=7)
+    small_bt = ConfigBacktester.from_workload(small)
+    picks = [0, 333, 777, 999]
+    small_result = small_bt.run([configs[i] for i in picks])
+    begin = datetime.combine(small.start_date, datetime.min.time())
+    start = time.perf_counter()
+    for j, i in enumerate(picks):
+        tally = replay_by_hand(small_bt, configs[i], begin)
+        for name, value in tally.items():
+            assert small_result[name][j] == value, f'config {i}: {name} differs'
+    per_cell = (time.perf_counter() - start) / (len(picks) * small_bt.sku_shop.size)
+    scaled = per_cell * len(configs) * bt.sku_shop.size
+    print(f"  one engine call per SKU-hour, scaled {scaled:8.0f} s   (~{scaled / 3600:.1f} h, "
+          f"{scaled / swept:.0f}× slower)")
+    print("\n  checks, TP/FP, detections, RED alerts == scalar engine replay: OK")
+
+    # Best configs within the spot-check budget
+    ok = np.flatnonzero(result['checks_per_shop_day'] <= BUDGET * skus)
+    best = ok[np.lexsort((result['false_positive_rate'][ok], -result['detection_rate'][ok]))][:5]
+    print(f"\n  best detection at ≤ {BUDGET} checks per SKU-day ({ok.size} configs):")
+    print(f"  {'vol ×':>6} {'time h':>6} {'counter':>7} {'random':>6} {'green':>5} "
+          f"{'/shop-day':>9} {'detected':>9} {'FP rate':>8} {'hours':>6}")
+    for i in best.tolist():
+        print(f"  {result['volume_multiplier'][i]:>6.1f} {result['time_threshold_hours'][i]:>6.0f} "
+              f"{result['sales_counter_max'][i]:>7.0f} {result['random_probability'][i]:>6.2f} "
+              f"{result['green_max'][i]:>5.1f} {result['checks_per_shop_day'][i]:>9.1f} "
+              f"{result['detection_rate'][i]:>9.1%} {result['false_positive_rate'][i]:>8.1%} "
+              f"{result['mean_hours_to_detect'][i]:>6.1f}")
+
+    default = next(i for i, c in enumerate(configs)
+                   if all(c[k] == AnomalyDetectionEngine.DEFAULT_CONFIG[k] for k in GRID))
+    print(f"\n  DEFAULT_CONFIG: {performance_metrics(result, default)}")
@@ -0,0 +1,102 @@
+"""
+Smart Loss Control - Decant Ledger Benchmark
+=============================================
+
+One day of decant / sale / restock logs for thousands of shops, with a
+few decants tampered with (litres_added one carton's worth short of
+what was broken), verified:
+  1. event by event in Python over the same columns (two balances per
+     SKU in dicts)
+  2. DecantLedger.apply_columns: the whole fleet-day as one batch
+  3. DecantLedger.apply on the transaction dicts
+
+All three must report the same violating events.
+
+Run:
+    python benchmarks/bench_decant_ledger.py [shops] [skus_per_shop] [days]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from decant_ledger import LEDGER_CHECKS, TOLERANCE, TYPE_CODE, DecantLedger
+from workload_generator import generate_workload
+
+TAMPERED = 0.02
+
+
+def check_by_hand(workload, litres, cartons):
+    """Reference: one event at a time."""
+    c = workload.columns
+    bulk = dict(enumerate(workload.initial_cartons.astype(float).tolist()))
+    # initial_litres is the total: the shelf holds what cartons do not
+    shelf = dict(enumerate((workload.initial_litres - workload.initial_cartons * 12)
+                           .astype(float).tolist()))
+    found = []
+    for i, (sku, kind, qty) in enumerate(zip(c['sku'].tolist(), c['type'].tolist(),
+                                             litres.tolist())):
+        if kind == TYPE_CODE['sale']:
+            shelf[sku] -= qty
+            if shelf[sku] < -TOLERANCE:
+                found.append((i, 'SHELF_NEGATIVE'))
+        elif kind == TYPE_CODE['restock']:
+            bulk[sku] += qty / 12
+        elif kind == TYPE_CODE['decant']:
+            if abs(qty - cartons[i] * 12) > TOLERANCE:
+                found.append((i, 'DECANT_NOT_CONSERVED'))
+            bulk[sku] -= cartons[i]
+            shelf[sku] += qty
+            if bulk[sku] < -TOLERANCE:
+                found.append((i, 'BULK_NEGATIVE'))
+    return found
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    c = workload.columns
+    litres = c['quantity'].copy()
+    decants = np.flatnonzero(c['type'] == TYPE_CODE['decant'])
+    rng = np.random.default_rng(7)
+    tampered = decants[rng.random(decants.size) < TAMPERED]
+    litres[tampered] -= 12
+    print(f"{shops:,} shops × {skus} SKUs × {days} day(s): {workload.size:,} events, "
+          f"{decants.size:,} decants ({tampered.size} tampered)")
+
+    start = time.perf_counter()
+    reference = check_by_hand(workload, litres, c['cartons'])
+    by_hand = time.perf_counter() - start
+
+    ledger = DecantLedger.from_workload(workload)
+    start = time.perf_counter()
+    result = ledger.apply_columns(c['sku'], c['type'], litres, c['cartons'])
+    columns = time.perf_counter() - start
+
+    records = list(workload.iter_transactions())
+    for i in tampered.tolist():
+        records[i]['litres_added'] -= 12
+    start = time.perf_counter()
+    violations = DecantLedger.from_workload(workload).apply(records)
+    dicts = time.perf_counter() - start
+
+    print(f"\n  event by event (Python)        {by_hand:8.3f} s")
+    print(f"  DecantLedger, columns          {columns:8.3f} s   ({by_hand / columns:.0f}× faster)")
+    print(f"  DecantLedger, transaction dicts{dicts:8.3f} s")
+
+    found = list(zip(result['position'].tolist(),
+                     [LEDGER_CHECKS[k] for k in result['check'].tolist()]))
+    assert sorted(found) == sorted(reference), 'violations differ from the event loop'
+    assert [(v['position'], v['check']) for v in violations] == found
+    counts = {name: sum(k == name for _, k in found) for name in LEDGER_CHECKS}
+    print(f"\n  same violations as the event loop: OK  {counts}")
+    assert set(p for p, k in found if k == 'DECANT_NOT_CONSERVED') == set(tampered.tolist())
+    print("  every tampered decant caught: OK")
@@ -0,0 +1,133 @@
+"""
+Smart Loss Control - Decision Cache Polling Benchmark
+======================================================
+
+Simulated device polling: every 10 s, a few hundred "should I show a
+Quick Check?" polls across a shop fleet's SKUs (popular SKUs are polled
+and sold more often), while sales and counts keep arriving. The same
+event stream is answered:
+  1. by AnomalyDetectionEngine.should_trigger_count directly
+  2. through DecisionCache (large enough for every SKU)
+  3. through a DecisionCache holding only a quarter of the SKUs (LRU)
+
+Reports polls/s, hit/miss/eviction counters, checks cached answers
+against a fresh computation, and compares how often RANDOM fires per
+SKU and hour: re-rolled on every poll vs one draw per slot.
+
+Run:
+    python benchmarks/bench_decision_cache.py [skus] [hours] [polls_per_tick]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, datetime_to_epoch_us
+from decision_cache import DecisionCache
+from velocity_tracker import SalesVelocityTracker
+
+START = datetime(2026, 2, 16, 9, 0)
+TICK_S = 10
+
+
+def make_load(n_skus, hours, polls_per_tick, seed=2026):
+    """Poll and event schedule: (tick, polled SKU rows, events before it)."""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_skus + 1) ** 0.8
+    popularity /= popularity.sum()
+    ticks = hours * 3600 // TICK_S
+
+    polls = [rng.choice(n_skus, polls_per_tick, p=popularity) for _ in range(ticks)]
+
+    # Sales: about 4 per SKU-hour on average, skewed like the polls
+    n_sales = int(4 * n_skus * hours)
+    sale_sku = rng.choice(n_skus, n_sales, p=popularity)
+    sale_s = np.sort(rng.random(n_sales) * hours * 3600)
+    # Counts: each SKU counted about every 5 hours
+    n_counts = max(1, n_skus * hours // 5)
+    count_sku = rng.integers(0, n_skus, n_counts)
+    count_s = rng.random(n_counts) * hours * 3600
+
+    events = sorted([(float(s), 0, int(k)) for s, k in zip(sale_s, sale_sku)]
+                    + [(float(s), 1, int(k)) for s, k in zip(count_s, count_sku)])
+    return polls, events
+
+
+def run(polls, events, n_skus, answer):
+    """Replay the schedule; answer(tracker, now, since) for every poll."""
+    trackers = [SalesVelocityTracker(f'SKU_{i:05d}', START - timedelta(hours=2))
+                for i in range(n_skus)]
+    randoms = set()
+    e = 0
+    elapsed = 0.0
+    for tick, rows in enumerate(polls):
+        now = START + timedelta(seconds=tick * TICK_S)
+        while e < len(events) and events[e][0] <= tick * TICK_S:
+            at, kind, k = events[e]
+            stamp = START + timedelta(seconds=at)
+            if kind == 0:
+                trackers[k].record_sale(stamp, 1)
+            else:
+                trackers[k].record_count(stamp)
+            e += 1
+        start = time.perf_counter()
+        for k in rows.tolist():
+            tracker = trackers[k]
+            decision = answer(tracker, now, tracker.total_sales_since_count)
+            if decision['should_trigger'] and decision['type'] == 'RANDOM':
+                randoms.add((k, now.hour))
+        elapsed += time.perf_counter() - start
+    return elapsed, randoms, trackers
+
+
+if __name__ == "__main__":
+
+    n_skus = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    hours = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    per_tick = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+
+    polls, events = make_load(n_skus, hours, per_tick)
+    n_polls = len(polls) * per_tick
+    print(f"{n_skus:,} SKUs, {hours} h, {n_polls:,} polls, {len(events):,} sales/counts")
+
+    engine = AnomalyDetectionEngine(seed=2026)
+    direct_t, direct_random, _ = run(polls, events, n_skus, engine.should_trigger_count)
+
+    full = DecisionCache(AnomalyDetectionEngine(seed=2026))
+    full_t, full_random, trackers = run(polls, events, n_skus, full.should_trigger_count)
+
+    small = DecisionCache(AnomalyDetectionEngine(seed=2026), max_entries=n_skus // 4)
+    small_t, _, _ = run(polls, events, n_skus, small.should_trigger_count)
+
+    print(f"\n  {'':<28}{'polls/s':>10}{'hit rate':>10}{'evictions':>11}")
+    print(f"  {'engine, every poll':<28}{n_polls / direct_t:>10,.0f}{'-':>10}{'-':>11}")
+    for label, cache, seconds in (('DecisionCache (all SKUs)', full, full_t),
+                                  (f'DecisionCache ({n_skus // 4:,} SKUs)', small, small_t)):
+        stats = cache.stats()
+        print(f"  {label:<28}{n_polls / seconds:>10,.0f}{stats['hit_rate']:>10.1%}"
+              f"{stats['evictions']:>11,}")
+    print(f"\n  counters (all SKUs): {full.stats()}")
+
+    # Cached answers match a fresh computation at the end of the run
+    end = START + timedelta(seconds=len(polls) * TICK_S - 1)
+    now_us = datetime_to_epoch_us(end)
+    mismatches = 0
+    for tracker in trackers:
+        cached = full.should_trigger_count(tracker, end, tracker.total_sales_since_count)
+        fresh, _ = full._decide(tracker, end, now_us, tracker.total_sales_since_count)
+        mismatches += cached != fresh
+    assert mismatches == 0, f'{mismatches} cached answers differ from a fresh computation'
+    print("  cached answers == fresh computation for every SKU: OK")
+
+    # RANDOM: re-rolled per poll vs one draw per SKU and hour
+    polled = {(int(k), (START + timedelta(seconds=t * TICK_S)).hour)
+              for t, rows in enumerate(polls) for k in rows.tolist()}
+    p = engine.config['random_probability']
+    print(f"\n  SKU-hours with a RANDOM check (configured {p:.0%}):")
+    print(f"    re-rolled every poll   {len(direct_random) / len(polled):6.1%}")
+    print(f"    one draw per slot      {len(full_random) / len(polled):6.1%}")
@@ -0,0 +1,98 @@
+"""
+Smart Loss Control - Delivery Audit Benchmark
+==============================================
+
+A month of fleet restocks checked against their purchase orders:
+  1. by hand: look up each PO line in a dict, call
+     InventoryEngine.validate_delivery, add up supplier totals
+  2. DeliveryAuditor: one hash join + vectorised audit for the month
+  3. DeliveryAuditor fed day by day (supplier totals kept incrementally)
+
+All three must give the same results and supplier totals.
+
+Run:
+    python benchmarks/bench_delivery_audit.py [shops] [skus_per_shop] [days]
+"""
+
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from delivery_audit import DeliveryAuditor, as_records, orders_from_restocks
+from inventory_engine_v2 import InventoryEngine
+from workload_generator import generate_workload
+
+SUPPLIERS = [f'Supplier {i:02d}' for i in range(40)]
+
+
+def audit_by_hand(orders, deliveries):
+    po = {(o['order_id'], o['sku_id']): o for o in orders}
+    results = []
+    totals = defaultdict(lambda: {'deliveries': 0, 'flagged': 0, 'total_impact': 0.0})
+    for d in deliveries:
+        line = po[d['order_id'], d['sku_id']]
+        result = InventoryEngine.validate_delivery(line['quantity_ordered'],
+                                                   d['quantity_received'], line['unit_price'])
+        results.append(result)
+        supplier = totals[line['supplier_name']]
+        supplier['deliveries'] += 1
+        supplier['flagged'] += result['status'] == 'FLAGGED'
+        supplier['total_impact'] += result['financial_impact']
+    return results, totals
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    restocks = [t for t in workload.iter_transactions() if t['type'] == 'restock']
+    orders, deliveries = orders_from_restocks(restocks, SUPPLIERS)
+    print(f"{shops:,} shops × {skus} SKUs × {days} days: {len(deliveries):,} deliveries, "
+          f"{len(SUPPLIERS)} suppliers")
+
+    start = time.perf_counter()
+    reference, totals = audit_by_hand(orders, deliveries)
+    by_hand = time.perf_counter() - start
+
+    start = time.perf_counter()
+    auditor = DeliveryAuditor(orders)
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    result = auditor.audit(deliveries)
+    summary = auditor.supplier_summary()
+    bulk = time.perf_counter() - start
+
+    by_day = defaultdict(list)
+    for d in deliveries:
+        by_day[d['timestamp'][:10]].append(d)
+    daily = DeliveryAuditor(orders)
+    start = time.perf_counter()
+    batches = [daily.audit(batch) for batch in by_day.values()]
+    daily_summary = daily.supplier_summary()
+    incremental = time.perf_counter() - start
+
+    print(f"\n  by hand (dict lookups + validate_delivery)  {by_hand:8.3f} s")
+    print(f"  DeliveryAuditor: index purchase orders      {indexed:8.3f} s")
+    print(f"                   audit the month            {bulk:8.3f} s"
+          f"   ({by_hand / bulk:.0f}× faster)")
+    print(f"                   {len(by_day)} daily batches            {incremental:8.3f} s"
+          f"   ({incremental / len(by_day) * 1000:.1f} ms per day)")
+
+    assert as_records(result) == reference, 'audit differs from validate_delivery'
+    assert [r for b in batches for r in as_records(b)] == reference
+    for name, expected in totals.items():
+        for got in (summary[name], daily_summary[name]):
+            assert got['deliveries'] == expected['deliveries']
+            assert got['flagged'] == expected['flagged']
+            assert abs(got['total_impact'] - expected['total_impact']) < 0.01
+    print("\n  results and supplier totals == validate_delivery loop: OK")
+
+    worst = next(iter(summary.items()))
+    print(f"  highest flag rate: {worst[0]} ({worst[1]['flag_rate']:.1%}, "
+          f"${worst[1]['total_impact']:,.2f})")
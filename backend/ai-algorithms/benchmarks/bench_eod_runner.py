@@ -0,0 +1,78 @@
+"""
+Smart Loss Control - End-of-Day Runner Scaling Benchmark
+=========================================================
+
+End-of-day reconciliation for a generated fleet:
+  1. shop by shop (InventoryReplayEngine + detect_theft_patterns_fast
+     per shop, the single-core baseline)
+  2. eod_runner.run_end_of_day with 1 … N worker processes
+
+Every worker count must give byte-identical summaries.
+
+Run:
+    python benchmarks/bench_eod_runner.py [shops] [skus_per_shop] [max_workers]
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine
+from eod_runner import run_workload
+from event_replay import InventoryReplayEngine
+from workload_generator import TYPE_CODE, generate_workload
+
+
+def shop_by_shop(workload, shops):
+    """The per-shop loop the runner replaces."""
+    engine = AnomalyDetectionEngine()
+    c = workload.columns
+    for s in range(shops):
+        rows = workload.shop_rows(s)
+        replay = InventoryReplayEngine.from_initial_inventory(workload.initial_inventory(s))
+        replay.apply_batch(workload.iter_transactions(rows))
+        replay.inventory_snapshots()
+
+        sales = rows[c['type'][rows] == TYPE_CODE['sale']]
+        times = np.sort(c['timestamp'][sales])
+        shift_end = np.datetime64(int(c['timestamp'][rows].max()), 'us').item()
+        engine.detect_theft_patterns_fast(times, shift_end, assume_sorted=True)
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=1)
+    print(f"{shops:,} shops × {skus} SKUs, 1 day: {workload.size:,} events "
+          f"({os.cpu_count()} CPUs available)")
+
+    sample = min(shops, 100)
+    start = time.perf_counter()
+    shop_by_shop(workload, sample)
+    baseline = (time.perf_counter() - start) * shops / sample
+    print(f"\n  shop by shop (extrapolated from {sample})   {baseline:8.3f} s")
+
+    reference = None
+    t1 = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        result = run_workload(workload, workers=workers)
+        elapsed = time.perf_counter() - start
+
+        encoded = json.dumps(result, sort_keys=True)
+        if reference is None:
+            reference, t1 = encoded, elapsed
+        assert encoded == reference, f'output differs with {workers} workers'
+
+        print(f"  runner, {workers:>2} worker(s)                  {elapsed:8.3f} s"
+              f"   speed-up {t1 / elapsed:4.2f}× vs 1 worker, "
+              f"{baseline / elapsed:5.1f}× vs shop by shop")
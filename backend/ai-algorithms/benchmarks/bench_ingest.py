@@ -0,0 +1,99 @@
+"""
+Smart Loss Control - JSONL Ingestion Benchmark
+===============================================
+
+Writes a generated workload as JSONL and streams it through
+algorithms/ingest.py as a separate process (the way it is used):
+  • start-up time (empty input)
+  • events per second and peak memory (max RSS, as reported by the
+    CLI) for two stream lengths: memory should stay flat as the
+    stream grows
+  • every variance result matches InventoryReplayEngine, which
+    applies the same events one at a time
+
+Run:
+    python benchmarks/bench_ingest.py [shops] [skus_per_shop] [days]
+"""
+
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from event_replay import InventoryReplayEngine
+from workload_generator import generate_workload
+
+INGEST = Path(__file__).resolve().parent.parent / 'algorithms' / 'ingest.py'
+
+
+def write_jsonl(path, workload, inventory_path):
+    with open(path, 'w') as f:
+        for txn in workload.iter_transactions():
+            f.write(json.dumps(txn) + '\n')
+    with open(inventory_path, 'w') as f:
+        json.dump(workload.initial_inventory(), f)
+
+
+def run_cli(tmp, *args):
+    """Run ingest.py; returns (summary stats, output lines, wall s)."""
+    out = tmp / 'stdout.jsonl'
+    start = time.perf_counter()
+    with open(out, 'wb') as stdout:
+        done = subprocess.run([sys.executable, str(INGEST), *args],
+                              stdout=stdout, stderr=subprocess.PIPE, check=True)
+    wall = time.perf_counter() - start
+    stats = json.loads(done.stderr.decode().strip().splitlines()[-1])
+    return stats, out.read_text().splitlines(), wall
+
+
+def replay_variances(workload):
+    """Variance at every quick count, one event at a time."""
+    engine = InventoryReplayEngine.from_initial_inventory(workload.initial_inventory())
+    result = {}
+    for txn in workload.iter_transactions():
+        if engine.apply(txn) and txn['type'] == 'quick_count':
+            state = engine.skus[txn['sku_id']]
+            # Superseded (older) counts leave the state untouched
+            if state.last_count_at == datetime.fromisoformat(txn['timestamp']):
+                result[txn['transaction_id']] = state.last_count_variance
+    return result
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        empty = tmp / 'empty.jsonl'
+        empty.write_bytes(b'')
+        _, _, startup = run_cli(tmp, str(empty))
+        print(f"start-up (empty stream): {startup * 1000:.0f} ms\n")
+
+        print(f"  {'stream':<30}{'events':>12}{'events/s':>12}{'wall s':>9}{'max RSS MB':>12}")
+        for span in (days, days * 3):
+            workload = generate_workload(shops=shops, skus_per_shop=skus, days=span)
+            source, inventory = tmp / 'events.jsonl', tmp / 'inventory.json'
+            write_jsonl(source, workload, inventory)
+
+            stats, lines, wall = run_cli(tmp, str(source), '--inventory', str(inventory))
+            label = f"{shops:,} shops × {skus} SKUs × {span} d"
+            print(f"  {label:<30}{stats['events']:>12,}{stats['events_per_second']:>12,}"
+                  f"{wall:>9.2f}{stats['max_rss_mb']:>12}")
+
+            if span == days:
+                reference = replay_variances(workload)
+                results = [json.loads(line) for line in lines]
+                variances = {r['transaction_id']: r['variance']
+                             for r in results if r['kind'] == 'variance'}
+                assert variances == reference, 'variance differs from event replay'
+                alerts = sum(r['kind'] == 'alert' for r in results)
+                print(f"  {'':<30}{len(variances):,} counts, {alerts:,} alerts "
+                      f"= InventoryReplayEngine: OK")
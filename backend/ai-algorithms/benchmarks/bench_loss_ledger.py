@@ -0,0 +1,146 @@
+"""
+Smart Loss Control - Loss Ledger Benchmark
+===========================================
+
+A month of loss rows for a pan-African fleet (shops priced in USD, NGN,
+KES, GHS, ZAR and UGX), rolled up to USD:
+  1. LossLedger: add the rows, then totals per shop-day, SKU, staff and
+     shop × SKU × staff × day
+  2. on a sample, the way it is done today: calculate_loss per row in
+     floats, converted per row in Python, added up in floats
+  3. on the same sample, an exact Decimal reference (round each loss to
+     the minor unit, add per group and currency, convert, add)
+
+The ledger must equal the Decimal reference to the cent, and every row
+must equal calculate_loss rounded to the cent.
+
+Run:
+    python benchmarks/bench_loss_ledger.py [rows] [shops] [sample_rows]
+"""
+
+import sys
+import time
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from inventory_engine_v2 import InventoryEngine
+from loss_ledger import (CURRENCY_EXPONENTS, SEED_RATES, LossLedger, RateTable,
+                         to_decimal, to_minor)
+
+FLEET_CURRENCIES = ('USD', 'NGN', 'KES', 'GHS', 'ZAR', 'UGX')
+SHARE = (0.15, 0.45, 0.15, 0.1, 0.1, 0.05)
+RATES = SEED_RATES + (('UGX', 'USD', '0.000270', '2026-02-01'),)
+FIRST_DAY = 20_485          # 2026-02-01 as days since 1970-01-01
+
+
+def make_rows(n, shops, skus=200_000, staff=30_000, days=30, seed=2026):
+    rng = np.random.default_rng(seed)
+    rate = {src: float(r) for src, _, r, _ in RATES}
+    shop_currency = rng.choice(len(FLEET_CURRENCIES), shops, p=SHARE)
+    usd_price = np.round(rng.uniform(0.5, 50, skus), 2)
+
+    shop = rng.integers(0, shops, n).astype(np.int32)
+    sku = rng.integers(0, skus, n).astype(np.int32)
+    code = shop_currency[shop]
+    # Shelf price in the shop's currency, written to its minor unit
+    exponents = np.array([CURRENCY_EXPONENTS[c] for c in FLEET_CURRENCIES])
+    to_local = np.array([1 / rate[c] for c in FLEET_CURRENCIES])
+    scale = 10.0 ** exponents[code]
+    price = np.round(usd_price[sku] * to_local[code] * scale) / scale
+    return {
+        'variance': rng.integers(1, 20_000, n) / 1000,    # up to 20 units, to the ml
+        'unit_price': price,
+        'currency': np.array(FLEET_CURRENCIES)[code],
+        'shop': shop,
+        'sku': sku,
+        'staff': rng.integers(0, staff, n).astype(np.int32),
+        'day': (FIRST_DAY + rng.integers(0, days, n)).astype(np.int32),
+    }
+
+
+def roll_up_floats(rows, n):
+    """Today: float loss per row, converted per row, float totals per shop."""
+    rate = {src: float(r) for src, _, r, _ in RATES}
+    totals = defaultdict(float)
+    for v, p, c, s in zip(rows['variance'][:n].tolist(), rows['unit_price'][:n].tolist(),
+                          rows['currency'][:n].tolist(), rows['shop'][:n].tolist()):
+        totals[s] += InventoryEngine.calculate_loss(v, p) * rate[c]
+    return totals
+
+
+def roll_up_decimal(rows, n):
+    """Exact: Decimal loss per row, per shop and currency, converted once."""
+    rate = {src: Decimal(r) for src, _, r, _ in RATES}
+    native = defaultdict(Decimal)
+    for v, p, c, s in zip(rows['variance'][:n].tolist(), rows['unit_price'][:n].tolist(),
+                          rows['currency'][:n].tolist(), rows['shop'][:n].tolist()):
+        unit = Decimal(1).scaleb(-CURRENCY_EXPONENTS[c])
+        native[s, c] += (abs(Decimal(str(v))) * Decimal(str(p))).quantize(unit, ROUND_HALF_UP)
+    totals = defaultdict(Decimal)
+    for (s, c), amount in native.items():
+        totals[s] += (amount * rate[c]).quantize(Decimal('0.01'), ROUND_HALF_UP)
+    return totals
+
+
+if __name__ == "__main__":
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000
+    shops = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    sample = int(sys.argv[3]) if len(sys.argv) > 3 else 300_000
+
+    rows = make_rows(n, shops)
+    snapshot = RateTable(RATES).snapshot('2026-02-28')
+    print(f"{n:,} loss rows, {shops:,} shops in {len(FLEET_CURRENCIES)} currencies")
+
+    ledger = LossLedger()
+    start = time.perf_counter()
+    ledger.add_losses(rows['variance'], rows['unit_price'], rows['currency'],
+                      rows['shop'], rows['sku'], rows['staff'], rows['day'])
+    _ = ledger.columns
+    added = time.perf_counter() - start
+    print(f"\n  add_losses (exact minor units)              {added:7.2f} s")
+
+    timings = {}
+    for by in (('shop', 'day'), ('sku',), ('staff',), ('shop', 'sku', 'staff', 'day')):
+        start = time.perf_counter()
+        result = ledger.totals(by, snapshot)
+        timings[by] = time.perf_counter() - start
+        label = ' × '.join(by)
+        print(f"  totals in USD by {label:<27}{timings[by]:7.2f} s   "
+              f"({len(result['amount']):,} groups)")
+    fleet = ledger.total(snapshot)
+    print(f"  fleet total: ${to_decimal(fleet):,}")
+
+    # Sample: today's float path vs the exact reference vs the ledger
+    part = LossLedger()
+    amounts = part.add_losses(rows['variance'][:sample], rows['unit_price'][:sample],
+                              rows['currency'][:sample], rows['shop'][:sample])
+    start = time.perf_counter()
+    floats = roll_up_floats(rows, sample)
+    float_s = time.perf_counter() - start
+    exact = roll_up_decimal(rows, sample)
+    by_shop = part.totals(('shop',), snapshot)
+    got = dict(zip(by_shop['shop'].tolist(), by_shop['amount'].tolist()))
+
+    print(f"\n  sample of {sample:,} rows:")
+    print(f"    per-row Python float roll-up      {sample / float_s:12,.0f} rows/s")
+    print(f"    LossLedger (add + shop-day totals){n / (added + timings['shop', 'day']):12,.0f} rows/s")
+
+    assert got == {s: int(a.scaleb(2)) for s, a in exact.items()}, 'ledger != Decimal reference'
+    print("    per-shop USD totals == exact Decimal reference: OK")
+
+    exponents = np.array([CURRENCY_EXPONENTS[c] for c in rows['currency'][:sample]])
+    scalar = [InventoryEngine.calculate_loss(v, p) for v, p in
+              zip(rows['variance'][:sample].tolist(), rows['unit_price'][:sample].tolist())]
+    assert np.array_equal(to_minor(scalar, exponents), amounts), 'row != calculate_loss'
+    print("    every row == calculate_loss rounded to the minor unit: OK")
+
+    drift = [abs(floats[s] * 100 - got[s]) for s in got]
+    off = sum(round(floats[s], 2) * 100 != got[s] for s in got)
+    print(f"    float roll-up: {off:,} of {len(got):,} shops off by ≥ 1 cent "
+          f"(worst {max(drift):.2f} cents)")
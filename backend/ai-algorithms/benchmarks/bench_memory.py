@@ -0,0 +1,141 @@
+"""
+Smart Loss Control - Engine Input Memory Benchmark
+===================================================
+
+Memory needed to hold N SKU-day rows as:
+  1. the original dict-backed dataclasses (pre-slots layout)
+  2. slotted InventoryState / SalesVelocityData objects
+  3. columnar_store tables (typed columns + interned strings)
+
+Strings are built per row, the way a JSON or database load creates
+them. Measured with tracemalloc (NumPy buffers are included).
+
+Run:
+    python benchmarks/bench_memory.py [rows] [hours_per_row]
+"""
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from inventory_engine_v2 import InventoryState
+from anomaly_detection_v2 import SalesVelocityData
+from columnar_store import InventoryStateTable, SalesVelocityTable
+
+
+# The layouts before slots=True, for comparison
+@dataclass
+class DictInventoryState:
+    sku_id: str
+    brand: str
+    size: str
+    initial_stock: float
+    cartons_received: int
+    units_sold: float
+    litres_per_carton: int = 12
+
+
+@dataclass
+class DictSalesVelocityData:
+    sku_id: str
+    hourly_sales: List[float]
+    seven_day_average: float
+    last_count_timestamp: datetime
+    total_sales_since_count: int
+
+
+SHOP_SKUS = 2_000   # distinct SKU ids that repeat across shop-days
+BRANDS = ["King's Oil", 'Mamador', 'Devon Kings', 'Golden Terra']
+SIZES = ['1L', '2L', '3L', '5L', '25L']
+
+
+def measure(build):
+    """Peak-free retained bytes of whatever `build()` returns."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    return after - before
+
+
+def inventory_objects(cls, rows):
+    return [
+        cls(f'SKU_{i % SHOP_SKUS:05d}', f'{BRANDS[i % 4]}', f'{SIZES[i % 5]}',
+            float(i % 200), i % 6, float(i % 150))
+        for i in range(rows)
+    ]
+
+
+def inventory_table(rows):
+    i = np.arange(rows)
+    return InventoryStateTable.from_columns(
+        sku_id=[f'SKU_{k:05d}' for k in (i % SHOP_SKUS).tolist()],
+        brand=np.asarray(BRANDS, dtype=object)[i % 4],
+        size=np.asarray(SIZES, dtype=object)[i % 5],
+        initial_stock=(i % 200).astype(np.float64),
+        cartons_received=i % 6,
+        units_sold=(i % 150).astype(np.float64)
+    )
+
+
+def velocity_objects(cls, rows, hours):
+    base = datetime(2026, 2, 16)
+    return [
+        cls(f'SKU_{i % SHOP_SKUS:05d}',
+            [float((i + h) % 9) for h in range(hours)],
+            float(i % 7), base - timedelta(minutes=i % 600), i % 20)
+        for i in range(rows)
+    ]
+
+
+def velocity_table(rows, hours):
+    i = np.arange(rows)
+    hourly = (i[:, None] + np.arange(hours)[None, :]) % 9
+    stamps = np.datetime64('2026-02-16', 'us') - (i % 600).astype('timedelta64[m]')
+    return SalesVelocityTable.from_columns(
+        sku_id=[f'SKU_{k:05d}' for k in (i % SHOP_SKUS).tolist()],
+        hourly_sales=hourly.astype(np.float64),
+        seven_day_average=(i % 7).astype(np.float64),
+        last_count_timestamp=stamps,
+        total_sales_since_count=i % 20
+    )
+
+
+if __name__ == "__main__":
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    hours = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+
+    def report(label, nbytes):
+        print(f"  {label:<28} {nbytes / 2**20:>9.1f} MiB  "
+              f"({nbytes / rows:>6.1f} B/row)")
+
+    print(f"InventoryState, {rows:,} rows")
+    a = measure(lambda: inventory_objects(DictInventoryState, rows))
+    b = measure(lambda: inventory_objects(InventoryState, rows))
+    c = measure(lambda: inventory_table(rows))
+    report('dataclass (__dict__)', a)
+    report('dataclass (slots)', b)
+    report('InventoryStateTable', c)
+    print(f"  table vs original: {a / c:.1f}× smaller")
+
+    print(f"\nSalesVelocityData, {rows:,} rows × {hours} hourly values")
+    a = measure(lambda: velocity_objects(DictSalesVelocityData, rows, hours))
+    b = measure(lambda: velocity_objects(SalesVelocityData, rows, hours))
+    c = measure(lambda: velocity_table(rows, hours))
+    report('dataclass (__dict__)', a)
+    report('dataclass (slots)', b)
+    report('SalesVelocityTable', c)
+    print(f"  table vs original: {a / c:.1f}× smaller")
@@ -0,0 +1,300 @@
+"""
+Smart Loss Control - Bulk Postgres I/O Benchmark
+=================================================
+
+A generated fleet loaded into a database with the backend's migrations
+(shops, skus, users, inventory, transactions), then:
+  1. reads: PostgresIO.read_transactions / read_inventory against one
+     SELECT per row by id (sampled) and one SELECT … fetchall() turned
+     into the same NumPy columns
+  2. writes: write_alerts / upsert_velocity_metrics against one INSERT
+     per row in a single transaction (sampled)
+  3. round trips: the transactions read back == the workload loaded;
+     alerts keep every cent; an upsert over existing metrics updates
+     them in place; suspicious_activities rows land
+The benchmark's shops are deleted at the end (ON DELETE CASCADE).
+
+Needs psycopg 3 (pip install "psycopg[binary,pool]") and a superuser
+(or BYPASSRLS) connection.
+
+Run:
+    python benchmarks/bench_postgres_io.py postgresql://user@host/db [shops] [skus_per_shop] [days]
+    (or set DATABASE_URL and omit the DSN)
+"""
+
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from loss_ledger import to_minor
+from postgres_io import DB_EVENT_TYPES, PostgresIO, collect
+from workload_generator import TYPE_CODE, generate_workload
+
+HOUR_US = 3_600_000_000
+SAMPLE = 5_000            # Rows for the one-query-per-row baselines
+NIL = uuid.UUID(int=0)
+BENCH = 'bench#'           # skus.size tag of the benchmark's products
+
+# EVENT_TYPES code → transactions.type (sync / THEFT_EVENT are not stored)
+DB_TYPE = {TYPE_CODE[name]: db for db, name in DB_EVENT_TYPES.items()}
+
+
+def uuids(n):
+    return np.frombuffer(b''.join(uuid.uuid4().bytes for _ in range(n)), dtype='V16')
+
+
+def load(io, workload, shop_id):
+    """Write the workload as backend rows; (transactions loaded, products)."""
+    c = workload.columns
+    n_shops = len(workload.shop_ids)
+
+    # Staff: owners and staff belong to a shop, 'system' / 'unknown' are NULL
+    is_user = np.array([name.startswith(('OWNER_', 'STAFF_')) for name in workload.staff_ids])
+    staff_id = np.where(is_user, uuids(is_user.size), np.zeros(1, dtype='V16'))
+    staff_shop = [int(name.split('_')[1]) - 1 if user else -1
+                  for name, user in zip(workload.staff_ids, is_user)]
+
+    # A shop can hold several SKU rows of one brand and size; the
+    # database has one skus row per product, so number the repeats
+    seen = {}
+    products = []
+    for r in range(len(workload.sku_ids)):
+        key = (int(workload.sku_shop[r]), workload.sku_brand[r], workload.sku_size[r])
+        seen[key] = seen.get(key, -1) + 1
+        products.append((workload.sku_brand[r], f'{workload.sku_size[r]} {BENCH}{seen[key]}'))
+    with io.connection() as conn, conn.cursor() as cur:
+        cur.executemany('INSERT INTO skus (brand, size) VALUES (%s, %s) '
+                        'ON CONFLICT (brand, size, is_carton) DO NOTHING', sorted(set(products)))
+        cur.execute('SELECT brand, size, id FROM skus WHERE NOT is_carton')
+        product_id = {(b, s): i.bytes for b, s, i in cur.fetchall()}
+
+        with cur.copy('COPY shops (id, shop_name, owner_phone) FROM STDIN') as copy:
+            for s in range(n_shops):
+                copy.write_row((uuid.UUID(bytes=bytes(shop_id[s])), workload.shop_ids[s],
+                                f'+999{uuid.uuid4().int % 10**12:012d}'))
+        with cur.copy('COPY users (id, shop_id, full_name, role) FROM STDIN') as copy:
+            for i in np.flatnonzero(is_user):
+                name = workload.staff_ids[i]
+                copy.write_row((uuid.UUID(bytes=bytes(staff_id[i])),
+                                uuid.UUID(bytes=bytes(shop_id[staff_shop[i]])), name,
+                                'OWNER' if name.startswith('OWNER_') else 'STAFF'))
+
+    sku_id = np.frombuffer(b''.join(product_id[p] for p in products), dtype='V16')
+    row_shop = shop_id[workload.sku_shop]
+    with io.connection() as conn:
+        conn.execute('CREATE TEMP TABLE _load_inventory (shop_id uuid, sku_id uuid, '
+                     'quantity integer, cost_cents bigint, sell_cents bigint) ON COMMIT DROP')
+        io.copy_in('_load_inventory', (('shop_id', 'uuid'), ('sku_id', 'uuid'), ('quantity', 'int4'),
+                                       ('cost_cents', 'int8'), ('sell_cents', 'int8')),
+                   {'shop_id': row_shop, 'sku_id': sku_id, 'quantity': workload.initial_litres,
+                    'cost_cents': to_minor(workload.cost_price, 2),
+                    'sell_cents': to_minor(workload.sell_price, 2)}, conn)
+        conn.execute('INSERT INTO inventory (shop_id, sku_id, quantity, cost_price, selling_price) '
+                     'SELECT shop_id, sku_id, quantity, cost_cents::numeric / 100, '
+                     'sell_cents::numeric / 100 FROM _load_inventory')
+
+    # Transactions: stored types only, non-zero quantities, sales negative
+    keep = np.isin(c['type'], list(DB_TYPE)) & (c['quantity'] != 0)
+    rows = {name: c[name][keep] for name in ('timestamp', 'sku', 'staff', 'type', 'quantity', 'offline')}
+    case = ' '.join(f"WHEN {code} THEN '{db}'" for code, db in DB_TYPE.items())
+    with io.connection() as conn:
+        conn.execute('CREATE TEMP TABLE _load_tx (occurred_at timestamp, shop_id uuid, sku_id uuid, '
+                     'user_id uuid, type smallint, quantity integer, is_offline boolean) ON COMMIT DROP')
+        io.copy_in('_load_tx', (('occurred_at', 'timestamp'), ('shop_id', 'uuid'), ('sku_id', 'uuid'),
+                                ('user_id', 'uuid'), ('type', 'int2'), ('quantity', 'int4'),
+                                ('is_offline', 'bool')),
+                   {'occurred_at': rows['timestamp'], 'shop_id': row_shop[rows['sku']],
+                    'sku_id': sku_id[rows['sku']], 'user_id': staff_id[rows['staff']],
+                    'type': rows['type'], 'quantity': rows['quantity'],
+                    'is_offline': rows['offline']}, conn)
+        conn.execute(f"""
+            INSERT INTO transactions (shop_id, sku_id, user_id, type, quantity, is_offline,
+                                      occurred_at, device_id)
+            SELECT shop_id, sku_id, NULLIF(user_id, '{NIL}'), CASE type {case} END,
+                   CASE type WHEN {TYPE_CODE['sale']} THEN -quantity ELSE quantity END,
+                   is_offline, occurred_at, 'bench'
+            FROM _load_tx""")
+        conn.execute('ANALYZE transactions')
+    return rows, products
+
+
+def naive_read(io, shop_ids, n):
+    """One SELECT per transaction id; (rows, seconds)."""
+    with io.connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT id FROM transactions WHERE shop_id = ANY(%s) LIMIT %s', (shop_ids, n))
+        ids = [r[0] for r in cur.fetchall()]
+        start = time.perf_counter()
+        for i in ids:
+            cur.execute('SELECT t.occurred_at, t.shop_id, t.sku_id, t.user_id, t.type, t.quantity, '
+                        'i.selling_price, t.is_offline FROM transactions t LEFT JOIN inventory i '
+                        'ON i.shop_id = t.shop_id AND i.sku_id = t.sku_id WHERE t.id = %s', (i,))
+            cur.fetchone()
+        return len(ids), time.perf_counter() - start
+
+
+def fetchall_read(io):
+    """One SELECT, rows as Python tuples, then NumPy columns; (rows, seconds)."""
+    start = time.perf_counter()
+    with io.connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT t.occurred_at, t.shop_id, t.sku_id, t.user_id, t.type, t.quantity, '
+                    'i.selling_price, t.is_offline FROM transactions t LEFT JOIN inventory i '
+                    'ON i.shop_id = t.shop_id AND i.sku_id = t.sku_id')
+        rows = cur.fetchall()
+    codes = {}
+    columns = list(zip(*rows))
+    np.array([t.timestamp() for t in columns[0]])
+    for k in (1, 2, 3, 4):
+        np.array([codes.setdefault(v, len(codes)) for v in columns[k]])
+    np.array(columns[5], dtype=np.float64)
+    np.array([float(p or 0) for p in columns[6]])
+    np.array(columns[7], dtype=bool)
+    return len(rows), time.perf_counter() - start
+
+
+def naive_write(io, sku, deviation, loss, commit_each=False):
+    """One INSERT per alert, in one transaction or committing each; seconds."""
+    shop_ids, sku_ids = io.shops.ids, io.skus.ids
+    start = time.perf_counter()
+    with io.connection() as conn, conn.cursor() as cur:
+        for s, d, l in zip(sku.tolist(), deviation.tolist(), loss.tolist()):
+            cur.execute('INSERT INTO alerts (shop_id, sku_id, deviation, estimated_loss) '
+                        'VALUES (%s, %s, %s, %s)',
+                        (shop_ids[io.sku_shop[s]], sku_ids[io.sku_product[s]], round(d), l))
+            if commit_each:
+                conn.commit()
+    return time.perf_counter() - start
+
+
+def timed(label, rows, seconds, *baselines):
+    ratios = ''.join(f'{rows / seconds / b:8.0f}×' for b in baselines)
+    print(f"  {label:<48} {rows:>10,} rows {seconds:8.2f} s {rows / seconds:>12,.0f} rows/s {ratios}")
+    return rows / seconds
+
+
+if __name__ == "__main__":
+
+    args = sys.argv[1:]
+    dsn = args.pop(0) if args and '://' in args[0] else os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise SystemExit(__doc__)
+    shops = int(args[0]) if len(args) > 0 else 400
+    skus = int(args[1]) if len(args) > 1 else 20
+    days = int(args[2]) if len(args) > 2 else 14
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    io = PostgresIO(dsn, max_size=4)
+    shop_id = uuids(shops)
+    shop_ids = [uuid.UUID(bytes=bytes(s)) for s in shop_id]
+
+    try:
+        start = time.perf_counter()
+        loaded, products = load(io, workload, shop_id)
+        print(f"{shops:,} shops × {skus} SKUs × {days} days: {loaded['timestamp'].size:,} transactions "
+              f"loaded in {time.perf_counter() - start:.1f} s\n")
+
+        # ------------------------------------------------------------
+        # Reads
+        # ------------------------------------------------------------
+        n, seconds = naive_read(io, shop_ids, SAMPLE)
+        base = timed('one SELECT per row (sample)', n, seconds)
+        timed('one SELECT, fetchall() → NumPy columns', *fetchall_read(io), base)
+
+        start = time.perf_counter()
+        inventory = io.read_inventory()
+        timed('read_inventory', inventory['sku'].size, time.perf_counter() - start, base)
+        start = time.perf_counter()
+        events = collect(io.read_transactions())
+        timed('read_transactions (binary COPY)', events['timestamp'].size,
+              time.perf_counter() - start, base)
+
+        # Round trip: map codes back to workload rows, compare sorted
+        shop_of = {sid: s for s, sid in enumerate(str(u) for u in shop_ids)}
+        shop_map = np.array([shop_of[i] for i in io.shops.ids])
+        row_of = {(int(workload.sku_shop[r]),) + products[r]: r for r in range(len(products))}
+        product = {}
+        with io.connection() as conn:
+            for i, b, s in conn.execute('SELECT id, brand, size FROM skus'):
+                product[str(i)] = (b, s)
+        names = io.skus.ids
+        row_map = np.array([row_of[(int(shop_map[s]),) + product[names[p]]]
+                            for s, p in zip(io.sku_shop, io.sku_product)])
+        got = np.stack([events['timestamp'], shop_map[events['shop']], row_map[events['sku']],
+                        events['type'], events['quantity'], events['offline']])
+        want = np.stack([loaded['timestamp'], workload.sku_shop[loaded['sku']], loaded['sku'],
+                         loaded['type'], loaded['quantity'], loaded['offline']])
+        got = got[:, np.lexsort(got[::-1])]
+        want = want[:, np.lexsort(want[::-1])]
+        assert np.array_equal(got, want), 'transactions read back != loaded'
+        price = workload.sell_price[row_map[events['sku']]]
+        assert np.allclose(events['unit_price'], price), 'unit_price != inventory selling_price'
+        assert np.allclose(inventory['selling_price'], workload.sell_price[row_map[inventory['sku']]])
+        print("  transactions / inventory read back == workload loaded: OK\n")
+
+        # ------------------------------------------------------------
+        # Writes
+        # ------------------------------------------------------------
+        rng = np.random.default_rng(7)
+        rows = np.arange(len(io.sku_rows))
+        sku = np.tile(rows, max(1, 400_000 // rows.size))
+        deviation = rng.normal(0, 3, sku.size)
+        loss = np.round(rng.gamma(2.0, 20.0, sku.size), 3)
+
+        seconds = naive_write(io, sku[:SAMPLE], deviation[:SAMPLE], loss[:SAMPLE])
+        base = timed('one INSERT per alert, one transaction (sample)', SAMPLE, seconds)
+        n = SAMPLE // 5
+        seconds = naive_write(io, sku[:n], deviation[:n], loss[:n], commit_each=True)
+        each = timed('one INSERT + COMMIT per alert (sample)', n, seconds)
+        with io.connection() as conn:
+            conn.execute('DELETE FROM alerts WHERE shop_id = ANY(%s)', (shop_ids,))
+        start = time.perf_counter()
+        written = io.write_alerts(sku, deviation, loss)
+        timed('write_alerts (COPY + INSERT … SELECT)', written, time.perf_counter() - start, base, each)
+
+        with io.connection() as conn:
+            cents = conn.execute('SELECT sum(estimated_loss * 100)::bigint FROM alerts '
+                                 'WHERE shop_id = ANY(%s)', (shop_ids,)).fetchone()[0]
+        assert cents == to_minor(loss, 2).sum(), 'alerts total != Σ to_minor(loss)'
+        print(f"  alerts total == Σ to_minor(loss): {cents / 100:,.2f} (exact)")
+
+        # Two days of hourly metrics for every SKU row, then the same keys again
+        hours = min(days, 2) * 24
+        start_us = int(np.datetime64(workload.start_date, 'us').astype(np.int64))
+        period = start_us + np.repeat(np.arange(hours), rows.size) * HOUR_US
+        sku = np.tile(rows, hours)
+        units = rng.poisson(3, sku.size).astype(np.float64)
+        start = time.perf_counter()
+        written = io.upsert_velocity_metrics('HOURLY', sku, period, period + HOUR_US, units, units)
+        timed('upsert_velocity_metrics (insert)', written, time.perf_counter() - start, base, each)
+        units[::3] += 1
+        start = time.perf_counter()
+        written = io.upsert_velocity_metrics('HOURLY', sku, period, period + HOUR_US, units, units)
+        timed('upsert_velocity_metrics (⅓ changed)', sku.size, time.perf_counter() - start, base, each)
+        assert written == units[::3].size, f'{written:,} rows updated, {units[::3].size:,} changed'
+
+        back = collect(io.read_velocity_metrics('HOURLY'))
+        mine = np.isin(io.sku_shop[back['sku']], np.unique(io.sku_shop[rows]))
+        order = np.lexsort((back['sku'][mine], back['period_start'][mine]))
+        assert np.array_equal(back['units_sold'][mine][order], units), 'upsert != last values'
+        assert np.array_equal(back['avg_velocity'][mine][order], units)
+        print(f"  sales_velocity_metrics read back == last upsert ({order.size:,} rows): OK")
+
+        records = [{'shop': int(s), 'pattern': 'end_of_shift_spike', 'severity': 'high',
+                    'description': 'bench'} for s in range(len(io.shops))]
+        io.write_suspicious_activities(records)
+        with io.connection() as conn:
+            stored = conn.execute("SELECT count(*) FROM suspicious_activities WHERE shop_id = ANY(%s) "
+                                  "AND pattern = 'END_OF_SHIFT_SPIKE'", (shop_ids,)).fetchone()[0]
+        assert stored == len(records)
+        print(f"  suspicious_activities: {stored:,} rows: OK")
+
+    finally:
+        with io.connection() as conn:
+            conn.execute('DELETE FROM shops WHERE id = ANY(%s)', (shop_ids,))
+            conn.execute('DELETE FROM skus WHERE size LIKE %s', (f'%{BENCH}%',))
+        io.close()
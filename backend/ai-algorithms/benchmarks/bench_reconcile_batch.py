@@ -0,0 +1,72 @@
+"""
+Smart Loss Control - Batch Reconciliation Benchmark
+====================================================
+
+Compares InventoryEngine.reconcile_batch (NumPy columns) with the
+scalar calculate_expected → calculate_variance → calculate_loss loop.
+
+Run:
+    python benchmarks/bench_reconcile_batch.py [rows]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Engines live in ../algorithms (they are plain modules, not a package)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from inventory_engine_v2 import InventoryEngine, InventoryState
+
+
+def make_columns(rows: int, seed: int = 7):
+    """Random but plausible end-of-day columns for `rows` SKUs."""
+    rng = np.random.default_rng(seed)
+    return {
+        'initial_stock': rng.integers(0, 200, rows).astype(np.float64),
+        'cartons_received': rng.integers(0, 6, rows),
+        'units_sold': rng.integers(0, 150, rows).astype(np.float64),
+        'actual': rng.integers(0, 260, rows).astype(np.float64),
+        'unit_price': np.round(rng.uniform(2, 20, rows), 2),
+    }
+
+
+def scalar_loop(cols, limit: int):
+    """The per-SKU path callers use today."""
+    engine = InventoryEngine()
+    for i in range(limit):
+        state = InventoryState(
+            sku_id='SKU', brand='Brand', size='5L',
+            initial_stock=cols['initial_stock'][i].item(),
+            cartons_received=int(cols['cartons_received'][i]),
+            units_sold=cols['units_sold'][i].item()
+        )
+        expected = engine.calculate_expected(state)
+        variance = engine.calculate_variance(expected, cols['actual'][i].item())
+        engine.calculate_loss(variance['variance'], cols['unit_price'][i].item())
+
+
+if __name__ == "__main__":
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    cols = make_columns(rows)
+
+    # Best of 5 for the batch path
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        InventoryEngine.reconcile_batch(**cols)
+        best = min(best, time.perf_counter() - start)
+
+    # Scalar path on a sample, extrapolated to the full size
+    sample = min(rows, 100_000)
+    start = time.perf_counter()
+    scalar_loop(cols, sample)
+    scalar = (time.perf_counter() - start) * rows / sample
+
+    print(f"Rows:            {rows:,}")
+    print(f"Batch:           {best * 1000:8.1f} ms ({rows / best:,.0f} rows/s)")
+    print(f"Scalar (est.):   {scalar * 1000:8.1f} ms ({rows / scalar:,.0f} rows/s)")
+    print(f"Speed-up:        {scalar / best:8.1f}×")
@@ -0,0 +1,158 @@
+"""
+Smart Loss Control - Spike Sketch Benchmark
+============================================
+
+Fleet sales (plus injected bursts) streamed hour by hour into a
+SpikeSketch, against the exact VOLUME check on every active SKU-hour
+after the first week (exact hourly units per SKU, as a per-SKU
+SalesVelocityTracker would hold them):
+  • recall: exact spikes the sketch named as candidates — all of them,
+    the injected bursts, and those inside the documented bound
+    (current × 168 / volume_multiplier − week ≥ ε × fleet week units)
+  • candidates per active SKU-hour: the share still checked exactly,
+    and keys dropped because more than top_k passed in an hour
+  • confirm() on the candidates == exact spikes among them
+for several volume_multiplier settings, block lengths and widths, plus ingest
+throughput and memory vs one 168-hour ring per SKU.
+
+Run:
+    python benchmarks/bench_spike_sketch.py [shops] [skus_per_shop] [days]
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, SalesVelocityData
+from spike_sketch import SpikeSketch
+from workload_generator import CLOSE_HOUR, OPEN_HOUR, TYPE_CODE, generate_workload
+
+HOUR_US = 3_600_000_000
+SPIKE_RATE = 0.002        # Share of open SKU-hours given a burst
+SPIKE_FACTOR = 8.0        # Burst units = factor × the SKU's usual hourly sales
+BATCH = 50_000            # Events per add() call
+MULTIPLIERS = (2.0, 4.0, 8.0)
+SKETCHES = ((1, 1 << 14), (4, 1 << 14), (4, 1 << 16), (24, 1 << 18))   # (block_hours, width)
+
+
+def fleet_sales(workload, rng):
+    """Sales in time order with bursts added; (events, injected mask)."""
+    c = workload.columns
+    sales = c['type'] == TYPE_CODE['sale']
+    sku, ts, qty = c['sku'][sales], c['timestamp'][sales], c['quantity'][sales]
+
+    # Bursts: a few open hours after the first week, spread over the hour
+    start_hour = int(np.datetime64(workload.start_date, 'h').astype(np.int64))
+    n, hours = len(workload.sku_ids), workload.days * 24
+    hod = np.arange(hours) % 24
+    eligible = (hod >= OPEN_HOUR) & (hod < CLOSE_HOUR) & (np.arange(hours) >= 168)
+    pick = (rng.random((n, hours)) < SPIKE_RATE) & eligible
+    burst_sku, burst_hour = np.nonzero(pick)
+    usual = np.bincount(sku, weights=qty, minlength=n) / (workload.days * (CLOSE_HOUR - OPEN_HOUR))
+    burst_qty = np.ceil(SPIKE_FACTOR * np.maximum(usual[burst_sku], 1.0))
+    burst_ts = (start_hour + burst_hour) * HOUR_US + rng.integers(0, HOUR_US, burst_sku.size)
+
+    sku = np.concatenate([sku, burst_sku])
+    ts = np.concatenate([ts, burst_ts])
+    qty = np.concatenate([qty, burst_qty])
+    order = np.argsort(ts, kind='stable')
+    injected = np.zeros((n, hours), dtype=bool)
+    injected[burst_sku, burst_hour] = True
+    return sku[order], ts[order], qty[order], injected, start_hour
+
+
+def trailing_week(units):
+    """Units in the 168 hours up to and including each hour."""
+    total = np.cumsum(units, axis=1)
+    week = total.copy()
+    week[:, 168:] -= total[:, :-168]
+    return week
+
+
+def stream(sketch, shop, sku, ts, qty, start_hour, shape):
+    """
+    Feed the sales in batches; (candidate mask, seconds, candidates per
+    hour, top-K overflow after the first week).
+    """
+    found = np.zeros(shape, dtype=bool)
+    began = time.perf_counter()
+    batches = []
+    warm = None
+    for i in range(0, ts.size, BATCH):
+        closed = sketch.add(shop[i:i + BATCH], sku[i:i + BATCH],
+                            ts[i:i + BATCH], qty[i:i + BATCH])
+        if warm is None and any(c['hour'] - start_hour >= 167 for c in closed):
+            warm = sketch.overflow
+        batches.extend(closed)
+    batches.append(sketch.close_hour())
+    elapsed = time.perf_counter() - began
+    for c in batches:
+        found[c['sku'], c['hour'] - start_hour] = True
+    return found, elapsed, batches, sketch.overflow - warm
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 14
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    sku, ts, qty, injected, start_hour = fleet_sales(workload, np.random.default_rng(7))
+    shop = workload.sku_shop[sku]
+    n, hours = len(workload.sku_ids), days * 24
+    units = np.bincount(sku * hours + (ts // HOUR_US - start_hour), weights=qty,
+                        minlength=n * hours).reshape(n, hours)
+    scored = units > 0
+    scored[:, :168] = False              # first week: no full baseline yet
+    print(f"{shops:,} shops × {skus} SKUs × {days} days: {ts.size:,} sales, "
+          f"{scored.sum():,} active SKU-hours scored, {injected.sum():,} injected bursts")
+    print(f"  exact state: 168 hourly buckets × {n:,} SKUs = {n * 168 * 8 / 1e6:.0f} MB\n")
+
+    week = trailing_week(units)
+    average = week / 168
+    fleet_week = week.sum(axis=0)
+
+    def share(part, whole):
+        return f"{part.sum() / whole.sum():.1%}" if whole.any() else '-'
+
+    print(f"  {'vol ×':>5} {'block':>5} {'width':>7} {'memory':>7} {'events/s':>10} {'spikes':>10} "
+          f"{'recall':>7} {'bursts':>7} {'in bound':>13} {'checked':>8} {'overflow':>9}")
+    for multiplier in MULTIPLIERS:
+        engine = AnomalyDetectionEngine({'volume_multiplier': multiplier})
+        spikes = scored & (units > multiplier * average)
+        margin = units * 168 / multiplier - week
+        for block_hours, width in SKETCHES:
+            sketch = SpikeSketch(width=width, block_hours=block_hours, engine=engine)
+            found, elapsed, batches, overflow = stream(sketch, shop, sku, ts, qty, start_hour, (n, hours))
+            found &= scored
+            bound = spikes & (margin >= sketch.epsilon * fleet_week)
+            print(f"  {multiplier:>5.0f} {block_hours:>4}h {width:>7,} {sketch.memory_bytes / 1e6:>5.0f}MB "
+                  f"{ts.size / elapsed:>10,.0f} {spikes.sum():>10,} {share(found & spikes, spikes):>7} "
+                  f"{share(found & injected & spikes, injected & spikes):>7} "
+                  f"{share(found & bound, bound):>6} of {bound.sum():>6,}"
+                  f"{found.sum() / scored.sum():>8.1%} {overflow:>9,}")
+
+    # Exact check of the last run's candidates, one engine call each
+    began = datetime.combine(workload.start_date, datetime.min.time())
+
+    def velocity_of(shop_code, sku_code, hour):
+        t = hour - start_hour
+        return SalesVelocityData(workload.sku_ids[sku_code], [units[sku_code, t]],
+                                 average[sku_code, t], began, 0)
+
+    confirmed = checked = 0
+    for c in batches:
+        if c['hour'] - start_hour < 168:
+            continue
+        ok = sketch.confirm(c, velocity_of)
+        assert np.array_equal(ok, spikes[c['sku'], c['hour'] - start_hour]), 'confirm != exact'
+        confirmed += ok.sum()
+        checked += ok.size
+    print(f"\n  confirm(): {checked:,} candidates → {confirmed:,} VOLUME spikes "
+          f"(== exact rule on the same SKU-hours: OK)")
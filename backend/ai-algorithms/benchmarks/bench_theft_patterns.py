@@ -0,0 +1,63 @@
+"""
+Smart Loss Control - Theft Pattern Detection Benchmark
+=======================================================
+
+Compares AnomalyDetectionEngine.detect_theft_patterns (parses each
+timestamp up to three times) with detect_theft_patterns_fast
+(parse once, binary search, vectorised diff) on synthetic week-long
+sales logs, and checks both return the same result.
+
+Run:
+    python benchmarks/bench_theft_patterns.py [size ...]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, to_epoch_us
+
+
+def make_sales_log(size: int, seed: int = 11):
+    """`size` chronologically ordered sales spread over one week."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2026-02-09T06:00:00', 's')
+    offsets = np.sort(rng.integers(0, 7 * 24 * 3600, size))
+    stamps = (start + offsets.astype('timedelta64[s]')).astype(str)
+    return [{'timestamp': t, 'quantity': 1} for t in stamps]
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    engine = AnomalyDetectionEngine()
+
+    print(f"{'sales':>10} {'original':>12} {'fast (dicts)':>14} "
+          f"{'fast (epoch)':>14} {'speed-up':>9}  same")
+
+    for size in sizes:
+        log = make_sales_log(size)
+        shift_end = datetime(2026, 2, 16, 6, 0) - timedelta(hours=2)
+        epochs = to_epoch_us(log)
+
+        slow_t, slow = timed(lambda: engine.detect_theft_patterns(log, shift_end), 1)
+        fast_t, fast = timed(lambda: engine.detect_theft_patterns_fast(log, shift_end))
+        pre_t, pre = timed(lambda: engine.detect_theft_patterns_fast(epochs, shift_end))
+
+        same = slow == fast == pre
+        print(f"{size:>10,} {slow_t * 1000:>10.1f}ms {fast_t * 1000:>12.1f}ms "
+              f"{pre_t * 1000:>12.2f}ms {slow_t / fast_t:>8.1f}×  {same}")
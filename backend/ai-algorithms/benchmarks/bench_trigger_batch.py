@@ -0,0 +1,94 @@
+"""
+Smart Loss Control - Batched Trigger Decision Benchmark
+========================================================
+
+Throughput of AnomalyDetectionEngine.should_trigger_counts for 100k
+SKUs per call (one shop and many shops), against the scalar
+should_trigger_count loop. Also checks that a fixed seed gives the
+same decisions twice.
+
+Run:
+    python benchmarks/bench_trigger_batch.py [skus]
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine, SalesVelocityData
+
+
+def make_inputs(skus: int, now: datetime, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return {
+        'current_hour_sales': rng.poisson(4, skus).astype(np.float64),
+        'seven_day_average': rng.uniform(1, 6, skus),
+        'last_count_timestamps': (
+            np.datetime64(now, 'us')
+            - rng.integers(0, 8 * 3600, skus).astype('timedelta64[s]')
+        ),
+        'sales_since_trigger': rng.integers(0, 15, skus),
+    }
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+
+    skus = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    now = datetime(2026, 2, 16, 15, 0)
+    inputs = make_inputs(skus, now)
+    engine = AnomalyDetectionEngine(seed=2026)
+
+    print(f"SKUs per call: {skus:,}")
+
+    for shops in (1, 100, 10_000):
+        shop_ids = np.arange(skus) % shops
+        elapsed = best_of(lambda: engine.should_trigger_counts(
+            current_time=now, shop_ids=shop_ids, **inputs
+        ))
+        print(f"  batch, {shops:>6,} shop(s): {elapsed * 1000:8.1f} ms "
+              f"({skus / elapsed:,.0f} SKUs/s)")
+
+    first = engine.should_trigger_counts(current_time=now, shop_ids=shop_ids, **inputs)
+    again = engine.should_trigger_counts(current_time=now, shop_ids=shop_ids, **inputs)
+    print(f"  reproducible with seed:   {bool(np.array_equal(first['type'], again['type']))}")
+
+    # Scalar loop on a sample, extrapolated
+    sample = min(skus, 20_000)
+    last = inputs['last_count_timestamps'].astype(datetime)
+    velocities = [
+        SalesVelocityData(
+            sku_id=str(i),
+            hourly_sales=[inputs['current_hour_sales'][i].item()],
+            seven_day_average=inputs['seven_day_average'][i].item(),
+            last_count_timestamp=last[i],
+            total_sales_since_count=0
+        )
+        for i in range(sample)
+    ]
+    counters = inputs['sales_since_trigger'][:sample].tolist()
+
+    start = time.perf_counter()
+    for velocity, counter in zip(velocities, counters):
+        engine.should_trigger_count(velocity, now, counter)
+    scalar = (time.perf_counter() - start) * skus / sample
+
+    print(f"  scalar loop (est.):       {scalar * 1000:8.1f} ms "
+          f"({skus / scalar:,.0f} SKUs/s)")
+
+    labels = np.asarray(AnomalyDetectionEngine.TRIGGER_TYPES)
+    types, counts = np.unique(labels[first['type']], return_counts=True)
+    print("  decisions: " + ", ".join(f"{t}={c:,}" for t, c in zip(types, counts)))
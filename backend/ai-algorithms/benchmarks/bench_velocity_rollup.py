@@ -0,0 +1,170 @@
+"""
+Smart Loss Control - Velocity Rollup Benchmark
+===============================================
+
+Fleet sales streamed through a VelocityRollup in arrival order, with a
+share of them synced late (offline devices, delays of up to 12 days),
+against brute-force recomputation from the raw sales:
+  1. correctness: the last value emitted for every HOURLY / DAILY /
+     WEEKLY bucket (upsert semantics) == units summed from scratch over
+     the sales the rollup kept; seven_day_average and the open hour ==
+     the raw sales of the trailing 168 hours, at several points
+  2. throughput: events/s through add() (emission included), against
+     rescanning every sale so far at each hour close
+
+Run:
+    python benchmarks/bench_velocity_rollup.py [shops] [skus_per_shop] [days]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from velocity_rollup import (HOUR_US, HOURS_PER_DAY, HOURS_PER_WEEK, VelocityRollup,
+                             week_of, week_start)
+from workload_generator import TYPE_CODE, generate_workload
+
+BATCH = 20_000            # Events per add() call
+LATE_RATE = 0.02          # Share of sales synced late
+LATE_MEAN_HOURS = 36      # Mean sync delay (exponential, capped)
+LATE_MAX_HOURS = 12 * 24
+CHECKS = 8                # seven_day_average spot checks
+
+
+def arriving_sales(workload, rng):
+    """Sales in arrival order, a share delayed; (sku, timestamp, quantity)."""
+    c = workload.columns
+    sales = np.flatnonzero(c['type'] == TYPE_CODE['sale'])
+    ts = c['timestamp'][sales]
+
+    # Arrival clock: the newest timestamp seen so far, plus a delay
+    arrival = np.maximum.accumulate(ts).astype(np.float64)
+    late = rng.random(ts.size) < LATE_RATE
+    delay = np.minimum(rng.exponential(LATE_MEAN_HOURS, late.sum()), LATE_MAX_HOURS)
+    arrival[late] += delay * HOUR_US
+    order = np.argsort(arrival, kind='stable')
+    rows = sales[order]
+    return c['sku'][rows].astype(np.int64), c['timestamp'][rows], c['quantity'][rows]
+
+
+def kept_mask(hours, history_hours):
+    """The rollup's rule: drop sales older than history at their batch's start."""
+    starts = np.arange(0, hours.size, BATCH)
+    batch_max = np.maximum.reduceat(hours, starts)
+    head = np.maximum.accumulate(np.concatenate([[hours[:BATCH].min()], batch_max[:-1]]))
+    head = np.maximum(head, hours[:BATCH].min())
+    return hours >= np.repeat(head, np.diff(np.append(starts, hours.size))) - history_hours + 1
+
+
+def last_values(parts):
+    """Last emitted value per (sku, period_start): what the upserts leave."""
+    sku = np.concatenate([p['sku'] for p in parts])
+    start = np.concatenate([p['period_start'] for p in parts]) // HOUR_US
+    units = np.concatenate([p['units_sold'] for p in parts])
+    key = start * (sku.max() + 1) + sku
+    _, last = np.unique(key[::-1], return_index=True)
+    last = key.size - 1 - last
+    return sku[last], start[last], units[last]
+
+
+def brute_force(sku, hours, qty, n):
+    """Hour, day and week totals from scratch: {window: (sku, start hour, units)}."""
+    out = {}
+    for window, bucket, start_of in (
+            ('HOURLY', hours, lambda b: b),
+            ('DAILY', hours // HOURS_PER_DAY, lambda b: b * HOURS_PER_DAY),
+            ('WEEKLY', week_of(hours), week_start)):
+        key, inverse = np.unique(bucket * n + sku, return_inverse=True)
+        units = np.bincount(inverse, weights=qty)
+        b, s = np.divmod(key, n)
+        keep = units != 0
+        out[window] = (s[keep], start_of(b[keep]), units[keep])
+    return out
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 14
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    sku, ts, qty = arriving_sales(workload, np.random.default_rng(7))
+    n = len(workload.sku_ids)
+    hours = ts // HOUR_US
+
+    rollup = VelocityRollup(n)
+    kept = kept_mask(hours, rollup.history_hours)
+    emitted = {'HOURLY': [], 'DAILY': [], 'WEEKLY': []}
+    checkpoints = set(np.linspace(BATCH, ts.size, CHECKS, dtype=np.int64) // BATCH * BATCH)
+
+    # ------------------------------------------------------------
+    # Stream
+    # ------------------------------------------------------------
+    elapsed = 0.0
+    for i in range(0, ts.size, BATCH):
+        start = time.perf_counter()
+        rows = rollup.add(sku[i:i + BATCH], ts[i:i + BATCH], qty[i:i + BATCH])
+        elapsed += time.perf_counter() - start
+        for window, columns in rows.items():
+            emitted[window].append(columns)
+
+        if i + BATCH in checkpoints or i + BATCH >= ts.size:
+            seen = slice(0, i + BATCH)
+            window = kept[seen] & (hours[seen] > rollup.head - HOURS_PER_WEEK) & (hours[seen] <= rollup.head)
+            week = np.bincount(sku[seen][window], weights=qty[seen][window], minlength=n)
+            assert np.array_equal(rollup.seven_day_average(), week / HOURS_PER_WEEK), 'seven_day_average'
+            now = kept[seen] & (hours[seen] == rollup.head)
+            assert np.array_equal(rollup.current_hour_sales(),
+                                  np.bincount(sku[seen][now], weights=qty[seen][now], minlength=n))
+
+    # Close everything up to the end of the last week
+    end = week_start(week_of(int(hours.max())) + 1)
+    start = time.perf_counter()
+    for window, columns in rollup.advance(end * HOUR_US).items():
+        emitted[window].append(columns)
+    elapsed += time.perf_counter() - start
+
+    total = sum(p['sku'].size for parts in emitted.values() for p in parts)
+    print(f"{shops:,} shops × {skus} SKUs × {days} days: {ts.size:,} sales, "
+          f"{rollup.late:,} late (reopened buckets), {rollup.dropped:,} older than "
+          f"{rollup.history_hours // 24} days (dropped), {rollup.future:,} too far ahead\n")
+    assert rollup.future == 0, 'workload sales taken for future-dated ones'
+
+    # ------------------------------------------------------------
+    # Correctness against recomputation
+    # ------------------------------------------------------------
+    truth = brute_force(sku[kept], hours[kept], qty[kept], n)
+    distinct = 0
+    for window in emitted:
+        got = last_values(emitted[window])
+        want = truth[window]
+        g = np.lexsort((got[0], got[1]))
+        w = np.lexsort((want[0], want[1]))
+        assert all(np.array_equal(a[g], b[w]) for a, b in zip(got, want)), f'{window} != brute force'
+        distinct += got[0].size
+        print(f"  {window:<7} {got[0].size:>10,} buckets == brute force")
+    print(f"  {total - distinct:,} re-emitted rows for reopened buckets "
+          f"({total:,} emitted in all)")
+    print(f"  seven_day_average / current hour == trailing 168 h of raw sales at {len(checkpoints)} points: OK\n")
+
+    # ------------------------------------------------------------
+    # Throughput: incremental vs rescanning at every hour close
+    # ------------------------------------------------------------
+    span = int(hours.max() - hours.min()) + 1
+    prefixes = np.linspace(ts.size / days, ts.size, days).astype(np.int64)
+    took = []
+    for p in prefixes:
+        start = time.perf_counter()
+        brute_force(sku[:p], hours[:p], qty[:p], n)
+        took.append(time.perf_counter() - start)
+    rescans = sum(took) * span / days
+    print(f"  rollup (add + advance)                  {elapsed:8.2f} s  {ts.size / elapsed:>12,.0f} events/s")
+    print(f"  rescan all sales at every hour close    {rescans:8.2f} s  "
+          f"(one rescan per day timed, × {span / days:.0f}; {rescans / elapsed:.0f}× slower)")
+    print(f"  one rescan of all {days} days             {took[-1]:8.2f} s")
+    print(f"\n  rollup state: {rollup.memory_bytes / 1e6:.0f} MB")
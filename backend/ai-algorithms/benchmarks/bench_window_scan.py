@@ -0,0 +1,139 @@
+"""
+Smart Loss Control - Multi-Window Detector Benchmark
+=====================================================
+
+Tuning grid for the end-of-shift / gap checks over every shop-day of a
+generated workload:
+  1. re-run detect_theft_patterns on the shop-day's sales dicts once per
+     (window, sales threshold, gap threshold) setting
+  2. the same with detect_theft_patterns_fast on pre-parsed epochs
+  3. one MultiWindowDetector.scan per shop-day (dicts, and epochs)
+
+Also checks every grid entry against the re-runs, and the busiest-window
+counts against a brute-force two-pointer sweep, then shows how scan
+time grows with the number of window lengths.
+
+Run:
+    python benchmarks/bench_window_scan.py [shops] [skus_per_shop] [days]
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'algorithms'))
+
+from anomaly_detection_v2 import AnomalyDetectionEngine
+from event_replay import EVENT_TYPES
+from window_scan import MultiWindowDetector
+from workload_generator import generate_workload
+
+DAY_US = 86_400_000_000
+
+
+def shop_days(workload):
+    """Sorted sale times of every shop-day."""
+    cols = workload.columns
+    sales = np.flatnonzero(cols['type'] == EVENT_TYPES.index('sale'))
+    ts, shop = cols['timestamp'][sales], cols['shop'][sales]
+    order = np.lexsort((ts, ts // DAY_US, shop))
+    ts, key = ts[order], (shop[order].astype(np.int64) << 32) | (ts[order] // DAY_US)
+    bounds = np.flatnonzero(np.r_[True, key[1:] != key[:-1], True])
+    return [ts[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def busiest_brute_force(times, window_min):
+    """Largest count in any [t, t + w] starting at a sale (two pointers)."""
+    best, right = 0, 0
+    for left in range(times.size):
+        while right < times.size and times[right] <= times[left] + window_min * 60_000_000:
+            right += 1
+        best = max(best, right - left)
+    return best
+
+
+def rerun_grid(days, detector, method):
+    """One detector call per setting per shop-day."""
+    flags = []
+    for log in days:
+        if isinstance(log, np.ndarray):
+            shift_end = np.datetime64(int(log[-1]), 'us').item()
+        else:
+            shift_end = datetime.fromisoformat(log[-1]['timestamp'])
+        for window in detector.windows_min.tolist():
+            for threshold in detector.sales_thresholds.tolist():
+                for gap in detector.gap_thresholds_min.tolist():
+                    engine = AnomalyDetectionEngine({'shift_window_min': window,
+                                                     'suspicious_sales': threshold,
+                                                     'gap_threshold_min': gap})
+                    result = getattr(engine, method)(log, shift_end)
+                    flags.append({p['pattern'] for p in result['patterns']})
+    return flags
+
+
+def scan_grid(days, detector):
+    return [detector.scan(log) for log in days]
+
+
+if __name__ == "__main__":
+
+    shops = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+
+    workload = generate_workload(shops=shops, skus_per_shop=skus, days=days)
+    groups = shop_days(workload)
+    detector = MultiWindowDetector()
+    settings = (detector.windows_min.size * detector.sales_thresholds.size
+                * detector.gap_thresholds_min.size)
+    print(f"{len(groups):,} shop-days, {sum(g.size for g in groups):,} sales; "
+          f"grid of {settings} settings")
+
+    logs = [[{'timestamp': t.isoformat(), 'quantity': 1}
+             for t in times.astype('datetime64[us]').astype(datetime)] for times in groups]
+
+    timings, reruns = {}, []
+    for label, method, days_in in (
+            ('detect_theft_patterns, per setting', 'detect_theft_patterns', logs),
+            ('..._fast on epochs, per setting', 'detect_theft_patterns_fast', groups)):
+        start = time.perf_counter()
+        reruns.append(rerun_grid(days_in, detector, method))
+        timings[label] = time.perf_counter() - start
+    for label, days_in in (('one scan per shop-day (dicts)', logs),
+                           ('one scan per shop-day (epochs)', groups)):
+        start = time.perf_counter()
+        scans = scan_grid(days_in, detector)
+        timings[label] = time.perf_counter() - start
+
+    slowest = max(timings.values())
+    print()
+    for label, seconds in timings.items():
+        print(f"  {label:<38}{seconds:8.2f} s {slowest / seconds:8.0f}×")
+
+    # Every grid entry agrees with the re-runs
+    assert reruns[0] == reruns[1]
+    it = iter(reruns[0])
+    for scan in scans:
+        for w in range(detector.windows_min.size):
+            for t in range(detector.sales_thresholds.size):
+                for g in range(detector.gap_thresholds_min.size):
+                    flagged = next(it)
+                    assert scan['end_flags'][w, t] == ('end_of_shift_spike' in flagged)
+                    assert scan['gap_flags'][g] == ('extended_gap' in flagged)
+    print("\n  every setting == per-setting detector runs: OK")
+
+    for times, scan in zip(groups[:20], scans):
+        for k, window in enumerate(detector.windows_min.tolist()):
+            assert scan['peak_counts'][k] == busiest_brute_force(times, window)
+    print("  busiest windows == brute-force two-pointer sweep: OK")
+
+    # Cost per shop-day as the window grid grows
+    print(f"\n  {'windows':>8} {'ms / shop-day':>14}")
+    for n_windows in (1, 5, 10, 20, 40):
+        wide = MultiWindowDetector(np.linspace(5, 240, n_windows).astype(int).tolist())
+        start = time.perf_counter()
+        scan_grid(groups[:200], wide)
+        print(f"  {n_windows:>8} {(time.perf_counter() - start) / 200 * 1000:>14.2f}")
@@ -0,0 +1,160 @@
+"""
+Smart Loss Control - Engine Service Load Test
+==============================================
+
+Starts a local engine_service.py and drives it with many concurrent
+keep-alive connections (closed loop: each connection sends its next
+request when the previous answer arrives). The request mix follows
+the device traffic: mostly trigger polls, some counts, variance checks
+and the occasional theft-pattern scan.
+
+Reports client-side throughput and p50/p99 latency per endpoint, the
+service's own /v1/stats (mean batch size, rejections) and how many
+503s (backpressure) were seen. Needs nothing but this repo.
+
+Run:
+    python benchmarks/load_test_service.py
+    python benchmarks/load_test_service.py --connections 128 --duration 10
+    python benchmarks/load_test_service.py --max-batch 1   # no batching
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SERVICE = Path(__file__).resolve().parent.parent / 'algorithms' / 'engine_service.py'
+
+# Share of each endpoint in the request mix
+MIX = (
+    ('should_trigger_count', 0.70),
+    ('process_count', 0.15),
+    ('calculate_variance', 0.10),
+    ('detect_theft_patterns', 0.05),
+)
+
+
+def make_request(endpoint: str, rng: random.Random) -> dict:
+    if endpoint == 'should_trigger_count':
+        return {
+            'shop_id': f'SHOP_{rng.randrange(500):04d}',
+            'sku_id': f'SKU_{rng.randrange(20):03d}',
+            'current_hour_sales': rng.randrange(0, 12),
+            'seven_day_average': round(rng.uniform(0.5, 4), 2),
+            'last_count_timestamp': f'2026-02-16T{rng.randrange(6, 18):02d}:00:00',
+            'current_time': '2026-02-16T18:30:00',
+            'sales_since_trigger': rng.randrange(0, 15),
+        }
+    if endpoint == 'process_count':
+        expected = rng.randrange(20, 200)
+        return {'expected': expected, 'actual': expected - rng.randrange(0, 3),
+                'unit_price': 14.0, 'staff_id': 'STAFF_01',
+                'counted_at': '2026-02-16T15:00:00'}
+    if endpoint == 'calculate_variance':
+        expected = rng.randrange(20, 200)
+        return {'expected': expected, 'actual': expected + rng.randrange(-3, 2)}
+    minutes = sorted(rng.sample(range(6 * 60, 21 * 60), 40))
+    return {
+        'sales_log': [{'timestamp': f'2026-02-16T{m // 60:02d}:{m % 60:02d}:00'}
+                      for m in minutes],
+        'shift_end': '2026-02-16T21:00:00',
+    }
+
+
+async def http_call(reader, writer, method, path, body=b''):
+    writer.write(
+        f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+        f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+        .encode() + body
+    )
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, deadline, seed, latencies, statuses):
+    rng = random.Random(seed)
+    names = [name for name, _ in MIX]
+    weights = [w for _, w in MIX]
+    reader, writer = await asyncio.open_connection(host, port)
+    clock = time.perf_counter_ns
+
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(names, weights)[0]
+        body = json.dumps(make_request(endpoint, rng)).encode()
+        start = clock()
+        status, _ = await http_call(reader, writer, 'POST', f'/v1/{endpoint}', body)
+        elapsed = clock() - start
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 200:
+            latencies[endpoint].append(elapsed)
+        elif status == 503:
+            await asyncio.sleep(0.01)   # back off as Retry-After asks
+
+    writer.close()
+
+
+async def run(args, host, port):
+    latencies = {name: [] for name, _ in MIX}
+    statuses = {}
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        client(host, port, deadline, k, latencies, statuses)
+        for k in range(args.connections)
+    ))
+    wall = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, body = await http_call(reader, writer, 'GET', '/v1/stats')
+    writer.close()
+    return latencies, statuses, wall, json.loads(body)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Engine service load test')
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--max-pending', type=int, default=4096)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, str(SERVICE), '--port', '0',
+         '--max-batch', str(args.max_batch), '--max-wait-ms', str(args.max_wait_ms),
+         '--max-pending', str(args.max_pending)],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        line = server.stdout.readline().strip()       # "listening on host:port"
+        host, port = line.rsplit(' ', 1)[1].rsplit(':', 1)
+        latencies, statuses, wall, stats = asyncio.run(run(args, host, int(port)))
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{args.connections} connections, {args.duration:.0f}s, "
+          f"max_batch={args.max_batch}, max_wait={args.max_wait_ms}ms")
+    print(f"  {total:,} OK responses, {total / wall:,.0f} req/s; status counts {statuses}\n")
+    print(f"  {'endpoint':<24}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'mean batch':>12}{'rejected':>10}")
+    for name, _ in MIX:
+        lat = np.asarray(latencies[name], dtype=np.float64) / 1e6
+        p50, p99 = np.percentile(lat, [50, 99]) if lat.size else (0, 0)
+        server_side = stats['endpoints'][name]
+        print(f"  {name:<24}{lat.size:>10,}{p50:>10.2f}{p99:>10.2f}"
+              f"{server_side['mean_batch_size']:>12.1f}{server_side['rejected']:>10}")
@@ -0,0 +1,422 @@
+"""
+Smart Loss Control - Engine Benchmark Suite
+============================================
+
+Throughput and latency percentiles for every public method of
+inventory_engine_v2.py and anomaly_detection_v2.py, fed with inputs
+from workload_generator.py.
+
+Results are written as JSON (one file per commit by default) so two
+runs can be compared:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/abc123.json
+
+Options:
+    --shops / --skus / --days   workload size (default 50 × 20 × 7)
+    --min-time SECONDS          time spent per case (default 0.3)
+    --only SUBSTRING            run matching cases only
+    --output PATH               where to write the JSON
+    --compare PATH              print the change against an earlier run
+    --threshold PCT             slow-down that counts as a regression
+    --instrument                run with instrumentation.EngineMetrics
+                                enabled (measures its overhead)
+"""
+
+import argparse
+import inspect
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / 'algorithms'))
+
+import anomaly_detection_v2
+import inventory_engine_v2
+from anomaly_detection_v2 import (
+    AnomalyDetectionEngine, QuickCountManager, SalesVelocityData,
+    datetime_to_epoch_us, to_epoch_us
+)
+from instrumentation import EngineMetrics
+from inventory_engine_v2 import InventoryEngine, InventoryState
+from workload_generator import TYPE_CODE, generate_workload
+
+
+# -------------------------------------------------------------------
+# CASE REGISTRY
+# -------------------------------------------------------------------
+# A case is a function taking the prepared inputs and returning a
+# zero-argument callable (one "call") plus how many items it handles.
+# -------------------------------------------------------------------
+
+CASES = {}
+
+
+def case(name: str):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+# -------------------------------------------------------------------
+# INPUTS
+# -------------------------------------------------------------------
+
+class Inputs:
+    """Everything the cases need, derived from one generated workload."""
+
+    def __init__(self, shops: int, skus: int, days: int, seed: int = 2026):
+        self.params = {'shops': shops, 'skus_per_shop': skus, 'days': days,
+                       'seed': seed}
+        self.workload = generate_workload(shops=shops, skus_per_shop=skus,
+                                          days=days, seed=seed)
+        c = self.workload.columns
+        n_skus = len(self.workload.sku_ids)
+
+        sales = c['type'] == TYPE_CODE['sale']
+        self.units_sold = np.bincount(c['sku'][sales], weights=c['quantity'][sales],
+                                      minlength=n_skus)
+        restocks = c['type'] == TYPE_CODE['restock']
+        self.cartons = np.bincount(c['sku'][restocks], weights=c['quantity'][restocks],
+                                   minlength=n_skus) // 12
+        self.initial = self.workload.initial_litres.astype(np.float64)
+        self.actual = self.initial + self.cartons * 12 - self.units_sold
+        self.actual -= np.random.default_rng(seed).integers(0, 2, n_skus)
+        self.price = self.workload.sell_price
+
+        # One busy staff member's week of sales, as dicts and epochs
+        staff = np.bincount(c['staff'][sales]).argmax()
+        rows = np.flatnonzero(sales & (c['staff'] == staff))
+        rows = rows[np.argsort(c['timestamp'][rows], kind='stable')]
+        self.sales_log = [
+            {'timestamp': np.datetime64(int(t), 'us').astype('datetime64[s]').item().isoformat()}
+            for t in c['timestamp'][rows].tolist()
+        ]
+        self.sales_epochs = c['timestamp'][rows]
+        last = self.sales_epochs[-1]
+        self.shift_end = np.datetime64(int(last), 'us').item()
+
+        # Per-SKU velocity inputs at the end of the workload
+        self.now = datetime.combine(self.workload.start_date, datetime.min.time()) \
+            + timedelta(days=days, hours=-3)
+        rng = np.random.default_rng(seed + 1)
+        self.current_hour = rng.poisson(3, n_skus).astype(np.float64)
+        self.average = rng.uniform(0.5, 4, n_skus)
+        self.last_count = (np.datetime64(self.now, 'us')
+                           - rng.integers(0, 8 * 3600, n_skus).astype('timedelta64[s]'))
+        self.since_trigger = rng.integers(0, 15, n_skus)
+        self.shop_of = self.workload.sku_shop
+        self.velocities = [
+            SalesVelocityData(
+                self.workload.sku_ids[i], [self.current_hour[i].item()],
+                self.average[i].item(), self.last_count[i].item(), 0
+            )
+            for i in range(min(n_skus, 5_000))
+        ]
+
+        expected = np.maximum(self.initial + self.cartons * 12 - self.units_sold, 1)
+        self.pct = (self.actual - expected) / expected * 100
+        self.count_records = [
+            (expected[i].item(), self.actual[i].item(), self.price[i].item(),
+             'STAFF', self.now)
+            for i in range(n_skus)
+        ]
+
+
+# -------------------------------------------------------------------
+# inventory_engine_v2
+# -------------------------------------------------------------------
+
+@case('InventoryEngine.calculate_expected')
+def _(inp):
+    states = [InventoryState('SKU', 'B', '5L', inp.initial[i].item(),
+                             int(inp.cartons[i]), inp.units_sold[i].item())
+              for i in range(len(inp.initial))]
+    it = iter(range(1 << 62))
+    return lambda: InventoryEngine.calculate_expected(states[next(it) % len(states)]), 1
+
+
+@case('InventoryEngine.calculate_variance')
+def _(inp):
+    return lambda: InventoryEngine.calculate_variance(135.0, 132.0), 1
+
+
+@case('InventoryEngine.calculate_loss')
+def _(inp):
+    return lambda: InventoryEngine.calculate_loss(-3.0, 14.0), 1
+
+
+@case('InventoryEngine.validate_delivery')
+def _(inp):
+    return lambda: InventoryEngine.validate_delivery(100, 98, 12.33), 1
+
+
+@case('InventoryEngine.log_decant')
+def _(inp):
+    return lambda: InventoryEngine.log_decant(2), 1
+
+
+@case('InventoryEngine.reconcile_batch')
+def _(inp):
+    n = len(inp.initial)
+    return (lambda: InventoryEngine.reconcile_batch(
+        inp.initial, inp.cartons, inp.units_sold, inp.actual, inp.price)), n
+
+
+# -------------------------------------------------------------------
+# anomaly_detection_v2
+# -------------------------------------------------------------------
+
+@case('AnomalyDetectionEngine.should_trigger_count')
+def _(inp):
+    engine = AnomalyDetectionEngine(seed=1)
+    it = iter(range(1 << 62))
+    v = inp.velocities
+    return lambda: engine.should_trigger_count(v[next(it) % len(v)], inp.now, 5), 1
+
+
+@case('AnomalyDetectionEngine.should_trigger_counts')
+def _(inp):
+    engine = AnomalyDetectionEngine(seed=1)
+    return (lambda: engine.should_trigger_counts(
+        inp.current_hour, inp.average, inp.last_count, inp.now,
+        inp.since_trigger, shop_ids=inp.shop_of)), len(inp.average)
+
+
+@case('AnomalyDetectionEngine.classify_variance')
+def _(inp):
+    engine = AnomalyDetectionEngine()
+    return lambda: engine.classify_variance(-4.2), 1
+
+
+@case('AnomalyDetectionEngine.classify_variances')
+def _(inp):
+    engine = AnomalyDetectionEngine()
+    return lambda: engine.classify_variances(inp.pct), len(inp.pct)
+
+
+@case('AnomalyDetectionEngine.detect_theft_patterns')
+def _(inp):
+    engine = AnomalyDetectionEngine()
+    return (lambda: engine.detect_theft_patterns(inp.sales_log, inp.shift_end)), \
+        len(inp.sales_log)
+
+
+@case('AnomalyDetectionEngine.detect_theft_patterns_fast')
+def _(inp):
+    engine = AnomalyDetectionEngine()
+    return (lambda: engine.detect_theft_patterns_fast(inp.sales_log, inp.shift_end)), \
+        len(inp.sales_log)
+
+
+@case('AnomalyDetectionEngine.detect_theft_patterns_fast[epochs]')
+def _(inp):
+    engine = AnomalyDetectionEngine()
+    return (lambda: engine.detect_theft_patterns_fast(
+        inp.sales_epochs, inp.shift_end, assume_sorted=True)), len(inp.sales_epochs)
+
+
+@case('AnomalyDetectionEngine.pattern_result')
+def _(inp):
+    patterns = AnomalyDetectionEngine().detect_theft_patterns_fast(
+        inp.sales_epochs, inp.shift_end, assume_sorted=True)['patterns']
+    return lambda: AnomalyDetectionEngine.pattern_result(patterns), 1
+
+
+@case('QuickCountManager.generate_prompt')
+def _(inp):
+    sku = {'sku_id': 'KINGS_5L', 'brand': "King's Oil", 'size': '5L'}
+    return lambda: QuickCountManager.generate_prompt(sku), 1
+
+
+@case('QuickCountManager.process_count')
+def _(inp):
+    return lambda: QuickCountManager.process_count(107, 106, 14.0, 'STAFF', inp.now), 1
+
+
+@case('QuickCountManager.process_counts')
+def _(inp):
+    engine = AnomalyDetectionEngine()
+    return (lambda: QuickCountManager.process_counts(inp.count_records, engine)), \
+        len(inp.count_records)
+
+
+@case('QuickCountManager.count_record')
+def _(inp):
+    result = QuickCountManager.process_counts(inp.count_records[:100])
+    return lambda: QuickCountManager.count_record(result, 7), 1
+
+
+@case('QuickCountManager.count_records')
+def _(inp):
+    result = QuickCountManager.process_counts(inp.count_records[:100])
+    rows = np.arange(0, min(100, len(inp.count_records)), 2)
+    return lambda: QuickCountManager.count_records(result, rows), len(rows)
+
+
+@case('to_epoch_us')
+def _(inp):
+    return lambda: to_epoch_us(inp.sales_log), len(inp.sales_log)
+
+
+@case('datetime_to_epoch_us')
+def _(inp):
+    return lambda: datetime_to_epoch_us(inp.now), 1
+
+
+# -------------------------------------------------------------------
+# RUNNER
+# -------------------------------------------------------------------
+
+def public_methods():
+    """Every public callable the two engine modules define."""
+    names = set()
+    for module in (inventory_engine_v2, anomaly_detection_v2):
+        for name, obj in vars(module).items():
+            if name.startswith('_') or getattr(obj, '__module__', None) != module.__name__:
+                continue
+            if inspect.isfunction(obj):
+                names.add(name)
+            elif inspect.isclass(obj):
+                for attr, member in vars(obj).items():
+                    if attr.startswith('_'):
+                        continue
+                    if isinstance(member, (staticmethod, classmethod)) \
+                            or inspect.isfunction(member):
+                        names.add(f'{name}.{attr}')
+    return names
+
+
+def measure(call, min_time: float, max_calls: int = 200_000):
+    """Per-call latencies (ns) until min_time has been spent."""
+    call()  # warm-up
+    latencies = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    while len(latencies) < max_calls:
+        start = clock()
+        call()
+        end = clock()
+        latencies.append(end - start)
+        if end >= deadline and len(latencies) >= 5:
+            break
+    return np.asarray(latencies, dtype=np.float64)
+
+
+def summarise(latencies_ns: np.ndarray, items: int) -> dict:
+    p50, p95, p99 = np.percentile(latencies_ns, [50, 95, 99]) / 1e3
+    total_s = latencies_ns.sum() / 1e9
+    return {
+        'calls': int(latencies_ns.size),
+        'items_per_call': int(items),
+        'mean_us': round(latencies_ns.mean() / 1e3, 3),
+        'p50_us': round(p50, 3),
+        'p95_us': round(p95, 3),
+        'p99_us': round(p99, 3),
+        'calls_per_s': round(latencies_ns.size / total_s, 1),
+        'items_per_s': round(latencies_ns.size * items / total_s, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_suite(inp: Inputs, min_time: float, only: str = None, cases=None) -> dict:
+    results = {}
+    for name, setup in (cases or CASES).items():
+        if only and only not in name:
+            continue
+        call, items = setup(inp)
+        results[name] = summarise(measure(call, min_time), items)
+        r = results[name]
+        print(f"  {name:<58} p50 {r['p50_us']:>11.2f}µs  "
+              f"p99 {r['p99_us']:>11.2f}µs  {r['items_per_s']:>15,.0f} items/s")
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """Print p50 / throughput change per case; returns #regressions."""
+    regressions = 0
+    print(f"\nAgainst {baseline['meta'].get('commit')} "
+          f"(regression = p50 more than {threshold:.0f}% slower):")
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        change = (now['p50_us'] / before['p50_us'] - 1) * 100 if before['p50_us'] else 0.0
+        flag = 'REGRESSION' if change > threshold else ''
+        regressions += bool(flag)
+        print(f"  {name:<58} {change:>+8.1f}%  {flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--shops', type=int, default=50)
+    parser.add_argument('--skus', type=int, default=20)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.3)
+    parser.add_argument('--only')
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    parser.add_argument('--threshold', type=float, default=10.0)
+    parser.add_argument('--instrument', action='store_true')
+    args = parser.parse_args()
+
+    inp = Inputs(args.shops, args.skus, args.days)
+    print(f"Workload: {inp.workload.size:,} events, "
+          f"{len(inp.workload.sku_ids):,} SKUs, sales log {len(inp.sales_log):,}")
+
+    covered = {name.split('[')[0] for name in CASES}
+    missing = sorted(public_methods() - covered)
+    if missing:
+        print(f"  (no benchmark case for: {', '.join(missing)})")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor() or platform.machine(),
+            'workload': inp.params,
+            'min_time_s': args.min_time,
+            'instrumented': args.instrument,
+        },
+    }
+
+    # Class-level wrapping covers the instances the cases create
+    metrics = EngineMetrics()
+    if args.instrument:
+        for cls in (InventoryEngine, AnomalyDetectionEngine, QuickCountManager):
+            metrics.instrument(cls)
+    with metrics:
+        report['results'] = run_suite(inp, args.min_time, args.only)
+
+    output = Path(args.output) if args.output else \
+        HERE / 'results' / (f"{report['meta']['commit']}"
+                            f"{'-instrumented' if args.instrument else ''}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        sys.exit(1 if compare(report, baseline, args.threshold) else 0)